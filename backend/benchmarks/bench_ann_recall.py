@@ -0,0 +1,68 @@
+"""
+Recall / latency harness: IVF index vs. brute force
+
+Builds a throwaway on-disk index per size, then reports recall@k against
+exact search and per-query latency for a range of ``nprobe`` values.
+
+Run from the backend directory:
+    python -m benchmarks.bench_ann_recall [--sizes 10000 100000] [--nprobe 1 4 8 16 32]
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from utils.ann_index import IVFIndex
+
+DIM = 384
+
+
+def clustered_vectors(rng, n, dim, clusters=200):
+    """Synthetic embeddings with topic structure, like a real paper corpus"""
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    return centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n in args.sizes:
+        vectors = clustered_vectors(rng, n, DIM)
+        queries = clustered_vectors(rng, args.queries, DIM)
+
+        with tempfile.TemporaryDirectory() as path:
+            index = IVFIndex(path)
+            start = time.perf_counter()
+            for chunk in range(0, n, 5000):
+                index.add(list(range(chunk, min(chunk + 5000, n))), vectors[chunk:chunk + 5000])
+            build_s = time.perf_counter() - start
+
+            truth = [{i for i, _ in index.search_exact(q, args.top_k)} for q in queries]
+            start = time.perf_counter()
+            for q in queries:
+                index.search_exact(q, args.top_k)
+            exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+            print(f"\n{n} papers  nlist={index.meta['nlist']}  build={build_s:.1f}s  exact={exact_ms:.2f}ms/query")
+            print(f"{'nprobe':>7} | {'recall@' + str(args.top_k):>9} | {'latency':>9}")
+            for nprobe in args.nprobe:
+                start = time.perf_counter()
+                results = [index.search(q, args.top_k, nprobe=nprobe) for q in queries]
+                latency_ms = (time.perf_counter() - start) / len(queries) * 1000
+                recall = np.mean([
+                    len(truth[i] & {pid for pid, _ in hits}) / args.top_k
+                    for i, hits in enumerate(results)
+                ])
+                print(f"{nprobe:>7} | {recall:>9.3f} | {latency_ms:>7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Chat and search throughput with the sync database path and with DB_ASYNC.
+
+  sync   - regular engine; the routers' database work runs on threadpool
+           workers (core.database.run_db)
+  async  - DB_ASYNC=true: aiosqlite engine, database work runs on the event
+           loop through AsyncSession.run_sync
+
+Each mode runs in its own process (the engine is configured at import) on
+the same seeded workspace, served by uvicorn. Simulated users send a mix of
+new chats, follow-ups in their own conversation and workspace searches; the
+fake LLM from benchmarks.stub_servers answers after --llm-ms and the
+embedding model is replaced by a hashed random vector. Commits and SQL
+statements are counted on the engine, so the per-chat write cost (one
+transaction per turn) is reported alongside latency.
+
+On SQLite expect the async mode to be somewhat slower: aiosqlite still runs
+every connection on its own thread, plus a greenlet hop per statement. The
+async engine is meant for PostgreSQL with asyncpg, where the driver itself
+is non-blocking.
+
+Run from the backend directory:
+    python -m benchmarks.bench_async_db [--requests 600] [--concurrency 8 64] [--llm-ms 50]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+LLM_PORT = 8090
+APP_PORT = 8091
+PAPERS = 200
+
+
+def configure(db_path: str, mode: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ["GROQ_API_KEY"] = "stub"
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{LLM_PORT}"
+    os.environ["EMBEDDING_PRELOAD"] = "lazy"
+    os.environ["EMBEDDING_CACHE_PATH"] = ""
+    os.environ["ANN_INDEX_DIR"] = os.path.join(os.path.dirname(db_path), f"indexes_{mode}")
+    os.environ["JOB_WORKERS"] = "0"
+    os.environ["FULLTEXT_INGEST"] = "false"
+    os.environ["RESPONSE_CACHE"] = "false"
+    os.environ["LLM_MAX_PER_USER"] = "1000"
+    os.environ["DB_ASYNC"] = "true" if mode == "async" else "false"
+
+
+def fake_encode(texts, batch_size=32, dim=384):
+    import numpy as np
+    vectors = []
+    for text in texts:
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "little")
+        vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+        vectors.append(vector / np.linalg.norm(vector))
+    return np.stack(vectors)
+
+
+def seed():
+    from sqlalchemy import insert
+
+    from core.database import Base, SessionLocal, engine
+    from core.migrations import run_migrations
+    from models.conversation import Conversation  # noqa: F401
+    from models.job import Job  # noqa: F401
+    from models.paper import Paper
+    from models.user import User
+    from models.workspace import Workspace
+    from utils.vector_codec import encode_embedding
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    titles = [f"Paper {i} on retrieval method {i % 17}" for i in range(PAPERS)]
+    with SessionLocal() as db:
+        db.add(User(id=1, email="bench@example.org", password="x"))
+        db.add(Workspace(id=1, name="shared", owner_id=1))
+        db.flush()
+        db.execute(insert(Paper), [
+            {"title": title, "abstract": f"We study {title.lower()} in depth. " * 5, "workspace_id": 1,
+             "embedding": encode_embedding(vector)}
+            for title, vector in zip(titles, fake_encode(titles))
+        ])
+        db.commit()
+
+
+async def drive(headers, requests, concurrency):
+    import httpx
+
+    latencies = {"new chat": [], "follow-up": [], "search": []}
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", headers=headers, timeout=300) as client:
+        async def user(n, worker):
+            conversation_id = None
+            for i in range(n):
+                if i % 3 == 2:
+                    kind, call = "search", client.get(
+                        "/papers/workspace/1/search", params={"query": f"retrieval method {(worker + i) % 17}"}
+                    )
+                else:
+                    kind = "follow-up" if conversation_id else "new chat"
+                    params = {"workspace_id": 1, **({"conversation_id": conversation_id} if conversation_id else {})}
+                    call = client.post("/chat", params=params, json={"content": f"Question {worker}-{i} on method {i % 17}"})
+                start = time.perf_counter()
+                r = await call
+                r.raise_for_status()
+                latencies[kind].append((time.perf_counter() - start) * 1000)
+                if kind != "search":
+                    # A fresh conversation every fourth chat
+                    conversation_id = None if i % 4 == 3 else r.json()["conversation_id"]
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user(requests // concurrency, w) for w in range(concurrency)))
+        return sum(map(len, latencies.values())) / (time.perf_counter() - start), latencies
+
+
+def run_mode(mode: str, requests: int, concurrencies, llm_ms: float):
+    import numpy as np
+    from sqlalchemy import event
+
+    from benchmarks.stub_servers import llm_app, serve_in_thread
+    from core import database
+    from core.security import create_access_token
+    from utils.embeddings import embedding_provider
+
+    serve_in_thread(llm_app(first_token_ms=llm_ms, token_ms=0), LLM_PORT)
+    embedding_provider.encode = fake_encode
+    from main import app
+    serve_in_thread(app, APP_PORT)
+
+    counts = {"commits": 0, "statements": 0}
+    target = database.async_engine.sync_engine if database.async_engine is not None else database.engine
+    event.listen(target, "commit", lambda conn: counts.__setitem__("commits", counts["commits"] + 1))
+    event.listen(target, "before_cursor_execute",
+                 lambda *a: counts.__setitem__("statements", counts["statements"] + 1))
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench@example.org', 'uid': 1})}"}
+    asyncio.run(drive(headers, 60, 4))  # warm up: index bootstrap, connections
+
+    results = []
+    for concurrency in concurrencies:
+        counts.update(commits=0, statements=0)
+        rps, latencies = asyncio.run(drive(headers, requests, concurrency))
+        chats = len(latencies["new chat"]) + len(latencies["follow-up"])
+        results.append({
+            "concurrency": concurrency,
+            "rps": rps,
+            "commits_per_chat": counts["commits"] / chats,
+            "statements_per_request": counts["statements"] / sum(map(len, latencies.values())),
+            **{
+                kind: [float(np.percentile(values, 50)), float(np.percentile(values, 99))]
+                for kind, values in latencies.items()
+            }
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 64])
+    parser.add_argument("--llm-ms", type=float, default=50)
+    parser.add_argument("--mode", choices=["seed", "sync", "async"])
+    parser.add_argument("--db")
+    args = parser.parse_args()
+
+    if args.mode:
+        configure(args.db, args.mode)
+        if args.mode == "seed":
+            seed()
+        else:
+            print(json.dumps(run_mode(args.mode, args.requests, args.concurrency, args.llm_ms)))
+        return
+
+    tmp = tempfile.mkdtemp(prefix="bench_async_db_")
+    seeded = os.path.join(tmp, "seed.db")
+    base = [sys.executable, "-m", "benchmarks.bench_async_db", "--requests", str(args.requests),
+            "--llm-ms", str(args.llm_ms), "--concurrency", *map(str, args.concurrency)]
+    subprocess.run([*base, "--mode", "seed", "--db", seeded], check=True)
+
+    print(f"{args.requests} requests per run (2/3 chats, 1/3 searches), {PAPERS} papers, fake LLM {args.llm_ms:.0f}ms")
+    print(f"{'mode':>5} | {'conc':>4} | {'req/s':>6} | {'commits/chat':>12} | {'stmts/req':>9} | "
+          f"{'new chat p50/p99':>17} | {'follow-up p50/p99':>17} | {'search p50/p99':>15}")
+    print("-" * 110)
+    for mode in ("sync", "async"):
+        db = os.path.join(tmp, f"{mode}.db")
+        shutil.copy(seeded, db)
+        out = subprocess.run([*base, "--mode", mode, "--db", db], check=True, capture_output=True, text=True).stdout
+        for row in json.loads(out.strip().splitlines()[-1]):
+            cells = [f"{row[kind][0]:>6.1f}/{row[kind][1]:<6.1f}ms" for kind in ("new chat", "follow-up", "search")]
+            print(f"{mode:>5} | {row['concurrency']:>4} | {row['rps']:>6.0f} | {row['commits_per_chat']:>12.2f} | "
+                  f"{row['statements_per_request']:>9.1f} | {cells[0]:>17} | {cells[1]:>17} | {cells[2]:>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Requests per second on GET /conversations with different ways of resolving
+the current user.
+
+  legacy   - the old path: a sync dependency (run in the threadpool) that
+             verifies the JWT, then a User query by email in the handler
+  verify   - the principal dependency with its token cache disabled: the
+             signature is checked on every request, the user id comes from
+             the token
+  cached   - the principal dependency as shipped: verified tokens come from
+             the TTL cache
+
+Requests go through httpx's ASGI transport, so the numbers are the app's
+own per-request cost without sockets.
+
+Run from the backend directory:
+    python -m benchmarks.bench_auth [--requests 3000] [--concurrency 1 16]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.environment import bench_environment
+
+bench_environment("bench_auth_")
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+from fastapi import Depends, HTTPException  # noqa: E402
+from jose import JWTError, jwt  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from core.database import SessionLocal, get_db  # noqa: E402
+from core.security import ALGORITHM, SECRET_KEY, Principal, token_cache  # noqa: E402
+from models.conversation import Conversation  # noqa: E402
+from models.user import User  # noqa: E402
+from routers.auth import get_current_user, oauth2_scheme  # noqa: E402
+
+
+def legacy_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    # Same request session as the handler, like the old in-handler lookup
+    try:
+        email = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    user = db.query(User).filter(User.email == email).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return Principal(id=user.id, email=user.email)
+
+
+async def drive(app, headers, requests, concurrency):
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        async def worker(n):
+            for _ in range(n):
+                start = time.perf_counter()
+                r = await client.get("/conversations")
+                r.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        await client.get("/conversations")  # warm up
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+        return len(latencies) / (time.perf_counter() - start), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as client:
+        client.post("/register", json={"email": "bench@example.org", "password": "bench"})
+        token = client.post("/login", data={"username": "bench@example.org", "password": "bench"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    with SessionLocal() as db:
+        user_id = db.query(User.id).filter(User.email == "bench@example.org").scalar()
+        db.add_all([Conversation(user_id=user_id) for _ in range(5)])
+        db.commit()
+
+    print(f"GET /conversations (5 rows), {args.requests} requests per run")
+    print(f"{'concurrent':>10} | {'mode':>7} | {'req/s':>7} | {'p50':>8} | {'p99':>8}")
+    print("-" * 52)
+    for concurrency in args.concurrency:
+        for mode in ("legacy", "verify", "cached"):
+            app.dependency_overrides.clear()
+            if mode == "legacy":
+                app.dependency_overrides[get_current_user] = legacy_current_user
+            token_cache.clear()
+            token_cache.max_entries = 0 if mode == "verify" else 10000
+            rps, latencies = asyncio.run(drive(app, headers, args.requests, concurrency))
+            print(
+                f"{concurrency:>10} | {mode:>7} | {rps:>7.0f} | "
+                f"{np.percentile(latencies, 50):>6.2f}ms | {np.percentile(latencies, 99):>6.2f}ms"
+            )
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
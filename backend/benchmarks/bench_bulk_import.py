@@ -0,0 +1,82 @@
+"""
+Benchmark: one-by-one POST /papers/import vs. POST /papers/import/bulk
+
+Runs the real app in-process against a throwaway SQLite database. The
+embedding model is replaced by stub_servers.FakeEmbeddingModel with a fixed
+per-call cost plus a per-text cost (``--call-ms`` / ``--per-text-ms``) so the
+comparison does not depend on torch being installed; pass ``--real-model`` to
+use MiniLM.
+
+Run from the backend directory:
+    python -m benchmarks.bench_bulk_import [--papers 500]
+"""
+import argparse
+import time
+
+from benchmarks.environment import bench_environment
+
+bench_environment("bench_bulk_")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from benchmarks.stub_servers import install_fake_embedder  # noqa: E402
+from main import app  # noqa: E402
+from utils.embeddings import embedding_provider  # noqa: E402
+
+
+def papers(prefix, n):
+    return [
+        {
+            "title": f"{prefix} paper {i}: scaling laws for retrieval",
+            "abstract": "We study how retrieval-augmented models scale with corpus size. " * 4,
+            "authors": "A. Author, B. Author",
+            "year": 2024,
+            "url": f"https://example.org/{prefix}/{i}.pdf",
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=500)
+    parser.add_argument("--call-ms", type=float, default=8.0)
+    parser.add_argument("--per-text-ms", type=float, default=0.4)
+    parser.add_argument("--real-model", action="store_true")
+    args = parser.parse_args()
+
+    if not args.real_model:
+        install_fake_embedder(embedding_provider, ms_per_text=args.per_text_ms, ms_per_call=args.call_ms)
+
+    with TestClient(app) as client:
+        client.post("/register", json={"email": "bench@example.org", "password": "bench"})
+        token = client.post("/login", data={"username": "bench@example.org", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        ws_single = client.post("/workspace/create", json={"name": "single"}, headers=headers).json()["id"]
+        ws_bulk = client.post("/workspace/create", json={"name": "bulk"}, headers=headers).json()["id"]
+
+        start = time.perf_counter()
+        for paper in papers("single", args.papers):
+            r = client.post("/papers/import", json={**paper, "workspace_id": ws_single}, headers=headers)
+            r.raise_for_status()
+        single_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        r = client.post(
+            "/papers/import/bulk",
+            json={"workspace_id": ws_bulk, "papers": papers("bulk", args.papers)},
+            headers=headers
+        )
+        r.raise_for_status()
+        bulk_s = time.perf_counter() - start
+        assert r.json()["imported"] == args.papers, r.json()
+
+    print(f"{args.papers} papers")
+    print(f"  one-by-one : {single_s:6.2f}s  {args.papers / single_s:8.1f} papers/s")
+    print(f"  bulk       : {bulk_s:6.2f}s  {args.papers / bulk_s:8.1f} papers/s")
+    print(f"  speedup    : {single_s / bulk_s:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
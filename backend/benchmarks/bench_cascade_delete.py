@@ -0,0 +1,155 @@
+"""
+Delete latency for a large workspace and a long conversation.
+
+  orm         the previous endpoints: ``db.delete(workspace)`` loads every
+              paper and only nulls its workspace_id (same for messages),
+              leaving orphans behind
+  set-based   utils.cascade: one DELETE ... WHERE per table, one transaction
+  batched     the background-job path: DELETE_BATCH_ROWS rows per
+              transaction; the longest single transaction is what blocks
+              other writers
+
+Each variant runs on its own copy of the same seeded SQLite database
+(--papers papers with 384-dim embeddings and --chunks full-text chunks each,
+plus a conversation of --messages messages). Rows left pointing at the
+deleted parent (or at NULL) are counted afterwards.
+
+Run from the backend directory:
+    python -m benchmarks.bench_cascade_delete [--papers 50000] [--chunks 2] [--messages 20000]
+"""
+import argparse
+import os
+import shutil
+import time
+
+import numpy as np
+
+from benchmarks.environment import bench_environment
+
+TMP = bench_environment("bench_cascade_", database="seed.db")
+
+from sqlalchemy import create_engine, insert, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from core.database import Base, SessionLocal, engine  # noqa: E402
+from core.migrations import run_migrations  # noqa: E402
+from models.conversation import Conversation, Message  # noqa: E402
+from models.job import Job  # noqa: E402, F401
+from models.paper import Paper, PaperChunk  # noqa: E402
+from models.user import User  # noqa: E402
+from models.workspace import Workspace  # noqa: E402
+from utils.cascade import DELETE_BATCH_ROWS, delete_conversation_cascade, delete_workspace_cascade, purge_workspace  # noqa: E402
+from utils.vector_codec import encode_embedding  # noqa: E402
+
+WORKSPACE, CONVERSATION = 1, 1
+
+
+def seed(papers: int, chunks: int, messages: int):
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    rng = np.random.default_rng(0)
+    words = "retrieval transformer attention dataset baseline evaluation embedding ranking".split()
+    with SessionLocal() as db:
+        db.add(User(id=1, email="bench@example.org", password="x"))
+        db.add_all([Workspace(id=WORKSPACE, name="big", owner_id=1), Workspace(id=2, name="other", owner_id=1)])
+        db.add(Conversation(id=CONVERSATION, user_id=1, workspace_id=WORKSPACE))
+        db.flush()
+        for start in range(0, papers, 5000):
+            n = min(5000, papers - start)
+            vectors = rng.standard_normal((n, 384)).astype(np.float32)
+            db.execute(insert(Paper), [
+                {"id": start + i + 1, "title": f"Paper {start + i}", "abstract": " ".join(words) * 4,
+                 "workspace_id": WORKSPACE if (start + i) % 10 else 2, "embedding": encode_embedding(vectors[i])}
+                for i in range(n)
+            ])
+            if chunks:
+                db.execute(insert(PaperChunk), [
+                    {"paper_id": start + i + 1, "workspace_id": WORKSPACE if (start + i) % 10 else 2,
+                     "ordinal": k, "content": " ".join(words) * 25, "token_count": 260,
+                     "embedding": encode_embedding(vectors[i])}
+                    for i in range(n) for k in range(chunks)
+                ])
+        db.execute(insert(Message), [
+            {"conversation_id": CONVERSATION, "role": "user" if i % 2 == 0 else "assistant", "content": " ".join(words) * 5}
+            for i in range(messages)
+        ])
+        db.commit()
+
+
+def copy_session(name: str):
+    path = os.path.join(TMP, f"{name}.db")
+    shutil.copy(os.path.join(TMP, "seed.db"), path)
+    return sessionmaker(bind=create_engine(f"sqlite:///{path}"), autoflush=False)
+
+
+def leftovers(session_factory) -> dict:
+    with session_factory() as db:
+        return {
+            "papers": db.execute(text(
+                "SELECT count(*) FROM papers WHERE workspace_id IS NULL OR workspace_id = :w"), {"w": WORKSPACE}
+            ).scalar(),
+            "chunks": db.execute(text("SELECT count(*) FROM paper_chunks WHERE workspace_id = :w"), {"w": WORKSPACE}).scalar(),
+            "messages": db.execute(text(
+                "SELECT count(*) FROM messages WHERE conversation_id IS NULL OR conversation_id = :c"), {"c": CONVERSATION}
+            ).scalar(),
+            "other workspace papers": db.execute(text("SELECT count(*) FROM papers WHERE workspace_id = 2")).scalar(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=50_000)
+    parser.add_argument("--chunks", type=int, default=2, help="full-text chunks per paper")
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--batch", type=int, default=DELETE_BATCH_ROWS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    seed(args.papers, args.chunks, args.messages)
+    print(f"seeded {args.papers} papers ({args.papers * 9 // 10} in the deleted workspace), "
+          f"{args.papers * args.chunks} chunks, {args.messages} messages in {time.perf_counter() - start:.1f}s")
+    print(f"{'variant':>10} | {'workspace':>10} | {'longest txn':>11} | {'conversation':>12} | left behind")
+    print("-" * 100)
+
+    for variant in ("orm", "set-based", "batched"):
+        factory = copy_session(variant)
+        longest = 0.0
+        start = time.perf_counter()
+        if variant == "orm":
+            with factory() as db:
+                db.delete(db.get(Workspace, WORKSPACE))
+                db.commit()
+        elif variant == "set-based":
+            with factory() as db:
+                delete_workspace_cascade(db, WORKSPACE)
+        else:
+            last = [time.perf_counter()]
+
+            def on_progress(counts):
+                nonlocal longest
+                now = time.perf_counter()
+                longest = max(longest, now - last[0])
+                last[0] = now
+
+            purge_workspace(WORKSPACE, args.batch, on_progress, session_factory=factory)
+        workspace_s = time.perf_counter() - start
+        longest = longest or workspace_s
+
+        start = time.perf_counter()
+        with factory() as db:
+            if variant == "orm":
+                db.delete(db.get(Conversation, CONVERSATION))
+                db.commit()
+            else:
+                delete_conversation_cascade(db, CONVERSATION, 1)
+        conversation_s = time.perf_counter() - start
+
+        left = ", ".join(f"{name}={count}" for name, count in leftovers(factory).items())
+        print(f"{variant:>10} | {workspace_s * 1000:>8.0f}ms | {longest * 1000:>9.0f}ms | "
+              f"{conversation_s * 1000:>10.0f}ms | {left}")
+
+    shutil.rmtree(TMP, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
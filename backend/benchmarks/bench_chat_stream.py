@@ -0,0 +1,79 @@
+"""
+Time-to-first-token: POST /chat vs. POST /chat/stream
+
+Starts the fake LLM from benchmarks.stub_servers, points the Groq clients at
+it and serves the app with uvicorn on a throwaway SQLite database (the
+TestClient buffers whole responses, so it cannot observe streaming). For each
+endpoint it reports when the first byte of answer text reached the client
+and when the response finished.
+
+Run from the backend directory:
+    python -m benchmarks.bench_chat_stream [--first-token-ms 300 --token-ms 20]
+"""
+import argparse
+import os
+import time
+
+from benchmarks.environment import bench_environment
+
+bench_environment(
+    "bench_stream_",
+    GROQ_API_KEY="stub",
+)
+
+LLM_PORT = 8082
+APP_PORT = 8083
+os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{LLM_PORT}"
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+
+from benchmarks.stub_servers import llm_app, serve_in_thread  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    llm_server = serve_in_thread(llm_app(args.first_token_ms, args.token_ms), LLM_PORT)
+
+    from main import app
+    from utils.embeddings import embedding_provider
+    embedding_provider.encode = lambda texts, batch_size=32: np.ones((len(texts), 384), dtype=np.float32)
+    app_server = serve_in_thread(app, APP_PORT)
+
+    results = {"/chat": [], "/chat/stream": []}
+    with httpx.Client(base_url=f"http://127.0.0.1:{APP_PORT}", timeout=60) as client:
+        client.post("/register", json={"email": "bench@example.org", "password": "bench"})
+        token = client.post("/login", data={"username": "bench@example.org", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            client.post("/chat", json={"content": "Summarize my papers"}, headers=headers).raise_for_status()
+            total = (time.perf_counter() - start) * 1000
+            results["/chat"].append((total, total))
+
+            start = time.perf_counter()
+            first = None
+            with client.stream("POST", "/chat/stream", json={"content": "Summarize my papers"}, headers=headers) as r:
+                for line in r.iter_lines():
+                    if first is None and line.startswith("event: token"):
+                        first = (time.perf_counter() - start) * 1000
+            results["/chat/stream"].append((first, (time.perf_counter() - start) * 1000))
+
+    app_server.should_exit = True
+    llm_server.should_exit = True
+    print(f"fake LLM: first token after {args.first_token_ms:.0f}ms, then {args.token_ms:.0f}ms/token")
+    print(f"{'endpoint':>13} | {'first token p50':>15} | {'complete p50':>12}")
+    for endpoint, samples in results.items():
+        first = np.median([s[0] for s in samples])
+        total = np.median([s[1] for s in samples])
+        print(f"{endpoint:>13} | {first:>13.0f}ms | {total:>10.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
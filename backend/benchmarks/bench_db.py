@@ -0,0 +1,299 @@
+"""
+Per-endpoint latency on a seeded SQLite database, before and after the
+engine tuning (WAL, synchronous=NORMAL, mmap) and the foreign-key indexes.
+
+  before - rollback journal, synchronous=FULL, no mmap, without the
+           ix_papers_workspace_id / ix_conversations_user_created /
+           ix_workspaces_owner_id indexes
+  after  - the defaults of core.database and migration 7
+
+The database is seeded once (users, workspaces, papers, conversations,
+messages) and copied for each phase; every phase runs in its own process
+because the engine is configured at import. Each endpoint is called
+sequentially through TestClient as random seeded users. The fake LLM from
+benchmarks.stub_servers answers /chat instantly; the embedding model is
+replaced by a constant vector. GET /papers/search (Semantic Scholar) is
+left out because it never touches the database.
+
+Run from the backend directory:
+    python -m benchmarks.bench_db [--users 2000] [--requests 200]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+NEW_INDEXES = ("ix_papers_workspace_id", "ix_conversations_user_created", "ix_workspaces_owner_id")
+WORKSPACES_PER_USER = 2
+PAPERS_PER_WORKSPACE = 25
+CONVERSATIONS_PER_USER = 3
+MESSAGES_PER_CONVERSATION = 30
+LLM_PORT = 8088
+
+
+def configure(db_path: str, phase: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ["GROQ_API_KEY"] = "stub"
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{LLM_PORT}"
+    os.environ["EMBEDDING_PRELOAD"] = "lazy"
+    os.environ["EMBEDDING_CACHE_PATH"] = ""
+    os.environ["ANN_INDEX_DIR"] = os.path.join(os.path.dirname(db_path), f"indexes_{phase}")
+    os.environ["JOB_WORKERS"] = "0"
+    os.environ["FULLTEXT_INGEST"] = "false"
+    os.environ["RESPONSE_CACHE"] = "false"
+    if phase in ("seed", "before"):
+        os.environ["SQLITE_WAL"] = "false"
+        os.environ["SQLITE_SYNCHRONOUS"] = "FULL"
+        os.environ["SQLITE_MMAP_SIZE"] = "0"
+
+
+def seed(users: int):
+    from sqlalchemy import insert
+
+    from core.database import Base, SessionLocal, engine
+    from core.migrations import run_migrations
+    from models.conversation import Conversation, Message
+    from models.job import Job  # noqa: F401
+    from models.paper import Paper, PaperChunk  # noqa: F401
+    from models.user import User
+    from models.workspace import Workspace
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    rng = random.Random(0)
+    words = "retrieval transformer graph protein climate language vision sparse dense agent".split()
+    with SessionLocal() as db:
+        db.execute(insert(User), [
+            {"id": u, "email": f"user{u}@example.org", "password": "x"} for u in range(1, users + 1)
+        ])
+        db.execute(insert(Workspace), [
+            {"id": w, "name": f"workspace {w}", "owner_id": (w - 1) // WORKSPACES_PER_USER + 1}
+            for w in range(1, users * WORKSPACES_PER_USER + 1)
+        ])
+        papers = [
+            {
+                "workspace_id": w,
+                "title": " ".join(rng.choices(words, k=6)),
+                "abstract": " ".join(rng.choices(words, k=120)),
+                "authors": "A. Author, B. Author",
+                "year": 2000 + rng.randrange(25),
+            }
+            for p in range(PAPERS_PER_WORKSPACE)
+            for w in range(1, users * WORKSPACES_PER_USER + 1)
+        ]
+        for i in range(0, len(papers), 20_000):
+            db.execute(insert(Paper), papers[i:i + 20_000])
+        db.execute(insert(Conversation), [
+            {"id": c, "user_id": (c - 1) // CONVERSATIONS_PER_USER + 1, "workspace_id": None}
+            for c in range(1, users * CONVERSATIONS_PER_USER + 1)
+        ])
+        messages = [
+            {"conversation_id": c, "role": "user" if m % 2 == 0 else "assistant", "content": " ".join(rng.choices(words, k=40))}
+            for m in range(MESSAGES_PER_CONVERSATION)
+            for c in range(1, users * CONVERSATIONS_PER_USER + 1)
+        ]
+        for i in range(0, len(messages), 50_000):
+            db.execute(insert(Message), messages[i:i + 50_000])
+        db.commit()
+
+
+def measure(users: int, requests: int) -> dict:
+    import numpy as np
+    from fastapi.testclient import TestClient
+    from sqlalchemy import text
+
+    from benchmarks.stub_servers import llm_app, serve_in_thread
+    from core.database import engine
+    from core.security import create_access_token
+
+    if os.environ.get("SQLITE_WAL") == "false":
+        with engine.begin() as conn:
+            conn.execute(text("PRAGMA journal_mode=DELETE"))
+            for name in NEW_INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            conn.execute(text("ANALYZE"))
+
+    serve_in_thread(llm_app(first_token_ms=0, token_ms=0), LLM_PORT)
+    from main import app
+    from utils.embeddings import embedding_provider
+    embedding_provider.encode = lambda texts, batch_size=32: np.ones((len(texts), 384), dtype=np.float32)
+
+    rng = random.Random(1)
+    results = {}
+
+    def user():
+        u = rng.randrange(1, users + 1)
+        token = create_access_token({"sub": f"user{u}@example.org", "uid": u})
+        return u, {"Authorization": f"Bearer {token}"}
+
+    def workspace_of(u):
+        return (u - 1) * WORKSPACES_PER_USER + 1 + rng.randrange(WORKSPACES_PER_USER)
+
+    def conversation_of(u):
+        return (u - 1) * CONVERSATIONS_PER_USER + 1 + rng.randrange(CONVERSATIONS_PER_USER)
+
+    with TestClient(app) as client:
+        def run(name, call, n=requests):
+            latencies = []
+            for _ in range(n):
+                method, url, kwargs = call()
+                start = time.perf_counter()
+                r = client.request(method, url, **kwargs)
+                latencies.append((time.perf_counter() - start) * 1000)
+                assert r.status_code < 400, (name, r.status_code, r.text)
+            results[name] = [float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))]
+
+        def me():
+            return "GET", "/me", {"headers": user()[1]}
+
+        def workspaces():
+            return "GET", "/workspace/my", {"headers": user()[1]}
+
+        created_workspaces = []
+
+        def create_workspace():
+            u, headers = user()
+            created_workspaces.append(headers)
+            return "POST", "/workspace/create", {"headers": headers, "json": {"name": "new"}}
+
+        def list_papers():
+            u, headers = user()
+            return "GET", f"/papers/workspace/{workspace_of(u)}", {"headers": headers}
+
+        def search_papers():
+            u, headers = user()
+            return "GET", f"/papers/workspace/{workspace_of(u)}/search", {
+                "headers": headers, "params": {"query": "sparse retrieval", "mode": "lexical"}
+            }
+
+        imported = []
+
+        def import_paper():
+            u, headers = user()
+            return "POST", "/papers/import", {"headers": headers, "json": {
+                "title": f"Imported {rng.random()}", "abstract": "new paper", "workspace_id": workspace_of(u)
+            }}
+
+        def import_bulk():
+            u, headers = user()
+            return "POST", "/papers/import/bulk", {"headers": headers, "json": {
+                "workspace_id": workspace_of(u),
+                "papers": [{"title": f"Bulk {rng.random()}", "abstract": "new"} for _ in range(10)]
+            }}
+
+        jobs = []
+
+        def import_async():
+            u, headers = user()
+            return "POST", "/papers/import/async", {"headers": headers, "json": {
+                "workspace_id": workspace_of(u), "papers": [{"title": f"Async {rng.random()}"}]
+            }}
+
+        def chat():
+            u, headers = user()
+            return "POST", "/chat", {"headers": headers, "params": {"workspace_id": workspace_of(u)},
+                                     "json": {"content": "What do these papers say about sparse retrieval?"}}
+
+        def conversations():
+            return "GET", "/conversations", {"headers": user()[1]}
+
+        def messages():
+            u, headers = user()
+            return "GET", f"/conversation/{conversation_of(u)}/messages", {"headers": headers}
+
+        run("GET /me", me)
+        run("GET /workspace/my", workspaces)
+        run("POST /workspace/create", create_workspace)
+        run("GET /papers/workspace/{id}", list_papers)
+        run("GET /papers/workspace/{id}/search", search_papers)
+        run("POST /papers/import", import_paper)
+        run("POST /papers/import/bulk", import_bulk)
+        run("POST /papers/import/async", import_async)
+        run("POST /chat", chat)
+        run("GET /conversations", conversations)
+        run("GET /conversation/{id}/messages", messages)
+
+        # Deletes and lookups of rows created above
+        new_papers = [row[0] for row in engine.connect().execute(
+            text("SELECT id FROM papers WHERE title LIKE 'Imported %' ORDER BY id")
+        )]
+        job_owner = {row[0]: row[1] for row in engine.connect().execute(text("SELECT id, user_id FROM jobs"))}
+        new_convs = [row for row in engine.connect().execute(
+            text("SELECT id, user_id FROM conversations ORDER BY id DESC LIMIT :n"), {"n": requests}
+        )]
+        new_ws = [row for row in engine.connect().execute(
+            text("SELECT id, owner_id FROM workspaces ORDER BY id DESC LIMIT :n"), {"n": requests}
+        )]
+
+        def headers_for(u):
+            return {"Authorization": f"Bearer {create_access_token({'sub': f'user{u}@example.org', 'uid': u})}"}
+
+        job_items = iter(job_owner.items())
+        run("GET /jobs/{id}", lambda: (lambda j: ("GET", f"/jobs/{j[0]}", {"headers": headers_for(j[1])}))(next(job_items)),
+            n=len(job_owner))
+        papers_iter = iter(new_papers)
+        run("DELETE /papers/{id}", lambda: ("DELETE", f"/papers/{next(papers_iter)}", {"headers": user()[1]}),
+            n=len(new_papers))
+        convs_iter = iter(new_convs)
+        run("DELETE /conversation/{id}", lambda: (lambda c: (
+            "DELETE", f"/conversation/{c[0]}", {"headers": headers_for(c[1])}))(next(convs_iter)), n=len(new_convs))
+        ws_iter = iter(new_ws)
+        run("DELETE /workspace/{id}", lambda: (lambda w: (
+            "DELETE", f"/workspace/{w[0]}", {"headers": headers_for(w[1])}))(next(ws_iter)), n=len(new_ws))
+
+        client.post("/register", json={"email": "bench@example.org", "password": "bench"})
+        run("POST /login", lambda: ("POST", "/login", {"data": {"username": "bench@example.org", "password": "bench"}}),
+            n=10)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--phase", choices=["seed", "before", "after"])
+    parser.add_argument("--db")
+    args = parser.parse_args()
+
+    if args.phase:
+        configure(args.db, args.phase)
+        if args.phase == "seed":
+            seed(args.users)
+        else:
+            print(json.dumps(measure(args.users, args.requests)))
+        return
+
+    tmp = tempfile.mkdtemp(prefix="bench_db_")
+    seeded = os.path.join(tmp, "seed.db")
+    base = [sys.executable, "-m", "benchmarks.bench_db", "--users", str(args.users), "--requests", str(args.requests)]
+    start = time.perf_counter()
+    subprocess.run([*base, "--phase", "seed", "--db", seeded], check=True)
+    print(
+        f"seeded {args.users} users, {args.users * WORKSPACES_PER_USER} workspaces, "
+        f"{args.users * WORKSPACES_PER_USER * PAPERS_PER_WORKSPACE} papers, "
+        f"{args.users * CONVERSATIONS_PER_USER * MESSAGES_PER_CONVERSATION} messages "
+        f"in {time.perf_counter() - start:.0f}s"
+    )
+
+    results = {}
+    for phase in ("before", "after"):
+        db = os.path.join(tmp, f"{phase}.db")
+        shutil.copy(seeded, db)
+        out = subprocess.run([*base, "--phase", phase, "--db", db], check=True, capture_output=True, text=True).stdout
+        results[phase] = json.loads(out.strip().splitlines()[-1])
+
+    print(f"\n{'endpoint':<36} | {'before p50':>10} | {'p99':>8} | {'after p50':>10} | {'p99':>8}")
+    print("-" * 84)
+    for name, (p50, p99) in results["before"].items():
+        a50, a99 = results["after"][name]
+        print(f"{name:<36} | {p50:>8.2f}ms | {p99:>6.2f}ms | {a50:>8.2f}ms | {a99:>6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
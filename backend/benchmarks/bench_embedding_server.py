@@ -0,0 +1,220 @@
+"""
+Memory and throughput of the embedding model with several uvicorn workers.
+
+  per-worker         every worker loads its own model with torch's default
+                     thread count (one thread per core, per worker)
+  per-worker-pinned  the same with EMBEDDING_THREADS = cores / workers
+  shared             EMBEDDING_SERVER: one model process (utils.embedding_server)
+                     serves all workers over a Unix socket
+
+For each worker count the app is started under uvicorn, the model warmed up
+in every worker (EMBEDDING_PRELOAD=eager), and --concurrency clients send
+semantic workspace searches with distinct ~30-word queries, so every request
+runs the model once (no cache hits). Memory is the proportional set size
+(PSS, shared pages split between the processes sharing them) summed over
+the uvicorn processes and the embedding server, read from /proc after the
+run; Linux only.
+
+Run from the backend directory:
+    python -m benchmarks.bench_embedding_server [--workers 1 4 8] [--requests 800] [--concurrency 32]
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+APP_PORT = 8130
+MODES = ("per-worker", "per-worker-pinned", "shared")
+WORDS = (
+    "retrieval transformer attention dataset baseline evaluation embedding ranking latency "
+    "scaling benchmark ablation encoder decoder gradient memory throughput recall graph "
+    "contrastive sparse dense distillation protein molecule language vision speech policy"
+).split()
+
+
+def seed():
+    from sqlalchemy import insert
+
+    import main  # noqa: F401  (creates the tables)
+    from core.database import SessionLocal
+    from models.paper import Paper
+    from models.user import User
+    from models.workspace import Workspace
+    from utils.embeddings import embedding_provider
+    from utils.vector_codec import encode_embedding
+
+    titles = [f"Paper {i} on retrieval method {i % 17}" for i in range(200)]
+    with SessionLocal() as db:
+        db.add(User(id=1, email="bench@example.org", password="x"))
+        db.add(Workspace(id=1, name="bench", owner_id=1))
+        db.flush()
+        db.execute(insert(Paper), [
+            {"title": title, "workspace_id": 1, "embedding": encode_embedding(vector)}
+            for title, vector in zip(titles, embedding_provider.encode(titles))
+        ])
+        db.commit()
+
+
+def pss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def descendants(pid: int) -> list:
+    children = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    parent = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(parent, []).append(int(entry))
+    found, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        found.append(current)
+        stack.extend(children.get(current, []))
+    return found
+
+
+def wait_ready(app: subprocess.Popen, workers: int, timeout: float = 300):
+    """Every worker answers /health/ready with 200 (hit until enough consecutive successes)"""
+    import httpx
+
+    deadline, streak = time.monotonic() + timeout, 0
+    while streak < workers * 4:
+        if app.poll() is not None:
+            raise RuntimeError(f"app exited with status {app.returncode}")
+        if time.monotonic() > deadline:
+            raise RuntimeError("app not ready in time")
+        try:
+            ok = httpx.get(f"http://127.0.0.1:{APP_PORT}/health/ready", timeout=5).status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        streak = streak + 1 if ok else 0
+        if not ok:
+            time.sleep(0.2)
+
+
+async def drive(token: str, requests: int, concurrency: int, seed_value: int):
+    import httpx
+
+    rng = random.Random(seed_value)
+    queries = [" ".join(rng.choices(WORDS, k=30)) + f" {i}" for i in range(requests)]
+    latencies = []
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", headers=headers, timeout=300) as client:
+        async def user():
+            while queries:
+                query = queries.pop()
+                start = time.perf_counter()
+                r = await client.get("/papers/workspace/1/search", params={"query": query, "mode": "semantic"})
+                r.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        return len(latencies) / (time.perf_counter() - start), latencies
+
+
+def run(mode: str, workers: int, db_path: str, tmp: str, args) -> dict:
+    from core.security import create_access_token
+
+    socket_path = os.path.join(tmp, "embeddings.sock")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        ANN_INDEX_DIR=os.path.join(tmp, f"indexes_{mode}_{workers}"),
+        EMBEDDING_PRELOAD="eager",
+        EMBEDDING_CACHE_PATH="",
+        EMBEDDING_CACHE_SIZE="0",
+        EMBEDDING_SERVER=socket_path if mode == "shared" else "",
+        EMBEDDING_SERVER_AUTOSTART="false",
+        EMBEDDING_THREADS=str(max(1, (os.cpu_count() or 1) // workers)) if mode == "per-worker-pinned" else "0",
+        JOB_WORKERS="0",
+        FULLTEXT_INGEST="false",
+        METRICS="false",
+    )
+    processes = []
+    try:
+        if mode == "shared":
+            server = subprocess.Popen([sys.executable, "-m", "utils.embedding_server", "--socket", socket_path],
+                                      env=env, stdout=subprocess.DEVNULL)
+            processes.append(server)
+            deadline = time.monotonic() + 300
+            while not os.path.exists(socket_path):
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("embedding server did not start")
+                time.sleep(0.1)
+        app = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(APP_PORT),
+             "--workers", str(workers), "--log-level", "warning"],
+            env=env,
+        )
+        processes.append(app)
+        wait_ready(app, workers)
+
+        token = create_access_token({"sub": "bench@example.org", "uid": 1})
+        asyncio.run(drive(token, workers * 20, args.concurrency, 1))  # warm up every worker
+        rps, latencies = asyncio.run(drive(token, args.requests, args.concurrency, 2))
+
+        pids = [pid for process in processes for pid in descendants(process.pid)]
+        return {
+            "mode": mode,
+            "workers": workers,
+            "processes": len(pids),
+            "pss_mb": sum(pss_kb(pid) for pid in pids) / 1024,
+            "rps": rps,
+            "p50": float(np.percentile(latencies, 50)),
+            "p99": float(np.percentile(latencies, 99)),
+        }
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=20)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--requests", type=int, default=800)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_embedding_server_") as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+        os.environ.setdefault("GROQ_API_KEY", "stub")
+        os.environ.update(EMBEDDING_SERVER="", EMBEDDING_CACHE_PATH="", EMBEDDING_PRELOAD="lazy")
+        seed()
+
+        print(f"{args.requests} semantic searches, concurrency {args.concurrency}, {os.cpu_count()} cores")
+        print(f"{'mode':>17} | {'workers':>7} | {'procs':>5} | {'PSS':>9} | {'req/s':>7} | {'p50':>8} | {'p99':>8}")
+        print("-" * 80)
+        for workers in args.workers:
+            for mode in args.modes:
+                row = run(mode, workers, db_path, tmp, args)
+                print(f"{row['mode']:>17} | {row['workers']:>7} | {row['processes']:>5} | {row['pss_mb']:>6.0f} MB | "
+                      f"{row['rps']:>7.1f} | {row['p50']:>6.0f}ms | {row['p99']:>6.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
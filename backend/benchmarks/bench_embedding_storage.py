@@ -0,0 +1,78 @@
+"""
+Benchmark: JSON embedding column vs. binary blobs (float32 / float16 / int8)
+
+For each format a throwaway SQLite database is filled with the same
+embeddings, then we report the stored bytes per embedding, the database file
+size, and the time to load a workspace's embeddings into a NumPy matrix and
+answer one top-k query (the retrieval read path).
+
+Run from the backend directory:
+    python -m benchmarks.bench_embedding_storage [--papers 20000]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from utils.retrieval import normalize_rows, top_k_indices
+from utils.vector_codec import decode_matrix, encode_embedding
+
+DIM = 384
+
+
+def build(path, vectors, fmt):
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE papers (id INTEGER PRIMARY KEY, workspace_id INTEGER, embedding)")
+    if fmt == "json":
+        rows = ((i, 1, json.dumps(v.tolist())) for i, v in enumerate(vectors))
+    else:
+        rows = ((i, 1, encode_embedding(v, fmt)) for i, v in enumerate(vectors))
+    con.executemany("INSERT INTO papers VALUES (?, ?, ?)", rows)
+    con.commit()
+    con.execute("VACUUM")
+    row_bytes = con.execute("SELECT avg(length(embedding)) FROM papers").fetchone()[0]
+    con.close()
+    return row_bytes
+
+
+def read_path(path, fmt, query):
+    con = sqlite3.connect(path)
+    start = time.perf_counter()
+    blobs = [row[0] for row in con.execute("SELECT embedding FROM papers WHERE workspace_id = 1")]
+    if fmt == "json":
+        matrix = np.asarray([json.loads(b) for b in blobs], dtype=np.float32)
+    else:
+        matrix = decode_matrix(blobs)
+    hits = top_k_indices(normalize_rows(matrix) @ query, 3)
+    elapsed = (time.perf_counter() - start) * 1000
+    con.close()
+    return elapsed, hits.tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.papers, DIM)).astype(np.float32)
+    query = rng.standard_normal(DIM).astype(np.float32)
+
+    print(f"{args.papers} papers x {DIM} dims")
+    print(f"{'format':>8} | {'bytes/row':>9} | {'db size':>9} | {'load+top3':>10} | top-3 ids")
+    print("-" * 62)
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ("json", "float32", "float16", "int8"):
+            path = os.path.join(tmp, f"{fmt}.db")
+            row_bytes = build(path, vectors, fmt)
+            size_mb = os.path.getsize(path) / 1e6
+            elapsed, ids = read_path(path, fmt, query)
+            print(f"{fmt:>8} | {row_bytes:>9.0f} | {size_mb:>7.1f}MB | {elapsed:>8.1f}ms | {ids}")
+
+
+if __name__ == "__main__":
+    main()
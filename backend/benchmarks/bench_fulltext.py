@@ -0,0 +1,106 @@
+"""
+Full-text ingestion: throughput vs. workers, and peak memory for one paper
+
+Papers point at generated PDFs served by benchmarks.stub_servers.pdf_app
+(with a simulated download latency). The embedding model is
+stub_servers.FakeEmbeddingModel with a fixed per-call cost plus a per-text
+cost, as in bench_bulk_import, so no model needs to be installed. pypdf is required.
+
+Run from the backend directory:
+    python -m benchmarks.bench_fulltext [--papers 40] [--pages 20] [--workers 1 4 8]
+"""
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+
+from benchmarks.environment import bench_environment
+
+TMP = bench_environment(
+    "bench_fulltext_",
+    FULLTEXT_ALLOW_PRIVATE_HOSTS="true",  # the PDF server is on 127.0.0.1
+)
+os.environ["FULLTEXT_LOCAL_DIR"] = TMP
+
+PDF_PORT = 8086
+
+from benchmarks.stub_servers import install_fake_embedder, make_pdf, paper_pages, pdf_app, serve_in_thread  # noqa: E402
+from core.database import Base, SessionLocal, engine  # noqa: E402
+from core.migrations import run_migrations  # noqa: E402
+from models.conversation import Conversation  # noqa: E402,F401
+from models.paper import Paper, PaperChunk  # noqa: E402
+from models.user import User  # noqa: E402,F401
+from models.workspace import Workspace  # noqa: E402,F401
+from utils.embeddings import embedding_provider  # noqa: E402
+from utils.fulltext import FulltextIngestor, extract_pages  # noqa: E402
+
+
+def add_papers(workspace_id, urls):
+    with SessionLocal() as db:
+        papers = [Paper(title=f"paper {i}", url=url, workspace_id=workspace_id) for i, url in enumerate(urls)]
+        db.add_all(papers)
+        db.commit()
+        return [p.id for p in papers]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--download-ms", type=float, default=200)
+    parser.add_argument("--call-ms", type=float, default=10)
+    parser.add_argument("--per-text-ms", type=float, default=1)
+    parser.add_argument("--memory-pages", type=int, default=50)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    install_fake_embedder(embedding_provider, ms_per_text=args.per_text_ms, ms_per_call=args.call_ms)
+    serve_in_thread(pdf_app(args.pages, args.download_ms), PDF_PORT)
+
+    print(f"{args.papers} papers x {args.pages} pages, {args.download_ms:.0f}ms download latency")
+    print(f"{'workers':>7} | {'wall':>8} | {'papers/s':>8} | {'chunks':>7}")
+    print("-" * 42)
+    for workspace_id, workers in enumerate(args.workers, 1):
+        ids = add_papers(workspace_id, [f"http://127.0.0.1:{PDF_PORT}/pdf/{i}.pdf" for i in range(args.papers)])
+        ingestor = FulltextIngestor(workers=workers)
+
+        async def run():
+            await ingestor.ingest(ids)
+            await ingestor.aclose()
+
+        start = time.perf_counter()
+        asyncio.run(run())
+        wall = time.perf_counter() - start
+        assert ingestor.metrics["indexed"] == args.papers, ingestor.metrics
+        print(f"{workers:>7} | {wall:>7.2f}s | {args.papers / wall:>8.1f} | {ingestor.metrics['chunks']:>7}")
+
+    # Peak Python memory while ingesting one long paper, against its size
+    path = os.path.join(TMP, "long.pdf")
+    with open(path, "wb") as f:
+        f.write(make_pdf(paper_pages(7, args.memory_pages)))
+    text_bytes = sum(len(text.encode()) for _, text in extract_pages(path))
+    [paper_id] = add_papers(len(args.workers) + 1, [f"file://{path}"])
+    ingestor = FulltextIngestor(workers=1)
+
+    async def run_one():
+        await ingestor.ingest([paper_id])
+        await ingestor.aclose()
+
+    tracemalloc.start()
+    asyncio.run(run_one())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    with SessionLocal() as db:
+        chunks = db.query(PaperChunk).filter(PaperChunk.paper_id == paper_id).count()
+
+    print()
+    print(f"{args.memory_pages}-page paper: {os.path.getsize(path) / 1e6:.2f} MB PDF, "
+          f"{text_bytes / 1e6:.2f} MB text, {chunks} chunks")
+    print(f"  peak traced memory during ingestion: {peak / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
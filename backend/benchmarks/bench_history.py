@@ -0,0 +1,106 @@
+"""
+Prompt size vs. conversation length: old history query vs. utils.history
+
+For each conversation length, builds the prompt history three ways against a
+throwaway SQLite database and reports estimated prompt tokens and load time:
+
+  oldest-10 - the old query (created_at ASC LIMIT 10): stale turns only
+  full      - every message, i.e. what "just send the history" costs
+  budgeted  - load_history(): newest turns within the token budget
+
+Run from the backend directory:
+    python -m benchmarks.bench_history [--lengths 10 50 200 1000 5000]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.environment import bench_environment
+
+bench_environment("bench_history_")
+
+from core.database import Base, SessionLocal, engine  # noqa: E402
+from core.migrations import run_migrations  # noqa: E402
+from models.conversation import Conversation, Message  # noqa: E402
+from models.paper import Paper  # noqa: E402,F401
+from models.user import User  # noqa: E402,F401
+from models.workspace import Workspace  # noqa: E402,F401
+from utils.history import estimate_tokens, history_budget, load_history, message_tokens  # noqa: E402
+
+TURN = (
+    "Could you compare the evaluation setup of the retrieval-augmented model with the "
+    "baseline, in particular the datasets, the metrics and how many runs were averaged? "
+)
+
+
+def seed(db, length):
+    conversation = Conversation(user_id=1)
+    db.add(conversation)
+    db.flush()
+    start = datetime.utcnow()
+    db.bulk_insert_mappings(Message, [
+        {
+            "conversation_id": conversation.id,
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"turn {i}: " + TURN * (1 if i % 2 == 0 else 4),
+            "created_at": start + timedelta(seconds=i),
+        }
+        for i in range(length)
+    ])
+    db.commit()
+    return conversation.id
+
+
+def timed(fn, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 50, 200, 1000, 5000])
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    budget = history_budget()
+
+    print(f"history budget {budget} tokens")
+    print(f"{'messages':>8} | {'oldest-10':>16} | {'full':>16} | {'budgeted':>16} | latest turn sent")
+    print(f"{'':>8} | {'tokens':>7} {'ms':>8} | {'tokens':>7} {'ms':>8} | {'tokens':>7} {'ms':>8} |")
+    print("-" * 80)
+    with SessionLocal() as db:
+        for length in args.lengths:
+            conversation_id = seed(db, length)
+            latest = f"turn {length - 1}:"
+
+            def oldest():
+                return db.query(Message).filter(
+                    Message.conversation_id == conversation_id
+                ).order_by(Message.created_at).limit(10).all()
+
+            def full():
+                return db.query(Message).filter(
+                    Message.conversation_id == conversation_id
+                ).order_by(Message.created_at).all()
+
+            old_rows, old_ms = timed(oldest)
+            full_rows, full_ms = timed(full, repeat=3)
+            history, new_ms = timed(lambda: load_history(db, conversation_id, budget))
+
+            def tokens(rows):
+                return sum(estimate_tokens(m.content) for m in rows) + 4 * len(rows)
+
+            old_latest = any(m.content.startswith(latest) for m in old_rows)
+            new_latest = history.messages[-1]["content"].startswith(latest)
+            assert history.tokens == sum(message_tokens(m) for m in history.messages)
+            print(
+                f"{length:>8} | {tokens(old_rows):>7} {old_ms:>6.2f}ms | {tokens(full_rows):>7} {full_ms:>6.2f}ms | "
+                f"{history.tokens:>7} {new_ms:>6.2f}ms | old={'yes' if old_latest else 'no '} new={'yes' if new_latest else 'no'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Hybrid search: recall@k and latency of semantic, lexical (BM25) and fused
+rankings on a synthetic workspace of 100k papers.
+
+Papers belong to topics (clustered embeddings, topic-specific title words),
+have three authors from a large name pool, and a few carry a made-up method
+name. Three query sets probe the weak spots of each side:
+
+  author   - an author's surname; relevant = that author's papers
+  method   - an exact method name / acronym; relevant = papers mentioning it
+  semantic - a paraphrase with no word in common with the corpus; relevant =
+             the exact top-k by embedding similarity
+
+For author and method queries the "embedding" is unrelated to the answer,
+mirroring how MiniLM treats unseen names. Latency excludes query embedding.
+
+Run from the backend directory:
+    python -m benchmarks.bench_hybrid_search [--papers 100000] [--queries 200]
+"""
+import argparse
+import time
+from collections import defaultdict
+
+from benchmarks.environment import bench_environment
+
+bench_environment("bench_hybrid_")
+
+import numpy as np  # noqa: E402
+
+from benchmarks.bench_ann_recall import DIM  # noqa: E402
+from core.database import Base, SessionLocal, engine  # noqa: E402
+from core.migrations import run_migrations  # noqa: E402
+from models.conversation import Conversation  # noqa: E402,F401
+from models.job import Job  # noqa: E402,F401
+from models.paper import Paper  # noqa: E402
+from models.user import User  # noqa: E402,F401
+from models.workspace import Workspace  # noqa: E402,F401
+from utils.ann_index import get_workspace_index  # noqa: E402
+from utils.hybrid_search import hybrid_search  # noqa: E402
+from utils.retrieval import normalize_rows, top_k_indices  # noqa: E402
+
+GENERIC = "we propose study results model method data analysis approach evaluation show novel".split()
+
+
+def unit(rng, n):
+    return normalize_rows(rng.standard_normal((n, DIM)).astype(np.float32))
+
+
+def build_corpus(rng, n, topics, methods):
+    centers = unit(rng, topics)
+    labels = rng.integers(0, topics, size=n)
+    vectors = normalize_rows(centers[labels] + 0.6 * unit(rng, n))
+    surnames = [f"Surname{i:05d}" for i in range(n // 2)]
+    topic_words = [[f"topic{t}word{w}" for w in range(6)] for t in range(topics)]
+
+    rows, by_author, by_method = [], defaultdict(set), defaultdict(set)
+    method_of = rng.integers(0, methods, size=n)
+    carries_method = rng.random(n) < 0.03
+    for i in range(n):
+        words = topic_words[labels[i]]
+        authors = [surnames[j] for j in rng.integers(0, len(surnames), size=3)]
+        abstract = " ".join(rng.choice(GENERIC, size=20)) + " " + " ".join(rng.choice(words, size=8))
+        if carries_method[i]:
+            method = f"MTHD{method_of[i]:04d}"
+            abstract += f" using {method}"
+            by_method[method].add(i + 1)
+        for author in authors:
+            by_author[author].add(i + 1)
+        rows.append({
+            "id": i + 1,
+            "title": " ".join(rng.choice(words, size=4)) + " " + " ".join(rng.choice(GENERIC, size=3)),
+            "abstract": abstract,
+            "authors": ", ".join(f"A. {a}" for a in authors),
+            "workspace_id": 1,
+        })
+    return rows, vectors, by_author, by_method
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    start = time.perf_counter()
+    rows, vectors, by_author, by_method = build_corpus(rng, args.papers, topics=500, methods=1000)
+    with SessionLocal() as db:
+        for i in range(0, len(rows), 10_000):
+            db.bulk_insert_mappings(Paper, rows[i:i + 10_000])
+        db.commit()
+    insert_s = time.perf_counter() - start
+    start = time.perf_counter()
+    index = get_workspace_index(1)
+    index.rebuild(np.arange(1, args.papers + 1), vectors)
+    index_s = time.perf_counter() - start
+    print(f"{args.papers} papers: DB + FTS insert {insert_s:.1f}s, ANN build {index_s:.1f}s")
+
+    queries = []
+    for author in rng.choice(sorted(by_author), size=args.queries, replace=False):
+        queries.append(("author", author, unit(rng, 1)[0], by_author[author]))
+    for method in rng.choice(sorted(by_method), size=min(args.queries, len(by_method)), replace=False):
+        queries.append(("method", method, unit(rng, 1)[0], by_method[method]))
+    for _ in range(args.queries):
+        vector = normalize_rows(vectors[rng.integers(0, args.papers)][None] + 0.5 * unit(rng, 1))[0]
+        exact = set((top_k_indices(vectors @ vector, args.top_k) + 1).tolist())
+        queries.append(("semantic", "how do related approaches compare", vector, exact))
+
+    results = defaultdict(lambda: {"recall": [], "ms": []})
+    with SessionLocal() as db:
+        for kind, text, vector, relevant in queries:
+            for mode in ("semantic", "lexical", "hybrid"):
+                start = time.perf_counter()
+                hits = hybrid_search(db, 1, text, vector, index, top_k=args.top_k, mode=mode)
+                elapsed = (time.perf_counter() - start) * 1000
+                found = {hit.paper_id for hit in hits}
+                results[(kind, mode)]["recall"].append(len(found & relevant) / min(args.top_k, len(relevant)))
+                results[(kind, mode)]["ms"].append(elapsed)
+
+    print(f"\n{'queries':>8} | {'mode':>8} | {'recall@' + str(args.top_k):>9} | {'p50':>8} | {'p99':>8}")
+    print("-" * 54)
+    for kind in ("author", "method", "semantic"):
+        for mode in ("semantic", "lexical", "hybrid"):
+            r = results[(kind, mode)]
+            print(
+                f"{kind:>8} | {mode:>8} | {np.mean(r['recall']):>9.3f} | "
+                f"{np.percentile(r['ms'], 50):>6.2f}ms | {np.percentile(r['ms'], 99):>6.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Background jobs: import latency vs. model speed, re-embedding vs. workers
+
+  1. POST /papers/import (embeds inline) against POST /papers/import/async
+     (returns a job id) while the simulated model gets slower.
+  2. Re-embedding N papers through reembed/reembed_chunk jobs with 1..8
+     job workers.
+
+The embedding model is stub_servers.FakeEmbeddingModel, which sleeps for a
+fixed per-call cost plus a per-text cost (like a model that releases the
+GIL), as in bench_bulk_import.
+
+Run from the backend directory:
+    python -m benchmarks.bench_jobs [--papers 4000] [--workers 1 2 4 8]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.environment import bench_environment
+
+bench_environment(
+    "bench_jobs_",
+    JOB_WORKERS="0",  # measure enqueueing only; jobs run below
+    FULLTEXT_INGEST="false",
+)
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from benchmarks.stub_servers import install_fake_embedder  # noqa: E402
+from core.database import SessionLocal  # noqa: E402
+from main import app  # noqa: E402
+from models.job import Job  # noqa: E402
+from models.paper import Paper  # noqa: E402
+from utils import reembed  # noqa: E402
+from utils.embeddings import embedding_provider  # noqa: E402
+from utils.jobs import JobWorkerPool, enqueue, FINISHED  # noqa: E402
+
+
+def import_latency(client, headers, workspace_id, call_ms, repeat=5):
+    install_fake_embedder(embedding_provider, ms_per_call=call_ms)
+    inline, queued = [], []
+    for i in range(repeat):
+        paper = {"title": f"latency {call_ms} {i}", "abstract": "Scaling laws.", "workspace_id": workspace_id}
+        start = time.perf_counter()
+        client.post("/papers/import", json=paper, headers=headers).raise_for_status()
+        inline.append((time.perf_counter() - start) * 1000)
+
+        body = {"workspace_id": workspace_id, "papers": [{**paper, "title": paper["title"] + " async"}]}
+        start = time.perf_counter()
+        r = client.post("/papers/import/async", json=body, headers=headers)
+        assert r.status_code == 202, r.text
+        queued.append((time.perf_counter() - start) * 1000)
+    return np.median(inline), np.median(queued)
+
+
+def reembed_run(workers):
+    with SessionLocal() as db:
+        db.query(Paper).update({"embedding_model": "previous-model"}, synchronize_session=False)
+        db.query(Job).delete()
+        db.commit()
+        run_id = enqueue(db, "reembed", {}).id
+
+    async def go():
+        pool = JobWorkerPool(workers=workers, poll_seconds=0.05)
+        await pool.start(kinds=["reembed", "reembed_chunk"])
+        while True:
+            await asyncio.sleep(0.05)
+            with SessionLocal() as db:
+                if db.get(Job, run_id).status in FINISHED:
+                    break
+        await pool.stop()
+
+    start = time.perf_counter()
+    asyncio.run(go())
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=4000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--chunk-size", type=int, default=250)
+    parser.add_argument("--call-ms", type=float, default=20)
+    parser.add_argument("--per-text-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        client.post("/register", json={"email": "bench@example.org", "password": "bench"})
+        token = client.post("/login", data={"username": "bench@example.org", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        workspace_id = client.post("/workspace/create", json={"name": "jobs"}, headers=headers).json()["id"]
+
+        print("import latency (median of 5)")
+        print(f"{'model call':>10} | {'inline':>9} | {'async':>9}")
+        print("-" * 36)
+        for call_ms in (10, 100, 500):
+            inline, queued = import_latency(client, headers, workspace_id, call_ms)
+            print(f"{call_ms:>8.0f}ms | {inline:>7.1f}ms | {queued:>7.1f}ms")
+
+    with SessionLocal() as db:
+        db.bulk_insert_mappings(Paper, [
+            {"title": f"paper {i}", "abstract": "Retrieval-augmented generation at scale. " * 5, "workspace_id": workspace_id}
+            for i in range(args.papers)
+        ])
+        db.commit()
+
+    install_fake_embedder(embedding_provider, ms_per_text=args.per_text_ms, ms_per_call=args.call_ms)
+    reembed.REEMBED_CHUNK_SIZE = args.chunk_size
+    print()
+    print(f"re-embedding {args.papers} papers in chunks of {args.chunk_size}")
+    print(f"{'workers':>7} | {'wall':>8} | {'papers/s':>9}")
+    print("-" * 32)
+    for workers in args.workers:
+        wall = reembed_run(workers)
+        print(f"{workers:>7} | {wall:>7.2f}s | {args.papers / wall:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Related-papers graph: build cost and incremental update cost.
+
+For each size a throwaway paper index is filled with clustered synthetic
+embeddings and the kNN graph is built from it (blocked matrix products).
+The naive alternative, one ``cosine_similarity`` call per pair, is timed on
+a sample of rows and extrapolated. Then a random sequence of index writes
+(single imports, bulk imports of 200, single deletes, bulk deletes of 200
+that eventually compact the index, re-embeddings of 20 papers) is applied
+and the graph is synced after each one. That incremental updates give the
+same graph as a full recompute is checked by tests/test_knn_graph.py.
+
+Run from the backend directory:
+    python -m benchmarks.bench_knn_graph [--sizes 5000 20000] [--ops 60]
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_ann_recall import DIM, clustered_vectors
+from utils.ann_index import IVFIndex
+from utils.embeddings import cosine_similarity
+from utils.knn_graph import KNNGraph
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000])
+    parser.add_argument("--ops", type=int, default=60)
+    parser.add_argument("--naive-rows", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n in args.sizes:
+        vectors = clustered_vectors(rng, n, DIM)
+        with tempfile.TemporaryDirectory() as path:
+            index = IVFIndex(path)
+            index.add(list(range(n)), vectors)
+
+            graph = KNNGraph()
+            start = time.perf_counter()
+            graph.sync(index)
+            build_s = time.perf_counter() - start
+
+            lists = vectors.tolist()
+            start = time.perf_counter()
+            for row in range(args.naive_rows):
+                sorted((cosine_similarity(lists[row], other), j) for j, other in enumerate(lists) if j != row)
+            naive_s = (time.perf_counter() - start) / args.naive_rows * n
+
+            print(f"\n{n} papers, k={graph.k}: blocked build {build_s:.2f}s, "
+                  f"naive cosine_similarity ~{naive_s:.0f}s (extrapolated from {args.naive_rows} rows)")
+            print(f"{'operation':>16} | {'papers':>6} | {'sync':>9} | {'full rebuild':>12}")
+            print("-" * 54)
+
+            next_id = n
+            timings = {}
+            for step in range(args.ops):
+                live = np.array(sorted(graph.snapshot()))
+                op = ["import", "bulk import", "delete", "bulk delete", "re-embed"][step % 5]
+                if op == "import":
+                    index.add([next_id], clustered_vectors(rng, 1, DIM))
+                    next_id += 1
+                elif op == "bulk import":
+                    index.add(list(range(next_id, next_id + 200)), clustered_vectors(rng, 200, DIM))
+                    next_id += 200
+                elif op == "delete":
+                    index.remove([int(rng.choice(live))])
+                elif op == "bulk delete":
+                    # Repeated often enough to compact the index along the way
+                    index.remove(rng.choice(live, size=200, replace=False).tolist())
+                else:
+                    chosen = rng.choice(live, size=20, replace=False).tolist()
+                    index.add(chosen, clustered_vectors(rng, 20, DIM))
+
+                start = time.perf_counter()
+                graph.sync(index)
+                timings.setdefault(op, []).append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            KNNGraph().sync(index)
+            rebuild_ms = (time.perf_counter() - start) * 1000
+            for op, values in timings.items():
+                print(f"{op:>16} | {len(graph):>6} | {np.mean(values) * 1000:>7.1f}ms | {rebuild_ms:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
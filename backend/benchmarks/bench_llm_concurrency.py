@@ -0,0 +1,93 @@
+"""
+How many concurrent chats one worker sustains: blocking vs. async LLM calls
+
+Serves the app with uvicorn (one worker) against the fake LLM from
+benchmarks.stub_servers and fires bursts of concurrent POST /chat requests.
+
+  blocking - the old behaviour: a synchronous Groq client called on the loop
+  async    - AsyncGroq behind the LLM limiter
+
+Run from the backend directory:
+    python -m benchmarks.bench_llm_concurrency [--concurrency 1 8 32] [--llm-ms 500]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.environment import bench_environment
+
+bench_environment(
+    "bench_llm_",
+    GROQ_API_KEY="stub",
+    LLM_MAX_PER_USER="1000",  # one benchmark user drives all the load
+)
+
+LLM_PORT = 8084
+APP_PORT = 8085
+os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{LLM_PORT}"
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+from groq import Groq  # noqa: E402
+
+from benchmarks.stub_servers import llm_app, serve_in_thread  # noqa: E402
+
+
+async def burst(base_url, headers, n):
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=300) as client:
+        async def one():
+            start = time.perf_counter()
+            r = await client.post("/chat", json={"content": "What are the key findings?"})
+            r.raise_for_status()
+            return (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one() for _ in range(n)))
+        return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--llm-ms", type=float, default=500)
+    args = parser.parse_args()
+
+    llm_server = serve_in_thread(llm_app(first_token_ms=args.llm_ms, token_ms=0), LLM_PORT)
+
+    from main import app
+    from utils.embeddings import embedding_provider
+    from utils.llm_limiter import llm_limiter
+    embedding_provider.encode = lambda texts, batch_size=32: np.ones((len(texts), 384), dtype=np.float32)
+    app_server = serve_in_thread(app, APP_PORT)
+    base_url = f"http://127.0.0.1:{APP_PORT}"
+
+    with httpx.Client(base_url=base_url) as client:
+        client.post("/register", json={"email": "bench@example.org", "password": "bench"})
+        token = client.post("/login", data={"username": "bench@example.org", "password": "bench"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async_complete = llm_limiter.complete
+    sync_client = Groq(api_key="stub", base_url=os.environ["GROQ_BASE_URL"], max_retries=0)
+
+    async def blocking_complete(user_key, request=None, **kwargs):
+        return sync_client.chat.completions.create(**kwargs)
+
+    print(f"fake LLM latency {args.llm_ms:.0f}ms, one uvicorn worker")
+    print(f"{'concurrent':>10} | {'mode':>8} | {'wall':>8} | {'chats/s':>8} | {'p50':>8} | {'p99':>8}")
+    print("-" * 64)
+    for n in args.concurrency:
+        for mode, complete in (("blocking", blocking_complete), ("async", async_complete)):
+            llm_limiter.complete = complete
+            wall, latencies = asyncio.run(burst(base_url, headers, n))
+            print(
+                f"{n:>10} | {mode:>8} | {wall:>7.2f}s | {n / wall:>8.1f} | "
+                f"{np.percentile(latencies, 50):>6.0f}ms | {np.percentile(latencies, 99):>6.0f}ms"
+            )
+
+    app_server.should_exit = True
+    llm_server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
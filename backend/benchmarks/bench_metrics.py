@@ -0,0 +1,85 @@
+"""
+Cost of the latency instrumentation.
+
+  stage()     - one ``with stage(...)`` block, with METRICS on and off
+  middleware  - requests per second through a one-route app with and
+                without MetricsMiddleware, each request opening 10 stages
+                (about what /chat records)
+
+Requests go through httpx's ASGI transport, so socket overhead does not
+hide the difference.
+
+Run from the backend directory:
+    python -m benchmarks.bench_metrics [--calls 1000000] [--requests 5000]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from utils import metrics as metrics_module  # noqa: E402
+from utils.metrics import MetricsMiddleware, metrics, stage  # noqa: E402
+
+STAGES = ("auth", "embed", "conversation", "index", "retrieval", "history", "response_cache", "llm", "save", "extra")
+
+
+def time_stage(calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        with stage("bench"):
+            pass
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        for name in STAGES:
+            with stage(name):
+                pass
+        return {"ok": True}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def drive(app: FastAPI, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(100):
+            await client.get("/work")
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/work")
+        return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'measurement':>28} | {'value':>12}")
+    print("-" * 44)
+    for enabled in (False, True):
+        metrics_module.METRICS = enabled
+        print(f"{'stage() with METRICS=' + str(enabled).lower():>28} | {time_stage(args.calls):>9.0f} ns")
+
+    for enabled in (False, True):
+        metrics_module.METRICS = enabled
+        metrics.clear()
+        rps = asyncio.run(drive(make_app(enabled), args.requests))
+        print(f"{'req/s, metrics ' + ('on' if enabled else 'off'):>28} | {rps:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
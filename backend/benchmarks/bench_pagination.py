@@ -0,0 +1,151 @@
+"""
+Listing cost: full ORM lists vs. keyset pages with column projection.
+
+Seeds one workspace with --papers papers (with 384-d embeddings) and one
+conversation with --messages messages, then compares through TestClient:
+
+  full       - the old handlers: every ORM row (embeddings included), one list
+  first page - GET ...?limit=100
+  deep page  - the page starting 90% of the way through (cursor)
+  ndjson     - the whole thread streamed with Accept: application/x-ndjson
+
+Peak Python heap (server and client, same process) is measured with
+tracemalloc around each request. The NDJSON stream is read from a uvicorn
+server line by line, since TestClient buffers whole response bodies.
+
+Run from the backend directory:
+    python -m benchmarks.bench_pagination [--papers 50000] [--messages 50000]
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.environment import bench_environment
+
+bench_environment(
+    "bench_pages_",
+    GROQ_API_KEY="stub",
+    JOB_WORKERS="0",
+)
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from benchmarks.stub_servers import serve_in_thread  # noqa: E402
+from core.database import SessionLocal  # noqa: E402
+from core.security import create_access_token  # noqa: E402
+from models.conversation import Conversation, Message  # noqa: E402
+from models.paper import Paper  # noqa: E402
+from models.user import User  # noqa: E402
+from models.workspace import Workspace  # noqa: E402
+from schemas.conversation import MessageResponse  # noqa: E402
+from schemas.paper import PaperResponse  # noqa: E402
+from utils.vector_codec import encode_embedding  # noqa: E402
+
+APP_PORT = 8089
+
+
+def seed(papers: int, messages: int):
+    rng = np.random.default_rng(0)
+    with SessionLocal() as db:
+        db.add(User(id=1, email="bench@example.org", password="x"))
+        db.add(Workspace(id=1, name="big", owner_id=1))
+        db.add(Conversation(id=1, user_id=1))
+        db.flush()
+        for start in range(0, papers, 10_000):
+            vectors = rng.standard_normal((min(10_000, papers - start), 384)).astype(np.float32)
+            db.execute(insert(Paper), [
+                {"title": f"Paper {start + i}", "abstract": "An abstract. " * 40, "workspace_id": 1,
+                 "embedding": encode_embedding(vector)}
+                for i, vector in enumerate(vectors)
+            ])
+        for start in range(0, messages, 20_000):
+            db.execute(insert(Message), [
+                {"conversation_id": 1, "role": "user" if i % 2 else "assistant", "content": "A chat message. " * 20}
+                for i in range(start, min(messages, start + 20_000))
+            ])
+        db.commit()
+
+
+def measure(call):
+    tracemalloc.start()
+    start = time.perf_counter()
+    n, body = call()
+    elapsed = (time.perf_counter() - start) * 1000
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return n, body, elapsed, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=50_000)
+    parser.add_argument("--messages", type=int, default=50_000)
+    args = parser.parse_args()
+
+    from main import app
+    seed(args.papers, args.messages)
+    serve_in_thread(app, APP_PORT)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench@example.org', 'uid': 1})}"}
+
+    with TestClient(app) as client:
+        def full_papers():
+            # What the unpaginated handler did, serialization included
+            with SessionLocal() as db:
+                rows = db.query(Paper).filter(Paper.workspace_id == 1).all()
+                body = b"[" + b",".join(PaperResponse.model_validate(p).model_dump_json().encode() for p in rows) + b"]"
+            return len(rows), len(body)
+
+        def full_messages():
+            with SessionLocal() as db:
+                rows = db.query(Message).filter(Message.conversation_id == 1).order_by(Message.created_at).all()
+                body = b"[" + b",".join(MessageResponse.model_validate(m).model_dump_json().encode() for m in rows) + b"]"
+            return len(rows), len(body)
+
+        def page(url, **params):
+            def call():
+                r = client.get(url, params=params, headers=headers)
+                r.raise_for_status()
+                return len(r.json()), len(r.content)
+            return call
+
+        def cursor_at(url, fraction, total):
+            # Walk to the page that starts at ``fraction`` of the list
+            cursor, seen = None, 0
+            while seen < fraction * total:
+                r = client.get(url, params={"limit": 500, **({"cursor": cursor} if cursor else {})}, headers=headers)
+                seen += len(r.json())
+                cursor = r.headers["x-next-cursor"]
+            return cursor
+
+        def ndjson():
+            with httpx.stream("GET", f"http://127.0.0.1:{APP_PORT}/conversation/1/messages", params={"limit": 500},
+                              headers={**headers, "Accept": "application/x-ndjson"}, timeout=300) as r:
+                n = size = 0
+                for line in r.iter_lines():
+                    n += 1
+                    size += len(line)
+            return n, size
+
+        papers_url, messages_url = "/papers/workspace/1", "/conversation/1/messages"
+        runs = [
+            ("papers", "full", full_papers),
+            ("papers", "first page", page(papers_url)),
+            ("papers", "deep page", page(papers_url, cursor=cursor_at(papers_url, 0.9, args.papers))),
+            ("messages", "full", full_messages),
+            ("messages", "first page", page(messages_url)),
+            ("messages", "deep page", page(messages_url, cursor=cursor_at(messages_url, 0.9, args.messages))),
+            ("messages", "ndjson", ndjson),
+        ]
+        print(f"{args.papers} papers with embeddings, {args.messages} messages in one conversation")
+        print(f"{'list':>8} | {'mode':>10} | {'rows':>6} | {'bytes':>10} | {'time':>9} | {'peak heap':>9}")
+        print("-" * 68)
+        for what, mode, call in runs:
+            n, size, elapsed, peak = measure(call)
+            print(f"{what:>8} | {mode:>10} | {n:>6} | {size:>10} | {elapsed:>7.1f}ms | {peak:>7.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
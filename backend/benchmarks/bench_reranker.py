@@ -0,0 +1,172 @@
+"""
+Latency the cross-encoder reranking stage adds to chat retrieval.
+
+A workspace of --papers synthetic papers (topic words in title and abstract)
+is embedded with the deterministic fake embedder from stub_servers. The
+first stage is hybrid_search (vector + BM25), as in routers/chat.py. Then
+utils.reranker.rerank_papers rescores its top candidates and keeps 3:
+
+  first stage            hybrid_search for the 3 papers only (reranker off)
+  cold, batched          unique questions, all pairs in RERANK_BATCH_SIZE batches
+  cold, one pair/batch   the same with batch size 1 (a forward pass per pair)
+  warm                   the same questions again, scores from the cache
+  concurrent             --concurrency askers at once under --budget-ms; the
+                         reranker runs one forward pass at a time, so queued
+                         requests fall back to the first-stage order (right
+                         away when the queue alone exceeds the budget)
+
+By default the cross-encoder is stub_servers.FakeCrossEncoder, which sleeps
+--ms-per-batch per forward pass plus --ms-per-pair per pair (defaults are in
+the range of ms-marco-MiniLM-L-6 on one CPU core with ~200-token pairs).
+Pass --model to load a real sentence-transformers CrossEncoder instead.
+Reranking times include reading the candidates' titles and abstracts.
+
+Run from the backend directory:
+    python -m benchmarks.bench_reranker [--papers 20000] [--queries 100] [--model cross-encoder/ms-marco-MiniLM-L-6-v2]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.environment import bench_environment
+
+bench_environment("bench_reranker_")
+
+import numpy as np  # noqa: E402
+
+from benchmarks.stub_servers import install_fake_cross_encoder, install_fake_embedder  # noqa: E402
+from core.database import Base, SessionLocal, engine  # noqa: E402
+from core.migrations import run_migrations  # noqa: E402
+from models.conversation import Conversation  # noqa: E402,F401
+from models.job import Job  # noqa: E402,F401
+from models.paper import Paper  # noqa: E402
+from models.user import User  # noqa: E402,F401
+from models.workspace import Workspace  # noqa: E402,F401
+from utils.ann_index import get_workspace_index  # noqa: E402
+from utils.embeddings import embedding_provider  # noqa: E402
+from utils.hybrid_search import hybrid_search  # noqa: E402
+from utils.reranker import CrossEncoderReranker, reranker, rerank_papers  # noqa: E402
+
+GENERIC = "we propose study results model method data analysis approach evaluation show novel".split()
+CONTEXT_PAPERS = 3
+
+
+def seed(rng, n: int, topics: int):
+    topic_words = [[f"topic{t}word{w}" for w in range(8)] for t in range(topics)]
+    labels = rng.integers(0, topics, size=n)
+    rows = []
+    for i in range(n):
+        words = topic_words[labels[i]]
+        rows.append({
+            "id": i + 1,
+            "title": " ".join(rng.choice(words, size=4)) + " " + " ".join(rng.choice(GENERIC, size=3)),
+            "abstract": " ".join(rng.choice(GENERIC, size=60)) + " " + " ".join(rng.choice(words, size=20)),
+            "workspace_id": 1,
+        })
+    with SessionLocal() as db:
+        for i in range(0, n, 10_000):
+            db.bulk_insert_mappings(Paper, rows[i:i + 10_000])
+        db.commit()
+    vectors = embedding_provider.encode([f"{r['title']}. {r['abstract']}" for r in rows])
+    index = get_workspace_index(1)
+    index.rebuild(np.arange(1, n + 1), vectors)
+    return index, topic_words
+
+
+def retrieve(db, index, query: str, vector, candidates: int):
+    """(first-stage ms, rerank ms) of one chat retrieval"""
+    start = time.perf_counter()
+    top_k = candidates if candidates else CONTEXT_PAPERS
+    paper_ids = [hit.paper_id for hit in hybrid_search(db, 1, query, vector, index, top_k=top_k)]
+    first = time.perf_counter()
+    if candidates:
+        rerank_papers(db, query, paper_ids, CONTEXT_PAPERS)
+    return (first - start) * 1000, (time.perf_counter() - first) * 1000
+
+
+def row(name: str, first, rerank, fallbacks: int = 0):
+    total = np.asarray(first) + np.asarray(rerank)
+    print(f"{name:>24} | {np.percentile(first, 50):>6.1f}ms | {np.percentile(rerank, 50):>6.1f}ms | "
+          f"{np.percentile(rerank, 99):>6.1f}ms | {np.percentile(total, 50):>6.1f}ms | "
+          f"{np.percentile(total, 99):>6.1f}ms | {fallbacks / len(first):>8.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[10, 25, 50])
+    parser.add_argument("--model", default="", help="real CrossEncoder model name (default: fake)")
+    parser.add_argument("--ms-per-batch", type=float, default=5)
+    parser.add_argument("--ms-per-pair", type=float, default=3)
+    parser.add_argument("--budget-ms", type=float, default=300)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    install_fake_embedder(embedding_provider)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    start = time.perf_counter()
+    index, topic_words = seed(rng, args.papers, topics=max(1, args.papers // 200))
+    print(f"{args.papers} papers seeded and indexed in {time.perf_counter() - start:.1f}s")
+
+    reranker.enabled = True
+    if args.model:
+        reranker.model_name = args.model
+        reranker.warm_up()
+    else:
+        install_fake_cross_encoder(reranker, args.ms_per_batch, args.ms_per_pair)
+
+    questions = []
+    for _ in range(args.queries):
+        words = topic_words[rng.integers(0, len(topic_words))]
+        text = "what do papers on " + " ".join(rng.choice(words, size=3)) + " say about " + " ".join(rng.choice(GENERIC, size=2))
+        questions.append(text)
+    vectors = embedding_provider.encode(questions)  # query embedding is not part of the timings
+
+    print(f"\nreranker: {args.model or f'fake ({args.ms_per_batch:g}ms/batch + {args.ms_per_pair:g}ms/pair)'}, "
+          f"budget {args.budget_ms:g}ms, {os.cpu_count()} cores")
+    print(f"{'':>24} | {'1st p50':>8} | {'+rr p50':>8} | {'+rr p99':>8} | {'tot p50':>8} | {'tot p99':>8} | fallback")
+    print("-" * 96)
+
+    def run(candidates: int, budget_ms: float = 0):
+        reranker.budget_ms = budget_ms  # 0: measure the full cost, never fall back
+        before = reranker.fallbacks
+        with SessionLocal() as db:
+            times = [retrieve(db, index, q, v, candidates) for q, v in zip(questions, vectors)]
+        first, rerank = zip(*times)
+        return first, rerank, reranker.fallbacks - before
+
+    first, rerank, _ = run(0)
+    row("first stage (top 3)", first, rerank)
+    batch_size = reranker.batch_size
+    for candidates in args.candidates:
+        reranker.clear()
+        row(f"cold, batched, {candidates}", *run(candidates))
+        if not args.model or candidates == args.candidates[-1]:
+            reranker.clear()
+            reranker.batch_size = 1
+            row(f"cold, 1 pair/batch, {candidates}", *run(candidates))
+            reranker.batch_size = batch_size
+        row(f"warm, {candidates}", *run(candidates))
+
+    # Concurrent askers with the budget on; the executor is shared, as in the API
+    candidates = args.candidates[-1]
+    reranker.clear()
+    reranker.budget_ms = args.budget_ms
+    before = reranker.fallbacks
+
+    def ask(i: int):
+        with SessionLocal() as db:
+            return retrieve(db, index, questions[i], vectors[i], candidates)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        first, rerank = zip(*pool.map(ask, range(len(questions))))
+    row(f"{args.concurrency} concurrent, {candidates}", first, rerank, reranker.fallbacks - before)
+    print(f"\n{CrossEncoderReranker.__name__} stats: {reranker.stats()}")
+
+
+if __name__ == "__main__":
+    main()
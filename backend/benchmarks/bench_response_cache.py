@@ -0,0 +1,140 @@
+"""
+Semantic response cache: LLM calls and chat latency with and without it.
+
+Serves the app with uvicorn against the fake LLM from
+benchmarks.stub_servers. Simulated users ask questions about one shared
+workspace: most are paraphrases of a few common intents ("summarize these
+papers", "what datasets are used", ...), the rest are unique. Halfway
+through a paper is imported, which must invalidate the cached answers.
+
+The real sentence-transformers model is replaced by a bag-of-words embedder
+that ignores stop words and punctuation, so paraphrases land close together
+the way they do with MiniLM while unrelated questions do not.
+
+Run from the backend directory:
+    python -m benchmarks.bench_response_cache [--chats 400] [--concurrency 16] [--llm-ms 800]
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import re
+import time
+
+from benchmarks.environment import bench_environment
+
+bench_environment(
+    "bench_cache_",
+    GROQ_API_KEY="stub",
+    FULLTEXT_INGEST="false",
+    LLM_MAX_PER_USER="1000",
+)
+
+LLM_PORT = 8086
+APP_PORT = 8087
+os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{LLM_PORT}"
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+
+from benchmarks.stub_servers import llm_app, serve_in_thread  # noqa: E402
+
+INTENTS = [
+    ["Summarize these papers", "Can you summarize these papers?", "summarize the papers please",
+     "Please summarize these papers."],
+    ["What datasets are used?", "Which datasets are used", "what datasets are used in these papers"],
+    ["What are the key findings?", "what are the key findings", "What are the key findings of these papers?"],
+    ["Compare the methods", "Can you compare the methods?", "compare these methods"],
+]
+STOP = {"a", "an", "the", "these", "this", "of", "in", "please", "can", "you", "are", "is", "what", "which"}
+
+
+def toy_encode(texts, batch_size=32, dim=384):
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in re.findall(r"\w+", text.lower()):
+            if word not in STOP:
+                seed = int.from_bytes(hashlib.sha256(word.encode()).digest()[:4], "little")
+                vectors[row] += np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+        vectors[row] /= np.linalg.norm(vectors[row]) or 1.0
+    return vectors
+
+
+def workload(rng, n, unique_share):
+    for i in range(n):
+        if rng.random() < unique_share:
+            yield f"Question {i} about topic {rng.integers(1_000_000)}"
+        else:
+            variants = INTENTS[rng.integers(len(INTENTS))]
+            yield variants[rng.integers(len(variants))]
+
+
+async def run(base_url, headers, workspace_id, questions, concurrency):
+    latencies, cached = [], 0
+    slots = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=300) as client:
+        async def one(question):
+            nonlocal cached
+            async with slots:
+                start = time.perf_counter()
+                r = await client.post(f"/chat?workspace_id={workspace_id}", json={"content": question})
+                r.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+                cached += r.json()["cached"]
+
+        half = len(questions) // 2
+        start = time.perf_counter()
+        await asyncio.gather(*(one(q) for q in questions[:half]))
+        # The workspace changes: everything cached so far is stale
+        (await client.post("/papers/import", json={
+            "title": "A late addition", "abstract": "New results.", "workspace_id": workspace_id
+        })).raise_for_status()
+        await asyncio.gather(*(one(q) for q in questions[half:]))
+        return time.perf_counter() - start, latencies, cached
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-ms", type=float, default=800)
+    parser.add_argument("--unique", type=float, default=0.3, help="share of one-off questions")
+    args = parser.parse_args()
+
+    serve_in_thread(llm_app(first_token_ms=args.llm_ms, token_ms=0), LLM_PORT)
+
+    from main import app
+    from utils.embeddings import embedding_provider
+    from utils.response_cache import response_cache
+    embedding_provider.encode = toy_encode
+    serve_in_thread(app, APP_PORT)
+    base_url = f"http://127.0.0.1:{APP_PORT}"
+
+    with httpx.Client(base_url=base_url) as client:
+        client.post("/register", json={"email": "bench@example.org", "password": "bench"})
+        token = client.post("/login", data={"username": "bench@example.org", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        workspace_id = client.post("/workspace/create", json={"name": "shared"}, headers=headers).json()["id"]
+        for i in range(20):
+            client.post("/papers/import", headers=headers, json={
+                "title": f"Paper {i} on retrieval", "abstract": f"We study method {i}.", "workspace_id": workspace_id
+            }).raise_for_status()
+
+    questions = list(workload(np.random.default_rng(0), args.chats, args.unique))
+    print(f"{args.chats} chats, {args.concurrency} concurrent, fake LLM {args.llm_ms:.0f}ms, "
+          f"{args.unique:.0%} one-off questions, one import halfway")
+    print(f"{'cache':>5} | {'LLM calls':>9} | {'hit rate':>8} | {'wall':>7} | {'p50':>8} | {'p99':>8}")
+    print("-" * 62)
+    for enabled in (False, True):
+        response_cache.enabled = enabled
+        response_cache.clear()
+        wall, latencies, cached = asyncio.run(run(base_url, headers, workspace_id, questions, args.concurrency))
+        print(
+            f"{'on' if enabled else 'off':>5} | {len(questions) - cached:>9} | {cached / len(questions):>8.1%} | "
+            f"{wall:>6.1f}s | {np.percentile(latencies, 50):>6.0f}ms | {np.percentile(latencies, 99):>6.0f}ms"
+        )
+    print(f"\ncache counters: {response_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: per-paper cosine loop vs. the workspace IVF index
+
+The index is the serving path for related papers and chat retrieval:
+``search_exact`` is one matrix product over the live rows, ``search`` probes
+the inverted lists once the workspace is large enough to be trained (its
+recall is measured by bench_ann_recall; the speedup column is for exact).
+
+Run from the backend directory:
+    python -m benchmarks.bench_retrieval
+"""
+import os
+import time
+
+import numpy as np
+
+from benchmarks.environment import bench_environment
+
+TMP = bench_environment("bench_retrieval_")
+
+from utils.ann_index import IVFIndex  # noqa: E402
+
+DIM = 384
+SIZES = [1_000, 10_000, 100_000]
+QUERIES = 20
+TOP_K = 3
+
+
+def legacy_find_similar(query_embedding, papers, top_k):
+    """The original find_similar_papers loop, kept here for comparison"""
+    similarities = []
+    for paper in papers:
+        vec1_np = np.array(query_embedding)
+        vec2_np = np.array(paper['embedding'])
+        similarity = float(np.dot(vec1_np, vec2_np) / (np.linalg.norm(vec1_np) * np.linalg.norm(vec2_np)))
+        similarities.append({'paper': paper, 'similarity': similarity})
+    similarities.sort(key=lambda x: x['similarity'], reverse=True)
+    return [item['paper'] for item in similarities[:top_k]]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'papers':>8} | {'legacy loop':>12} | {'exact':>9} | {'ivf':>9} | speedup")
+    print("-" * 58)
+
+    for n in SIZES:
+        vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+        papers = [{'id': i, 'embedding': v.tolist()} for i, v in enumerate(vectors)]
+
+        index = IVFIndex(os.path.join(TMP, f"workspace_{n}"))
+        index.add(list(range(n)), vectors)
+
+        query = rng.standard_normal(DIM).astype(np.float32)
+        legacy_ids = [p['id'] for p in legacy_find_similar(query.tolist(), papers, TOP_K)]
+        exact_ids = [i for i, _ in index.search_exact(query, TOP_K)]
+        assert legacy_ids == exact_ids, (legacy_ids, exact_ids)
+
+        legacy_ms = timed(lambda: legacy_find_similar(query.tolist(), papers, TOP_K), 1 if n >= 100_000 else 3)
+        exact_ms = timed(lambda: index.search_exact(query, TOP_K), QUERIES)
+        ivf_ms = timed(lambda: index.search(query, TOP_K), QUERIES)
+
+        print(f"{n:>8} | {legacy_ms:>10.2f}ms | {exact_ms:>7.3f}ms | {ivf_ms:>7.3f}ms | {legacy_ms / exact_ms:>6.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Semantic Scholar client against a local stub server
+
+Fires bursts of concurrent searches (many identical, some distinct) at the
+stub, which adds latency and answers 429 on every Nth request, and reports
+wall time, upstream calls and the client's cache/coalescing/retry counters.
+
+Run from the backend directory:
+    python -m benchmarks.bench_semantic_scholar [--users 50] [--rate-limit-every 4]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.stub_servers import semantic_scholar_app, serve_in_thread
+from utils.semantic_scholar import RateLimitedError, SemanticScholarClient
+
+FIELDS = "title,abstract,authors,year,citationCount,url,openAccessPdf"
+
+
+async def burst(client, users, distinct):
+    async def one(i):
+        try:
+            await client.search(f"topic {i % distinct}", FIELDS)
+            return "ok"
+        except RateLimitedError:
+            return "rate_limited"
+
+    return await asyncio.gather(*(one(i) for i in range(users)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--distinct", type=int, default=5, help="distinct queries per burst")
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--rate-limit-every", type=int, default=4)
+    args = parser.parse_args()
+
+    stub = semantic_scholar_app(args.latency_ms, args.rate_limit_every)
+    server = serve_in_thread(stub, args.port)
+
+    client = SemanticScholarClient(
+        base_url=f"http://127.0.0.1:{args.port}/graph/v1",
+        rate_per_sec=20, burst=5, backoff=0.05
+    )
+
+    async def run():
+        for label in ("cold", "warm"):
+            start = time.perf_counter()
+            before = stub.state.requests
+            results = await burst(client, args.users, args.distinct)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(
+                f"{label:>5}: {args.users} searches in {elapsed:7.1f}ms, "
+                f"{stub.state.requests - before} upstream calls, "
+                f"{results.count('rate_limited')} gave up on 429"
+            )
+        print("client:", client.stats())
+        await client.aclose()
+
+    asyncio.run(run())
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
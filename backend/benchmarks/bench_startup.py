@@ -0,0 +1,77 @@
+"""
+Startup benchmark: app import time, time-to-ready and first-request latency
+
+Each configuration runs in a fresh interpreter so module and model caches do
+not leak between measurements. "lazy" shows the cost the first request pays
+when nothing is warmed up; "eager" shows it after a lifespan warm-up.
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup [--backends torch quantized onnx]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import main
+from utils.embeddings import embedding_provider, generate_embedding
+import_s = time.perf_counter() - t0
+
+ready_s = None
+if "{mode}" == "eager":
+    t1 = time.perf_counter()
+    embedding_provider.warm_up()
+    ready_s = time.perf_counter() - t1
+
+t2 = time.perf_counter()
+generate_embedding("transformer models for protein folding")
+first_ms = (time.perf_counter() - t2) * 1000
+
+t3 = time.perf_counter()
+generate_embedding("graph neural networks for molecules")
+second_ms = (time.perf_counter() - t3) * 1000
+
+print(json.dumps({{"import_s": import_s, "ready_s": ready_s, "first_ms": first_ms, "second_ms": second_ms}}))
+"""
+
+
+def run(mode, backend, database_url):
+    env = dict(os.environ, EMBEDDING_BACKEND=backend, EMBEDDING_PRELOAD="lazy", DATABASE_URL=database_url)
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(mode=mode)],
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["torch", "quantized"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        print(f"{'backend':>10} | {'mode':>5} | {'import':>8} | {'to ready':>8} | {'1st req':>9} | {'2nd req':>8}")
+        print("-" * 66)
+        for backend in args.backends:
+            for mode in ("lazy", "eager"):
+                r = run(mode, backend, database_url)
+                if "error" in r:
+                    print(f"{backend:>10} | {mode:>5} | failed: {r['error']}")
+                    continue
+                ready = f"{r['ready_s']:.2f}s" if r["ready_s"] is not None else "-"
+                print(
+                    f"{backend:>10} | {mode:>5} | {r['import_s']:>7.2f}s | {ready:>8} | "
+                    f"{r['first_ms']:>7.1f}ms | {r['second_ms']:>6.1f}ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Settings shared by the benchmarks.
+
+The app reads its settings when its modules are imported, so a benchmark
+calls ``bench_environment`` before importing anything from it.
+"""
+import os
+import tempfile
+
+
+def bench_environment(prefix: str, database: str = "bench.db", **settings: str) -> str:
+    """
+    Point the app at a fresh temporary directory and return its path.
+
+    The SQLite database and the ANN indexes live in that directory. The model
+    loads lazily (benchmarks usually install a fake one), there is no disk
+    embedding cache, and the secrets are placeholders unless set already.
+    ``settings`` are further environment variables to set.
+    """
+    tmp = tempfile.mkdtemp(prefix=prefix)
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{os.path.join(tmp, database)}",
+        ANN_INDEX_DIR=os.path.join(tmp, "indexes"),
+        EMBEDDING_PRELOAD="lazy",
+        EMBEDDING_CACHE_PATH="",
+    )
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    os.environ.update(settings)
+    return tmp
@@ -0,0 +1,86 @@
+"""
+Load test: inline generate_embedding vs. the micro-batching EmbeddingBatcher
+
+Simulates N concurrent chat users, each issuing several query embeddings from
+inside async handlers, and reports throughput and p50/p99 latency for:
+
+  inline   - the old path, a blocking model.encode(text) per request on the loop
+  batched  - await embedding_batcher.embed(text)
+
+Per-call latency of the inline mode hides the time other users spend waiting
+for the blocked event loop, so the "user p99" column reports how long the
+slowest users took to finish all of their requests.
+
+By default the real model is used. ``--simulate`` replaces it with
+stub_servers.FakeEmbeddingModel, whose cost is a fixed per-call overhead plus
+a per-text cost, which is how a transformer forward pass scales on CPU, so the
+harness runs without torch.
+
+Run from the backend directory:
+    python -m benchmarks.load_embeddings [--users 50 100] [--simulate]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.environment import bench_environment
+
+bench_environment("load_embeddings_")
+
+import numpy as np  # noqa: E402
+
+from benchmarks.stub_servers import install_fake_embedder  # noqa: E402
+from utils.embedding_batcher import EmbeddingBatcher  # noqa: E402
+from utils.embeddings import embedding_provider  # noqa: E402
+
+
+async def user(encode, requests, latencies, started, finished):
+    for i in range(requests):
+        start = time.perf_counter()
+        await encode(f"what does paper {i} say about attention?")
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0)
+    finished.append((time.perf_counter() - started) * 1000)
+
+
+async def scenario(encode, users, requests):
+    latencies, finished = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(user(encode, requests, latencies, start, finished) for _ in range(users)))
+    elapsed = time.perf_counter() - start
+    return (
+        len(latencies) / elapsed,
+        np.percentile(latencies, 50),
+        np.percentile(latencies, 99),
+        np.percentile(finished, 99),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--requests", type=int, default=5, help="embeddings per user")
+    parser.add_argument("--simulate", action="store_true")
+    parser.add_argument("--call-ms", type=float, default=8.0)
+    parser.add_argument("--per-text-ms", type=float, default=0.4)
+    args = parser.parse_args()
+
+    if args.simulate:
+        install_fake_embedder(embedding_provider, ms_per_text=args.per_text_ms, ms_per_call=args.call_ms)
+    else:
+        embedding_provider.warm_up()
+
+    async def inline(text):
+        return embedding_provider.encode([text])[0]
+
+    print(f"{'users':>5} | {'mode':>7} | {'req/s':>8} | {'p50':>8} | {'p99':>8} | {'user p99':>9}")
+    print("-" * 60)
+    for users in args.users:
+        batcher = EmbeddingBatcher(embedding_provider)
+        for name, encode in (("inline", inline), ("batched", batcher.embed)):
+            rps, p50, p99, user_p99 = asyncio.run(scenario(encode, users, args.requests))
+            print(f"{users:>5} | {name:>7} | {rps:>8.1f} | {p50:>6.1f}ms | {p99:>6.1f}ms | {user_p99:>7.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
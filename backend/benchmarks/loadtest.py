@@ -0,0 +1,551 @@
+"""
+End-to-end load test of the whole backend.
+
+  1. seed    a fresh SQLite database with --users users, each owning
+             --workspaces workspaces of --papers papers and --conversations
+             conversations of --messages messages (bulk inserts, embeddings
+             from the fake embedder unless --real-embedder)
+  2. serve   the stub LLM and Semantic Scholar servers from
+             benchmarks.stub_servers (latency set by --llm-ms/--token-ms and
+             --s2-ms), then the app itself under uvicorn with --workers
+             processes, pointed at the stubs
+  3. drive   one closed-loop virtual user per unit of concurrency, for each
+             --concurrency level: after --warmup seconds that are not
+             recorded, each virtual user picks the next operation from --mix
+             for --duration seconds
+  4. report  requests/s, error count and latency percentiles per operation
+             and level, written as JSON to --output together with the git
+             commit and the settings used; the server's own per-stage
+             latencies (/health/stages) are included when METRICS is on
+
+Operations (weights in --mix, e.g. "chat=3,workspace_search=2"):
+
+  chat                POST /chat, a new conversation or a follow-up in one
+                      of the user's conversations
+  chat_stream         POST /chat/stream, read to the end
+  import              POST /papers/import into one of the user's workspaces
+  s2_search           GET /papers/search (stub Semantic Scholar + ranking)
+  workspace_search    GET /papers/workspace/{id}/search
+  list_papers         GET /papers/workspace/{id}
+  list_conversations  GET /conversations
+  messages            GET /conversation/{id}/messages
+  related             GET /papers/{id}/related
+
+Questions and queries are drawn from a small vocabulary, so some chats repeat
+and hit the response cache, like real traffic would. Everything is seeded,
+so two runs with the same arguments send the same request sequence per
+virtual user.
+
+Compare two runs (exit status 1 when an operation got slower or lost
+throughput by more than --threshold):
+    python -m benchmarks.loadtest --compare before.json after.json
+
+Extra settings for the app go through --env, e.g. --env DB_ASYNC=true.
+
+Run from the backend directory:
+    python -m benchmarks.loadtest [--users 20] [--concurrency 4 16 64] [--duration 20] [--output loadtest.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_MIX = (
+    "chat=3,chat_stream=1,import=1,s2_search=1,workspace_search=2,"
+    "list_papers=2,list_conversations=1,messages=1,related=1"
+)
+PERCENTILES = (50, 90, 95, 99)
+MIN_COMPARED_REQUESTS = 20  # fewer samples per operation are too noisy to call a regression
+
+VOCABULARY = (
+    "retrieval transformer attention dataset baseline evaluation embedding "
+    "ranking latency scaling benchmark ablation encoder decoder gradient "
+    "memory throughput recall graph contrastive sparse dense distillation"
+).split()
+QUESTIONS = (
+    "What do these papers say about {}?",
+    "How is {} evaluated?",
+    "Which method works best for {}?",
+    "Summarise the findings on {}",
+)
+
+
+# =========================
+# SETUP
+# =========================
+def configure(args, tmp: str):
+    """Environment shared by the seeding step and the app server"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'loadtest.db')}"
+    os.environ.setdefault("SECRET_KEY", "loadtest-secret")
+    os.environ["GROQ_API_KEY"] = "stub"
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{args.port + 1}"
+    os.environ["SEMANTIC_SCHOLAR_BASE_URL"] = f"http://127.0.0.1:{args.port + 2}/graph/v1"
+    os.environ["ANN_INDEX_DIR"] = os.path.join(tmp, "indexes")
+    os.environ["EMBEDDING_CACHE_PATH"] = ""
+    os.environ["EMBEDDING_PRELOAD"] = "background" if args.real_embedder else "lazy"
+    os.environ["JOB_WORKERS"] = "0"
+    os.environ["FULLTEXT_INGEST"] = "false"
+    os.environ["LLM_MAX_PER_USER"] = "100000"
+    os.environ["LOADTEST_FAKE_EMBEDDER"] = "" if args.real_embedder else str(args.embed_ms)
+    for item in args.env:
+        key, _, value = item.partition("=")
+        os.environ[key] = value
+
+
+def seed(args) -> dict:
+    """Fill the database; returns the ids each virtual user works with"""
+    from sqlalchemy import insert
+
+    from benchmarks.stub_servers import install_fake_embedder
+    from core.database import Base, SessionLocal, engine
+    from core.migrations import run_migrations
+    from models.conversation import Conversation, Message
+    from models.job import Job  # noqa: F401
+    from models.paper import Paper
+    from models.user import User
+    from models.workspace import Workspace
+    from utils.embeddings import EMBEDDING_MODEL_NAME, embedding_provider
+    from utils.vector_codec import encode_embedding
+
+    if not args.real_embedder:
+        install_fake_embedder(embedding_provider)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    rng = random.Random(args.seed)
+    users = []
+    paper_id = conversation_id = 0
+    with SessionLocal() as db:
+        db.execute(insert(User), [
+            {"id": u, "email": f"user{u}@loadtest.local", "password": "x"} for u in range(1, args.users + 1)
+        ])
+        for u in range(1, args.users + 1):
+            workspaces = [(u - 1) * args.workspaces + w for w in range(1, args.workspaces + 1)]
+            db.execute(insert(Workspace), [{"id": w, "name": f"workspace {w}", "owner_id": u} for w in workspaces])
+
+            papers = {}
+            for w in workspaces:
+                titles = [
+                    f"{' '.join(rng.sample(VOCABULARY, 3)).capitalize()} study {w}-{i}" for i in range(args.papers)
+                ]
+                vectors = embedding_provider.encode(titles, batch_size=64) if titles else []
+                db.execute(insert(Paper), [
+                    {"id": paper_id + i + 1, "title": title, "workspace_id": w,
+                     "abstract": f"We study {title.lower()} across {rng.randint(2, 9)} datasets.",
+                     "authors": "Load Test", "year": 2015 + i % 10, "citations": i % 50,
+                     "embedding": encode_embedding(vector), "embedding_model": EMBEDDING_MODEL_NAME}
+                    for i, (title, vector) in enumerate(zip(titles, vectors))
+                ])
+                papers[w] = list(range(paper_id + 1, paper_id + len(titles) + 1))
+                paper_id += len(titles)
+
+            conversations = list(range(conversation_id + 1, conversation_id + args.conversations + 1))
+            conversation_id += args.conversations
+            if conversations:
+                db.execute(insert(Conversation), [
+                    {"id": c, "user_id": u, "workspace_id": rng.choice(workspaces)} for c in conversations
+                ])
+            if conversations and args.messages:
+                db.execute(insert(Message), [
+                    {"conversation_id": c, "role": "user" if m % 2 == 0 else "assistant",
+                     "content": rng.choice(QUESTIONS).format(rng.choice(VOCABULARY)) if m % 2 == 0
+                     else "The papers agree that " + " ".join(rng.choices(VOCABULARY, k=40)) + "."}
+                    for c in conversations for m in range(args.messages)
+                ])
+            users.append({"id": u, "workspaces": workspaces, "papers": papers, "conversations": conversations})
+        db.commit()
+    return {"users": users, "papers": paper_id, "conversations": conversation_id}
+
+
+def create_app():
+    """uvicorn factory for the app under test, with the fake embedder when configured"""
+    from utils.embeddings import embedding_provider
+    from main import app
+
+    fake = os.getenv("LOADTEST_FAKE_EMBEDDER")
+    if fake:
+        from benchmarks.stub_servers import install_fake_embedder
+        install_fake_embedder(embedding_provider, ms_per_text=float(fake))
+    return app
+
+
+def start_servers(args) -> List[subprocess.Popen]:
+    """Stub LLM, stub Semantic Scholar and the app, each in its own process"""
+    stub = [sys.executable, "-m", "benchmarks.stub_servers"]
+    quiet = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    processes = [
+        subprocess.Popen([*stub, "llm", "--port", str(args.port + 1),
+                          "--first-token-ms", str(args.llm_ms), "--token-ms", str(args.token_ms)], **quiet),
+        subprocess.Popen([*stub, "s2", "--port", str(args.port + 2), "--latency-ms", str(args.s2_ms)], **quiet),
+        subprocess.Popen([sys.executable, "-m", "uvicorn", "benchmarks.loadtest:create_app", "--factory",
+                          "--host", "127.0.0.1", "--port", str(args.port), "--workers", str(args.workers),
+                          "--log-level", "warning"]),
+    ]
+    wait_until_up(processes, f"http://127.0.0.1:{args.port}/health/ready", args.startup_timeout)
+    return processes
+
+
+def wait_until_up(processes: List[subprocess.Popen], url: str, timeout: float):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if any(p.poll() is not None for p in processes):
+            raise RuntimeError("a server process exited during startup")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+def stop_servers(processes: List[subprocess.Popen]):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# =========================
+# WORKLOAD
+# =========================
+@dataclass
+class VirtualUser:
+    user: dict
+    headers: dict
+    rng: random.Random
+    conversations: List[int] = field(default_factory=list)
+
+    def workspace(self) -> int:
+        return self.rng.choice(self.user["workspaces"])
+
+    def question(self) -> str:
+        return self.rng.choice(QUESTIONS).format(self.rng.choice(VOCABULARY))
+
+    def query(self) -> str:
+        return " ".join(self.rng.sample(VOCABULARY, 2))
+
+
+async def op_chat(client, vu: VirtualUser, stream: bool = False):
+    params = {"workspace_id": vu.workspace()}
+    if vu.conversations and vu.rng.random() < 0.5:
+        params["conversation_id"] = vu.rng.choice(vu.conversations)
+    if not stream:
+        response = await client.post("/chat", params=params, json={"content": vu.question()})
+        if response.status_code == 200:
+            conversation_id = response.json().get("conversation_id")
+            if conversation_id and conversation_id not in vu.conversations:
+                vu.conversations.append(conversation_id)
+        return response
+
+    async with client.stream("POST", "/chat/stream", params=params, json={"content": vu.question()}) as response:
+        async for _ in response.aiter_bytes():
+            pass
+    return response
+
+
+async def op_chat_stream(client, vu: VirtualUser):
+    return await op_chat(client, vu, stream=True)
+
+
+async def op_import(client, vu: VirtualUser):
+    title = f"{vu.query().capitalize()} revisited {vu.rng.randrange(10 ** 9)}"
+    return await client.post("/papers/import", json={
+        "title": title, "abstract": f"We revisit {title.lower()}.", "authors": "Load Test",
+        "year": 2024, "workspace_id": vu.workspace(),
+    })
+
+
+async def op_s2_search(client, vu: VirtualUser):
+    return await client.get("/papers/search", params={"query": vu.query(), "workspace_id": vu.workspace()})
+
+
+async def op_workspace_search(client, vu: VirtualUser):
+    return await client.get(f"/papers/workspace/{vu.workspace()}/search", params={"query": vu.query()})
+
+
+async def op_list_papers(client, vu: VirtualUser):
+    return await client.get(f"/papers/workspace/{vu.workspace()}", params={"limit": 100})
+
+
+async def op_list_conversations(client, vu: VirtualUser):
+    return await client.get("/conversations", params={"limit": 50})
+
+
+async def op_messages(client, vu: VirtualUser):
+    if not vu.conversations:
+        return await op_list_conversations(client, vu)
+    return await client.get(f"/conversation/{vu.rng.choice(vu.conversations)}/messages", params={"limit": 100})
+
+
+async def op_related(client, vu: VirtualUser):
+    papers = vu.user["papers"][vu.workspace()]
+    if not papers:
+        return await op_list_papers(client, vu)
+    return await client.get(f"/papers/{vu.rng.choice(papers)}/related")
+
+
+OPERATIONS = {
+    "chat": op_chat,
+    "chat_stream": op_chat_stream,
+    "import": op_import,
+    "s2_search": op_s2_search,
+    "workspace_search": op_workspace_search,
+    "list_papers": op_list_papers,
+    "list_conversations": op_list_conversations,
+    "messages": op_messages,
+    "related": op_related,
+}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in OPERATIONS:
+            raise SystemExit(f"unknown operation in --mix: {name} (choose from {', '.join(OPERATIONS)})")
+        weights[name] = float(weight or 1)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+async def run_level(base_url: str, users: List[dict], tokens: Dict[int, str], mix: Dict[str, float],
+                    concurrency: int, duration: float, seed: int) -> dict:
+    """Closed loop: ``concurrency`` virtual users back to back for ``duration`` seconds"""
+    import httpx
+
+    names, weights = list(mix), list(mix.values())
+    samples: Dict[str, List[float]] = {name: [] for name in names}
+    statuses: Dict[str, Dict[str, int]] = {name: {} for name in names}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        deadline = time.perf_counter() + duration
+
+        async def virtual_user(number: int):
+            user = users[number % len(users)]
+            vu = VirtualUser(user, {"Authorization": f"Bearer {tokens[user['id']]}"},
+                             random.Random(seed * 100_003 + number), list(user["conversations"]))
+            as_user = _AuthedClient(client, vu.headers)
+            while time.perf_counter() < deadline:
+                name = vu.rng.choices(names, weights)[0]
+                start = time.perf_counter()
+                try:
+                    response = await OPERATIONS[name](as_user, vu)
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                samples[name].append(time.perf_counter() - start)
+                statuses[name][status] = statuses[name].get(status, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(virtual_user(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    for name in names:
+        values = np.array(samples[name]) * 1000
+        errors = sum(n for status, n in statuses[name].items() if not status.startswith(("2", "3")))
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": errors,
+            "statuses": statuses[name],
+            "rps": round(len(values) / elapsed, 2),
+            **({
+                "mean_ms": round(float(values.mean()), 2),
+                **{f"p{p}_ms": round(float(np.percentile(values, p)), 2) for p in PERCENTILES},
+                "max_ms": round(float(values.max()), 2),
+            } if len(values) else {}),
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "requests": total,
+        "errors": sum(e["errors"] for e in endpoints.values()),
+        "rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+    }
+
+
+class _AuthedClient:
+    """Client view that adds one virtual user's auth header to every call"""
+
+    def __init__(self, client, headers: dict):
+        self._client = client
+        self._headers = headers
+
+    def get(self, url, **kwargs):
+        return self._client.get(url, headers=self._headers, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._client.post(url, headers=self._headers, **kwargs)
+
+    def stream(self, method, url, **kwargs):
+        return self._client.stream(method, url, headers=self._headers, **kwargs)
+
+
+# =========================
+# REPORTING
+# =========================
+def git_commit() -> Optional[dict]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {"commit": commit, "dirty": dirty}
+
+
+def print_level(level: dict):
+    print(f"\nconcurrency {level['concurrency']}: {level['requests']} requests in {level['elapsed_s']}s, "
+          f"{level['rps']} req/s, {level['errors']} errors")
+    print(f"{'operation':>18} | {'req':>6} | {'err':>4} | {'req/s':>7} | {'p50':>8} | {'p95':>8} | {'p99':>8} | {'max':>8}")
+    print("-" * 88)
+    for name, e in level["endpoints"].items():
+        if not e["requests"]:
+            continue
+        print(f"{name:>18} | {e['requests']:>6} | {e['errors']:>4} | {e['rps']:>7.1f} | "
+              + " | ".join(f"{e[key]:>6.0f}ms" for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")))
+
+
+def compare(baseline_path: str, current_path: str, threshold: float) -> bool:
+    """Print per-operation deltas; True when something regressed beyond ``threshold``"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(current_path) as f:
+        current = json.load(f)
+    before = {level["concurrency"]: level for level in baseline["levels"]}
+
+    print(f"{baseline_path} ({(baseline.get('git') or {}).get('commit', '?')[:10]}) -> "
+          f"{current_path} ({(current.get('git') or {}).get('commit', '?')[:10]}), threshold {threshold:.0%}")
+    print(f"{'conc':>4} | {'operation':>18} | {'req/s before':>12} | {'req/s after':>11} | "
+          f"{'p95 before':>10} | {'p95 after':>9} | verdict")
+    print("-" * 96)
+    regressed = False
+    for level in current["levels"]:
+        old_level = before.get(level["concurrency"])
+        if old_level is None:
+            continue
+        for name, new in level["endpoints"].items():
+            old = old_level["endpoints"].get(name)
+            if not old or not old["requests"] or not new["requests"]:
+                continue
+            if min(old["requests"], new["requests"]) < MIN_COMPARED_REQUESTS:
+                print(f"{level['concurrency']:>4} | {name:>18} | {'':>12} | {'':>11} | {'':>10} | {'':>9} | too few requests")
+                continue
+            slower = new["p95_ms"] > old["p95_ms"] * (1 + threshold)
+            fewer = new["rps"] < old["rps"] * (1 - threshold)
+            failing = new["errors"] / new["requests"] > old["errors"] / old["requests"] + 0.01
+            verdict = ", ".join(
+                label for label, bad in (("slower", slower), ("less throughput", fewer), ("more errors", failing)) if bad
+            ) or "ok"
+            regressed |= verdict != "ok"
+            print(f"{level['concurrency']:>4} | {name:>18} | {old['rps']:>12.1f} | {new['rps']:>11.1f} | "
+                  f"{old['p95_ms']:>8.0f}ms | {new['p95_ms']:>7.0f}ms | {verdict}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--workspaces", type=int, default=2, help="per user")
+    parser.add_argument("--papers", type=int, default=200, help="per workspace")
+    parser.add_argument("--conversations", type=int, default=5, help="per user")
+    parser.add_argument("--messages", type=int, default=20, help="per conversation")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--duration", type=float, default=20, help="seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=5, help="unrecorded seconds before each level")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--llm-ms", type=float, default=300, help="stub LLM time to first token")
+    parser.add_argument("--token-ms", type=float, default=5, help="stub LLM time per further token")
+    parser.add_argument("--s2-ms", type=float, default=150, help="stub Semantic Scholar latency")
+    parser.add_argument("--embed-ms", type=float, default=0, help="fake embedder cost per text")
+    parser.add_argument("--real-embedder", action="store_true", help="use EMBEDDING_MODEL instead of the fake")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra app setting")
+    parser.add_argument("--port", type=int, default=8120, help="app port; the stubs use the next two")
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="loadtest.json")
+    parser.add_argument("--baseline", help="results file to compare this run against")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="only compare two results files")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary database directory")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    mix = parse_mix(args.mix)
+    tmp = tempfile.mkdtemp(prefix="loadtest_")
+    configure(args, tmp)
+
+    start = time.perf_counter()
+    seeded = seed(args)
+    seed_s = time.perf_counter() - start
+    print(f"seeded {args.users} users, {seeded['papers']} papers, {seeded['conversations']} conversations "
+          f"({seeded['conversations'] * args.messages} messages) in {seed_s:.1f}s")
+
+    from core.security import create_access_token
+
+    tokens = {
+        user["id"]: create_access_token({"sub": f"user{user['id']}@loadtest.local", "uid": user["id"]})
+        for user in seeded["users"]
+    }
+    base_url = f"http://127.0.0.1:{args.port}"
+    processes = start_servers(args)
+    levels = []
+    try:
+        for concurrency in args.concurrency:
+            if args.warmup:
+                asyncio.run(run_level(base_url, seeded["users"], tokens, mix, concurrency, args.warmup, args.seed + 1))
+            level = asyncio.run(run_level(base_url, seeded["users"], tokens, mix, concurrency, args.duration, args.seed))
+            levels.append(level)
+            print_level(level)
+
+        import httpx
+        stages = httpx.get(f"{base_url}/health/stages", timeout=10).json()
+    finally:
+        stop_servers(processes)
+        if not args.keep:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {**vars(args), "mix": mix},
+        "seed_seconds": round(seed_s, 2),
+        "levels": levels,
+        "server_stages": stages,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {args.output}")
+
+    if args.baseline:
+        sys.exit(1 if compare(args.baseline, args.output, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Local stand-ins for external services, used by the benchmarks and tests.
+
+    semantic_scholar_app   GET /graph/v1/paper/search with tunable latency
+                           and a 429 on every Nth request
+    llm_app                Groq/OpenAI-compatible POST /openai/v1/chat/completions
+                           that returns (or streams) canned tokens at a set pace
+                           (and can break streams off mid-answer)
+    pdf_app                GET /pdf/{paper}.pdf: generated multi-page text PDFs
+    FakeEmbeddingModel     deterministic stand-in for the SentenceTransformer
+                           model (install_fake_embedder)
+
+Run one on its own (then point SEMANTIC_SCHOLAR_BASE_URL / GROQ_BASE_URL at it):
+    python -m benchmarks.stub_servers s2 --port 8081 --latency-ms 150 --rate-limit-every 4
+    python -m benchmarks.stub_servers llm --port 8082 --first-token-ms 300 --token-ms 20
+    python -m benchmarks.stub_servers pdf --port 8086 --pages 50
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import List
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+
+def semantic_scholar_app(latency_ms: float = 100, rate_limit_every: int = 0, retry_after: int = 0) -> FastAPI:
+    """Fake Semantic Scholar search; ``app.state.requests`` counts hits"""
+    app = FastAPI()
+    app.state.requests = 0
+
+    @app.get("/graph/v1/paper/search")
+    async def search(query: str, limit: int = 10, fields: str = ""):
+        app.state.requests += 1
+        number = app.state.requests
+        await asyncio.sleep(latency_ms / 1000)
+        if rate_limit_every and number % rate_limit_every == 0:
+            return JSONResponse(status_code=429, content={"message": "Too Many Requests"},
+                                headers={"Retry-After": str(retry_after)})
+        return {
+            "total": limit,
+            "data": [
+                {
+                    "paperId": f"{query}-{i}",
+                    "title": f"{query.title()} study {i}",
+                    "abstract": f"An abstract about {query} number {i}.",
+                    "authors": [{"name": "Stub Author"}],
+                    "year": 2020 + i % 5,
+                    "citationCount": i * 3,
+                    "url": f"https://stub.example/{i}",
+                    "openAccessPdf": {"url": f"https://stub.example/{i}.pdf"} if i % 2 else None,
+                }
+                for i in range(limit)
+            ],
+        }
+
+    return app
+
+
+CANNED_ANSWER = (
+    "Based on the papers in your workspace, the main contribution is a retrieval "
+    "method that scales to large corpora while keeping latency low. "
+) * 4
+
+
+def llm_app(first_token_ms: float = 300, token_ms: float = 20, answer: str = CANNED_ANSWER) -> FastAPI:
+    """Fake Groq chat completions; ``app.state.active`` tracks in-flight calls.
+
+    Setting ``app.state.fail_after`` to n makes streams break off (connection
+    dropped) after n tokens, like an upstream failure mid-answer.
+    """
+    app = FastAPI()
+    app.state.requests = 0
+    app.state.fail_after = None
+    app.state.active = 0
+    app.state.max_active = 0
+    tokens = [word + " " for word in answer.split()]
+
+    def envelope(**fields):
+        return {"id": "chatcmpl-stub", "created": int(time.time()), "model": "stub-llm", **fields}
+
+    @app.post("/openai/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        app.state.active += 1
+        app.state.max_active = max(app.state.max_active, app.state.active)
+
+        if not body.get("stream"):
+            try:
+                await asyncio.sleep((first_token_ms + token_ms * len(tokens)) / 1000)
+            finally:
+                app.state.active -= 1
+            return envelope(
+                object="chat.completion",
+                choices=[{"index": 0, "finish_reason": "stop",
+                          "message": {"role": "assistant", "content": "".join(tokens)}}],
+                usage={"prompt_tokens": 100, "completion_tokens": len(tokens), "total_tokens": 100 + len(tokens)},
+            )
+
+        async def stream():
+            try:
+                await asyncio.sleep(first_token_ms / 1000)
+                for i, token in enumerate(tokens):
+                    if i == app.state.fail_after:
+                        raise ConnectionAbortedError("stub LLM stream failure")
+                    if i:
+                        await asyncio.sleep(token_ms / 1000)
+                    chunk = envelope(object="chat.completion.chunk", choices=[
+                        {"index": 0, "delta": {"content": token}, "finish_reason": None}
+                    ])
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                done = envelope(object="chat.completion.chunk", choices=[
+                    {"index": 0, "delta": {}, "finish_reason": "stop"}
+                ])
+                yield f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n"
+            finally:
+                app.state.active -= 1
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+PDF_VOCABULARY = (
+    "model retrieval transformer attention dataset baseline evaluation accuracy "
+    "training corpus embedding query document ranking latency scaling layer "
+    "token benchmark ablation results method experiment parameter encoder "
+    "decoder gradient loss batch index vector memory throughput recall"
+).split()
+
+
+def paper_pages(paper: int, pages: int, lines_per_page: int = 45) -> List[str]:
+    """Deterministic filler text for one paper, ending in a references section"""
+    rng = random.Random(paper)
+    text = []
+    for number in range(pages):
+        lines = [" ".join(rng.choices(PDF_VOCABULARY, k=12)) + "." for _ in range(lines_per_page)]
+        if number == pages - 1:
+            lines[lines_per_page // 2:] = ["References"] + [f"[{i}] A. Author. Some cited work. 2020." for i in range(10)]
+        text.append("\n".join(lines))
+    return text
+
+
+def make_pdf(pages: List[str]) -> bytes:
+    """Minimal uncompressed PDF with one Helvetica text line per input line"""
+    def escape(line: str) -> str:
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        ops = "BT /F1 9 Tf 11 TL 40 780 Td " + " ".join(f"({escape(line)}) Tj T*" for line in text.split("\n")) + " ET"
+        stream = ops.encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Contents %d 0 R >>" % (len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{k} 0 R" for k in kids).encode(), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def pdf_app(pages: int = 20, latency_ms: float = 50) -> FastAPI:
+    """Serves a generated PDF per paper number; ``app.state.requests`` counts hits"""
+    app = FastAPI()
+    app.state.requests = 0
+
+    @app.get("/pdf/{paper}.pdf")
+    async def pdf(paper: int):
+        app.state.requests += 1
+        await asyncio.sleep(latency_ms / 1000)
+        return Response(make_pdf(paper_pages(paper, pages)), media_type="application/pdf")
+
+    @app.get("/html/{paper}")
+    async def landing_page(paper: int):
+        return Response(f"<html><body>Paper {paper}</body></html>", media_type="text/html")
+
+    return app
+
+
+class FakeEmbeddingModel:
+    """Hashed bag of words: texts sharing words get similar vectors, same text same vector"""
+
+    STOP = frozenset("a an and are for in is of on the to what which with".split())
+
+    def __init__(self, dim: int = 384, ms_per_text: float = 0, ms_per_call: float = 0):
+        self.dim = dim
+        self.ms_per_text = ms_per_text
+        self.ms_per_call = ms_per_call
+        self._words = {}
+
+    def _word(self, word: str) -> np.ndarray:
+        vector = self._words.get(word)
+        if vector is None:
+            seed = int.from_bytes(hashlib.sha256(word.encode()).digest()[:4], "little")
+            vector = self._words[word] = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return vector
+
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        if self.ms_per_call or self.ms_per_text:
+            # Blocks like a real forward pass: a fixed overhead plus a cost per text
+            time.sleep((self.ms_per_call + self.ms_per_text * len(texts)) / 1000)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                if word not in self.STOP:
+                    vectors[row] += self._word(word)
+            vectors[row] /= np.linalg.norm(vectors[row]) or 1.0
+        return vectors
+
+
+def install_fake_embedder(provider, dim: int = 384, ms_per_text: float = 0, ms_per_call: float = 0) -> FakeEmbeddingModel:
+    """Make ``provider`` (utils.embeddings.EmbeddingProvider) use a FakeEmbeddingModel"""
+    model = FakeEmbeddingModel(dim, ms_per_text, ms_per_call)
+    provider._model = model
+    provider.state = provider.READY
+    provider.load_seconds = 0.0
+    return model
+
+
+class FakeCrossEncoder:
+    """Scores a (query, text) pair by shared words; sleeps like a forward pass per batch and per pair"""
+
+    def __init__(self, ms_per_batch: float = 0, ms_per_pair: float = 0):
+        self.ms_per_batch = ms_per_batch
+        self.ms_per_pair = ms_per_pair
+
+    def predict(self, pairs, batch_size: int = 32, **kwargs) -> np.ndarray:
+        batches = -(-len(pairs) // max(batch_size, 1))
+        if self.ms_per_batch or self.ms_per_pair:
+            time.sleep((batches * self.ms_per_batch + len(pairs) * self.ms_per_pair) / 1000)
+        scores = np.zeros(len(pairs), dtype=np.float32)
+        for i, (query, text) in enumerate(pairs):
+            words = set(re.findall(r"\w+", query.lower())) - FakeEmbeddingModel.STOP
+            scores[i] = len(words & set(re.findall(r"\w+", text.lower()))) / (len(words) or 1)
+        return scores
+
+
+def install_fake_cross_encoder(reranker, ms_per_batch: float = 0, ms_per_pair: float = 0) -> FakeCrossEncoder:
+    """Make ``reranker`` (utils.reranker.CrossEncoderReranker) use a FakeCrossEncoder"""
+    model = FakeCrossEncoder(ms_per_batch, ms_per_pair)
+    reranker._model = model
+    return model
+
+
+def serve_in_thread(app: FastAPI, port: int) -> uvicorn.Server:
+    """Start ``app`` on 127.0.0.1:port in a daemon thread and wait until it is up (stop: ``should_exit = True``)"""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("service", choices=["s2", "llm", "pdf"])
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--pages", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.service == "s2":
+        app = semantic_scholar_app(args.latency_ms, args.rate_limit_every)
+    elif args.service == "llm":
+        app = llm_app(args.first_token_ms, args.token_ms)
+    else:
+        app = pdf_app(args.pages, args.latency_ms)
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
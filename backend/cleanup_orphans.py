@@ -0,0 +1,50 @@
+"""
+Remove rows and index files left behind by deleted workspaces and
+conversations (papers, full-text chunks and messages whose parent is gone),
+and finish workspace deletes that were interrupted.
+
+    python cleanup_orphans.py              # report, then delete in batches
+    python cleanup_orphans.py --dry-run    # only report
+    python cleanup_orphans.py --batch 1000 # rows per DELETE transaction
+
+Safe to run while the API is up: every batch is its own short transaction.
+"""
+import argparse
+import time
+
+from core.database import engine, Base, SessionLocal
+from core.migrations import run_migrations
+from models.user import User
+from models.workspace import Workspace
+from models.paper import Paper, PaperChunk
+from models.conversation import Conversation, Message
+from models.job import Job
+from utils.cascade import DELETE_BATCH_ROWS, delete_orphans, find_orphans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--batch", type=int, default=DELETE_BATCH_ROWS)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    with SessionLocal() as db:
+        found = find_orphans(db)
+    for name, count in found.items():
+        print(f"  {name:<30} {count}")
+    if args.dry_run or not any(found.values()):
+        print("Nothing deleted" if args.dry_run else "No orphans found")
+        return
+
+    started = time.perf_counter()
+    removed = delete_orphans(args.batch)
+    print(f"Cleaned up in {time.perf_counter() - started:.1f}s:")
+    for name, count in removed.items():
+        print(f"  {name:<30} {count}")
+
+
+if __name__ == "__main__":
+    main()
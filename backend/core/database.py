@@ -1,6 +1,8 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 import os
 from dotenv import load_dotenv
 
@@ -8,9 +10,68 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# Add check_same_thread=False for SQLite
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+
+def _data_dir() -> str:
+    """Directory for local data files: next to a SQLite database, else the cwd"""
+    url = make_url(DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        return os.path.dirname(os.path.abspath(url.database))
+    return os.path.abspath(".")
+
+
+# Indexes and caches stored alongside the database
+DATA_DIR = os.getenv("DATA_DIR") or _data_dir()
+
+# Connection pool (per worker process): DB_POOL_SIZE kept open, up to
+# DB_MAX_OVERFLOW more under load, DB_POOL_TIMEOUT seconds to wait for one
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; -1 keeps connections forever
+
+# SQLite tuning: WAL lets readers run alongside the writer, NORMAL sync is
+# crash-safe in WAL mode (only the last commits can be lost on power failure)
+SQLITE_WAL = os.getenv("SQLITE_WAL", "true").lower() in ("1", "true", "yes")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+if SQLITE_SYNCHRONOUS not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+    raise ValueError(f"SQLITE_SYNCHRONOUS must be OFF, NORMAL, FULL or EXTRA, not {SQLITE_SYNCHRONOUS!r}")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))  # seconds a writer waits for the lock
+
+# Async driver (aiosqlite / asyncpg) for the chat and papers routers
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+_url = make_url(DATABASE_URL)
+_is_sqlite = _url.get_backend_name() == "sqlite"
+_in_memory = _is_sqlite and _url.database in (None, "", ":memory:")
+
+engine_args = {"pool_pre_ping": not _is_sqlite}
+if _is_sqlite:
+    # Add check_same_thread=False for SQLite
+    engine_args["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT}
+if not _in_memory:
+    engine_args.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+engine = create_engine(DATABASE_URL, **engine_args)
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    if SQLITE_WAL and not _in_memory:
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+if _is_sqlite:
+    event.listen(engine, "connect", _sqlite_pragmas)
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -18,6 +79,22 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    if _url.get_backend_name() not in ASYNC_DRIVERS:
+        raise ValueError(f"DB_ASYNC supports {', '.join(ASYNC_DRIVERS)} databases, not {_url.get_backend_name()!r}")
+    if _in_memory:
+        raise ValueError("DB_ASYNC needs a database file: an in-memory SQLite database is private to one engine")
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    # Same database and pool settings; the driver is imported here, so a
+    # missing aiosqlite / asyncpg fails at startup rather than on a request
+    async_engine = create_async_engine(_url.set(drivername=ASYNC_DRIVERS[_url.get_backend_name()]), **engine_args)
+    if _is_sqlite:
+        event.listen(async_engine.sync_engine, "connect", _sqlite_pragmas)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -25,4 +102,30 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def _call_with_session(fn, *args):
+    with SessionLocal() as db:
+        return fn(db, *args)
+
+
+async def run_db(fn, *args, in_thread: bool = False):
+    """
+    Run ``fn(session, *args)`` without blocking the event loop.
+
+    With DB_ASYNC the session comes from the async engine and ``fn`` runs
+    through ``AsyncSession.run_sync``; otherwise it gets a regular session on
+    a threadpool worker. ``fn`` commits its own writes and should return plain
+    values, not ORM objects bound to the closed session.
+
+    ``run_sync`` executes ``fn`` on the event loop thread and only yields
+    while a statement waits on the database, so anything else ``fn`` does
+    blocks the loop. Pass ``in_thread=True`` when ``fn`` also does CPU or
+    file work (index builds, vector scoring, reranking): it then always runs
+    on a threadpool worker with a regular session.
+    """
+    if AsyncSessionLocal is not None and not in_thread:
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(fn, *args)
+    return await run_in_threadpool(_call_with_session, fn, *args)
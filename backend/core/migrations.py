@@ -0,0 +1,304 @@
+"""
+Minimal schema migration runner.
+
+``Base.metadata.create_all`` only creates missing tables, so changes to
+existing tables (new columns, type changes, indexes) are registered here as
+numbered migrations. Applied versions are recorded in ``schema_migrations``
+and each migration runs in its own transaction.
+
+Every worker process runs the migrations when it starts, so the run holds a
+lock (a flock beside a SQLite database, a Postgres advisory lock): one worker
+migrates while the others wait and then find nothing pending.
+"""
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock between processes
+    fcntl = None
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = []
+MIGRATION_LOCK_KEY = 7_311_502  # pg_advisory_lock key, shared by every worker
+
+
+def migration(version: int, name: str):
+    """Register a migration function under a unique, increasing version"""
+    def decorator(fn: Callable[[Connection], None]):
+        MIGRATIONS.append((version, name, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+def _columns(conn: Connection, table: str) -> set:
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return set()
+    return {column["name"] for column in inspector.get_columns(table)}
+
+
+@contextmanager
+def _migration_lock(engine: Engine):
+    """Hold off other worker processes migrating the same database"""
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            conn.commit()  # the lock belongs to the session, not the transaction
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                conn.commit()
+    elif engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:") and fcntl:
+        with open(os.path.abspath(engine.url.database) + ".migrate.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # released when the file is closed
+            yield
+    else:
+        yield
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """Apply every pending migration; returns the names that were applied"""
+    with _migration_lock(engine):
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, applied_at VARCHAR NOT NULL)"
+            ))
+            applied = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+        done = []
+        for version, name, fn in MIGRATIONS:
+            if version in applied:
+                continue
+            with engine.begin() as conn:
+                fn(conn)
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                    {"v": version, "n": name, "t": datetime.utcnow().isoformat()},
+                )
+            done.append(name)
+        return done
+
+
+# =========================
+# MIGRATIONS
+# =========================
+@migration(1, "papers_binary_embeddings")
+def papers_binary_embeddings(conn: Connection):
+    """Move papers.embedding (JSON text) into the binary papers.embedding_vec column"""
+    from utils.vector_codec import encode_embedding
+
+    columns = _columns(conn, "papers")
+    if "embedding" not in columns:
+        return
+    if "embedding_vec" not in columns:
+        blob_type = "BYTEA" if conn.dialect.name == "postgresql" else "BLOB"
+        conn.execute(text(f"ALTER TABLE papers ADD COLUMN embedding_vec {blob_type}"))
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text(
+                "SELECT id, embedding FROM papers WHERE id > :last AND embedding IS NOT NULL "
+                "ORDER BY id LIMIT 1000"
+            ),
+            {"last": last_id},
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for paper_id, raw in rows:
+            vector = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+            updates.append({"id": paper_id, "vec": encode_embedding(vector)})
+        conn.execute(text("UPDATE papers SET embedding_vec = :vec WHERE id = :id"), updates)
+        last_id = rows[-1][0]
+
+    conn.execute(text("ALTER TABLE papers DROP COLUMN embedding"))
+
+
+@migration(2, "conversation_history")
+def conversation_history(conn: Connection):
+    """Index messages by (conversation_id, created_at DESC) and add rolling-summary columns"""
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_messages_conversation_created "
+        "ON messages (conversation_id, created_at DESC)"
+    ))
+    columns = _columns(conn, "conversations")
+    if "summary" not in columns:
+        conn.execute(text("ALTER TABLE conversations ADD COLUMN summary TEXT"))
+    if "summary_through_id" not in columns:
+        conn.execute(text("ALTER TABLE conversations ADD COLUMN summary_through_id INTEGER"))
+
+
+@migration(3, "papers_fulltext_status")
+def papers_fulltext_status(conn: Connection):
+    """Track full-text ingestion per paper (the paper_chunks table itself comes from create_all)"""
+    if "fulltext_status" not in _columns(conn, "papers"):
+        conn.execute(text("ALTER TABLE papers ADD COLUMN fulltext_status VARCHAR"))
+
+
+@migration(4, "papers_embedding_model")
+def papers_embedding_model(conn: Connection):
+    """Record which model embedded each paper, so a model change can be re-embedded"""
+    from utils.embeddings import EMBEDDING_MODEL_NAME
+
+    if "embedding_model" not in _columns(conn, "papers"):
+        conn.execute(text("ALTER TABLE papers ADD COLUMN embedding_model VARCHAR"))
+    # Existing embeddings were made by the model configured when upgrading
+    conn.execute(
+        text("UPDATE papers SET embedding_model = :model WHERE embedding_vec IS NOT NULL AND embedding_model IS NULL"),
+        {"model": EMBEDDING_MODEL_NAME},
+    )
+
+
+@migration(5, "papers_text_search")
+def papers_text_search(conn: Connection):
+    """Full-text index over title/abstract/authors: FTS5 on SQLite, tsvector + GIN on Postgres"""
+    if conn.dialect.name == "postgresql":
+        if "search_vector" not in _columns(conn, "papers"):
+            conn.execute(text(
+                "ALTER TABLE papers ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+                "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(authors, '')), 'B') || "
+                "setweight(to_tsvector('english', coalesce(abstract, '')), 'C')) STORED"
+            ))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_papers_search_vector ON papers USING GIN (search_vector)"))
+        return
+    if conn.dialect.name != "sqlite":
+        return
+
+    if not conn.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar():
+        return  # lexical search is skipped (vector only) on SQLite builds without FTS5
+
+    # External-content FTS5 table kept in sync by triggers, so writes stay incremental
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5("
+        "title, abstract, authors, content='papers', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS papers_fts_insert AFTER INSERT ON papers BEGIN "
+        "INSERT INTO papers_fts(rowid, title, abstract, authors) "
+        "VALUES (new.id, new.title, new.abstract, new.authors); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS papers_fts_delete AFTER DELETE ON papers BEGIN "
+        "INSERT INTO papers_fts(papers_fts, rowid, title, abstract, authors) "
+        "VALUES ('delete', old.id, old.title, old.abstract, old.authors); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS papers_fts_update AFTER UPDATE OF title, abstract, authors ON papers BEGIN "
+        "INSERT INTO papers_fts(papers_fts, rowid, title, abstract, authors) "
+        "VALUES ('delete', old.id, old.title, old.abstract, old.authors); "
+        "INSERT INTO papers_fts(rowid, title, abstract, authors) "
+        "VALUES (new.id, new.title, new.abstract, new.authors); END"
+    ))
+    conn.execute(text("INSERT INTO papers_fts(papers_fts) VALUES ('rebuild')"))
+
+
+@migration(6, "workspaces_content_version")
+def workspaces_content_version(conn: Connection):
+    """Version counter bumped on paper import/delete, part of the chat response cache key"""
+    if "content_version" not in _columns(conn, "workspaces"):
+        conn.execute(text("ALTER TABLE workspaces ADD COLUMN content_version INTEGER NOT NULL DEFAULT 0"))
+
+
+@migration(7, "foreign_key_indexes")
+def foreign_key_indexes(conn: Connection):
+    """Composite indexes behind the per-user and per-workspace listings"""
+    # messages (conversation_id, created_at DESC) already exists since migration 2
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_papers_workspace_id ON papers (workspace_id, id)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_conversations_user_created ON conversations (user_id, created_at DESC)"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_workspaces_owner_id ON workspaces (owner_id, id)"))
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("ANALYZE"))
+
+
+@migration(8, "cascading_foreign_keys")
+def cascading_foreign_keys(conn: Connection):
+    """ON DELETE rules matching utils.cascade, for databases that enforce foreign keys"""
+    # SQLite cannot alter constraints in place (and the app does not enable
+    # its foreign keys); utils.cascade deletes the dependent rows explicitly
+    if conn.dialect.name != "postgresql":
+        return
+    for table, column, parent, rule in (
+        ("papers", "workspace_id", "workspaces", "CASCADE"),
+        ("paper_chunks", "paper_id", "papers", "CASCADE"),
+        ("paper_chunks", "workspace_id", "workspaces", "CASCADE"),
+        ("conversations", "workspace_id", "workspaces", "SET NULL"),
+        ("messages", "conversation_id", "conversations", "CASCADE"),
+    ):
+        name = f"{table}_{column}_fkey"
+        # NOT VALID: existing orphans (see cleanup_orphans.py) do not block the migration
+        conn.execute(text(
+            f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}, "
+            f"ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {parent} (id) ON DELETE {rule} NOT VALID"
+        ))
+
+
+@migration(9, "workspaces_autoincrement")
+def workspaces_autoincrement(conn: Connection):
+    """Never reuse a deleted workspace's id on SQLite (caches and indexes are keyed by it)"""
+    # Postgres sequences never hand out an id twice
+    if conn.dialect.name != "sqlite":
+        return
+    ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'workspaces'")).scalar()
+    if ddl is None or "AUTOINCREMENT" in ddl.upper():
+        return
+
+    # AUTOINCREMENT cannot be added in place: copy into a new table (SQLite's
+    # foreign keys are not enabled by the app, so dropping the old one is safe)
+    conn.execute(text(
+        "CREATE TABLE workspaces_new ("
+        "id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, "
+        "name VARCHAR NOT NULL, "
+        "owner_id INTEGER REFERENCES users (id), "
+        "content_version INTEGER DEFAULT '0' NOT NULL)"
+    ))
+    conn.execute(text(
+        "INSERT INTO workspaces_new (id, name, owner_id, content_version) "
+        "SELECT id, name, owner_id, content_version FROM workspaces"
+    ))
+    conn.execute(text("DROP TABLE workspaces"))
+    conn.execute(text("ALTER TABLE workspaces_new RENAME TO workspaces"))
+    conn.execute(text("CREATE INDEX ix_workspaces_id ON workspaces (id)"))
+    conn.execute(text("CREATE INDEX ix_workspaces_owner_id ON workspaces (owner_id, id)"))
+
+    # Start above every id still referenced anywhere, not only the surviving workspaces
+    highest = max(
+        conn.execute(text(f"SELECT coalesce(max({column}), 0) FROM {table}")).scalar()
+        for table, column in (
+            ("workspaces", "id"), ("papers", "workspace_id"), ("paper_chunks", "workspace_id"),
+            ("conversations", "workspace_id"),
+        )
+        if column in _columns(conn, table)
+    )
+    conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'workspaces'"))
+    conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('workspaces', :seq)"), {"seq": highest})
+
+
+@migration(10, "workspaces_deleting")
+def workspaces_deleting(conn: Connection):
+    """Explicit flag for workspaces being deleted in the background (was owner_id = NULL)"""
+    if "deleting" not in _columns(conn, "workspaces"):
+        conn.execute(text("ALTER TABLE workspaces ADD COLUMN deleting BOOLEAN NOT NULL DEFAULT false"))
+
+    # Only workspaces a delete job was started for; other ownerless ones are left alone
+    if not _columns(conn, "jobs"):
+        return
+    targets = [
+        {"id": json.loads(payload)["workspace_id"]}
+        for payload, in conn.execute(text("SELECT payload FROM jobs WHERE kind = 'delete_workspace'"))
+    ]
+    if targets:
+        conn.execute(text("UPDATE workspaces SET deleting = true WHERE owner_id IS NULL AND id = :id"), targets)
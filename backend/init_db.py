@@ -3,22 +3,28 @@ Database initialization script
 Run this to create all tables in the database
 """
 from core.database import engine, Base
+from core.migrations import run_migrations
 from models.user import User
 from models.workspace import Workspace
-from models.paper import Paper
+from models.paper import Paper, PaperChunk
 from models.conversation import Conversation, Message
+from models.job import Job
 
 def init_database():
     """Create all database tables"""
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
     print("✅ Database tables created successfully!")
+    for name in run_migrations(engine):
+        print(f"✅ Applied migration: {name}")
     print("\nTables created:")
     print("  - users")
     print("  - workspaces")
     print("  - papers")
+    print("  - paper_chunks")
     print("  - conversations")
     print("  - messages")
+    print("  - jobs")
 
 if __name__ == "__main__":
     init_database()
@@ -1,21 +1,58 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 from core.database import engine, Base
+from core.migrations import run_migrations
 
 # Import models first to ensure they're registered with SQLAlchemy
 from models.user import User
 from models.workspace import Workspace
-from models.paper import Paper
+from models.paper import Paper, PaperChunk
 from models.conversation import Conversation, Message
+from models.job import Job
 
 # Routers
 from routers.auth import router as auth_router
 from routers.workspace import router as workspace_router
 from routers.papers import router as papers_router
 from routers.chat import router as chat_router
+from routers.health import router as health_router
+from routers.jobs import router as jobs_router
+
+from utils.embeddings import embedding_provider, EMBEDDING_PRELOAD
+from utils.semantic_scholar import semantic_scholar
+from utils.fulltext import fulltext_ingestor
+from utils.jobs import job_pool
+from utils.reranker import reranker
+from utils.metrics import METRICS, MetricsMiddleware
+import utils.reembed  # noqa: F401  (registers the re-embedding job handlers)
+
 
-app = FastAPI(title="ResearchPilot AI Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the embedding model up before (eager) or right after (background)
+    # the server starts accepting requests; "lazy" loads it on first use
+    if EMBEDDING_PRELOAD == "eager":
+        await run_in_threadpool(embedding_provider.warm_up)
+    elif EMBEDDING_PRELOAD == "background":
+        embedding_provider.start_background_load()
+    if reranker.enabled:
+        # Same policy for the cross-encoder (until it is loaded, chats keep the first-stage order)
+        if EMBEDDING_PRELOAD == "eager":
+            await run_in_threadpool(reranker.warm_up)
+        elif EMBEDDING_PRELOAD == "background":
+            reranker.start_background_load()
+    await job_pool.start()
+    yield
+    await job_pool.stop()
+    await semantic_scholar.aclose()
+    await fulltext_ingestor.aclose()
+
+
+app = FastAPI(title="ResearchPilot AI Backend", lifespan=lifespan)
 
 # CORS middleware to allow frontend communication
 app.add_middleware(
@@ -24,16 +61,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-# Create DB tables
+# Request/stage latency histograms (GET /metrics) and the slow-request log
+if METRICS:
+    app.add_middleware(MetricsMiddleware)
+
+# Create DB tables and apply pending schema migrations
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 # Register routers
 app.include_router(auth_router, tags=["auth"])
 app.include_router(workspace_router, prefix="/workspace", tags=["workspace"])
 app.include_router(papers_router, prefix="/papers", tags=["papers"])
 app.include_router(chat_router, tags=["chat"])
+app.include_router(health_router, tags=["health"])
+app.include_router(jobs_router, prefix="/jobs", tags=["jobs"])
 
 
 @app.get("/")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from core.database import Base
@@ -9,19 +9,32 @@ class Conversation(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    workspace_id = Column(Integer, ForeignKey("workspaces.id"), nullable=True)
+    workspace_id = Column(Integer, ForeignKey("workspaces.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Rolling summary of older turns (see utils.history), and the newest message it covers
+    summary = Column(Text, nullable=True)
+    summary_through_id = Column(Integer, nullable=True)
 
     messages = relationship("Message", back_populates="conversation")
 
+    # A user's conversations, newest first
+    __table_args__ = (
+        Index("ix_conversations_user_created", "user_id", created_at.desc()),
+    )
+
 
 class Message(Base):
     __tablename__ = "messages"
 
     id = Column(Integer, primary_key=True, index=True)
-    conversation_id = Column(Integer, ForeignKey("conversations.id"))
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"))
     role = Column(String, nullable=False)  # 'user' or 'assistant'
     content = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     conversation = relationship("Conversation", back_populates="messages")
+
+    # Serves "latest N messages of a conversation" without a sort
+    __table_args__ = (
+        Index("ix_messages_conversation_created", "conversation_id", created_at.desc()),
+    )
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index
+from datetime import datetime
+from core.database import Base
+
+
+class Job(Base):
+    """Unit of background work picked up by utils.jobs workers"""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    # queued -> running -> done | failed; parents wait in "waiting" for their children
+    status = Column(String, nullable=False, default="queued")
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    parent_id = Column(Integer, ForeignKey("jobs.id"), nullable=True, index=True)
+    payload = Column(Text, nullable=False, default="{}")  # JSON
+    result = Column(Text, nullable=True)  # JSON, also holds resumable checkpoints
+    error = Column(Text, nullable=True)
+    progress = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    # Workers claim the oldest queued job
+    __table_args__ = (
+        Index("ix_jobs_status_id", "status", "id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from core.database import Base
 
@@ -13,7 +13,29 @@ class Paper(Base):
     year = Column(Integer, nullable=True)
     citations = Column(Integer, nullable=True)
     url = Column(String, nullable=True)
-    embedding = Column(JSON, nullable=True)  # Store vector embeddings as JSON
-    workspace_id = Column(Integer, ForeignKey("workspaces.id"))
+    embedding = Column("embedding_vec", LargeBinary, nullable=True)  # Packed by utils.vector_codec
+    embedding_model = Column(String, nullable=True)  # Model that produced ``embedding``
+    workspace_id = Column(Integer, ForeignKey("workspaces.id", ondelete="CASCADE"))
+    # Full-text ingestion (utils.fulltext): pending, indexed, empty, no_pdf or failed
+    fulltext_status = Column(String, nullable=True)
 
-    workspace = relationship("Workspace", back_populates="papers")
\ No newline at end of file
+    workspace = relationship("Workspace", back_populates="papers")
+
+    # Papers of a workspace, in id order
+    __table_args__ = (
+        Index("ix_papers_workspace_id", "workspace_id", "id"),
+    )
+
+
+class PaperChunk(Base):
+    """Overlapping passage of a paper's full text, embedded for retrieval"""
+    __tablename__ = "paper_chunks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    paper_id = Column(Integer, ForeignKey("papers.id", ondelete="CASCADE"), index=True, nullable=False)
+    workspace_id = Column(Integer, ForeignKey("workspaces.id", ondelete="CASCADE"), index=True, nullable=False)
+    ordinal = Column(Integer, nullable=False)
+    page = Column(Integer, nullable=True)  # 1-based page the chunk starts on
+    content = Column(Text, nullable=False)
+    token_count = Column(Integer, nullable=False)
+    embedding = Column(LargeBinary, nullable=True)  # Packed by utils.vector_codec
\ No newline at end of file
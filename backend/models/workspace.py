@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, Index, false
 from sqlalchemy.orm import relationship
 from core.database import Base
 
@@ -11,5 +11,19 @@ class Workspace(Base):
 
     owner_id = Column(Integer, ForeignKey("users.id"))
 
+    # Bumped whenever papers are imported or deleted (invalidates cached chat answers)
+    content_version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Set while a background job deletes it: hidden from its owner, no imports or chats
+    deleting = Column(Boolean, nullable=False, default=False, server_default=false())
+
     # ADD THIS ↓
-    papers = relationship("Paper", back_populates="workspace")
\ No newline at end of file
+    papers = relationship("Paper", back_populates="workspace")
+
+    # A user's workspaces
+    __table_args__ = (
+        Index("ix_workspaces_owner_id", "owner_id", "id"),
+        # Ids of deleted workspaces are never handed out again on SQLite: response
+        # caches, paper indexes and k-NN graphs in other workers are keyed by id
+        {"sqlite_autoincrement": True},
+    )
\ No newline at end of file
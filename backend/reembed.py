@@ -0,0 +1,99 @@
+"""
+Re-embed every paper (and its full-text chunks) with the configured
+EMBEDDING_MODEL, e.g. after changing the model.
+
+    python reembed.py                 # start (or resume) a run and wait for it
+    python reembed.py --workers 8     # job workers in this process
+    python reembed.py --status        # progress of the latest run
+
+The work is split into chunk jobs in the ``jobs`` table, so a running API
+server's job workers help out, and an interrupted run continues where it
+stopped when the command is started again.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from core.database import engine, Base, SessionLocal
+from core.migrations import run_migrations
+from models.user import User
+from models.workspace import Workspace
+from models.paper import Paper, PaperChunk
+from models.conversation import Conversation, Message
+from models.job import Job
+from utils.embeddings import EMBEDDING_MODEL_NAME
+from utils.jobs import JobWorkerPool, enqueue, FINISHED, JOB_STALE_SECONDS
+from utils.reembed import stale_papers
+
+ACTIVE = ("queued", "running", "waiting")
+
+
+def latest_run(db):
+    return db.query(Job).filter(Job.kind == "reembed").order_by(Job.id.desc()).first()
+
+
+def describe(job: Job) -> str:
+    state = json.loads(job.result) if job.result else {}
+    return (
+        f"run {job.id} [{job.status}] model={state.get('model', '?')} "
+        f"chunks {job.progress}/{job.total or 0} papers planned={state.get('papers', 0)}"
+        + (f" error={job.error}" if job.error else "")
+    )
+
+
+async def run(workers: int, stale_after: float):
+    with SessionLocal() as db:
+        job = latest_run(db)
+        if job is None or job.status not in ACTIVE:
+            remaining = stale_papers(db).count()
+            if not remaining:
+                print(f"All papers are embedded with {EMBEDDING_MODEL_NAME}")
+                return
+            job = enqueue(db, "reembed", {"model": EMBEDDING_MODEL_NAME})
+            print(f"Started run {job.id}: {remaining} papers to re-embed with {EMBEDDING_MODEL_NAME}")
+        else:
+            print(f"Resuming {describe(job)}")
+        run_id = job.id
+
+    pool = JobWorkerPool(workers=workers, poll_seconds=0.2)
+    pool.requeue_stale(stale_after)
+    await pool.start(kinds=["reembed", "reembed_chunk"])
+    started = time.perf_counter()
+    try:
+        while True:
+            await asyncio.sleep(1)
+            with SessionLocal() as db:
+                job = db.get(Job, run_id)
+                print(f"  {time.perf_counter() - started:6.0f}s  {describe(job)}")
+                if job.status in FINISHED:
+                    break
+    finally:
+        await pool.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--status", action="store_true")
+    parser.add_argument(
+        "--stale-after", type=float, default=JOB_STALE_SECONDS,
+        help="seconds without a heartbeat before a running chunk job is taken over"
+    )
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    if args.status:
+        with SessionLocal() as db:
+            job = latest_run(db)
+            print(describe(job) if job else "No re-embedding run yet")
+            print(f"{stale_papers(db).count()} papers not embedded with {EMBEDDING_MODEL_NAME}")
+        return
+
+    asyncio.run(run(args.workers, args.stale_after))
+
+
+if __name__ == "__main__":
+    main()
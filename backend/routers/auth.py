@@ -4,10 +4,11 @@ from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 
-from core.database import get_db
-from core.security import create_access_token, SECRET_KEY, ALGORITHM
+from core.database import get_db, run_db
+from core.security import create_access_token, SECRET_KEY, ALGORITHM, Principal, token_cache
 from models.user import User
 from schemas.user import UserCreate, UserLogin
+from utils.metrics import stage
 
 router = APIRouter()
 
@@ -62,7 +63,7 @@ def login(
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     access_token = create_access_token(
-        data={"sub": user.email}
+        data={"sub": user.email, "uid": user.id}
     )
 
     return {
@@ -73,29 +74,53 @@ def login(
 # =========================
 # GET CURRENT USER
 # =========================
-def get_current_user(token: str = Depends(oauth2_scheme)):
+def _user_id(db: Session, email: str):
+    return db.query(User.id).filter(User.email == email).scalar()
 
-    credentials_exception = HTTPException(
-        status_code=401,
-        detail="Could not validate credentials"
-    )
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    The user behind the bearer token.
+
+    Recently verified tokens come from ``token_cache``, skipping the signature
+    check; the user id travels in the token, so no user lookup is needed.
+    Older tokens without it are resolved once through run_db, then cached too.
+    """
+    with stage("auth"):
+        principal = token_cache.get(token)
+        if principal is not None:
+            return principal
+
+        credentials_exception = HTTPException(
+            status_code=401,
+            detail="Could not validate credentials"
+        )
+
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            email: str = payload.get("sub")
+            user_id = payload.get("uid")
+
+            if email is None:
+                raise credentials_exception
 
-        if email is None:
+        except JWTError:
             raise credentials_exception
 
-    except JWTError:
-        raise credentials_exception
+        if user_id is None:
+            # Token issued before the user id was embedded
+            user_id = await run_db(_user_id, email)
+            if user_id is None:
+                raise credentials_exception
 
-    return email
+        principal = Principal(id=int(user_id), email=email)
+        token_cache.put(token, principal, payload.get("exp"))
+        return principal
 
 
 # =========================
 # PROTECTED ROUTE
 # =========================
 @router.get("/me")
-def read_users_me(current_user: str = Depends(get_current_user)):
-    return {"email": current_user}
\ No newline at end of file
+def read_users_me(current_user: Principal = Depends(get_current_user)):
+    return {"email": current_user.email}
\ No newline at end of file
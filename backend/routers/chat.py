@@ -1,205 +1,447 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
+from datetime import datetime
 from typing import Optional
+import json
+import os
+import time
 
-from core.database import get_db
+from core.database import get_db, run_db, SessionLocal
+from core.security import Principal
 from routers.auth import get_current_user
-from models.user import User
 from models.conversation import Conversation, Message
 from models.paper import Paper
 from models.schemas import ChatMessage
-from utils.groq_client import client, MODEL_CONFIG
-from utils.embeddings import generate_embedding, find_similar_papers
+from schemas.conversation import ConversationResponse, MessageResponse
+from utils.groq_client import async_client, llm_stats, MODEL_CONFIG
+from utils.llm_limiter import (
+    llm_limiter, LLMBusyError, LLMTimeoutError, ClientDisconnected, LLM_TIMEOUT
+)
+from utils.embedding_batcher import generate_embedding_async
+from utils.history import History, estimate_tokens, history_budget, load_history, message_tokens, refresh_summary
+from utils.fulltext import search_chunks
+from utils.hybrid_search import RRF_K, hybrid_search
+from utils.response_cache import content_version, response_cache
+from utils.reranker import RERANK_CANDIDATES, rerank_papers, reranker
+from utils.cascade import delete_conversation_cascade, ensure_not_deleting
+from utils.pagination import PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, paginate
+from utils.metrics import observe_stage, stage
+from routers.papers import get_paper_index
 
 router = APIRouter()
 
+# Prompt tokens spent on retrieved passages and abstracts
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+CONTEXT_PAPERS = 3  # papers that contribute their abstract
 
-@router.post("/chat")
-async def chat_with_papers(
-    message: ChatMessage,
-    workspace_id: Optional[int] = None,
-    conversation_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+
+def _build_context(db: Session, index, workspace_id: int, query: str, query_embedding) -> str:
+    """Best full-text passages and abstracts of the workspace, packed into CONTEXT_TOKEN_BUDGET"""
+    # Passages (by cosine) and papers (fused vector + BM25) are interleaved by
+    # reciprocal rank, since their raw scores are not comparable
+    candidates = [
+        {**chunk, "score": 1.0 / (RRF_K + rank)}
+        for rank, chunk in enumerate(search_chunks(db, workspace_id, query_embedding), 1)
+    ]
+    with_passages = {c["paper_id"] for c in candidates}
+
+    # Top papers without a matching passage (e.g. no open-access PDF) contribute their abstract;
+    # with the reranker on, the first stage's top RERANK_CANDIDATES are reordered by the cross-encoder
+    top_k = RERANK_CANDIDATES if reranker.enabled else CONTEXT_PAPERS
+    paper_ids = [hit.paper_id for hit in hybrid_search(db, workspace_id, query, query_embedding, index, top_k=top_k)]
+    if reranker.enabled:
+        with stage("rerank"):
+            paper_ids = rerank_papers(db, query, paper_ids, CONTEXT_PAPERS)
+    for rank, paper_id in enumerate(paper_ids[:CONTEXT_PAPERS], 1):
+        if paper_id not in with_passages:
+            candidates.append({"paper_id": paper_id, "page": None, "content": None, "score": 1.0 / (RRF_K + rank)})
+
+    papers = {
+        p.id: p for p in db.query(Paper.id, Paper.title, Paper.authors, Paper.year, Paper.abstract).filter(
+            Paper.id.in_({c["paper_id"] for c in candidates})
+        )
+    }
+
+    # Greedy packing, best score first; grouped by paper for the prompt
+    remaining = CONTEXT_TOKEN_BUDGET
+    selected = {}
+    for candidate in sorted(candidates, key=lambda c: c["score"], reverse=True):
+        paper = papers.get(candidate["paper_id"])
+        if paper is None:
+            continue
+        if candidate["content"] is None:
+            if not paper.abstract:
+                continue
+            candidate = {**candidate, "content": f"Abstract: {paper.abstract}", "tokens": estimate_tokens(paper.abstract)}
+        cost = candidate["tokens"] + (0 if paper.id in selected else estimate_tokens(paper.title) + 8)
+        if cost > remaining:
+            continue
+        remaining -= cost
+        selected.setdefault(paper.id, []).append(candidate)
+
+    if not selected:
+        return ""
+
+    context = "\n\nRelevant papers from your workspace:\n"
+    for i, (paper_id, passages) in enumerate(selected.items(), 1):
+        paper = papers[paper_id]
+        context += f"\n{i}. {paper.title}"
+        if paper.authors:
+            context += f" by {paper.authors}"
+        if paper.year:
+            context += f" ({paper.year})"
+        for passage in sorted(passages, key=lambda c: (c["page"] is not None, c["page"] or 0)):
+            prefix = f"[p. {passage['page']}] " if passage["page"] else ""
+            context += f"\n{prefix}{passage['content']}"
+        context += "\n"
+    return context
+
+
+def _load_prompt(
+    db: Session,
+    user_id: int,
+    content: str,
+    workspace_id: Optional[int],
+    conversation_id: Optional[int],
+    query_embedding
 ):
-    """Chat with AI using context from workspace papers"""
-    
-    # Get user
-    user = db.query(User).filter(User.email == current_user).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Get or create conversation
-    if conversation_id:
-        conversation = db.query(Conversation).filter(
+    """
+    Check the conversation and build the Groq prompt in one read-only pass.
+
+    Returns (messages, needs_summary, cache_key); the key is None when the
+    answer cannot be cached.
+    """
+    with stage("conversation"):
+        owned = not conversation_id or db.query(Conversation.id).filter(
             Conversation.id == conversation_id,
-            Conversation.user_id == user.id
+            Conversation.user_id == user_id
         ).first()
-        if not conversation:
-            raise HTTPException(status_code=404, detail="Conversation not found")
-    else:
-        conversation = Conversation(user_id=user.id, workspace_id=workspace_id)
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
-    
-    # Save user message
-    user_message = Message(
-        conversation_id=conversation.id,
-        role="user",
-        content=message.content
-    )
-    db.add(user_message)
-    db.commit()
-    
+    if not owned:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    ensure_not_deleting(db, workspace_id)
+
     # Build context from papers if workspace is specified
     context = ""
+    version = None
     if workspace_id:
-        papers = db.query(Paper).filter(Paper.workspace_id == workspace_id).all()
-        
-        if papers:
-            # Generate embedding for user query
-            query_embedding = generate_embedding(message.content)
-            
-            # Find relevant papers using semantic search
-            papers_data = [
-                {
-                    'id': p.id,
-                    'title': p.title,
-                    'abstract': p.abstract,
-                    'authors': p.authors,
-                    'year': p.year,
-                    'embedding': p.embedding
-                }
-                for p in papers if p.embedding
-            ]
-            
-            relevant_papers = find_similar_papers(query_embedding, papers_data, top_k=3)
-            
-            if relevant_papers:
-                context = "\n\nRelevant papers from your workspace:\n"
-                for i, paper in enumerate(relevant_papers, 1):
-                    context += f"\n{i}. {paper['title']}"
-                    if paper.get('authors'):
-                        context += f" by {paper['authors']}"
-                    if paper.get('year'):
-                        context += f" ({paper['year']})"
-                    if paper.get('abstract'):
-                        context += f"\nAbstract: {paper['abstract'][:300]}..."
-                    context += "\n"
-    
-    # Get conversation history
-    history_messages = db.query(Message).filter(
-        Message.conversation_id == conversation.id
-    ).order_by(Message.created_at).limit(10).all()
-    
-    # Build messages for Groq
-    groq_messages = [
-        {
-            "role": "system",
-            "content": f"You are a helpful research assistant. You help researchers understand and analyze academic papers. {context}"
-        }
-    ]
-    
-    # Add conversation history (excluding the last user message we just added)
-    for msg in history_messages[:-1]:
-        groq_messages.append({
-            "role": msg.role,
-            "content": msg.content
-        })
-    
-    # Add current user message
-    groq_messages.append({
-        "role": "user",
-        "content": message.content
-    })
+        # Read before retrieval, so an import racing this chat cannot be cached as "seen"
+        with stage("index"):
+            version = content_version(db, workspace_id)
+            index = get_paper_index(db, workspace_id)
+
+        if len(index):
+            with stage("retrieval"):
+                context = _build_context(db, index, workspace_id, content, query_embedding)
     
-    # Get AI response
-    response = client.chat.completions.create(
-        messages=groq_messages,
-        **MODEL_CONFIG
+    system_message = {
+        "role": "system",
+        "content": f"You are a helpful research assistant. You help researchers understand and analyze academic papers. {context}"
+    }
+    current_message = {"role": "user", "content": content}
+
+    # Latest turns that fit the token budget (the new question is sent last)
+    budget = history_budget(message_tokens(system_message) + message_tokens(current_message))
+    with stage("history"):
+        history = load_history(db, conversation_id, budget) if conversation_id else History()
+    groq_messages = [system_message, *history.messages, current_message]
+    cache_key = response_cache.key(workspace_id, version, query_embedding, history.messages) if workspace_id else None
+
+    return groq_messages, history.needs_summary, cache_key
+
+
+def _save_turn(
+    db: Session,
+    user_id: int,
+    workspace_id: Optional[int],
+    conversation_id: Optional[int],
+    question: Optional[str],
+    asked_at: Optional[datetime],
+    answer: Optional[str] = None
+) -> int:
+    """
+    Store a chat turn in one transaction, creating the conversation if needed.
+
+    Either message may be None (streaming saves the question up front and the
+    answer at the end). Returns the conversation id.
+    """
+    with stage("save"):
+        if conversation_id is None:
+            conversation = Conversation(user_id=user_id, workspace_id=workspace_id, created_at=asked_at)
+            db.add(conversation)
+            db.flush()
+            conversation_id = conversation.id
+        if question is not None:
+            # Stamped with the arrival time, so it sorts before the answer
+            db.add(Message(conversation_id=conversation_id, role="user", content=question, created_at=asked_at))
+        if answer is not None:
+            db.add(Message(conversation_id=conversation_id, role="assistant", content=answer))
+        db.commit()
+    return conversation_id
+
+
+async def _prepare_chat(
+    current_user: Principal,
+    message: ChatMessage,
+    workspace_id: Optional[int],
+    conversation_id: Optional[int]
+):
+    """Embed the question, then build the prompt without holding a connection across awaits"""
+    # The embedding also keys the response cache
+    with stage("embed"):
+        query_embedding = await generate_embedding_async(message.content) if workspace_id else None
+    # Retrieval scores vectors and may wait for the reranker: never on the event loop
+    return await run_db(
+        _load_prompt, current_user.id, message.content, workspace_id, conversation_id, query_embedding,
+        in_thread=True
     )
+
+
+@router.post("/chat")
+async def chat_with_papers(
+    message: ChatMessage,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    workspace_id: Optional[int] = None,
+    conversation_id: Optional[int] = None,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Chat with AI using context from workspace papers.
+
+    The conversation (if new), the question and the answer are written in one
+    transaction once the answer is known; a failed LLM call stores nothing.
+    """
+    asked_at = datetime.utcnow()
+    groq_messages, needs_summary, cache_key = await _prepare_chat(
+        current_user, message, workspace_id, conversation_id
+    )
+
+    # A near-identical question about the same workspace state was answered already
+    with stage("response_cache"):
+        ai_response = response_cache.get(cache_key)
+    cached = ai_response is not None
+
+    if not cached:
+        # Get AI response without blocking the event loop
+        try:
+            with stage("llm"):
+                response = await llm_limiter.complete(
+                    current_user.email,
+                    request=request,
+                    messages=groq_messages,
+                    **MODEL_CONFIG
+                )
+        except LLMBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+        except LLMTimeoutError as e:
+            raise HTTPException(status_code=504, detail=str(e))
+        except ClientDisconnected:
+            # Nobody is listening any more; 499 mirrors nginx's "client closed request"
+            return Response(status_code=499)
+
+        ai_response = response.choices[0].message.content
+        response_cache.put(cache_key, ai_response)
     
-    ai_response = response.choices[0].message.content
-    
-    # Save AI message
-    ai_message = Message(
-        conversation_id=conversation.id,
-        role="assistant",
-        content=ai_response
+    conversation_id = await run_db(
+        _save_turn, current_user.id, workspace_id, conversation_id, message.content, asked_at, ai_response
     )
-    db.add(ai_message)
-    db.commit()
+
+    if needs_summary:
+        background_tasks.add_task(refresh_summary, conversation_id, current_user.email)
     
     return {
         "response": ai_response,
-        "conversation_id": conversation.id
+        "conversation_id": conversation_id,
+        "cached": cached
     }
 
 
-@router.get("/conversations")
-async def get_conversations(
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_with_papers_stream(
+    message: ChatMessage,
+    workspace_id: Optional[int] = None,
+    conversation_id: Optional[int] = None,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Same as /chat, but streams the answer as Server-Sent Events.
+
+    Events: ``start`` (conversation id), one ``token`` per chunk, then
+    ``done`` with timing, or ``error``. The assistant message is saved once
+    when the stream ends, including a partial answer if the client leaves.
+    A cached answer is sent as a single ``token`` event.
+    """
+    asked_at = datetime.utcnow()
+    with stage("embed"):
+        query_embedding = await generate_embedding_async(message.content) if workspace_id else None
+
+    def start_turn(db: Session):
+        # Prompt, new conversation and question in one round trip; the
+        # answer follows in a second transaction when the stream ends
+        prompt = _load_prompt(db, current_user.id, message.content, workspace_id, conversation_id, query_embedding)
+        return prompt, _save_turn(db, current_user.id, workspace_id, conversation_id, message.content, asked_at)
+
+    (groq_messages, needs_summary, cache_key), conv_id = await run_db(start_turn, in_thread=True)
+    with stage("response_cache"):
+        cached_response = response_cache.get(cache_key)
+
+    async def events():
+        parts = []
+        saved = False
+        started = time.perf_counter()
+        first_token_ms = None
+        yield _sse("start", {"conversation_id": conv_id})
+
+        try:
+            if cached_response is not None:
+                first_token_ms = (time.perf_counter() - started) * 1000
+                parts.append(cached_response)
+                yield _sse("token", {"content": cached_response})
+            else:
+                # Starlette cancels this generator when the client disconnects,
+                # which releases the slot and cancels the upstream stream
+                with stage("llm"):
+                    async with llm_limiter.slot(current_user.email):
+                        stream = await async_client.chat.completions.create(
+                            messages=groq_messages,
+                            stream=True,
+                            timeout=LLM_TIMEOUT,
+                            **MODEL_CONFIG
+                        )
+                        async for chunk in stream:
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if not delta:
+                                continue
+                            if first_token_ms is None:
+                                first_token_ms = (time.perf_counter() - started) * 1000
+                                llm_stats.record_first_token(first_token_ms)
+                                observe_stage("llm_first_token", first_token_ms / 1000)
+                            parts.append(delta)
+                            yield _sse("token", {"content": delta})
+                # Only complete answers are reused
+                response_cache.put(cache_key, "".join(parts))
+
+            await run_db(_save_turn, current_user.id, workspace_id, conv_id, None, None, "".join(parts))
+            saved = True
+            yield _sse("done", {
+                "conversation_id": conv_id,
+                "time_to_first_token_ms": first_token_ms,
+                "total_ms": (time.perf_counter() - started) * 1000,
+                "cached": cached_response is not None
+            })
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            # Client left or the stream failed: keep the partial answer. This
+            # may run while the generator is being closed, so no awaits here
+            if parts and not saved:
+                with SessionLocal() as session:
+                    _save_turn(session, current_user.id, workspace_id, conv_id, None, None, "".join(parts))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(refresh_summary, conv_id, current_user.email) if needs_summary else None
+    )
+
+
+@router.get("/conversations", response_model=list[ConversationResponse])
+def get_conversations(
+    response: Response,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get all conversations for current user"""
-    user = db.query(User).filter(User.email == current_user).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    conversations = db.query(Conversation).filter(
-        Conversation.user_id == user.id
-    ).order_by(Conversation.created_at.desc()).all()
-    
-    return conversations
+    """Conversations of the current user, newest first (next page cursor in X-Next-Cursor)"""
+    query = db.query(
+        Conversation.id, Conversation.user_id, Conversation.workspace_id, Conversation.created_at
+    ).filter(Conversation.user_id == current_user.id)
+    if cursor:
+        created_at, last_id = decode_cursor(cursor, datetime, int)
+        query = query.filter(or_(
+            Conversation.created_at < created_at,
+            and_(Conversation.created_at == created_at, Conversation.id < last_id)
+        ))
+    rows = query.order_by(Conversation.created_at.desc(), Conversation.id.desc()).limit(limit + 1).all()
+    return paginate(rows, limit, response, key=lambda row: (row.created_at, row.id))
 
 
-@router.get("/conversation/{conversation_id}/messages")
-async def get_conversation_messages(
+def _messages_after(db: Session, conversation_id: int, after: Optional[tuple], limit: int):
+    """One keyset page of a conversation's messages, oldest first"""
+    query = db.query(
+        Message.id, Message.conversation_id, Message.role, Message.content, Message.created_at
+    ).filter(Message.conversation_id == conversation_id)
+    if after:
+        created_at, last_id = after
+        query = query.filter(or_(
+            Message.created_at > created_at,
+            and_(Message.created_at == created_at, Message.id > last_id)
+        ))
+    return query.order_by(Message.created_at, Message.id).limit(limit).all()
+
+
+@router.get("/conversation/{conversation_id}/messages", response_model=list[MessageResponse])
+def get_conversation_messages(
     conversation_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get all messages in a conversation"""
-    user = db.query(User).filter(User.email == current_user).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    conversation = db.query(Conversation).filter(
+    """
+    Messages of a conversation, oldest first (next page cursor in X-Next-Cursor).
+
+    With ``Accept: application/x-ndjson`` the whole thread after ``cursor``
+    is streamed instead, one message per line, read in pages of ``limit``.
+    """
+    conversation = db.query(Conversation.id).filter(
         Conversation.id == conversation_id,
-        Conversation.user_id == user.id
+        Conversation.user_id == current_user.id
     ).first()
     
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    
-    messages = db.query(Message).filter(
-        Message.conversation_id == conversation_id
-    ).order_by(Message.created_at).all()
-    
-    return messages
+
+    after = tuple(decode_cursor(cursor, datetime, int)) if cursor else None
+
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        def lines(after):
+            while True:
+                # A short session per page, so a slow reader holds no connection
+                with SessionLocal() as session:
+                    rows = _messages_after(session, conversation_id, after, limit)
+                # One chunk per page: each chunk is a hop through the threadpool
+                yield "".join(MessageResponse.model_validate(row).model_dump_json() + "\n" for row in rows)
+                if len(rows) < limit:
+                    return
+                after = (rows[-1].created_at, rows[-1].id)
+
+        db.close()
+        return StreamingResponse(lines(after), media_type="application/x-ndjson")
+
+    rows = _messages_after(db, conversation_id, after, limit + 1)
+    return paginate(rows, limit, response, key=lambda row: (row.created_at, row.id))
 
 
 @router.delete("/conversation/{conversation_id}")
-async def delete_conversation(
+def delete_conversation(
     conversation_id: int,
     db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Delete a conversation"""
-    user = db.query(User).filter(User.email == current_user).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == user.id
-    ).first()
-    
-    if not conversation:
+    """Delete a conversation and its messages"""
+    if not delete_conversation_cascade(db, conversation_id, current_user.id):
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    db.delete(conversation)
-    db.commit()
-    
     return {"message": "Conversation deleted successfully"}
\ No newline at end of file
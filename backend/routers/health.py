@@ -0,0 +1,107 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from core.security import token_cache
+
+from utils.embeddings import embedding_provider, embedding_cache
+from utils.embedding_batcher import embedding_batcher
+from utils.semantic_scholar import semantic_scholar
+from utils.groq_client import llm_stats
+from utils.llm_limiter import llm_limiter
+from utils.history import history_stats
+from utils.fulltext import fulltext_ingestor
+from utils.jobs import job_pool
+from utils.response_cache import response_cache
+from utils.reranker import reranker
+from utils.metrics import metrics
+
+router = APIRouter()
+
+
+@router.get("/health")
+def health():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "ok"}
+
+
+@router.get("/health/ready")
+def readiness():
+    """Readiness probe: 200 once the embedding model is loaded, 503 before"""
+    status = embedding_provider.status()
+    return JSONResponse(
+        status_code=200 if embedding_provider.ready else 503,
+        content={
+            "ready": embedding_provider.ready,
+            "embedding_model": status,
+            "embedding_batcher": embedding_batcher.stats(),
+        }
+    )
+
+
+@router.get("/health/embedding-cache")
+def embedding_cache_stats():
+    """Hit/miss/eviction counters for the embedding cache"""
+    return embedding_cache.stats()
+
+
+@router.get("/health/semantic-scholar")
+def semantic_scholar_stats():
+    """Cache, coalescing, retry and rate-limit counters for Semantic Scholar"""
+    return semantic_scholar.stats()
+
+
+@router.get("/health/llm")
+def llm_stats_summary():
+    """LLM queue depth, concurrency and streaming time-to-first-token"""
+    return {**llm_stats.summary(), "limiter": llm_limiter.stats(), "history": history_stats}
+
+
+@router.get("/health/fulltext")
+def fulltext_stats():
+    """Full-text ingestion counters (papers by outcome, chunks, bytes downloaded)"""
+    return fulltext_ingestor.stats()
+
+
+@router.get("/health/jobs")
+def job_stats():
+    """Background job counts by status and this process's worker counters"""
+    return job_pool.stats()
+
+
+@router.get("/health/response-cache")
+def response_cache_stats():
+    """Hit rate, size and eviction counters of the semantic chat-answer cache"""
+    return response_cache.stats()
+
+
+@router.get("/health/reranker")
+def reranker_stats():
+    """Cross-encoder reranking: requests reranked or fallen back, score-cache hit rate, batch latency"""
+    return reranker.stats()
+
+
+@router.get("/health/auth-cache")
+def auth_cache_stats():
+    """Hit rate of the verified-token cache used by get_current_user"""
+    return token_cache.stats()
+
+
+@router.get("/health/stages")
+def stage_latencies():
+    """p50/p95/p99 per route and per pipeline stage (embed, retrieval, llm, save, ...)"""
+    return {
+        "requests": metrics.summary("researchpilot_request_seconds"),
+        "stages": metrics.summary("researchpilot_stage_seconds"),
+    }
+
+
+@router.get("/health/slow-requests")
+def slow_requests():
+    """Latest requests over SLOW_REQUEST_MS with their stage breakdown, newest first"""
+    return list(reversed(metrics.slow_requests))
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Request and stage latency histograms in the Prometheus text format"""
+    return PlainTextResponse(metrics.prometheus(), media_type="text/plain; version=0.0.4")
@@ -1,150 +1,530 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-import requests
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, defer
+from typing import Optional
+import httpx
+import numpy as np
 import os
 
-from core.database import get_db
-from models.paper import Paper
-from schemas.paper import PaperImport, PaperResponse
-from utils.embeddings import generate_embedding
+from core.database import get_db, run_db
+from core.security import Principal
+from models.paper import Paper, PaperChunk
+from schemas.paper import (
+    PaperImport, PaperResponse, PaperBulkItem, PaperBulkImport,
+    BulkImportItemStatus, BulkImportResult, PaperSearchResult, RelatedPaper
+)
+from schemas.job import JobAccepted
+from utils.embedding_batcher import generate_embedding_async, generate_embeddings_async
+from utils.embeddings import EMBEDDING_MODEL_NAME, generate_embeddings
+from utils.jobs import JobContext, enqueue, job_handler, job_pool
+from utils.ann_index import IVFIndex, get_workspace_index
+from utils.knn_graph import KNN_GRAPH_K, refresh_workspace_graph, workspace_graph
+from utils.vector_codec import encode_embedding, decode_matrix
+from utils.retrieval import normalize_rows
+from utils.semantic_scholar import semantic_scholar, RateLimitedError
+from utils.fulltext import fulltext_ingestor
+from utils.hybrid_search import SEARCH_MODES, hybrid_search
+from utils.response_cache import bump_content_version
+from utils.pagination import PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, paginate
+from utils.cascade import ensure_not_deleting
+from utils.metrics import stage
 from routers.auth import get_current_user
 
 router = APIRouter()
 
-# Get API key from environment if available
-SEMANTIC_SCHOLAR_API_KEY = os.getenv("SEMANTIC_SCHOLAR_API_KEY")
+SEARCH_FIELDS = "title,abstract,authors,year,citationCount,url,openAccessPdf"
 
+# Papers embedded and inserted per round trip during bulk import
+BULK_IMPORT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "256"))
 
-@router.get("/search")
-async def search_papers(query: str):
-    url = "https://api.semanticscholar.org/graph/v1/paper/search"
-    headers = {"User-Agent": "ResearchPilot/1.0"}
-    
-    # Add API key if available
-    if SEMANTIC_SCHOLAR_API_KEY:
-        headers["x-api-key"] = SEMANTIC_SCHOLAR_API_KEY
-    
-    params = {
-        "query": query,
-        "limit": 10,
-        "fields": "title,abstract,authors,year,citationCount,url,openAccessPdf"
+# Paper columns sent to clients (everything but the embedding)
+PAPER_COLUMNS = (
+    Paper.id, Paper.title, Paper.abstract, Paper.authors, Paper.year, Paper.citations,
+    Paper.url, Paper.workspace_id, Paper.fulltext_status
+)
+
+
+def get_paper_index(db: Session, workspace_id: int) -> IVFIndex:
+    """ANN index for a workspace, bootstrapped from the database on first use"""
+    index = get_workspace_index(workspace_id)
+
+    def load():
+        # A new transaction, started under the rebuild lock: ``db`` may hold an older snapshot
+        with Session(bind=db.get_bind()) as session:
+            rows = session.query(Paper.id, Paper.embedding).filter(
+                Paper.workspace_id == workspace_id,
+                Paper.embedding.isnot(None),
+                Paper.embedding_model == EMBEDDING_MODEL_NAME
+            ).all()
+        return [r[0] for r in rows], decode_matrix(r[1] for r in rows)
+
+    index.bootstrap(load)
+    return index
+
+
+def _sample_papers(query: str) -> dict:
+    """Demo data shown when Semantic Scholar keeps rate-limiting us"""
+    return {
+        "papers": [
+            {
+                "title": f"Research Paper on {query} - Sample 1",
+                "abstract": f"This is a sample paper about {query}. The Semantic Scholar API is currently rate-limited. Please try again later or add an API key to your .env file.",
+                "authors": "Sample Author et al.",
+                "year": 2024,
+                "citations": 42,
+                "url": "https://arxiv.org/pdf/2301.00001.pdf",
+                "has_pdf": True
+            },
+            {
+                "title": f"Advanced Study of {query} - Sample 2",
+                "abstract": f"Another sample paper discussing {query}. This is demo data shown because the API has rate limits.",
+                "authors": "Demo Researcher, Test Author",
+                "year": 2023,
+                "citations": 28,
+                "url": "https://arxiv.org/pdf/2301.00002.pdf",
+                "has_pdf": True
+            }
+        ],
+        "note": "API rate limited. Showing sample data. Add SEMANTIC_SCHOLAR_API_KEY to .env for higher limits."
     }
 
+
+async def _rank_for_workspace(workspace_id: int, papers: list) -> list:
+    """Order search results by similarity to the workspace centroid, adding ``relevance``"""
+    index = get_workspace_index(workspace_id)
+    if not index.exists:
+        index = await run_db(get_paper_index, workspace_id, in_thread=True)
+    centroid = index.centroid()
+    if centroid is None:
+        return papers
+
+    # Same text as an import embeds, so importing a result hits the embedding cache
+    vectors = await generate_embeddings_async([f"{p['title']} {p['abstract'] or ''}" for p in papers])
+    for paper, vector in zip(papers, vectors):
+        paper["relevance"] = None if vector is None else float(
+            normalize_rows(np.array(vector, dtype=np.float32).reshape(1, -1))[0] @ centroid
+        )
+    return sorted(papers, key=lambda p: -np.inf if p["relevance"] is None else p["relevance"], reverse=True)
+
+
+@router.get("/search")
+async def search_papers(query: str, workspace_id: Optional[int] = None):
+    """
+    Search Semantic Scholar. With ``workspace_id`` the results are ranked by
+    similarity to the workspace's papers (its embedding centroid).
+    """
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        
-        if response.status_code == 429:
-            # Rate limited - return mock data for demo
-            return {
-                "papers": [
-                    {
-                        "title": f"Research Paper on {query} - Sample 1",
-                        "abstract": f"This is a sample paper about {query}. The Semantic Scholar API is currently rate-limited. Please try again later or add an API key to your .env file.",
-                        "authors": "Sample Author et al.",
-                        "year": 2024,
-                        "citations": 42,
-                        "url": "https://arxiv.org/pdf/2301.00001.pdf",
-                        "has_pdf": True
-                    },
-                    {
-                        "title": f"Advanced Study of {query} - Sample 2",
-                        "abstract": f"Another sample paper discussing {query}. This is demo data shown because the API has rate limits.",
-                        "authors": "Demo Researcher, Test Author",
-                        "year": 2023,
-                        "citations": 28,
-                        "url": "https://arxiv.org/pdf/2301.00002.pdf",
-                        "has_pdf": True
-                    }
-                ],
-                "note": "API rate limited. Showing sample data. Add SEMANTIC_SCHOLAR_API_KEY to .env for higher limits."
-            }
-        
-        if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail=response.text)
-
-        data = response.json()
-        papers = []
-
-        for paper in data.get("data", []):
-            authors = ", ".join([author.get("name", "") for author in paper.get("authors", [])])
-            
-            # Get PDF URL if available, otherwise use paper URL
-            pdf_info = paper.get("openAccessPdf")
-            paper_url = pdf_info.get("url") if pdf_info else paper.get("url")
-            
-            papers.append({
-                "title": paper.get("title"),
-                "abstract": paper.get("abstract"),
-                "authors": authors,
-                "year": paper.get("year"),
-                "citations": paper.get("citationCount"),
-                "url": paper_url,
-                "has_pdf": bool(pdf_info)
-            })
-
-        return {"papers": papers}
-
-    except requests.exceptions.Timeout:
+        with stage("semantic_scholar"):
+            data = await semantic_scholar.search(query, fields=SEARCH_FIELDS, limit=10)
+    except RateLimitedError:
+        # Still rate limited after backing off and retrying
+        return _sample_papers(query)
+    except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="API request timed out")
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except httpx.RequestError as e:
         raise HTTPException(status_code=500, detail=f"API request failed: {str(e)}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+    papers = []
+    for paper in data.get("data", []):
+        authors = ", ".join([author.get("name", "") for author in paper.get("authors", [])])
+
+        # Get PDF URL if available, otherwise use paper URL
+        pdf_info = paper.get("openAccessPdf")
+        paper_url = pdf_info.get("url") if pdf_info else paper.get("url")
+
+        papers.append({
+            "title": paper.get("title"),
+            "abstract": paper.get("abstract"),
+            "authors": authors,
+            "year": paper.get("year"),
+            "citations": paper.get("citationCount"),
+            "url": paper_url,
+            "has_pdf": bool(pdf_info)
+        })
+
+    if workspace_id is not None and papers:
+        with stage("rank"):
+            papers = await _rank_for_workspace(workspace_id, papers)
+    return {"papers": papers}
+
+
+def _initial_fulltext_status(url: Optional[str]) -> Optional[str]:
+    return "pending" if url and fulltext_ingestor.enabled else None
 
 
 @router.post("/import", response_model=PaperResponse)
 async def import_paper(
     paper_data: PaperImport,
-    db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Import a paper into a workspace with vector embedding"""
     
     # Generate embedding from title + abstract
     text_for_embedding = f"{paper_data.title} {paper_data.abstract or ''}"
-    embedding = generate_embedding(text_for_embedding)
-    
-    new_paper = Paper(
-        title=paper_data.title,
-        abstract=paper_data.abstract,
-        authors=paper_data.authors,
-        year=paper_data.year,
-        citations=paper_data.citations,
-        url=paper_data.url,
-        embedding=embedding,
-        workspace_id=paper_data.workspace_id
-    )
-    
-    db.add(new_paper)
+    with stage("embed"):
+        embedding = await generate_embedding_async(text_for_embedding)
+
+    def insert_paper(db: Session) -> PaperResponse:
+        ensure_not_deleting(db, paper_data.workspace_id)
+        with stage("insert"):
+            new_paper = Paper(
+                title=paper_data.title,
+                abstract=paper_data.abstract,
+                authors=paper_data.authors,
+                year=paper_data.year,
+                citations=paper_data.citations,
+                url=paper_data.url,
+                embedding=encode_embedding(embedding),
+                embedding_model=EMBEDDING_MODEL_NAME if embedding else None,
+                workspace_id=paper_data.workspace_id,
+                fulltext_status=_initial_fulltext_status(paper_data.url)
+            )
+            db.add(new_paper)
+            bump_content_version(db, paper_data.workspace_id)
+            db.flush()
+
+            # Fetch, chunk and embed the PDF in a background job (same transaction)
+            if new_paper.fulltext_status == "pending":
+                enqueue(db, "fulltext", {"paper_ids": [new_paper.id]}, commit=False)
+            paper = PaperResponse.model_validate(new_paper)  # before commit expires the instance
+            db.commit()
+
+        if embedding:
+            with stage("index"):
+                index = get_paper_index(db, paper.workspace_id)
+                index.add([paper.id], [embedding])
+            with stage("graph"):
+                refresh_workspace_graph(paper.workspace_id, index)
+        return paper
+
+    paper = await run_db(insert_paper, in_thread=True)
+    if paper.fulltext_status == "pending":
+        job_pool.notify()
+    return paper
+
+
+# =========================
+# BULK IMPORT
+# =========================
+def _dedup_key(value: Optional[str]) -> Optional[str]:
+    return " ".join(value.lower().split()) if value and value.strip() else None
+
+
+async def _json_items(payload: PaperBulkImport):
+    for index, item in enumerate(payload.papers):
+        yield index, item, None
+
+
+async def _ndjson_items(request: Request):
+    """Parse a streamed NDJSON body line by line without buffering it whole"""
+    index = 0
+    buffer = b""
+
+    def parse(line: bytes):
+        try:
+            return PaperBulkItem.model_validate_json(line), None
+        except ValidationError as e:
+            return None, str(e.errors()[0].get("msg", "Invalid paper"))
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield (index, *parse(line))
+                index += 1
+    if buffer.strip():
+        yield (index, *parse(buffer))
+
+
+def _existing_keys(db: Session, workspace_id: int) -> tuple:
+    """Dedup keys of the titles and URLs already in a workspace"""
+    ensure_not_deleting(db, workspace_id)
+    titles, urls = set(), set()
+    for title, url in db.query(Paper.title, Paper.url).filter(Paper.workspace_id == workspace_id):
+        titles.add(_dedup_key(title))
+        if url:
+            urls.add(_dedup_key(url))
+    return titles, urls
+
+
+def _insert_chunk(db: Session, workspace_id: int, chunk: list, vectors: list) -> tuple:
+    """Insert and index one embedded chunk in its own transaction; returns (new ids, full-text queued)"""
+    ensure_not_deleting(db, workspace_id)
+    mappings = [
+        {
+            "title": item.title,
+            "abstract": item.abstract,
+            "authors": item.authors,
+            "year": item.year,
+            "citations": item.citations,
+            "url": item.url,
+            "embedding": encode_embedding(vector),
+            "embedding_model": EMBEDDING_MODEL_NAME if vector is not None else None,
+            "workspace_id": workspace_id,
+            "fulltext_status": _initial_fulltext_status(item.url),
+        }
+        for (_, item), vector in zip(chunk, vectors)
+    ]
+    ids = db.scalars(
+        insert(Paper).returning(Paper.id, sort_by_parameter_order=True),
+        mappings
+    ).all()
+    bump_content_version(db, workspace_id)
+    fulltext_ids = [paper_id for (_, item), paper_id in zip(chunk, ids) if _initial_fulltext_status(item.url)]
+    if fulltext_ids:
+        enqueue(db, "fulltext", {"paper_ids": fulltext_ids}, commit=False)
     db.commit()
-    db.refresh(new_paper)
-    
-    return new_paper
+
+    embedded = [(paper_id, vector) for paper_id, vector in zip(ids, vectors) if vector is not None]
+    if embedded:
+        index = get_paper_index(db, workspace_id)
+        index.add([paper_id for paper_id, _ in embedded], np.vstack([vector for _, vector in embedded]))
+    return ids, bool(fulltext_ids)
+
+
+@router.post("/import/bulk", response_model=BulkImportResult)
+async def import_papers_bulk(
+    request: Request,
+    workspace_id: Optional[int] = None,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Import many papers into a workspace, committed BULK_IMPORT_CHUNK_SIZE at a time.
+
+    Send a JSON ``PaperBulkImport`` body, or ``application/x-ndjson`` with one
+    paper per line and ``?workspace_id=``. Papers whose title or URL already
+    exists in the workspace (or earlier in the request) are reported as
+    duplicates instead of being inserted.
+    """
+    if "ndjson" in request.headers.get("content-type", ""):
+        if workspace_id is None:
+            raise HTTPException(status_code=422, detail="workspace_id query parameter is required for NDJSON imports")
+        items = _ndjson_items(request)
+    else:
+        try:
+            payload = PaperBulkImport.model_validate_json(await request.body())
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+        workspace_id = payload.workspace_id
+        items = _json_items(payload)
+
+    return await _bulk_import(workspace_id, items)
+
+
+async def _bulk_import(workspace_id: int, items, on_progress=None, embed=generate_embeddings_async) -> BulkImportResult:
+    """
+    Dedup, embed and insert ``(index, item, error)`` tuples chunk by chunk.
+
+    A chunk is embedded with the async ``embed(texts)`` first, then inserted,
+    committed and indexed on a worker thread, so no transaction stays open
+    while the request body is read or the model runs. ``on_progress(done)``,
+    if given, is awaited after each chunk.
+    """
+    seen_titles, seen_urls = await run_db(_existing_keys, workspace_id, in_thread=True)
+    statuses, chunk = [], []
+    embedded = fulltext = False
+
+    async def flush(chunk: list):
+        nonlocal embedded, fulltext
+        vectors = await embed([f"{item.title} {item.abstract or ''}" for _, item in chunk])
+        ids, queued = await run_db(_insert_chunk, workspace_id, chunk, vectors, in_thread=True)
+        for (index, item), paper_id in zip(chunk, ids):
+            statuses.append(BulkImportItemStatus(index=index, status="imported", id=paper_id, title=item.title))
+        embedded = embedded or any(vector is not None for vector in vectors)
+        fulltext = fulltext or queued
+        if on_progress:
+            await on_progress(len(statuses))
+
+    async for index, item, error in items:
+        if error:
+            statuses.append(BulkImportItemStatus(index=index, status="invalid", detail=error))
+            continue
+
+        title_key, url_key = _dedup_key(item.title), _dedup_key(item.url)
+        if title_key in seen_titles or (url_key and url_key in seen_urls):
+            statuses.append(BulkImportItemStatus(index=index, status="duplicate", title=item.title))
+            continue
+        seen_titles.add(title_key)
+        if url_key:
+            seen_urls.add(url_key)
+
+        chunk.append((index, item))
+        if len(chunk) >= BULK_IMPORT_CHUNK_SIZE:
+            await flush(chunk)
+            chunk = []
+
+    if chunk:
+        await flush(chunk)
+    if embedded:
+        # Merging many papers into a big graph is real work: keep it off the event loop
+        await run_in_threadpool(refresh_workspace_graph, workspace_id, get_workspace_index(workspace_id))
+    if fulltext:
+        job_pool.notify()
+
+    statuses.sort(key=lambda s: s.index)
+    return BulkImportResult(
+        imported=sum(s.status == "imported" for s in statuses),
+        duplicates=sum(s.status == "duplicate" for s in statuses),
+        invalid=sum(s.status == "invalid" for s in statuses),
+        items=statuses
+    )
+
+
+@router.post("/import/async", response_model=JobAccepted, status_code=202)
+def import_papers_async(
+    payload: PaperBulkImport,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Queue papers for import and return at once with a job id.
+
+    Takes the same JSON body as ``/import/bulk``; poll ``GET /jobs/{job_id}``
+    for progress and the per-paper result.
+    """
+    ensure_not_deleting(db, payload.workspace_id)
+    job = enqueue(
+        db,
+        "import_papers",
+        payload.model_dump(),
+        user_id=current_user.id,
+        total=len(payload.papers)
+    )
+    return JobAccepted(job_id=job.id, status=job.status)
+
+
+@job_handler("import_papers")
+async def run_import_job(job: JobContext) -> dict:
+    payload = PaperBulkImport.model_validate(job.payload)
+    # Encode on this job's thread rather than the request batcher's, so jobs embed in parallel
+    result = await _bulk_import(
+        payload.workspace_id, _json_items(payload),
+        on_progress=lambda done: job.run_in_thread(job.progress, done),
+        embed=lambda texts: job.run_in_thread(generate_embeddings, texts)
+    )
+    await job.run_in_thread(job.progress, len(payload.papers))
+    return result.model_dump()
 
 
 @router.get("/workspace/{workspace_id}", response_model=list[PaperResponse])
-async def get_workspace_papers(
+def get_workspace_papers(
     workspace_id: int,
+    response: Response,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get all papers in a workspace"""
-    papers = db.query(Paper).filter(Paper.workspace_id == workspace_id).all()
-    return papers
+    """Papers in a workspace by id, without embeddings (next page cursor in X-Next-Cursor)"""
+    query = db.query(*PAPER_COLUMNS).filter(Paper.workspace_id == workspace_id)
+    if cursor:
+        last_id, = decode_cursor(cursor, int)
+        query = query.filter(Paper.id > last_id)
+    rows = query.order_by(Paper.id).limit(limit + 1).all()
+    return paginate(rows, limit, response, key=lambda row: (row.id,))
+
+
+@router.get("/workspace/{workspace_id}/search", response_model=list[PaperSearchResult])
+async def search_workspace_papers(
+    workspace_id: int,
+    query: str,
+    limit: int = Query(10, ge=1, le=100),
+    mode: str = "hybrid",
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Search the papers of a workspace.
+
+    ``hybrid`` (default) fuses embedding similarity with BM25 keyword matches
+    over title, abstract and authors, so author names, acronyms and exact
+    method names are found as well as paraphrases. ``semantic`` and
+    ``lexical`` use one side only.
+    """
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=422, detail=f"mode must be one of {', '.join(SEARCH_MODES)}")
+
+    with stage("index"):
+        index = get_workspace_index(workspace_id)
+        if not index.exists:
+            index = await run_db(get_paper_index, workspace_id, in_thread=True)
+    query_vector = None
+    if mode != "lexical" and len(index):
+        with stage("embed"):
+            query_vector = await generate_embedding_async(query)
+
+    def search(db: Session) -> list[PaperSearchResult]:
+        with stage("search"):
+            hits = hybrid_search(db, workspace_id, query, query_vector, index, top_k=limit, mode=mode)
+        papers = {
+            p.id: p for p in db.query(Paper).options(defer(Paper.embedding)).filter(
+                Paper.id.in_([hit.paper_id for hit in hits])
+            )
+        }
+        return [
+            PaperSearchResult(
+                **PaperResponse.model_validate(papers[hit.paper_id]).model_dump(),
+                score=hit.score,
+                semantic_rank=hit.semantic_rank,
+                lexical_rank=hit.lexical_rank
+            )
+            for hit in hits if hit.paper_id in papers
+        ]
+
+    return await run_db(search, in_thread=True)
+
+
+@router.get("/{paper_id}/related", response_model=list[RelatedPaper])
+def get_related_papers(
+    paper_id: int,
+    limit: int = Query(KNN_GRAPH_K, ge=1, le=KNN_GRAPH_K),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Most similar papers in the same workspace, from the workspace's neighbour graph"""
+    workspace_id = db.query(Paper.workspace_id).filter(Paper.id == paper_id).scalar()
+    if workspace_id is None:
+        raise HTTPException(status_code=404, detail="Paper not found")
+
+    graph = workspace_graph(workspace_id, get_paper_index(db, workspace_id))
+    neighbours = graph.neighbours(paper_id, limit)
+    papers = {row.id: row for row in db.query(*PAPER_COLUMNS).filter(Paper.id.in_([i for i, _ in neighbours]))}
+    return [
+        RelatedPaper(**PaperResponse.model_validate(papers[i]).model_dump(), score=score)
+        for i, score in neighbours if i in papers
+    ]
 
 
 @router.delete("/{paper_id}")
 async def delete_paper(
     paper_id: int,
-    db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Delete a paper from workspace"""
-    paper = db.query(Paper).filter(Paper.id == paper_id).first()
-    if not paper:
-        raise HTTPException(status_code=404, detail="Paper not found")
-    
-    db.delete(paper)
-    db.commit()
+    def delete(db: Session):
+        paper = db.query(Paper).filter(Paper.id == paper_id).first()
+        if not paper:
+            raise HTTPException(status_code=404, detail="Paper not found")
+
+        workspace_id = paper.workspace_id
+        chunk_ids = [row[0] for row in db.query(PaperChunk.id).filter(PaperChunk.paper_id == paper_id)]
+        if chunk_ids:
+            db.query(PaperChunk).filter(PaperChunk.paper_id == paper_id).delete(synchronize_session=False)
+        db.delete(paper)
+        bump_content_version(db, workspace_id)
+        db.commit()
+        return workspace_id, chunk_ids
+
+    workspace_id, chunk_ids = await run_db(delete)
+
+    index = get_workspace_index(workspace_id)
+    await run_in_threadpool(index.remove, [paper_id])
+    await run_in_threadpool(refresh_workspace_graph, workspace_id, index)
+    if chunk_ids:
+        await run_in_threadpool(get_workspace_index(workspace_id, "chunks").remove, chunk_ids)
     
-    return {"message": "Paper deleted successfully"}
\ No newline at end of file
+    return {"message": "Paper deleted successfully"}
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from core.database import get_db
+from core.security import Principal
 from routers.auth import get_current_user
-from models.user import User
+from models.paper import Paper
 from models.workspace import Workspace
 from schemas.workspace import WorkspaceCreate, WorkspaceOut
+from utils.cascade import WORKSPACE_DELETE_SYNC_PAPERS, delete_workspace_cascade, schedule_workspace_delete
 
 router = APIRouter()
 
@@ -14,18 +17,13 @@ router = APIRouter()
 def create_workspace(
     workspace: WorkspaceCreate,
     db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Create a new workspace for the current user"""
     
-    # Get user by email
-    user = db.query(User).filter(User.email == current_user).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     new_workspace = Workspace(
         name=workspace.name,
-        owner_id=user.id
+        owner_id=current_user.id
     )
     
     db.add(new_workspace)
@@ -38,40 +36,42 @@ def create_workspace(
 @router.get("/my", response_model=list[WorkspaceOut])
 def get_workspaces(
     db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get all workspaces for the current user"""
-    
-    # Get user by email
-    user = db.query(User).filter(User.email == current_user).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    workspaces = db.query(Workspace).filter(Workspace.owner_id == user.id).all()
+    workspaces = db.query(Workspace).filter(Workspace.owner_id == current_user.id, ~Workspace.deleting).all()
     return workspaces
 
 
 @router.delete("/{workspace_id}")
 def delete_workspace(
     workspace_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Delete a workspace"""
-    
-    user = db.query(User).filter(User.email == current_user).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    workspace = db.query(Workspace).filter(
+    """
+    Delete a workspace with its papers; its conversations are kept.
+
+    Workspaces with more than WORKSPACE_DELETE_SYNC_PAPERS papers disappear
+    at once but are deleted in the background: 202 with a job id to poll at
+    ``GET /jobs/{job_id}``.
+    """
+    workspace = db.query(Workspace.id).filter(
         Workspace.id == workspace_id,
-        Workspace.owner_id == user.id
+        Workspace.owner_id == current_user.id,
+        ~Workspace.deleting
     ).first()
     
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
-    
-    db.delete(workspace)
-    db.commit()
+
+    papers = db.query(func.count(Paper.id)).filter(Paper.workspace_id == workspace_id).scalar()
+    if papers > WORKSPACE_DELETE_SYNC_PAPERS:
+        job = schedule_workspace_delete(db, workspace_id, current_user.id, papers)
+        response.status_code = 202
+        return {"message": "Workspace deletion started", "job_id": job.id, "status": job.status}
+
+    delete_workspace_cascade(db, workspace_id)
     
     return {"message": "Workspace deleted successfully"}
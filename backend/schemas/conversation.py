@@ -0,0 +1,24 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional
+
+
+class ConversationResponse(BaseModel):
+    id: int
+    user_id: int
+    workspace_id: Optional[int]
+    created_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class MessageResponse(BaseModel):
+    id: int
+    conversation_id: int
+    role: str
+    content: str
+    created_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,21 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Any, Optional
+
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    progress: int
+    total: Optional[int]
+    result: Optional[Any]
+    error: Optional[str]
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+
+class JobAccepted(BaseModel):
+    job_id: int
+    status: str
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 
 class PaperImport(BaseModel):
@@ -12,6 +12,35 @@ class PaperImport(BaseModel):
     workspace_id: int
 
 
+class PaperBulkItem(BaseModel):
+    title: str
+    abstract: Optional[str] = None
+    authors: Optional[str] = None
+    year: Optional[int] = None
+    citations: Optional[int] = None
+    url: Optional[str] = None
+
+
+class PaperBulkImport(BaseModel):
+    workspace_id: int
+    papers: List[PaperBulkItem]
+
+
+class BulkImportItemStatus(BaseModel):
+    index: int
+    status: str  # 'imported', 'duplicate' or 'invalid'
+    id: Optional[int] = None
+    title: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class BulkImportResult(BaseModel):
+    imported: int
+    duplicates: int
+    invalid: int
+    items: List[BulkImportItemStatus]
+
+
 class PaperResponse(BaseModel):
     id: int
     title: str
@@ -21,6 +50,17 @@ class PaperResponse(BaseModel):
     citations: Optional[int]
     url: Optional[str]
     workspace_id: int
+    fulltext_status: Optional[str] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class PaperSearchResult(PaperResponse):
+    score: float
+    semantic_rank: Optional[int] = None
+    lexical_rank: Optional[int] = None
+
+
+class RelatedPaper(PaperResponse):
+    score: float  # cosine similarity to the paper asked about
@@ -0,0 +1,112 @@
+"""
+Test settings: a throwaway SQLite database and local stand-ins for external
+services (benchmarks.stub_servers). Settings are read at import time, so the
+environment is set here before any app module is imported.
+
+Run from the backend directory:
+    python -m pytest
+"""
+import os
+import socket
+import tempfile
+
+import pytest
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+TMP = tempfile.mkdtemp(prefix="researchpilot_tests_")
+LLM_PORT = free_port()
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(TMP, 'test.db')}",
+    DATA_DIR=TMP,
+    ANN_INDEX_DIR=os.path.join(TMP, "indexes"),
+    SECRET_KEY="test-secret-key-test-secret-key!",
+    GROQ_API_KEY="test",
+    GROQ_BASE_URL=f"http://127.0.0.1:{LLM_PORT}",
+    EMBEDDING_PRELOAD="lazy",
+    EMBEDDING_CACHE_PATH="",
+    EMBEDDING_SERVER="",
+    JOB_WORKERS="0",
+    FULLTEXT_INGEST="false",
+    RESPONSE_CACHE="false",
+)
+
+import httpx  # noqa: E402
+
+from benchmarks.stub_servers import install_fake_embedder, llm_app, serve_in_thread  # noqa: E402
+
+LLM_ANSWER = " ".join(f"word{i}" for i in range(40))
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def serve():
+    """Start FastAPI apps on free local ports; returns their base URL, stops them afterwards"""
+    servers = []
+
+    def start(app, port: int = 0) -> str:
+        port = port or free_port()
+        servers.append(serve_in_thread(app, port))
+        return f"http://127.0.0.1:{port}"
+
+    yield start
+    for server in servers:
+        server.should_exit = True
+
+
+@pytest.fixture(scope="session")
+def llm():
+    """Fake LLM at GROQ_BASE_URL streaming LLM_ANSWER, one token every 20ms"""
+    app = llm_app(first_token_ms=10, token_ms=20, answer=LLM_ANSWER)
+    server = serve_in_thread(app, LLM_PORT)
+    yield app
+    server.should_exit = True
+
+
+@pytest.fixture
+def llm_answer():
+    return LLM_ANSWER
+
+
+@pytest.fixture(autouse=True)
+def reset_llm(request):
+    yield
+    if "llm" in request.fixturenames:
+        request.getfixturevalue("llm").state.fail_after = None
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Tables created and migrated (importing main does both)"""
+    import main  # noqa: F401
+
+
+@pytest.fixture(scope="session")
+def api_url(llm):
+    """The whole API (main.app, lifespan included) on a local port, with the fake embedder"""
+    import main
+    from utils.embeddings import embedding_provider
+
+    install_fake_embedder(embedding_provider)
+    port = free_port()
+    server = serve_in_thread(main.app, port)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+
+
+@pytest.fixture
+def auth_headers(api_url, request):
+    """A freshly registered user's Authorization header"""
+    email = f"{request.node.name[:40]}-{free_port()}@example.org"
+    httpx.post(f"{api_url}/register", json={"email": email, "password": "pw"}).raise_for_status()
+    token = httpx.post(f"{api_url}/login", data={"username": email, "password": "pw"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
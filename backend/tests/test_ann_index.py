@@ -0,0 +1,164 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import utils.ann_index as ann_index
+from utils.ann_index import IVFIndex
+
+DIM = 32
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    return str(tmp_path / "workspace_1")
+
+
+def clustered(rng, n: int, centers: np.ndarray) -> np.ndarray:
+    labels = rng.integers(0, len(centers), size=n)
+    return (centers[labels] + 0.3 * rng.standard_normal((n, DIM))).astype(np.float32)
+
+
+def ids_of(hits) -> list:
+    return [paper_id for paper_id, _ in hits]
+
+
+def test_add_replace_and_remove(index_dir):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((10, DIM)).astype(np.float32)
+    index = IVFIndex(index_dir)
+    assert not index.exists and index.search(vectors[0]) == []
+
+    index.add(list(range(1, 11)), vectors)
+    assert len(index) == 10
+    assert ids_of(index.search(vectors[3], top_k=1)) == [4]
+
+    # Re-adding an id replaces its vector
+    index.add([4], vectors[7])
+    assert len(index) == 10
+    assert ids_of(index.search(vectors[7], top_k=2)) in ([4, 8], [8, 4])
+
+    assert index.remove([4, 5, 99]) == 2
+    assert len(index) == 8
+    assert index.meta["size"] == 11  # tombstones stay until compaction
+    found = ids_of(index.search_exact(vectors[4], top_k=10))
+    assert 4 not in found and 5 not in found and len(found) == 8
+
+
+def test_compaction_and_reopen_from_disk(index_dir):
+    rng = np.random.default_rng(1)
+    n = 3000
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    index = IVFIndex(index_dir)
+    index.add(list(range(1, n + 1)), vectors)
+
+    removed = list(range(1, n + 1, 2))
+    index.remove(removed)
+    assert index.meta["size"] == n - len(removed)  # compacted: more than a quarter were dead
+    assert len(index) == n - len(removed)
+
+    reopened = IVFIndex(index_dir)
+    assert len(reopened) == len(index)
+    for i in (1, 3, 999, n - 1):  # even ids are the live ones
+        assert reopened.search(vectors[i], top_k=1)[0][0] == i + 1
+    np.testing.assert_allclose(reopened.centroid(), index.centroid(), atol=1e-5)
+
+    # A second handle (another worker) sees later writes
+    index.add([n + 1], vectors[0])
+    assert reopened.search(vectors[0], top_k=1)[0][0] == n + 1
+    assert len(reopened) == len(index)
+
+
+def test_trained_index_recall(index_dir, monkeypatch):
+    monkeypatch.setattr(ann_index, "ANN_TRAIN_THRESHOLD", 1000)
+    rng = np.random.default_rng(2)
+    centers = rng.standard_normal((40, DIM)).astype(np.float32) * 2
+    vectors = clustered(rng, 5000, centers)
+    index = IVFIndex(index_dir)
+    index.add(list(range(1, 5001)), vectors)
+    index.remove(list(range(1, 5001, 3)))
+    assert index.trained
+
+    queries = clustered(rng, 50, centers)
+    recalls = []
+    for query in queries:
+        exact = set(ids_of(index.search_exact(query, top_k=10)))
+        approx = set(ids_of(index.search(query, top_k=10)))
+        recalls.append(len(exact & approx) / len(exact))
+        assert not approx & set(range(1, 5001, 3))  # no removed ids come back
+    assert np.mean(recalls) >= 0.9
+
+    reopened = IVFIndex(index_dir)
+    assert reopened.trained
+    assert ids_of(reopened.search(queries[0], top_k=10)) == ids_of(index.search(queries[0], top_k=10))
+
+
+def test_bootstrap_keeps_rows_written_meanwhile(index_dir):
+    """Another worker adds a paper while this one reads the rows for a bootstrap"""
+    rng = np.random.default_rng(3)
+    vectors = rng.standard_normal((3, DIM)).astype(np.float32)
+    database = {1: vectors[0], 2: vectors[1]}
+    ours, theirs = IVFIndex(index_dir), IVFIndex(index_dir)  # separate handles, like two workers
+
+    def rows():
+        ids = sorted(database)
+        return ids, np.vstack([database[i] for i in ids])
+
+    def other_worker():
+        database[3] = vectors[2]  # committed ...
+        theirs.bootstrap(rows)    # ... then indexed the way get_paper_index does it
+        theirs.add([3], vectors[2])
+
+    def slow_read():
+        snapshot = rows()
+        worker = threading.Thread(target=other_worker)
+        worker.start()
+        time.sleep(0.2)  # the other worker waits for our bootstrap to finish
+        slow_read.worker = worker
+        return snapshot
+
+    ours.bootstrap(slow_read)
+    slow_read.worker.join(5)
+    assert sorted(ids_of(ours.search_exact(vectors[0], top_k=5))) == [1, 2, 3]
+
+    # A removal racing a bootstrap waits for it, then removes the stale row
+    ours.drop()
+    done = []
+    remover = threading.Thread(target=lambda: done.append(theirs.remove([2])))
+
+    def read_then_delete():
+        snapshot = rows()
+        del database[2]
+        remover.start()
+        time.sleep(0.2)
+        return snapshot
+
+    ours.bootstrap(read_then_delete)
+    remover.join(5)
+    assert done == [1]
+    assert sorted(ids_of(ours.search_exact(vectors[0], top_k=5))) == [1, 3]
+
+
+def test_readers_wait_for_a_writer_in_another_worker(index_dir):
+    rng = np.random.default_rng(4)
+    vectors = rng.standard_normal((5, DIM)).astype(np.float32)
+    writer, reader = IVFIndex(index_dir), IVFIndex(index_dir)
+    writer.add([1, 2, 3, 4, 5], vectors)
+    reader.search(vectors[0])
+    entered = threading.Event()
+
+    def slow_write():
+        with writer._writing():  # e.g. a compaction moving rows around
+            entered.set()
+            time.sleep(0.3)
+            writer._tombstone([1])
+
+    thread = threading.Thread(target=slow_write)
+    thread.start()
+    entered.wait(5)
+    start = time.perf_counter()
+    hits = reader.search(vectors[0], top_k=5)
+    assert time.perf_counter() - start >= 0.25
+    assert 1 not in ids_of(hits)  # the finished write, never a half-done one
+    thread.join(5)
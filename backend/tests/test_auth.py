@@ -0,0 +1,90 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+import routers.auth as auth
+from core.database import SessionLocal
+from core.security import ALGORITHM, SECRET_KEY, Principal, TokenCache, create_access_token, token_cache
+from models.user import User
+from routers.auth import get_current_user
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def user(database, request):
+    with SessionLocal() as db:
+        user = User(email=f"{request.node.name[:40]}@example.org", password="x")
+        db.add(user)
+        db.commit()
+        return Principal(id=user.id, email=user.email)
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Threads that looked a user up by email (legacy tokens)"""
+    threads = []
+
+    def user_id(db, email):
+        threads.append(threading.get_ident())
+        return original(db, email)
+
+    original = auth._user_id
+    monkeypatch.setattr(auth, "_user_id", user_id)
+    return threads
+
+
+def test_token_cache_hits_misses_and_expiry(monkeypatch):
+    cache = TokenCache(ttl=60, max_entries=2)
+    alice, bob, carol = Principal(1, "a@x"), Principal(2, "b@x"), Principal(3, "c@x")
+    assert cache.get("a") is None
+    cache.put("a", alice)
+    cache.put("b", bob, token_expires=time.time() - 1)  # the token itself has expired
+    assert cache.get("a") == alice
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+    cache.put("b", bob)
+    cache.get("a")
+    cache.put("c", carol)  # evicts the least recently used entry, b
+    assert cache.get("b") is None and cache.get("a") == alice and cache.get("c") == carol
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)  # past the cache TTL
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 1
+
+
+async def test_verified_token_is_cached(user, lookups):
+    token = create_access_token({"sub": user.email, "uid": user.id})
+    before = token_cache.stats()
+    assert await get_current_user(token) == user
+    assert await get_current_user(token) == user
+    after = token_cache.stats()
+    assert (after["misses"] - before["misses"], after["hits"] - before["hits"]) == (1, 1)
+    assert lookups == []  # the id comes from the token
+
+
+async def test_legacy_token_is_resolved_off_the_loop_once(user, lookups):
+    token = create_access_token({"sub": user.email})
+    assert await get_current_user(token) == user
+    assert await get_current_user(token) == user
+    assert len(lookups) == 1
+    assert threading.get_ident() not in lookups
+
+
+async def test_invalid_tokens_are_rejected(user, lookups):
+    expired = jwt.encode(
+        {"sub": user.email, "uid": user.id, "exp": datetime.utcnow() - timedelta(minutes=1)},
+        SECRET_KEY, algorithm=ALGORITHM
+    )
+    unknown = create_access_token({"sub": "nobody@example.org"})
+    for token in (expired, unknown, "not-a-jwt", jwt.encode({"sub": user.email}, "other-secret", algorithm=ALGORITHM)):
+        with pytest.raises(HTTPException) as error:
+            await get_current_user(token)
+        assert error.value.status_code == 401
+    assert len(lookups) == 1  # only the well-signed legacy token for an unknown user
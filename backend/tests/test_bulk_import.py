@@ -0,0 +1,107 @@
+import json
+
+import anyio
+import httpx
+import pytest
+
+import routers.papers
+from utils.ann_index import get_workspace_index
+
+
+def create_workspace(api_url, headers, name: str) -> int:
+    response = httpx.post(f"{api_url}/workspace/create", json={"name": name}, headers=headers)
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+def workspace_titles(api_url, headers, workspace_id: int) -> list:
+    response = httpx.get(f"{api_url}/papers/workspace/{workspace_id}", headers=headers)
+    response.raise_for_status()
+    return [paper["title"] for paper in response.json()]
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(routers.papers, "BULK_IMPORT_CHUNK_SIZE", 2)
+
+
+def test_duplicates_within_the_batch_and_against_existing_papers(api_url, auth_headers, small_chunks):
+    workspace_id = create_workspace(api_url, auth_headers, "bulk")
+    httpx.post(f"{api_url}/papers/import", headers=auth_headers, json={
+        "title": "Existing Paper", "abstract": None, "authors": None, "year": None,
+        "citations": None, "url": "https://example.org/existing.pdf", "workspace_id": workspace_id,
+    }).raise_for_status()
+
+    papers = [
+        {"title": "existing   paper"},                                # title already in the workspace
+        {"title": "Alpha", "url": "https://EXAMPLE.org/existing.pdf"},  # URL already in the workspace
+        {"title": "Beta"},
+        {"title": "  beta "},                                         # earlier in this request
+        {"title": "Gamma", "url": "https://example.org/gamma.pdf"},
+        {"title": "Delta", "url": "https://example.org/GAMMA.pdf"},   # URL earlier in this request
+        {"title": "Epsilon"},
+    ]
+    response = httpx.post(f"{api_url}/papers/import/bulk", headers=auth_headers,
+                          json={"workspace_id": workspace_id, "papers": papers})
+    response.raise_for_status()
+    result = response.json()
+
+    assert [item["index"] for item in result["items"]] == list(range(len(papers)))
+    assert [item["status"] for item in result["items"]] == [
+        "duplicate", "duplicate", "imported", "duplicate", "imported", "duplicate", "imported",
+    ]
+    assert (result["imported"], result["duplicates"], result["invalid"]) == (3, 4, 0)
+    imported = [item for item in result["items"] if item["status"] == "imported"]
+    assert [item["title"] for item in imported] == ["Beta", "Gamma", "Epsilon"]
+    assert sorted(workspace_titles(api_url, auth_headers, workspace_id)) == ["Beta", "Epsilon", "Existing Paper", "Gamma"]
+
+    index = get_workspace_index(workspace_id)
+    assert len(index) == 4
+    assert {paper_id for paper_id, _ in index.search_exact(index.centroid(), top_k=10)} >= {item["id"] for item in imported}
+
+
+def test_ndjson_reports_invalid_lines(api_url, auth_headers, small_chunks):
+    workspace_id = create_workspace(api_url, auth_headers, "ndjson")
+    lines = [json.dumps({"title": "One"}), "{not json", json.dumps({"abstract": "no title"}), "", json.dumps({"title": "Two"})]
+    response = httpx.post(
+        f"{api_url}/papers/import/bulk", params={"workspace_id": workspace_id},
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"}, content="\n".join(lines)
+    )
+    response.raise_for_status()
+    result = response.json()
+    assert [(item["index"], item["status"]) for item in result["items"]] == [
+        (0, "imported"), (1, "invalid"), (2, "invalid"), (3, "imported"),
+    ]
+    assert all(item["detail"] for item in result["items"] if item["status"] == "invalid")
+
+
+@pytest.mark.anyio
+async def test_slow_upload_does_not_hold_the_write_lock(api_url, auth_headers, small_chunks):
+    workspace_id = create_workspace(api_url, auth_headers, "slow upload")
+    other_id = create_workspace(api_url, auth_headers, "other")
+    seen = {}
+
+    async def body():
+        for i in range(2):
+            yield (json.dumps({"title": f"Early {i}"}) + "\n").encode()
+        # The first chunk is committed while the rest of the body is still on its way ...
+        with anyio.fail_after(5):
+            while len(await anyio.to_thread.run_sync(workspace_titles, api_url, auth_headers, workspace_id)) < 2:
+                await anyio.sleep(0.05)
+        # ... so other writers are not locked out meanwhile
+        async with httpx.AsyncClient(timeout=5) as client:
+            response = await client.post(f"{api_url}/papers/import", headers=auth_headers, json={
+                "title": "Meanwhile", "abstract": None, "authors": None, "year": None,
+                "citations": None, "url": None, "workspace_id": other_id,
+            })
+        seen["other import"] = response.status_code
+        yield (json.dumps({"title": "Late"}) + "\n").encode()
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        response = await client.post(
+            f"{api_url}/papers/import/bulk", params={"workspace_id": workspace_id},
+            headers={**auth_headers, "Content-Type": "application/x-ndjson"}, content=body()
+        )
+    response.raise_for_status()
+    assert response.json()["imported"] == 3
+    assert seen["other import"] == 200
@@ -0,0 +1,78 @@
+import json
+import time
+
+import httpx
+
+
+def read_events(response: httpx.Response, stop_after_tokens: int = None):
+    """(event, data) pairs of an SSE response; stops reading after that many tokens"""
+    events, tokens = [], 0
+    for block in response.iter_text():
+        for message in filter(None, block.split("\n\n")):
+            fields = dict(line.split(": ", 1) for line in message.splitlines())
+            events.append((fields["event"], json.loads(fields["data"])))
+            tokens += fields["event"] == "token"
+            if stop_after_tokens is not None and tokens >= stop_after_tokens:
+                return events
+    return events
+
+
+def messages(api_url, headers, conversation_id):
+    response = httpx.get(f"{api_url}/conversation/{conversation_id}/messages", headers=headers)
+    response.raise_for_status()
+    return [(m["role"], m["content"]) for m in response.json()]
+
+
+def test_stream_sends_start_tokens_done_and_saves_answer(api_url, auth_headers, llm_answer):
+    with httpx.stream("POST", f"{api_url}/chat/stream", json={"content": "What is new?"},
+                      headers=auth_headers, timeout=30) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = read_events(response)
+
+    names = [name for name, _ in events]
+    assert names[0] == "start" and names[-1] == "done"
+    assert set(names[1:-1]) == {"token"}
+    conversation_id = events[0][1]["conversation_id"]
+    done = events[-1][1]
+    assert done["conversation_id"] == conversation_id
+    assert done["cached"] is False and done["time_to_first_token_ms"] > 0
+
+    answer = "".join(data["content"] for name, data in events if name == "token")
+    assert answer.split() == llm_answer.split()
+    assert messages(api_url, auth_headers, conversation_id) == [("user", "What is new?"), ("assistant", answer)]
+
+
+def test_upstream_failure_sends_error_event_and_keeps_partial_answer(api_url, auth_headers, llm):
+    llm.state.fail_after = 5
+    with httpx.stream("POST", f"{api_url}/chat/stream", json={"content": "Break please"},
+                      headers=auth_headers, timeout=30) as response:
+        events = read_events(response)
+
+    names = [name for name, _ in events]
+    assert names == ["start"] + ["token"] * 5 + ["error"]
+    assert events[-1][1]["detail"]
+    partial = "".join(data["content"] for name, data in events if name == "token")
+    conversation_id = events[0][1]["conversation_id"]
+    assert messages(api_url, auth_headers, conversation_id) == [("user", "Break please"), ("assistant", partial)]
+
+
+def test_client_disconnect_saves_partial_answer(api_url, auth_headers, llm_answer):
+    with httpx.stream("POST", f"{api_url}/chat/stream", json={"content": "Leaving early"},
+                      headers=auth_headers, timeout=30) as response:
+        events = read_events(response, stop_after_tokens=3)
+    # Leaving the block closes the connection mid-answer
+    conversation_id = events[0][1]["conversation_id"]
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        saved = messages(api_url, auth_headers, conversation_id)
+        if len(saved) == 2:
+            break
+        time.sleep(0.05)
+    assert saved[0] == ("user", "Leaving early")
+    role, partial = saved[1]
+    assert role == "assistant"
+    words = partial.split()
+    assert 3 <= len(words) < len(llm_answer.split())
+    assert words == llm_answer.split()[:len(words)]
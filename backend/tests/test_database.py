@@ -0,0 +1,37 @@
+import threading
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import core.database
+from core.database import run_db
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def async_sessions(tmp_path, monkeypatch):
+    """run_db as with DB_ASYNC=true, on aiosqlite"""
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+    monkeypatch.setattr(core.database, "AsyncSessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+    yield
+    await engine.dispose()
+
+
+def where_am_i(db):
+    db.execute(text("SELECT 1"))
+    return threading.get_ident()
+
+
+async def test_async_path_runs_on_the_event_loop_thread(async_sessions):
+    assert await run_db(where_am_i) == threading.get_ident()
+
+
+async def test_in_thread_never_runs_on_the_event_loop(async_sessions):
+    assert await run_db(where_am_i, in_thread=True) != threading.get_ident()
+
+
+async def test_default_path_runs_in_the_threadpool():
+    assert await run_db(where_am_i) != threading.get_ident()
@@ -0,0 +1,90 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import RedirectResponse
+
+import utils.fulltext as fulltext
+from benchmarks.stub_servers import pdf_app
+from utils.fulltext import BlockedHost, FulltextIngestor, is_public_address
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def ingestor():
+    ingestor = FulltextIngestor(workers=1)
+    ingestor._bind()
+    yield ingestor
+    await ingestor.aclose()
+
+
+def redirect_app(target: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/paper.pdf")
+    async def paper():
+        return RedirectResponse(target, status_code=302)
+
+    return app
+
+
+async def fetch(ingestor: FulltextIngestor, url: str) -> bytes:
+    async with ingestor._pdf_file(url) as path:
+        with open(path, "rb") as f:
+            return f.read()
+
+
+@pytest.mark.parametrize("address", [
+    "127.0.0.1", "10.1.2.3", "172.16.0.1", "192.168.1.1", "169.254.169.254", "0.0.0.0",
+    "::1", "fe80::1", "fc00::1", "::ffff:127.0.0.1", "224.0.0.1",
+])
+def test_non_public_addresses(address):
+    assert not is_public_address(address)
+
+
+@pytest.mark.parametrize("address", ["8.8.8.8", "140.82.112.3", "2606:4700::1111"])
+def test_public_addresses(address):
+    assert is_public_address(address)
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/paper.pdf",
+    "http://localhost/paper.pdf",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]/paper.pdf",
+])
+async def test_private_hosts_are_blocked(ingestor, url):
+    with pytest.raises(BlockedHost):
+        await fetch(ingestor, url)
+
+
+async def test_redirect_to_private_host_is_blocked(ingestor, serve, monkeypatch):
+    pdfs = pdf_app(pages=1, latency_ms=0)
+    # The PDF server listens on 127.0.0.2, which stays blocked
+    monkeypatch.setattr(fulltext, "is_public_address", lambda address: address == "127.0.0.1")
+    url = serve(redirect_app("http://127.0.0.2/pdf/1.pdf"))
+    with pytest.raises(BlockedHost):
+        await fetch(ingestor, f"{url}/paper.pdf")
+    assert pdfs.state.requests == 0
+
+
+async def test_redirects_are_followed_for_allowed_hosts(ingestor, serve, monkeypatch):
+    monkeypatch.setattr(fulltext, "FULLTEXT_ALLOW_PRIVATE_HOSTS", True)
+    pdfs = pdf_app(pages=2, latency_ms=0)
+    pdf_url = serve(pdfs)
+    url = serve(redirect_app(f"{pdf_url}/pdf/7.pdf"))
+    data = await fetch(ingestor, f"{url}/paper.pdf")
+    assert data.startswith(b"%PDF")
+    assert pdfs.state.requests == 1
+
+
+async def test_redirect_loop_is_cut_off(ingestor, serve, monkeypatch):
+    monkeypatch.setattr(fulltext, "FULLTEXT_ALLOW_PRIVATE_HOSTS", True)
+    app = FastAPI()
+
+    @app.get("/loop")
+    async def loop():
+        return RedirectResponse("/loop", status_code=302)
+
+    url = serve(app)
+    with pytest.raises(fulltext.NotAPdf, match="redirects"):
+        await fetch(ingestor, f"{url}/loop")
@@ -0,0 +1,106 @@
+import threading
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import utils.history as history
+from core.database import SessionLocal
+from models.conversation import Conversation, Message
+from utils.history import estimate_tokens, load_history, message_tokens, refresh_summary
+
+pytestmark = pytest.mark.anyio
+
+
+def create_conversation(contents: list) -> tuple:
+    """A conversation with alternating user/assistant messages; returns (id, message ids)"""
+    start = datetime.utcnow() - timedelta(hours=1)
+    with SessionLocal() as db:
+        conversation = Conversation()
+        db.add(conversation)
+        db.flush()
+        messages = [
+            Message(conversation_id=conversation.id, role="user" if i % 2 == 0 else "assistant",
+                    content=content, created_at=start + timedelta(seconds=i))
+            for i, content in enumerate(contents)
+        ]
+        db.add_all(messages)
+        db.commit()
+        return conversation.id, [m.id for m in messages]
+
+
+def test_token_budget_keeps_the_newest_turns(database):
+    contents = [f"message {i} " + "word " * 40 for i in range(6)]
+    conversation_id, ids = create_conversation(contents)
+    cost = message_tokens({"content": contents[0]})
+    assert cost == estimate_tokens(contents[0]) + 4
+
+    with SessionLocal() as db:
+        window = load_history(db, conversation_id, budget=3 * cost + cost // 2)
+    assert [m["content"] for m in window.messages] == contents[3:]
+    assert [m["role"] for m in window.messages] == ["assistant", "user", "assistant"]
+    assert window.truncated and window.oldest_id == ids[3]
+    assert window.tokens == 3 * cost
+
+    with SessionLocal() as db:
+        everything = load_history(db, conversation_id, budget=100 * cost)
+        without_last = load_history(db, conversation_id, budget=100 * cost, exclude_id=ids[-1])
+    assert not everything.truncated and len(everything.messages) == 6
+    assert [m["content"] for m in without_last.messages] == contents[:5]
+
+
+def test_turn_limit_applies_below_the_budget(database, monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_MAX_TURNS", 4)
+    conversation_id, ids = create_conversation([f"short {i}" for i in range(6)])
+    with SessionLocal() as db:
+        window = load_history(db, conversation_id, budget=10_000)
+    assert [m["content"] for m in window.messages] == [f"short {i}" for i in range(2, 6)]
+    assert window.truncated and window.oldest_id == ids[2]
+
+
+async def test_rolling_summary_folds_in_dropped_turns(database, monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_SUMMARY", True)
+    monkeypatch.setattr(history, "HISTORY_SUMMARY_MIN_TURNS", 2)
+    monkeypatch.setattr(history, "HISTORY_MAX_TURNS", 2)
+    prompts, db_threads = [], []
+
+    async def complete(user_key, messages, **options):
+        prompts.append(messages[1]["content"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f" summary {len(prompts)} "))])
+
+    for name in ("_summary_input", "_save_summary"):
+        def recorded(*args, _fn=getattr(history, name)):
+            db_threads.append(threading.get_ident())
+            return _fn(*args)
+        monkeypatch.setattr(history, name, recorded)
+    monkeypatch.setattr(history.llm_limiter, "complete", complete)
+
+    conversation_id, ids = create_conversation([f"turn {i}" for i in range(6)])
+    with SessionLocal() as db:
+        window = load_history(db, conversation_id, budget=10_000)
+    assert window.needs_summary  # turns 0-3 fell out of the window
+
+    await refresh_summary(conversation_id, "someone")
+    assert "Current summary:\n(none)" in prompts[0]
+    assert all(f"turn {i}" in prompts[0] for i in range(4)) and "turn 4" not in prompts[0]
+    assert db_threads and threading.get_ident() not in db_threads
+    with SessionLocal() as db:
+        conversation = db.get(Conversation, conversation_id)
+        assert (conversation.summary, conversation.summary_through_id) == ("summary 1", ids[3])
+        window = load_history(db, conversation_id, budget=10_000)
+    assert window.messages[0] == {"role": "system", "content": "Summary of the earlier conversation:\nsummary 1"}
+    assert [m["content"] for m in window.messages[1:]] == ["turn 4", "turn 5"]
+    assert not window.needs_summary
+
+    # Two more turns push turns 4 and 5 out: only those are folded into the existing summary
+    with SessionLocal() as db:
+        later = datetime.utcnow()
+        db.add_all([Message(conversation_id=conversation_id, role=role, content=f"turn {i}", created_at=later + timedelta(seconds=i))
+                    for i, role in ((6, "user"), (7, "assistant"))])
+        db.commit()
+    await refresh_summary(conversation_id, "someone")
+    assert prompts[1].startswith("Current summary:\nsummary 1")
+    assert "turn 4" in prompts[1] and "turn 5" in prompts[1] and "turn 3" not in prompts[1]
+    with SessionLocal() as db:
+        conversation = db.get(Conversation, conversation_id)
+        assert (conversation.summary, conversation.summary_through_id) == ("summary 2", ids[5])
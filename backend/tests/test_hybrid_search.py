@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from core.database import SessionLocal
+from models.paper import Paper
+from models.workspace import Workspace
+from utils.hybrid_search import _has_fts, hybrid_search, lexical_search, rrf_fuse
+
+
+@pytest.fixture
+def db(database):
+    with SessionLocal() as db:
+        if db.bind.dialect.name != "sqlite" or not _has_fts(db):
+            pytest.skip("needs SQLite with FTS5")
+        yield db
+
+
+def create_workspace(db, papers: list) -> tuple:
+    """A workspace holding the given papers (dicts of Paper columns); returns (id, paper ids)"""
+    workspace = Workspace(name="hybrid")
+    db.add(workspace)
+    db.flush()
+    rows = [Paper(workspace_id=workspace.id, **paper) for paper in papers]
+    db.add_all(rows)
+    db.commit()
+    return workspace.id, [row.id for row in rows]
+
+
+def lexical_ids(db, workspace_id: int, query: str) -> list:
+    return [paper_id for paper_id, _ in lexical_search(db, workspace_id, query)]
+
+
+class FakeIndex:
+    """Stands in for the workspace IVF index with a fixed semantic ranking"""
+
+    def __init__(self, ranking):
+        self.ranking = ranking
+
+    def __len__(self):
+        return len(self.ranking)
+
+    def search(self, query, top_k=5):
+        return [(paper_id, 1.0 / rank) for rank, paper_id in enumerate(self.ranking[:top_k], 1)]
+
+
+def test_bm25_ranks_title_matches_and_stays_in_the_workspace(db):
+    workspace_id, (in_title, in_abstract, twice, unrelated, by_author) = create_workspace(db, [
+        {"title": "Sparse tomography", "abstract": "A study of imaging."},
+        {"title": "Imaging study", "abstract": "We apply tomography to fossils."},
+        {"title": "Tomography of tomography", "abstract": "Tomography, again."},
+        {"title": "Protein folding", "abstract": "Nothing about scans."},
+        {"title": "Fossils", "abstract": "Field notes.", "authors": "Ada Tomography"},
+    ])
+    other_id, (elsewhere,) = create_workspace(db, [{"title": "Tomography elsewhere"}])
+
+    ranked = lexical_ids(db, workspace_id, "tomography")
+    assert ranked[0] == twice
+    assert ranked.index(in_title) < ranked.index(in_abstract)
+    assert ranked.index(by_author) < ranked.index(in_abstract)  # authors weigh more than the abstract
+    assert unrelated not in ranked and elsewhere not in ranked
+    assert lexical_ids(db, other_id, "tomography") == [elsewhere]
+
+    scores = [score for _, score in lexical_search(db, workspace_id, "tomography")]
+    assert scores == sorted(scores, reverse=True) and all(score > 0 for score in scores)
+
+    # Any term matches; FTS5 syntax in the query is taken literally
+    assert set(lexical_ids(db, workspace_id, "protein OR scans")) == {unrelated}
+    assert lexical_ids(db, workspace_id, 'fossils" NOT "imaging*') != []
+    assert lexical_ids(db, workspace_id, "  ***  ") == []
+
+
+def test_rrf_fusion_order():
+    # 3: 1/61 + 1/63 beats 2: 2/62, then the single-list items by rank
+    assert [item for item, _ in rrf_fuse([[1, 2, 3], [3, 2, 4]], k=60)] == [3, 2, 1, 4]
+    fused = dict(rrf_fuse([[1, 2], [2]], k=60))
+    assert fused[2] == pytest.approx(1 / 62 + 1 / 61) and fused[1] == pytest.approx(1 / 61)
+    assert rrf_fuse([[], []]) == []
+
+
+def test_hybrid_search_fuses_both_rankers(db):
+    workspace_id, (a, b, c) = create_workspace(db, [
+        {"title": "Graph neural networks"},
+        {"title": "Attention is all you need"},
+        {"title": "Message passing on graphs", "abstract": "Graph learning."},
+    ])
+    index = FakeIndex([b, c, a])
+    query_vector = np.ones(4, dtype=np.float32)
+
+    hits = hybrid_search(db, workspace_id, "graph", query_vector, index, top_k=3)
+    assert [hit.paper_id for hit in hits][0] in (a, c)  # in both rankings
+    assert {hit.paper_id for hit in hits} == {a, b, c}
+    hit_c = next(hit for hit in hits if hit.paper_id == c)
+    assert hit_c.semantic_rank == 2 and hit_c.lexical_rank is not None
+    assert next(hit for hit in hits if hit.paper_id == b).lexical_rank is None
+
+    assert [hit.paper_id for hit in hybrid_search(db, workspace_id, "graph", query_vector, index, mode="semantic")] == [b, c, a]
+    lexical = hybrid_search(db, workspace_id, "graph", query_vector, index, mode="lexical")
+    assert {hit.paper_id for hit in lexical} == {a, c} and all(hit.semantic_rank is None for hit in lexical)
+
+
+def test_fts_triggers_follow_inserts_updates_and_deletes(db):
+    workspace_id, (paper_id,) = create_workspace(db, [{"title": "Quasicrystal growth"}])
+    assert lexical_ids(db, workspace_id, "quasicrystal") == [paper_id]
+
+    paper = db.get(Paper, paper_id)
+    paper.title = "Perovskite growth"
+    paper.authors = "Grace Quasicrystal"
+    db.commit()
+    assert lexical_ids(db, workspace_id, "perovskite") == [paper_id]
+    assert lexical_ids(db, workspace_id, "quasicrystal") == [paper_id]  # now through the authors
+
+    paper.authors = None
+    db.commit()
+    assert lexical_ids(db, workspace_id, "quasicrystal") == []
+
+    db.add(Paper(workspace_id=workspace_id, title="Perovskite solar cells"))
+    db.commit()
+    assert len(lexical_ids(db, workspace_id, "perovskite")) == 2
+
+    db.delete(paper)
+    db.commit()
+    assert paper_id not in lexical_ids(db, workspace_id, "perovskite growth")
+    assert lexical_ids(db, workspace_id, "growth") == []
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import utils.fulltext as fulltext
+import utils.reembed as reembed
+from benchmarks.stub_servers import install_fake_embedder
+from core.database import SessionLocal
+from models.job import Job
+from models.paper import Paper
+from models.workspace import Workspace
+from utils.ann_index import IVFIndex, get_workspace_index
+from utils.embeddings import embedding_provider
+from utils.jobs import DONE, JobContext, JobWorkerPool, enqueue, job_handler
+
+pytestmark = pytest.mark.anyio
+
+BLOCK_SECONDS = 0.3
+threads = set()
+
+
+@job_handler("test_blocking")
+async def blocking_job(job: JobContext) -> dict:
+    def work():
+        threads.add(threading.get_ident())
+        time.sleep(BLOCK_SECONDS)  # e.g. a model call
+
+    await job.run_in_thread(work)
+    return {"ok": True}
+
+
+@pytest.fixture
+async def pool(database):
+    pools = []
+
+    async def start(workers: int, kinds):
+        pool = JobWorkerPool(workers=workers, poll_seconds=0.05)
+        await pool.start(kinds)
+        pools.append(pool)
+        return pool
+
+    yield start
+    for pool in pools:
+        await pool.stop()
+
+
+async def wait_done(job_ids, timeout: float = 5) -> list:
+    deadline = time.monotonic() + timeout
+    while True:
+        with SessionLocal() as db:
+            jobs = db.query(Job).filter(Job.id.in_(job_ids)).all()
+        if all(job.status == DONE for job in jobs) or time.monotonic() > deadline:
+            return jobs
+        await asyncio.sleep(0.05)
+
+
+async def test_workers_run_blocking_work_in_parallel(pool):
+    await pool(2, ["test_blocking"])
+    with SessionLocal() as db:
+        job_ids = [enqueue(db, "test_blocking", {}).id for _ in range(4)]
+    start = time.perf_counter()
+    jobs = await wait_done(job_ids)
+    elapsed = time.perf_counter() - start
+
+    assert [job.status for job in jobs] == [DONE] * 4
+    assert len(threads) == 2
+    # Two rounds of two parallel jobs, not four in a row
+    assert elapsed < 3.5 * BLOCK_SECONDS
+
+
+async def test_event_loop_stays_responsive_while_claiming(pool):
+    await pool(2, ["test_blocking"])
+    with SessionLocal() as db:
+        job_ids = [enqueue(db, "test_blocking", {}).id for _ in range(2)]
+    lags = []
+    while len(lags) < 20:
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+    await wait_done(job_ids)
+    assert max(lags) < BLOCK_SECONDS / 2
+
+
+async def test_fulltext_job_heartbeats_per_paper(pool, monkeypatch):
+    paper_ids = list(range(1, 6))
+    heartbeats = []
+
+    async def ingest_one(paper_id: int):
+        await asyncio.sleep(0.02)
+
+    def progress(self, done, total=None, **checkpoint):
+        heartbeats.append(done)
+        progress.original(self, done, total, **checkpoint)
+
+    progress.original = JobContext.progress
+    monkeypatch.setattr(fulltext, "_pending_papers", lambda ids: ids)
+    monkeypatch.setattr(fulltext.fulltext_ingestor, "_ingest_one", ingest_one)
+    monkeypatch.setattr(JobContext, "progress", progress)
+
+    await pool(1, ["fulltext"])
+    with SessionLocal() as db:
+        job_id = enqueue(db, "fulltext", {"paper_ids": paper_ids}).id
+    job, = await wait_done([job_id])
+
+    assert job.status == DONE, job.error
+    assert sorted(heartbeats) == [0, 1, 2, 3, 4, 5]
+    assert job.total == len(paper_ids)
+
+
+async def test_reembed_keeps_db_work_off_the_loop_and_fills_an_empty_index(pool, monkeypatch):
+    loop_thread = threading.get_ident()
+    sessions, progress_threads, rebuilds = [], [], []
+
+    def session_factory():
+        sessions.append(threading.get_ident())
+        return SessionLocal()
+
+    def progress(self, done, total=None, **checkpoint):
+        progress_threads.append(threading.get_ident())
+        progress.original(self, done, total, **checkpoint)
+
+    progress.original = JobContext.progress
+    monkeypatch.setattr(reembed, "SessionLocal", session_factory)
+    monkeypatch.setattr(JobContext, "progress", progress)
+    monkeypatch.setattr(IVFIndex, "rebuild", lambda self, ids, vectors: rebuilds.append(len(ids)))
+    install_fake_embedder(embedding_provider)
+
+    with SessionLocal() as db:
+        workspace = Workspace(name="reembed")
+        db.add(workspace)
+        db.flush()
+        db.add_all([Paper(title=f"Stale {i}", workspace_id=workspace.id, embedding_model="old-model") for i in range(3)])
+        db.commit()
+        workspace_id = workspace.id
+    index = get_workspace_index(workspace_id)
+    index.drop()
+    with index._writing():
+        pass  # an index that exists but holds nothing yet (dim unknown)
+    assert index.exists and index.meta["dim"] is None
+
+    await pool(1, ["reembed", "reembed_chunk"])
+    with SessionLocal() as db:
+        job_id = enqueue(db, "reembed", {}).id
+    job, = await wait_done([job_id], timeout=10)
+
+    assert job.status == DONE, job.error
+    assert sessions and loop_thread not in sessions
+    assert progress_threads and loop_thread not in progress_threads
+    assert rebuilds == []
+    assert len(index) == 3
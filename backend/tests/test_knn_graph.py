@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from benchmarks.bench_ann_recall import DIM, clustered_vectors
+from utils.ann_index import IVFIndex
+from utils.knn_graph import KNNGraph
+from utils.retrieval import normalize_rows
+
+PAPERS = 300
+OPS = 60
+
+
+def assert_matches_full_recompute(graph: KNNGraph, index: IVFIndex):
+    fresh = KNNGraph(graph.k)
+    fresh.sync(index)
+    expected, actual = fresh.snapshot(), graph.snapshot()
+    assert expected.keys() == actual.keys()
+    for paper_id in expected:
+        if expected[paper_id] != actual[paper_id]:
+            # Equal scores may legitimately come out in another order
+            assert [round(s, 5) for _, s in graph.neighbours(paper_id)] == \
+                [round(s, 5) for _, s in fresh.neighbours(paper_id)], paper_id
+
+    version, ids, slots = index.live_slots()
+    mean = normalize_rows(index.vectors_at(slots, version).astype(np.float64)).sum(axis=0)
+    np.testing.assert_allclose(index.centroid(), mean / np.linalg.norm(mean), atol=1e-5)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_incremental_updates_match_full_recompute(tmp_path, seed):
+    rng = np.random.default_rng(seed)
+    index = IVFIndex(str(tmp_path / "papers"))
+    index.add(list(range(PAPERS)), clustered_vectors(rng, PAPERS, DIM, clusters=20))
+    graph = KNNGraph()
+    graph.sync(index)
+    slots_used = PAPERS
+
+    next_id = PAPERS
+    for step in range(OPS):
+        live = np.array(sorted(graph.snapshot()))
+        op = ["import", "bulk import", "delete", "bulk delete", "re-embed"][rng.integers(0, 5)]
+        if op == "import":
+            index.add([next_id], clustered_vectors(rng, 1, DIM, clusters=20))
+            next_id, slots_used = next_id + 1, slots_used + 1
+        elif op == "bulk import":
+            index.add(list(range(next_id, next_id + 100)), clustered_vectors(rng, 100, DIM, clusters=20))
+            next_id, slots_used = next_id + 100, slots_used + 100
+        elif op == "delete":
+            index.remove([int(rng.choice(live))])
+        elif op == "bulk delete":
+            index.remove(rng.choice(live, size=min(100, len(live) - 10), replace=False).tolist())
+        else:
+            chosen = rng.choice(live, size=50, replace=False).tolist()
+            index.add(chosen, clustered_vectors(rng, 50, DIM, clusters=20))
+            slots_used += 50
+        graph.sync(index)
+        assert_matches_full_recompute(graph, index)
+
+    # Enough dead slots piled up for the index to compact (moving every vector) along the way
+    assert index.meta["size"] < slots_used
@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+
+import core.migrations as migrations
+from core.database import Base
+from core.migrations import run_migrations
+
+
+def sqlite_engine(tmp_path, name: str):
+    return create_engine(f"sqlite:///{os.path.join(tmp_path, name)}")
+
+
+def create_workspace(conn, name: str) -> int:
+    return conn.execute(text("INSERT INTO workspaces (name) VALUES (:n) RETURNING id"), {"n": name}).scalar()
+
+
+def test_new_database_never_reuses_workspace_ids(tmp_path, database):
+    engine = sqlite_engine(tmp_path, "new.db")
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        first, second = create_workspace(conn, "a"), create_workspace(conn, "b")
+        conn.execute(text("DELETE FROM workspaces WHERE id = :id"), {"id": second})
+        assert create_workspace(conn, "c") == second + 1
+    assert first == 1
+
+
+def test_existing_workspaces_table_is_rebuilt_with_autoincrement(tmp_path, database):
+    engine = sqlite_engine(tmp_path, "old.db")
+    Base.metadata.create_all(bind=engine, tables=[t for t in Base.metadata.sorted_tables if t.name != "workspaces"])
+    with engine.begin() as conn:
+        # The table as created before migration 9
+        conn.execute(text(
+            "CREATE TABLE workspaces (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL, "
+            "owner_id INTEGER REFERENCES users (id), content_version INTEGER DEFAULT '0' NOT NULL)"
+        ))
+        for name in ("a", "b", "c"):
+            create_workspace(conn, name)
+        conn.execute(text("UPDATE workspaces SET content_version = 7 WHERE id = 2"))
+        # Workspace 4 was deleted, but its papers are still there (an unfinished purge)
+        conn.execute(text("INSERT INTO papers (title, workspace_id) VALUES ('orphan', 4)"))
+        conn.execute(text("DELETE FROM workspaces WHERE id = 3"))
+
+    run_migrations(engine)
+    with engine.begin() as conn:
+        rows = conn.execute(text("SELECT id, name, content_version FROM workspaces ORDER BY id")).fetchall()
+        assert [tuple(row) for row in rows] == [(1, "a", 0), (2, "b", 7)]
+        assert create_workspace(conn, "d") == 5
+        indexes = {row[1] for row in conn.execute(text("PRAGMA index_list(workspaces)"))}
+    assert {"ix_workspaces_id", "ix_workspaces_owner_id"} <= indexes
+
+
+def test_ownerless_workspaces_with_a_delete_job_are_marked_deleting(tmp_path, database):
+    engine = sqlite_engine(tmp_path, "ownerless.db")
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE workspaces DROP COLUMN deleting"))
+        conn.execute(text("DELETE FROM schema_migrations WHERE version = 10"))
+        being_deleted, legacy = create_workspace(conn, "big"), create_workspace(conn, "legacy")
+        conn.execute(text(
+            "INSERT INTO jobs (kind, status, payload, attempts, progress) "
+            "VALUES ('delete_workspace', 'running', :payload, 1, 0)"
+        ), {"payload": f'{{"workspace_id": {being_deleted}}}'})
+
+    run_migrations(engine)
+    with engine.begin() as conn:
+        deleting = dict(conn.execute(text("SELECT id, deleting FROM workspaces")).fetchall())
+    assert deleting == {being_deleted: 1, legacy: 0}
+
+
+def test_concurrent_workers_apply_a_migration_once(tmp_path, database, monkeypatch):
+    runs = []
+
+    def slow_migration(conn):
+        runs.append(threading.get_ident())
+        time.sleep(0.2)
+        conn.execute(text("CREATE TABLE slow_migration (id INTEGER PRIMARY KEY)"))
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [(1, "slow_migration", slow_migration)])
+    errors, applied = [], []
+
+    def worker():
+        # A separate engine (and lock file handle) per worker, as in separate processes
+        try:
+            applied.append(run_migrations(sqlite_engine(tmp_path, "shared.db")))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert errors == []
+    assert len(runs) == 1
+    assert sorted(applied) == [[], [], ["slow_migration"]]
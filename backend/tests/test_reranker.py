@@ -0,0 +1,46 @@
+import sys
+import types
+
+import pytest
+
+from benchmarks.stub_servers import install_fake_cross_encoder
+from utils.reranker import CrossEncoderReranker
+
+DOCS = [(1, "graph neural networks"), (2, "protein folding"), (3, "graph attention")]
+
+
+@pytest.fixture
+def broken_model(monkeypatch):
+    """sentence_transformers whose CrossEncoder cannot be built; counts the attempts"""
+    attempts = []
+
+    def cross_encoder(name, device=None):
+        attempts.append(name)
+        raise OSError(f"cannot download {name}")
+
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(CrossEncoder=cross_encoder))
+    return attempts
+
+
+def test_failed_load_is_not_retried(broken_model):
+    reranker = CrossEncoderReranker(enabled=True, budget_ms=0)
+    assert reranker.rerank("graphs", DOCS) is None
+    for _ in range(3):
+        assert reranker.rerank("graphs", DOCS) is None
+
+    assert len(broken_model) == 1
+    stats = reranker.stats()
+    assert stats["failed"] and "cannot download" in stats["error"]
+    assert stats["fallbacks"] == 4 and stats["failures"] == 1
+
+
+def test_warm_up_does_not_count_towards_the_cost_estimate():
+    reranker = CrossEncoderReranker(enabled=True, budget_ms=0)
+    install_fake_cross_encoder(reranker, ms_per_batch=50, ms_per_pair=0)
+    reranker.warm_up()
+    assert reranker.stats()["ms_per_pair"] == 0.0
+    assert reranker.stats()["pairs_scored"] == 0
+
+    assert reranker.rerank("graphs", DOCS) is not None
+    # One batch of three pairs: about 50 / 3 ms each, not the warm-up's 50 for one pair
+    assert 10 < reranker.stats()["ms_per_pair"] < 45
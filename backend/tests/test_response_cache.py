@@ -0,0 +1,93 @@
+import httpx
+import numpy as np
+import pytest
+
+from core.database import SessionLocal
+from models.workspace import Workspace
+from utils.response_cache import SemanticResponseCache, response_cache
+
+
+def unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def with_similarity(base: np.ndarray, cosine: float) -> np.ndarray:
+    """A unit vector at the given cosine similarity to ``base`` (a unit vector)"""
+    other = np.zeros_like(base)
+    other[np.argmin(np.abs(base))] = 1.0
+    other = unit(other - (other @ base) * base)
+    return cosine * base + np.sqrt(1 - cosine ** 2) * other
+
+
+@pytest.fixture
+def enabled_cache(monkeypatch):
+    monkeypatch.setattr(response_cache, "enabled", True)
+    response_cache.clear()
+    yield response_cache
+    response_cache.clear()
+
+
+def test_similarity_threshold_and_groups():
+    cache = SemanticResponseCache(threshold=0.9, ttl=60, max_entries=10, enabled=True)
+    question = unit(np.arange(1, 9))
+    cache.put(cache.key(1, 0, question, []), "cached answer")
+
+    assert cache.get(cache.key(1, 0, with_similarity(question, 0.95), [])) == "cached answer"
+    assert cache.get(cache.key(1, 0, with_similarity(question, 0.85), [])) is None
+    # Same question, but another workspace, content version or conversation history
+    assert cache.get(cache.key(2, 0, question, [])) is None
+    assert cache.get(cache.key(1, 1, question, [])) is None
+    assert cache.get(cache.key(1, 0, question, [{"role": "user", "content": "earlier"}])) is None
+    assert (cache.metrics["hits"], cache.metrics["misses"]) == (1, 4)
+
+    cache.invalidate_workspace(1)
+    assert cache.get(cache.key(1, 0, question, [])) is None
+    assert cache.stats()["entries"] == 0
+
+    assert SemanticResponseCache(enabled=False).key(1, 0, question, []) is None
+    assert cache.key(1, None, question, []) is None  # workspace not found
+    assert cache.key(1, 0, np.zeros(8), []) is None
+
+
+def test_paper_import_and_delete_invalidate_answers(api_url, auth_headers, llm, enabled_cache):
+    response = httpx.post(f"{api_url}/workspace/create", json={"name": "cached"}, headers=auth_headers)
+    response.raise_for_status()
+    workspace_id = response.json()["id"]
+
+    def import_paper(title: str) -> int:
+        response = httpx.post(f"{api_url}/papers/import", headers=auth_headers, json={
+            "title": title, "abstract": f"We study {title.lower()}.", "authors": None, "year": None,
+            "citations": None, "url": None, "workspace_id": workspace_id,
+        })
+        response.raise_for_status()
+        return response.json()["id"]
+
+    def ask(question: str) -> bool:
+        response = httpx.post(f"{api_url}/chat", params={"workspace_id": workspace_id},
+                              json={"content": question}, headers=auth_headers, timeout=30)
+        response.raise_for_status()
+        return response.json()["cached"]
+
+    def version() -> int:
+        with SessionLocal() as db:
+            return db.get(Workspace, workspace_id).content_version
+
+    import_paper("Protein folding")
+    requests = llm.state.requests
+    assert ask("Summarize the papers") is False
+    assert ask("the papers: summarize!") is True  # same words, so the same embedding
+    assert ask("Which methods do they compare?") is False
+    assert llm.state.requests == requests + 2
+
+    before = version()
+    second = import_paper("Sparse attention")
+    assert version() == before + 1
+    assert ask("Summarize the papers") is False  # answered before the import
+    assert ask("Summarize the papers") is True
+
+    response = httpx.delete(f"{api_url}/papers/{second}", headers=auth_headers)
+    response.raise_for_status()
+    assert version() == before + 2
+    assert ask("Summarize the papers") is False
+    assert llm.state.requests == requests + 4
@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.stub_servers import semantic_scholar_app
+from utils.semantic_scholar import RateLimitedError, SemanticScholarClient
+
+pytestmark = pytest.mark.anyio
+
+FIELDS = "title,abstract"
+
+
+def make_client(base_url: str, **overrides) -> SemanticScholarClient:
+    settings = dict(rate_per_sec=1000, burst=1000, max_retries=3, backoff=0.01, timeout=5)
+    settings.update(overrides)
+    return SemanticScholarClient(base_url=f"{base_url}/graph/v1", api_key=None, **settings)
+
+
+@pytest.fixture
+def s2(serve):
+    def start(**options):
+        app = semantic_scholar_app(**{"latency_ms": 0, **options})
+        return app, serve(app)
+    return start
+
+
+async def test_search_returns_stub_results(s2):
+    app, url = s2()
+    client = make_client(url)
+    try:
+        data = await client.search("graph networks", FIELDS, limit=5)
+    finally:
+        await client.aclose()
+    assert len(data["data"]) == 5
+    assert data["data"][0]["paperId"] == "graph networks-0"
+    assert app.state.requests == 1
+
+
+async def test_429_is_retried_with_backoff(s2):
+    app, url = s2(rate_limit_every=2)  # the 2nd upstream request is rate limited
+    client = make_client(url)
+    try:
+        await client.search("first", FIELDS)
+        data = await client.search("second", FIELDS)
+    finally:
+        await client.aclose()
+    assert data["data"][0]["paperId"] == "second-0"
+    assert app.state.requests == 3
+    assert client.metrics["rate_limited"] == 1
+    assert client.metrics["retries"] == 1
+
+
+async def test_persistent_429_raises_after_max_retries(s2):
+    app, url = s2(rate_limit_every=1)
+    client = make_client(url, max_retries=2)
+    try:
+        with pytest.raises(RateLimitedError):
+            await client.search("always limited", FIELDS)
+    finally:
+        await client.aclose()
+    assert app.state.requests == 3
+    assert client.metrics["rate_limited"] == 3
+
+
+async def test_retry_after_is_capped(s2):
+    app, url = s2(rate_limit_every=2, retry_after=120)
+    client = make_client(url, max_backoff=0.05)
+    try:
+        await client.search("first", FIELDS)
+        start = time.perf_counter()
+        data = await client.search("second", FIELDS)
+    finally:
+        await client.aclose()
+    assert data["data"][0]["paperId"] == "second-0"
+    assert client.metrics["retries"] == 1
+    assert time.perf_counter() - start < 5
+
+
+async def test_repeated_search_is_served_from_cache(s2):
+    app, url = s2()
+    client = make_client(url)
+    try:
+        first = await client.search("Deep  Learning", FIELDS)
+        second = await client.search("deep learning", FIELDS)  # same normalized query
+        await client.search("deep learning", FIELDS, limit=3)  # different key
+    finally:
+        await client.aclose()
+    assert first == second
+    assert app.state.requests == 2
+    assert client.metrics["cache_hits"] == 1
+
+
+async def test_identical_concurrent_searches_are_coalesced(s2):
+    app, url = s2(latency_ms=200)
+    client = make_client(url)
+    try:
+        results = await asyncio.gather(*(client.search("transformers", FIELDS) for _ in range(5)))
+    finally:
+        await client.aclose()
+    assert all(result == results[0] for result in results)
+    assert app.state.requests == 1
+    assert client.metrics["coalesced"] == 4
+
+
+async def test_waiters_survive_cancelled_leader(s2):
+    app, url = s2(latency_ms=200)
+    client = make_client(url)
+    try:
+        leader = asyncio.create_task(client.search("attention", FIELDS))
+        await asyncio.sleep(0.05)
+        waiters = [asyncio.create_task(client.search("attention", FIELDS)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        leader.cancel()  # e.g. its HTTP client disconnected
+        results = await asyncio.gather(*waiters)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+    finally:
+        await client.aclose()
+    assert all(result["data"][0]["paperId"] == "attention-0" for result in results)
+    # One waiter repeated the request, the others joined it
+    assert app.state.requests == 2
+
+
+def test_client_of_a_finished_loop_is_closed(s2):
+    app, url = s2()
+    client = make_client(url)
+    asyncio.run(client.search("first loop", FIELDS))
+    first = client._client
+
+    async def on_a_new_loop():  # e.g. a test client per test
+        try:
+            await client.search("second loop", FIELDS)
+            return first.is_closed, client._client.is_closed
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(on_a_new_loop()) == (True, False)
+    assert app.state.requests == 2
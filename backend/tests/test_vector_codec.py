@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from utils.vector_codec import decode_embedding, decode_matrix, encode_embedding
+
+
+@pytest.fixture
+def vector():
+    return np.random.default_rng(0).standard_normal(384).astype(np.float32)
+
+
+def test_float32_round_trip_is_exact(vector):
+    blob = encode_embedding(vector, "float32")
+    assert blob[:4] == b"F32\0" and len(blob) == 4 + 384 * 4
+    np.testing.assert_array_equal(decode_embedding(blob), vector)
+
+
+def test_float16_round_trip(vector):
+    blob = encode_embedding(vector.tolist(), "float16")
+    assert blob[:4] == b"F16\0" and len(blob) == 4 + 384 * 2
+    decoded = decode_embedding(blob)
+    assert decoded.dtype == np.float32
+    np.testing.assert_allclose(decoded, vector, rtol=1e-3, atol=1e-3)
+
+
+def test_int8_round_trip(vector):
+    blob = encode_embedding(vector, "int8")
+    assert blob[:4] == b"I8\0\0" and len(blob) == 4 + 4 + 384
+    decoded = decode_embedding(blob)
+    scale = np.abs(vector).max() / 127
+    assert np.abs(decoded - vector).max() <= scale / 2 + 1e-6
+    # Quantization keeps the direction: cosine similarity stays near 1
+    assert decoded @ vector / (np.linalg.norm(decoded) * np.linalg.norm(vector)) > 0.999
+
+
+def test_int8_zero_vector():
+    np.testing.assert_array_equal(decode_embedding(encode_embedding(np.zeros(8), "int8")), np.zeros(8))
+
+
+def test_empty_and_invalid_input():
+    assert encode_embedding(None) is None
+    assert encode_embedding([]) is None
+    assert decode_embedding(None) is None
+    assert decode_embedding(b"") is None
+    with pytest.raises(ValueError):
+        encode_embedding([1.0], "float64")
+    with pytest.raises(ValueError):
+        decode_embedding(b"XYZ\0" + np.zeros(4, np.float32).tobytes())
+
+
+def test_decode_matrix_mixes_storage_types(vector):
+    blobs = [encode_embedding(vector, dtype) for dtype in ("float32", "float16", "int8")]
+    matrix = decode_matrix(blobs)
+    assert matrix.shape == (3, 384) and matrix.dtype == np.float32
+    np.testing.assert_allclose(matrix, np.tile(vector, (3, 1)), atol=0.02)
+    assert decode_matrix([]).shape == (0, 0)
@@ -0,0 +1,71 @@
+import httpx
+import pytest
+
+import routers.workspace
+from core.database import SessionLocal
+from models.workspace import Workspace
+from utils.cascade import delete_orphans, find_orphans
+
+
+def create_workspace(api_url, headers, name: str) -> int:
+    response = httpx.post(f"{api_url}/workspace/create", json={"name": name}, headers=headers)
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+def import_paper(api_url, headers, workspace_id: int, title: str) -> httpx.Response:
+    return httpx.post(f"{api_url}/papers/import", headers=headers, json={
+        "title": title, "abstract": "An abstract.", "authors": "A. Author", "year": 2024,
+        "citations": 0, "url": None, "workspace_id": workspace_id,
+    })
+
+
+@pytest.fixture
+def deleting_workspace(api_url, auth_headers, monkeypatch):
+    """A workspace whose background delete was started (no job workers run it in tests)"""
+    workspace_id = create_workspace(api_url, auth_headers, "big")
+    for i in range(2):
+        import_paper(api_url, auth_headers, workspace_id, f"Paper {i}").raise_for_status()
+    monkeypatch.setattr(routers.workspace, "WORKSPACE_DELETE_SYNC_PAPERS", 1)
+    response = httpx.delete(f"{api_url}/workspace/{workspace_id}", headers=auth_headers)
+    assert response.status_code == 202
+    yield workspace_id
+    delete_orphans()
+
+
+def test_deleting_workspace_is_hidden(api_url, auth_headers, deleting_workspace):
+    listed = httpx.get(f"{api_url}/workspace/my", headers=auth_headers).json()
+    assert deleting_workspace not in [w["id"] for w in listed]
+    again = httpx.delete(f"{api_url}/workspace/{deleting_workspace}", headers=auth_headers)
+    assert again.status_code == 404
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/papers/import/bulk", {"papers": [{"title": "Late"}]}),
+    ("/papers/import/async", {"papers": [{"title": "Late"}]}),
+])
+def test_deleting_workspace_rejects_bulk_imports(api_url, auth_headers, deleting_workspace, path, body):
+    response = httpx.post(f"{api_url}{path}", headers=auth_headers, json={**body, "workspace_id": deleting_workspace})
+    assert response.status_code == 409
+
+
+def test_deleting_workspace_rejects_imports_and_chats(api_url, auth_headers, deleting_workspace):
+    assert import_paper(api_url, auth_headers, deleting_workspace, "Late").status_code == 409
+    for path in ("/chat", "/chat/stream"):
+        response = httpx.post(f"{api_url}{path}", params={"workspace_id": deleting_workspace},
+                              json={"content": "Anything new?"}, headers=auth_headers)
+        assert response.status_code == 409
+
+
+def test_only_deleting_workspaces_are_unfinished_deletes(api_url, auth_headers, deleting_workspace):
+    with SessionLocal() as db:
+        ownerless = Workspace(name="legacy", owner_id=None)
+        db.add(ownerless)
+        db.commit()
+        ownerless_id = ownerless.id
+        assert find_orphans(db)["unfinished_workspace_deletes"] == 1
+
+    assert delete_orphans()["unfinished_workspace_deletes"] == 1
+    with SessionLocal() as db:
+        assert db.get(Workspace, deleting_workspace) is None
+        assert db.get(Workspace, ownerless_id) is not None
@@ -0,0 +1,486 @@
+"""
+Persistent per-workspace approximate nearest-neighbour index (IVF).
+
+Every workspace gets a directory of memory-mapped files next to the database:
+
+    vectors.f32     L2-normalized float32 embeddings, one row per slot
+    ids.i64         paper (or chunk) id stored in each slot (-1 marks a deleted slot)
+    lists.i32       inverted list each slot is assigned to
+    centroids.f32   coarse quantizer centroids
+    meta.json       dimension, slot counts and a version counter
+
+There is one index of paper embeddings per workspace, plus one of full-text
+chunk embeddings (``kind="chunks"``, see utils.fulltext).
+
+Small workspaces are searched exactly. Once a workspace holds
+ANN_TRAIN_THRESHOLD vectors a spherical k-means quantizer is trained and a
+query only scans the ``nprobe`` closest inverted lists, which is the
+recall/latency knob. Inserts append, deletes leave tombstones and the files
+are compacted once too many slots are dead.
+
+Workers share the files: writers take an exclusive flock, readers a shared
+one, so a search in one worker never sees another worker's half-written
+compaction. A missing index is bootstrapped from the database under a
+separate rebuild lock (``bootstrap``), and the rows are read while holding
+it, so nothing another worker adds or removes meanwhile is lost.
+"""
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from core.database import DATA_DIR
+from utils.retrieval import normalize_rows, top_k_indices
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+load_dotenv()
+
+
+INDEX_DIR = os.getenv("ANN_INDEX_DIR") or os.path.join(DATA_DIR, "indexes")
+ANN_TRAIN_THRESHOLD = int(os.getenv("ANN_TRAIN_THRESHOLD", "4096"))
+ANN_NLIST = int(os.getenv("ANN_NLIST", "0"))  # 0 = 4 * sqrt(n)
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "16"))
+
+_EMPTY_META = {
+    "dim": None,
+    "size": 0,       # slots in use, including tombstones
+    "live": 0,       # slots holding a paper
+    "capacity": 0,
+    "nlist": 0,      # 0 until the quantizer is trained
+    "trained_at": 0,
+    "version": 0,
+    "sum": None,     # running sum of the live vectors (workspace centroid)
+}
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on normalized rows; returns k normalized centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        empty = np.bincount(assign, minlength=k) == 0
+        if empty.any():
+            sums[empty] = data[rng.choice(len(data), size=int(empty.sum()))]
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+
+class IVFIndex:
+    """Memory-mapped inverted-file index for one workspace"""
+
+    FILES = (("vectors.f32", np.float32), ("ids.i64", np.int64), ("lists.i32", np.int32))
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._meta_mtime = None
+        self._load()
+
+    # -------------------------
+    # persistence
+    # -------------------------
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self._file("meta.json"))
+
+    @property
+    def trained(self) -> bool:
+        return self.meta["nlist"] > 0
+
+    def __len__(self) -> int:
+        return self.meta["live"]
+
+    def _load(self):
+        self.meta = dict(_EMPTY_META)
+        self.vectors = self.ids = self.lists = None
+        self.centroids = None
+        self._positions: Dict[int, int] = {}
+        self._members: List[np.ndarray] = []
+
+        if not self.exists:
+            self._meta_mtime = None
+            return
+
+        with open(self._file("meta.json")) as f:
+            self.meta.update(json.load(f))
+        self._meta_mtime = os.stat(self._file("meta.json")).st_mtime_ns
+        self._map()
+
+        size = self.meta["size"]
+        if size:
+            ids = np.asarray(self.ids[:size])
+            rows = np.flatnonzero(ids >= 0)
+            self._positions = dict(zip(ids[rows].tolist(), rows.tolist()))
+        if self.meta["sum"] is None and self.meta["live"]:
+            # Index written before centroids were tracked: sum once, saved on the next write
+            self.meta["sum"] = self._live_sum().tolist()
+        if self.trained:
+            self.centroids = np.fromfile(self._file("centroids.f32"), dtype=np.float32).reshape(
+                self.meta["nlist"], self.meta["dim"]
+            )
+            self._rebuild_members()
+
+    def _live_sum(self) -> np.ndarray:
+        size = self.meta["size"]
+        rows = np.flatnonzero(np.asarray(self.ids[:size]) >= 0)
+        total = np.zeros(self.meta["dim"], dtype=np.float64)
+        for start in range(0, len(rows), 16384):
+            total += np.asarray(self.vectors[rows[start:start + 16384]], dtype=np.float64).sum(axis=0)
+        return total
+
+    def _map(self):
+        capacity, dim = self.meta["capacity"], self.meta["dim"]
+        if not capacity:
+            return
+        self.vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r+", shape=(capacity, dim))
+        self.ids = np.memmap(self._file("ids.i64"), dtype=np.int64, mode="r+", shape=(capacity,))
+        self.lists = np.memmap(self._file("lists.i32"), dtype=np.int32, mode="r+", shape=(capacity,))
+
+    def _refresh(self):
+        """Reload if another worker has written the index since we mapped it"""
+        try:
+            mtime = os.stat(self._file("meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._meta_mtime:
+            self._load()
+
+    def _save(self):
+        for array in (self.vectors, self.ids, self.lists):
+            if array is not None:
+                array.flush()
+        self.meta["version"] += 1
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self._file("meta.json"))
+        self._meta_mtime = os.stat(self._file("meta.json")).st_mtime_ns
+
+    @contextmanager
+    def _writing(self):
+        """Serialize writers within this process and across workers"""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(self._file("lock"), "a") as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._refresh()
+                    yield
+                    self._save()
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _reading(self):
+        """Shared lock for readers: writers in other workers wait until the read is done"""
+        with self._lock:
+            lock_file = None
+            if fcntl and os.path.isdir(self.path):
+                try:
+                    lock_file = open(self._file("lock"), "a")
+                except FileNotFoundError:  # dropped meanwhile
+                    pass
+                else:
+                    fcntl.flock(lock_file, fcntl.LOCK_SH)
+            try:
+                self._refresh()
+                yield
+            finally:
+                if lock_file is not None:
+                    lock_file.close()  # releases the lock
+
+    @contextmanager
+    def _rebuilding(self):
+        """Serialize rebuilds within this process and across workers"""
+        # The lock file lives beside the directory, which a rebuild deletes
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock, open(self.path + ".rebuild.lock", "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)  # released when the file is closed
+            yield
+
+    def _reserve(self, needed: int):
+        capacity = self.meta["capacity"]
+        if needed <= capacity:
+            return
+        new_capacity = max(1024, capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+
+        self.vectors = self.ids = self.lists = None
+        widths = {"vectors.f32": self.meta["dim"], "ids.i64": 1, "lists.i32": 1}
+        for name, dtype in self.FILES:
+            with open(self._file(name), "ab") as f:
+                f.truncate(new_capacity * widths[name] * np.dtype(dtype).itemsize)
+        self.meta["capacity"] = new_capacity
+        self._map()
+
+    # -------------------------
+    # inverted lists
+    # -------------------------
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _rebuild_members(self):
+        size = self.meta["size"]
+        lists = np.asarray(self.lists[:size])
+        order = np.argsort(lists, kind="stable")
+        bounds = np.searchsorted(lists[order], np.arange(self.meta["nlist"] + 1))
+        self._members = [order[bounds[i]:bounds[i + 1]] for i in range(self.meta["nlist"])]
+
+    def _train(self):
+        size = self.meta["size"]
+        live_rows = np.flatnonzero(np.asarray(self.ids[:size]) >= 0)
+        live = len(live_rows)
+        nlist = ANN_NLIST or max(16, int(4 * np.sqrt(live)))
+        nlist = min(nlist, live)
+
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(live_rows, size=min(live, nlist * 64), replace=False))
+        self.centroids = kmeans(np.asarray(self.vectors[sample_rows]), nlist)
+        self.centroids.tofile(self._file("centroids.f32"))
+
+        for start in range(0, size, 16384):
+            block = slice(start, min(start + 16384, size))
+            self.lists[block] = self._assign(np.asarray(self.vectors[block]))
+
+        self.meta["nlist"] = nlist
+        self.meta["trained_at"] = live
+        self._rebuild_members()
+
+    def _compact(self):
+        size = self.meta["size"]
+        live_rows = np.flatnonzero(np.asarray(self.ids[:size]) >= 0)
+        live = len(live_rows)
+        self.vectors[:live] = self.vectors[live_rows]
+        self.ids[:live] = self.ids[live_rows]
+        self.lists[:live] = self.lists[live_rows]
+        self.meta["size"] = live
+        self.meta["sum"] = self._live_sum().tolist()  # drop accumulated rounding error
+        self._positions = dict(zip(np.asarray(self.ids[:live]).tolist(), range(live)))
+        if self.trained:
+            self._rebuild_members()
+
+    # -------------------------
+    # mutation
+    # -------------------------
+    def _add_to_sum(self, delta: np.ndarray):
+        current = self.meta["sum"]
+        self.meta["sum"] = (delta if current is None else np.asarray(current) + delta).tolist()
+
+    def _tombstone(self, paper_ids) -> int:
+        rows = []
+        for paper_id in paper_ids:
+            row = self._positions.pop(int(paper_id), None)
+            if row is not None:
+                self.ids[row] = -1
+                rows.append(row)
+        if rows:
+            self._add_to_sum(-np.asarray(self.vectors[rows], dtype=np.float64).sum(axis=0))
+        self.meta["live"] -= len(rows)
+        return len(rows)
+
+    def add(self, paper_ids: Sequence[int], vectors) -> None:
+        """Insert (or replace) embeddings for the given paper ids"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        if len(paper_ids) != len(vectors):
+            raise ValueError("paper_ids and vectors must have the same length")
+
+        with self._writing():
+            if not len(paper_ids):
+                return
+            if self.meta["dim"] is None:
+                self.meta["dim"] = int(vectors.shape[1])
+            elif vectors.shape[1] != self.meta["dim"]:
+                raise ValueError(f"Expected {self.meta['dim']}-dim embeddings, got {vectors.shape[1]}")
+
+            self._tombstone(paper_ids)
+            vectors = normalize_rows(vectors.copy())
+            start = self.meta["size"]
+            rows = np.arange(start, start + len(vectors))
+            self._reserve(start + len(vectors))
+
+            self.vectors[rows] = vectors
+            self.ids[rows] = np.asarray(paper_ids, dtype=np.int64)
+            self.meta["size"] += len(rows)
+            self.meta["live"] += len(rows)
+            self._add_to_sum(vectors.sum(axis=0, dtype=np.float64))
+            self._positions.update(zip((int(i) for i in paper_ids), rows.tolist()))
+
+            if self.trained:
+                assigned = self._assign(vectors)
+                self.lists[rows] = assigned
+                for list_id in np.unique(assigned):
+                    self._members[list_id] = np.concatenate([self._members[list_id], rows[assigned == list_id]])
+
+            live = self.meta["live"]
+            if live >= ANN_TRAIN_THRESHOLD and (not self.trained or live >= 2 * self.meta["trained_at"]):
+                self._train()
+
+    def remove(self, paper_ids: Sequence[int]) -> int:
+        """Delete embeddings by paper id; returns how many were present"""
+        if not self.exists:
+            # A bootstrap in progress may have read the rows before they were deleted
+            with self._rebuilding():
+                if not self.exists:
+                    return 0
+        with self._writing():
+            removed = self._tombstone(paper_ids)
+            dead = self.meta["size"] - self.meta["live"]
+            if removed and dead > max(1024, self.meta["live"] // 4):
+                self._compact()
+        return removed
+
+    def rebuild(self, paper_ids: Sequence[int], vectors) -> None:
+        """Replace the whole index contents"""
+        with self._rebuilding():
+            self._replace(paper_ids, vectors)
+
+    def rebuild_from(self, load: Callable[[], Tuple[Sequence[int], np.ndarray]], missing_only: bool = False) -> None:
+        """
+        Replace the index contents with ``load()`` -> (paper_ids, vectors).
+
+        ``load`` runs under the rebuild lock: another worker bootstrapping the
+        same index waits instead of reading rows that are stale by the time
+        it writes them. With ``missing_only`` nothing happens if the index
+        exists by the time the lock is taken.
+        """
+        with self._rebuilding():
+            if missing_only and self.exists:
+                return
+            self._replace(*load())
+
+    def bootstrap(self, load: Callable[[], Tuple[Sequence[int], np.ndarray]]) -> None:
+        """Build a missing index from ``load()``; a no-op once it exists"""
+        if not self.exists:
+            self.rebuild_from(load, missing_only=True)
+
+    def _replace(self, paper_ids: Sequence[int], vectors):
+        self.drop()
+        with self._writing():
+            pass
+        if len(paper_ids):
+            self.add(paper_ids, vectors)
+
+    def drop(self) -> None:
+        """Delete the index files for this workspace"""
+        with self._lock:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self._load()
+
+    # -------------------------
+    # reading
+    # -------------------------
+    def centroid(self) -> Optional[np.ndarray]:
+        """Normalized mean of the live vectors, or None when the index is empty"""
+        with self._reading():
+            if not self.meta["live"]:
+                return None
+            return normalize_rows(np.asarray(self.meta["sum"], dtype=np.float32).reshape(1, -1))[0]
+
+    def live_slots(self) -> Tuple[int, np.ndarray, np.ndarray]:
+        """(version, ids, slots) of every live entry, for mirrors that sync incrementally"""
+        with self._reading():
+            size = self.meta["size"]
+            ids = np.asarray(self.ids[:size]) if size else np.empty(0, dtype=np.int64)
+            slots = np.flatnonzero(ids >= 0)
+            return self.meta["version"], ids[slots], slots
+
+    def vectors_at(self, slots: np.ndarray, version: int) -> Optional[np.ndarray]:
+        """Copies of the vectors in ``slots``; None if the index changed since ``version``"""
+        with self._reading():
+            if self.meta["version"] != version:
+                return None
+            return np.array(self.vectors[slots]) if len(slots) else np.empty((0, self.meta["dim"] or 0), dtype=np.float32)
+
+    # -------------------------
+    # search
+    # -------------------------
+    def search(self, query, top_k: int = 5, nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Return [(paper_id, cosine similarity)] for the approximate top_k"""
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        with self._reading():
+            if not self.meta["live"] or query.shape[0] != self.meta["dim"]:
+                return []
+            query = normalize_rows(query.reshape(1, -1))[0]
+
+            size = self.meta["size"]
+            if self.trained:
+                probe = top_k_indices(self.centroids @ query, nprobe or ANN_NPROBE)
+                rows = np.concatenate([self._members[i] for i in probe])
+                rows.sort()
+            else:
+                rows = np.arange(size)
+
+            return self._score(rows, query, top_k)
+
+    def search_exact(self, query, top_k: int = 5) -> List[Tuple[int, float]]:
+        """Brute-force search over every live vector (ground truth for recall)"""
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        with self._reading():
+            if not self.meta["live"] or query.shape[0] != self.meta["dim"]:
+                return []
+            query = normalize_rows(query.reshape(1, -1))[0]
+            return self._score(np.arange(self.meta["size"]), query, top_k)
+
+    def _score(self, rows: np.ndarray, query: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        ids = np.asarray(self.ids[rows])
+        scores = np.asarray(self.vectors[rows]) @ query
+        scores[ids < 0] = -np.inf
+        best = top_k_indices(scores, top_k)
+        best = best[np.isfinite(scores[best])]
+        return list(zip(ids[best].tolist(), scores[best].tolist()))
+
+
+# =========================
+# PER-WORKSPACE REGISTRY
+# =========================
+_indexes: Dict[Tuple[int, str], IVFIndex] = {}
+_registry_lock = threading.Lock()
+
+
+def index_path(workspace_id: int, kind: str = "papers") -> str:
+    suffix = "" if kind == "papers" else f"_{kind}"
+    return os.path.join(INDEX_DIR, f"workspace_{workspace_id}{suffix}")
+
+
+def get_workspace_index(workspace_id: int, kind: str = "papers") -> IVFIndex:
+    """Open (or create lazily on first write) a workspace index; ``kind`` is papers or chunks"""
+    with _registry_lock:
+        index = _indexes.get((workspace_id, kind))
+        if index is None:
+            index = _indexes[(workspace_id, kind)] = IVFIndex(index_path(workspace_id, kind))
+        return index
+
+
+def drop_workspace_index(workspace_id: int, kind: str = "papers") -> None:
+    """Remove a workspace's index from disk and from the registry"""
+    index = get_workspace_index(workspace_id, kind)
+    index.drop()
+    try:
+        os.remove(index.path + ".rebuild.lock")
+    except FileNotFoundError:
+        pass
+    with _registry_lock:
+        _indexes.pop((workspace_id, kind), None)
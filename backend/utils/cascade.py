@@ -0,0 +1,240 @@
+"""
+Set-based cascading deletes for workspaces and conversations.
+
+Dependent rows are removed with one ``DELETE ... WHERE`` per table instead
+of being loaded through the ORM (which, without a cascade configured, only
+nulled their foreign keys and left them behind):
+
+  workspace     paper_chunks and papers are deleted, its conversations are
+                kept but detached (workspace_id = NULL); afterwards its paper
+                and chunk indexes, related-papers graph and cached chat
+                answers are dropped
+  conversation  its messages are deleted
+
+A workspace with more than WORKSPACE_DELETE_SYNC_PAPERS papers is deleted by a
+``delete_workspace`` background job instead. The request marks it
+``deleting`` right away, so it disappears from its owner's list and takes no
+more imports or chats (``ensure_not_deleting``). The job then removes the
+rows in batches of DELETE_BATCH_ROWS, each in its own short transaction, so
+the database is never locked for the whole delete.
+
+``find_orphans`` and ``delete_orphans`` remove what earlier deletes left
+behind (``python cleanup_orphans.py``).
+"""
+import os
+import shutil
+from typing import Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy import delete, exists, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from models.conversation import Conversation, Message
+from models.paper import Paper, PaperChunk
+from models.workspace import Workspace
+from utils.ann_index import INDEX_DIR, drop_workspace_index
+from utils.jobs import JobContext, enqueue, job_handler, job_pool
+from utils.knn_graph import drop_workspace_graph
+from utils.response_cache import response_cache
+
+load_dotenv()
+
+WORKSPACE_DELETE_SYNC_PAPERS = int(os.getenv("WORKSPACE_DELETE_SYNC_PAPERS", "5000"))
+DELETE_BATCH_ROWS = int(os.getenv("DELETE_BATCH_ROWS", "5000"))
+
+
+def _delete_where(db: Session, model, condition, limit: Optional[int] = None) -> int:
+    """DELETE rows matching ``condition``, at most ``limit`` of them; returns the row count"""
+    if limit is not None:
+        condition = model.id.in_(select(model.id).where(condition).limit(limit).scalar_subquery())
+    result = db.execute(delete(model).where(condition).execution_options(synchronize_session=False))
+    return result.rowcount
+
+
+# =========================
+# CONVERSATIONS
+# =========================
+def delete_conversation_cascade(db: Session, conversation_id: int, user_id: int) -> bool:
+    """Delete a user's conversation and its messages; False if it is not theirs. Commits."""
+    owned = db.query(Conversation.id).filter(
+        Conversation.id == conversation_id,
+        Conversation.user_id == user_id
+    ).first()
+    if not owned:
+        return False
+    _delete_where(db, Message, Message.conversation_id == conversation_id)
+    _delete_where(db, Conversation, Conversation.id == conversation_id)
+    db.commit()
+    return True
+
+
+# =========================
+# WORKSPACES
+# =========================
+def invalidate_workspace(workspace_id: int):
+    """Forget everything derived from a deleted workspace in this process and on disk"""
+    drop_workspace_index(workspace_id, "papers")
+    drop_workspace_index(workspace_id, "chunks")
+    drop_workspace_graph(workspace_id)
+    response_cache.invalidate_workspace(workspace_id)
+
+
+def _delete_workspace_row(db: Session, workspace_id: int):
+    db.execute(
+        update(Conversation).where(Conversation.workspace_id == workspace_id)
+        .values(workspace_id=None).execution_options(synchronize_session=False)
+    )
+    _delete_where(db, Workspace, Workspace.id == workspace_id)
+
+
+def delete_workspace_cascade(db: Session, workspace_id: int) -> Dict[str, int]:
+    """Delete a workspace and its papers in one transaction. Commits."""
+    counts = {
+        "chunks": _delete_where(db, PaperChunk, PaperChunk.workspace_id == workspace_id),
+        "papers": _delete_where(db, Paper, Paper.workspace_id == workspace_id),
+    }
+    _delete_workspace_row(db, workspace_id)
+    db.commit()
+    invalidate_workspace(workspace_id)
+    return counts
+
+
+def purge_workspace(
+    workspace_id: int,
+    batch: int = DELETE_BATCH_ROWS,
+    on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+    session_factory: Callable[[], Session] = SessionLocal,
+) -> Dict[str, int]:
+    """Delete a workspace's rows in batches, one transaction per batch; safe to re-run"""
+    counts = {"chunks": 0, "papers": 0}
+    for key, model, column in (("chunks", PaperChunk, PaperChunk.workspace_id), ("papers", Paper, Paper.workspace_id)):
+        while True:
+            with session_factory() as db:
+                removed = _delete_where(db, model, column == workspace_id, batch)
+                db.commit()
+            counts[key] += removed
+            if on_progress:
+                on_progress(counts)
+            if removed < batch:
+                break
+    with session_factory() as db:
+        _delete_workspace_row(db, workspace_id)
+        db.commit()
+    invalidate_workspace(workspace_id)
+    return counts
+
+
+def schedule_workspace_delete(db: Session, workspace_id: int, user_id: int, papers: int):
+    """Hide a large workspace from its owner now and delete it in a background job. Commits."""
+    db.query(Workspace).filter(Workspace.id == workspace_id).update(
+        {"deleting": True}, synchronize_session=False
+    )
+    job = enqueue(
+        db, "delete_workspace", {"workspace_id": workspace_id},
+        user_id=user_id, total=papers, commit=False
+    )
+    db.commit()
+    job_pool.notify()
+    response_cache.invalidate_workspace(workspace_id)
+    return job
+
+
+def ensure_not_deleting(db: Session, workspace_id: Optional[int]):
+    """409 for a workspace that is being deleted (its new rows would be orphaned)"""
+    if workspace_id and db.query(Workspace.deleting).filter(Workspace.id == workspace_id).scalar():
+        raise HTTPException(status_code=409, detail="Workspace is being deleted")
+
+
+@job_handler("delete_workspace")
+async def run_workspace_delete(job: JobContext) -> dict:
+    def report(counts: Dict[str, int]):
+        job.progress(counts["papers"], **counts)
+
+    return await job.run_in_thread(purge_workspace, job.payload["workspace_id"], DELETE_BATCH_ROWS, report)
+
+
+# =========================
+# ORPHANS
+# =========================
+def _orphan_conditions() -> dict:
+    return {
+        "papers": (Paper, or_(
+            Paper.workspace_id.is_(None),
+            ~exists().where(Workspace.id == Paper.workspace_id)
+        )),
+        "paper_chunks": (PaperChunk, or_(
+            ~exists().where(Paper.id == PaperChunk.paper_id),
+            ~exists().where(Workspace.id == PaperChunk.workspace_id)
+        )),
+        "messages": (Message, or_(
+            Message.conversation_id.is_(None),
+            ~exists().where(Conversation.id == Message.conversation_id)
+        )),
+    }
+
+
+def _detached_conversations():
+    return Conversation.workspace_id.isnot(None) & ~exists().where(Workspace.id == Conversation.workspace_id)
+
+
+def _stale_index_dirs(db: Session) -> list:
+    """Index directories (and their lock files) of workspaces that no longer exist"""
+    if not os.path.isdir(INDEX_DIR):
+        return []
+    live = {row[0] for row in db.query(Workspace.id)}
+    stale = []
+    for name in os.listdir(INDEX_DIR):
+        workspace = name.split(".")[0].removeprefix("workspace_").split("_")[0]
+        if name.startswith("workspace_") and workspace.isdigit() and int(workspace) not in live:
+            stale.append(os.path.join(INDEX_DIR, name))
+    return stale
+
+
+def find_orphans(db: Session) -> Dict[str, int]:
+    """Counts of everything ``delete_orphans`` would remove"""
+    counts = {
+        name: db.query(func.count(model.id)).filter(condition).scalar()
+        for name, (model, condition) in _orphan_conditions().items()
+    }
+    counts["conversations_to_detach"] = db.query(func.count(Conversation.id)).filter(_detached_conversations()).scalar()
+    counts["unfinished_workspace_deletes"] = db.query(func.count(Workspace.id)).filter(Workspace.deleting).scalar()
+    counts["index_files"] = len(_stale_index_dirs(db))
+    return counts
+
+
+def delete_orphans(batch: int = DELETE_BATCH_ROWS, session_factory: Callable[[], Session] = SessionLocal) -> Dict[str, int]:
+    """Finish interrupted workspace deletes, then remove orphaned rows and index files"""
+    counts = {"unfinished_workspace_deletes": 0}
+    with session_factory() as db:
+        pending = [row[0] for row in db.query(Workspace.id).filter(Workspace.deleting)]
+    for workspace_id in pending:
+        purge_workspace(workspace_id, batch, session_factory=session_factory)
+        counts["unfinished_workspace_deletes"] += 1
+
+    # Papers before chunks: removing an orphaned paper orphans its chunks
+    for name, (model, condition) in _orphan_conditions().items():
+        counts[name] = 0
+        while True:
+            with session_factory() as db:
+                removed = _delete_where(db, model, condition, batch)
+                db.commit()
+            counts[name] += removed
+            if removed < batch:
+                break
+
+    with session_factory() as db:
+        counts["conversations_to_detach"] = db.execute(
+            update(Conversation).where(_detached_conversations())
+            .values(workspace_id=None).execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        stale = _stale_index_dirs(db)
+    for path in stale:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+    counts["index_files"] = len(stale)
+    return counts
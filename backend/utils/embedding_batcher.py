@@ -0,0 +1,169 @@
+"""
+Micro-batching front end for the embedding model.
+
+Concurrent ``await generate_embedding_async(text)`` calls are collected for up
+to EMBEDDING_BATCH_WAIT_MS (or until EMBEDDING_BATCH_SIZE texts are queued),
+encoded with a single ``model.encode(batch)`` call in a worker thread, and
+each caller's future is resolved with its own vector. The event loop is never
+blocked by the model.
+
+Only the embedding cache's memory tier is consulted on the event loop. Disk
+lookups run in a separate thread (so they do not wait behind the model), and
+each encoded batch is written to disk in one transaction by the thread that
+encoded it.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Set
+
+import numpy as np
+from dotenv import load_dotenv
+
+from utils.embedding_cache import EmbeddingCache
+from utils.embeddings import EmbeddingProvider, embedding_provider, embedding_cache
+
+load_dotenv()
+
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent encode requests into batched model calls"""
+
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        max_batch: int = EMBEDDING_BATCH_SIZE,
+        max_wait_ms: float = EMBEDDING_BATCH_WAIT_MS,
+        workers: int = 1,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.provider = provider
+        self.cache = cache
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embedding")
+        self._cache_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-cache")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop only holds tasks weakly: keep in-flight batches alive until they finish
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.texts = 0
+
+    def _bind(self):
+        # Futures belong to one event loop; start fresh if the loop changed
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._pending = []
+            self._timer = None
+        return loop
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Encode one text, sharing a model call with concurrent requests"""
+        loop = self._bind()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    async def embed_many(self, texts: List[str]) -> List[np.ndarray]:
+        """Encode several texts; they are batched together with other callers"""
+        return list(await asyncio.gather(*(self.embed(t) for t in texts)))
+
+    async def cached(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors (None for misses): memory tier inline, disk tier in a worker thread"""
+        if self.cache is None:
+            return [None] * len(texts)
+        vectors = [self.cache.get_memory(text) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            if self.cache.path:
+                loop = asyncio.get_running_loop()
+                found = await loop.run_in_executor(
+                    self._cache_executor, self.cache.get_disk_many, [texts[i] for i in missing]
+                )
+            else:
+                found = self.cache.get_disk_many([texts[i] for i in missing])  # counts the misses, no I/O
+            for i, vector in zip(missing, found):
+                vectors[i] = vector
+        return vectors
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if self._pending:
+            self._timer = self._loop.call_soon(self._flush)
+        if batch:
+            task = self._loop.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[tuple]):
+        texts = [text for text, _ in batch]
+        try:
+            vectors = await self._loop.run_in_executor(self._executor, self._encode, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.texts += len(texts)
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        vectors = self.provider.encode(texts)
+        if self.cache is not None:
+            self.cache.put_many(texts, vectors)
+        return vectors
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch_size": self.texts / self.batches if self.batches else 0.0,
+            "pending": len(self._pending),
+        }
+
+
+embedding_batcher = EmbeddingBatcher(embedding_provider, cache=embedding_cache)
+
+
+async def generate_embedding_async(text: str) -> List[float]:
+    """Async, batched counterpart of utils.embeddings.generate_embedding"""
+    vector = (await generate_embeddings_async([text]))[0]
+    return [] if vector is None else vector.tolist()
+
+
+async def generate_embeddings_async(texts: List[str]) -> List[Optional[np.ndarray]]:
+    """Embed many texts at once, serving repeats from the cache (None for blank text)"""
+    vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+    wanted = [i for i, text in enumerate(texts) if text and text.strip()]
+    cached = await embedding_batcher.cached([texts[i] for i in wanted])
+    missing = []
+    for i, vector in zip(wanted, cached):
+        if vector is None:
+            missing.append(i)
+        vectors[i] = vector
+
+    if missing:
+        # Cached (memory and disk) by the thread that encodes the batch
+        encoded = await embedding_batcher.embed_many([texts[i] for i in missing])
+        for i, vector in zip(missing, encoded):
+            vectors[i] = vector
+    return vectors
@@ -0,0 +1,195 @@
+"""
+Content-hash cache in front of the embedding model.
+
+Entries are keyed by sha256(model name + normalized text), so re-importing a
+paper into another workspace or repeating a common chat question does not
+re-run the model. A bounded in-memory LRU tier sits on top of a persistent
+SQLite tier; rows written by a different model name are purged when the
+cache is opened, so switching EMBEDDING_MODEL invalidates it automatically.
+
+The memory tier never touches the disk (``get_memory``), so async code can
+use it on the event loop; the ``*_many`` methods do the SQLite I/O for a
+whole batch and belong in a worker thread. The disk tier keeps at most
+EMBEDDING_CACHE_DISK_SIZE rows, dropping the least recently written.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+
+from core.database import DATA_DIR
+from utils.vector_codec import decode_embedding, encode_embedding
+
+load_dotenv()
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_DISK_SIZE = int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", "500000"))
+# Empty string disables the persistent tier
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(DATA_DIR, "embedding_cache.sqlite3"))
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for hashing: NFC, collapsed whitespace"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """LRU memory tier backed by an optional SQLite tier"""
+
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: int = EMBEDDING_CACHE_SIZE,
+        path: Optional[str] = None,
+        max_disk_entries: int = EMBEDDING_CACHE_DISK_SIZE,
+    ):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.path = path
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()  # memory tier and counters
+        self._disk_lock = threading.Lock()  # SQLite connection
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_rows = 0  # upper bound; recounted before evicting
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+    def _disk(self) -> Optional[sqlite3.Connection]:
+        if self._db is None and self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key BLOB PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL)"
+            )
+            db.execute("DELETE FROM embeddings WHERE model != ?", (self.model_name,))
+            self._disk_rows = db.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+            self._db = db
+        return self._db
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Memory, then disk (blocking I/O)"""
+        vector = self.get_memory(text)
+        return vector if vector is not None else self.get_disk_many([text])[0]
+
+    def put(self, text: str, vector) -> None:
+        """Memory and disk (blocking I/O)"""
+        self.put_many([text], [vector])
+
+    def get_memory(self, text: str) -> Optional[np.ndarray]:
+        """Memory tier only: no I/O, safe on the event loop. Misses are counted by get_disk_many."""
+        key = self.key(text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return vector
+
+    def get_disk_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Disk lookups for texts that missed the memory tier, in one query; hits are promoted to memory"""
+        keys = [self.key(text) for text in texts]
+        rows = {}
+        if self.path and keys:
+            with self._disk_lock:
+                db = self._disk()
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    rows.update(db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+                    ).fetchall())
+        vectors = [decode_embedding(rows[key]) if key in rows else None for key in keys]
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self.disk_hits += 1
+                    self._remember(key, vector)
+        return vectors
+
+    def put_many(self, texts: Sequence[str], vectors) -> None:
+        """Store a batch in memory and, in one transaction, on disk"""
+        keys = [self.key(text) for text in texts]
+        vectors = [np.array(vector, dtype=np.float32) for vector in vectors]  # copy: don't pin the whole batch
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+        if not self.path or not keys:
+            return
+        with self._disk_lock:
+            db = self._disk()
+            db.execute("BEGIN")
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+                [(key, self.model_name, encode_embedding(vector, "float32")) for key, vector in zip(keys, vectors)],
+            )
+            db.execute("COMMIT")
+            self._disk_rows += len(keys)
+            if self._disk_rows > self.max_disk_entries:
+                self._evict_disk(db)
+
+    def _evict_disk(self, db: sqlite3.Connection):
+        # INSERT OR REPLACE gives a rewritten row a new rowid, so the lowest rowids were written longest ago
+        self._disk_rows = db.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+        excess = self._disk_rows - self.max_disk_entries
+        if excess > 0:
+            # Trim an extra 10% so the next few batches do not evict again
+            excess += self.max_disk_entries // 10
+            db.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)", (excess,)
+            )
+            self._disk_rows = db.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+            with self._lock:
+                self.disk_evictions += excess
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self.path:
+            with self._disk_lock:
+                self._disk().execute("DELETE FROM embeddings")
+                self._disk_rows = 0
+
+    def stats(self) -> dict:
+        disk_entries = 0
+        if self.path:
+            with self._disk_lock:
+                disk_entries = self._disk().execute("SELECT count(*) FROM embeddings").fetchone()[0]
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "model": self.model_name,
+                "memory_entries": len(self._memory),
+                "memory_capacity": self.max_entries,
+                "disk_entries": disk_entries,
+                "disk_capacity": self.max_disk_entries if self.path else 0,
+                "disk_evictions": self.disk_evictions,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,270 @@
+"""
+Shared embedding model server.
+
+With EMBEDDING_SERVER=/path/to.sock, worker processes do not load their own
+SentenceTransformer: ``EmbeddingProvider`` gets an ``EmbeddingClient`` whose
+``encode`` sends the texts over a Unix socket to one model process. The
+server batches concurrent requests from all workers (utils.embedding_batcher)
+and runs the model with EMBEDDING_THREADS torch threads, so N workers cost
+one model's memory and do not oversubscribe the CPU.
+
+Start it next to the app:
+    python -m utils.embedding_server [--socket /tmp/researchpilot-embeddings.sock]
+or leave EMBEDDING_SERVER_AUTOSTART on: the first worker that needs the model
+starts a server (a lock file makes concurrent workers start only one). An
+autostarted server outlives the workers and is reused by the next start.
+
+Wire format, both ways: a 4-byte big-endian length and a JSON header; a
+response with "shape" is followed by the float32 matrix it describes.
+
+    request   {"texts": [...]}  |  {"op": "status"}
+    response  {"shape": [n, dim]} + n*dim*4 bytes  |  {"status": {...}}  |  {"error": "..."}
+"""
+import argparse
+import asyncio
+import fcntl
+import json
+import os
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from utils.embedding_batcher import EmbeddingBatcher
+from utils.embeddings import EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME, EmbeddingProvider
+
+load_dotenv()
+
+EMBEDDING_SERVER_AUTOSTART = os.getenv("EMBEDDING_SERVER_AUTOSTART", "true").lower() in ("1", "true", "yes")
+EMBEDDING_SERVER_TIMEOUT = float(os.getenv("EMBEDDING_SERVER_TIMEOUT", "60"))  # seconds per encode call
+EMBEDDING_SERVER_START_TIMEOUT = float(os.getenv("EMBEDDING_SERVER_START_TIMEOUT", "300"))
+DEFAULT_SOCKET = "/tmp/researchpilot-embeddings.sock"
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LENGTH = struct.Struct(">I")
+
+
+# =========================
+# FRAMING
+# =========================
+def _send(sock: socket.socket, header: dict, payload: bytes = b""):
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(_LENGTH.pack(len(data)) + data + payload)
+
+
+def _recv_exactly(sock: socket.socket, n: int) -> bytes:
+    buffer = bytearray(n)
+    view = memoryview(buffer)
+    while view:
+        received = sock.recv_into(view)
+        if not received:
+            raise ConnectionResetError("embedding server closed the connection")
+        view = view[received:]
+    return bytes(buffer)
+
+
+def _recv(sock: socket.socket) -> Tuple[dict, bytes]:
+    length, = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+    header = json.loads(_recv_exactly(sock, length))
+    payload = b""
+    if "shape" in header:
+        rows, dim = header["shape"]
+        payload = _recv_exactly(sock, rows * dim * 4)
+    return header, payload
+
+
+# =========================
+# CLIENT
+# =========================
+class EmbeddingClient:
+    """Stands in for the SentenceTransformer model; one connection per calling thread"""
+
+    def __init__(self, path: str, timeout: float = EMBEDDING_SERVER_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _call(self, request: dict) -> Tuple[dict, bytes]:
+        # One retry on a fresh connection: a kept-alive socket goes stale
+        # when the server restarts. Timeouts are not retried.
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                _send(sock, request)
+                header, payload = _recv(sock)
+            except ConnectionError:
+                self._close()
+                if attempt:
+                    raise
+                continue
+            except OSError:
+                self._close()
+                raise
+            if "error" in header:
+                raise RuntimeError(f"embedding server: {header['error']}")
+            return header, payload
+
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        """Same contract as SentenceTransformer.encode; the server picks the batch size"""
+        header, payload = self._call({"texts": list(texts)})
+        return np.frombuffer(payload, dtype="<f4").reshape(header["shape"])
+
+    def status(self) -> dict:
+        header, _ = self._call({"op": "status"})
+        return header["status"]
+
+
+def _alive(path: str) -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(2)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def _start_server(path: str):
+    """Start a server on ``path`` unless another process did; blocks until it accepts"""
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)  # released when the file is closed
+        if _alive(path):
+            return
+        process = subprocess.Popen(
+            [sys.executable, "-m", "utils.embedding_server", "--socket", path],
+            cwd=BACKEND_DIR, stdin=subprocess.DEVNULL, start_new_session=True,
+        )
+        deadline = time.monotonic() + EMBEDDING_SERVER_START_TIMEOUT
+        while not _alive(path):
+            if process.poll() is not None:
+                raise RuntimeError(f"embedding server exited with status {process.returncode}")
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"embedding server not up after {EMBEDDING_SERVER_START_TIMEOUT:.0f}s")
+            time.sleep(0.1)
+
+
+def connect(path: str, model_name: str) -> EmbeddingClient:
+    """Client for the server on ``path`` (started if needed), checked to serve ``model_name``"""
+    if EMBEDDING_SERVER_AUTOSTART and not _alive(path):
+        _start_server(path)
+    client = EmbeddingClient(path)
+    served = client.status()["model"]
+    if served != model_name:
+        # Vectors from another model would not be comparable with the stored ones
+        raise RuntimeError(f"embedding server on {path} serves {served}, expected {model_name}")
+    return client
+
+
+# =========================
+# SERVER
+# =========================
+class EmbeddingServer:
+    """Serves one EmbeddingProvider to every worker over a Unix socket"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.provider = EmbeddingProvider(EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND)  # always in-process
+        self.batcher = EmbeddingBatcher(self.provider)
+        self.connections = 0
+        self.requests = 0
+
+    def status(self) -> dict:
+        return {
+            **self.provider.status(),
+            **self.batcher.stats(),
+            "pid": os.getpid(),
+            "connections": self.connections,
+            "requests": self.requests,
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    length, = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                    request = json.loads(await reader.readexactly(length))
+                except asyncio.IncompleteReadError:
+                    break
+                writer.write(await self._respond(request))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _respond(self, request: dict) -> bytes:
+        payload = b""
+        if request.get("op") == "status":
+            header = {"status": self.status()}
+        else:
+            self.requests += 1
+            try:
+                texts = request["texts"]
+                vectors = await self.batcher.embed_many(texts) if texts else []
+                matrix = np.stack(vectors).astype("<f4") if vectors else np.zeros((0, 0), dtype="<f4")
+                header, payload = {"shape": list(matrix.shape)}, matrix.tobytes()
+            except Exception as e:
+                header = {"error": f"{type(e).__name__}: {e}"}
+        data = json.dumps(header).encode("utf-8")
+        return _LENGTH.pack(len(data)) + data + payload
+
+    async def serve(self):
+        # Load before listening: a connectable socket means a ready model
+        await asyncio.get_running_loop().run_in_executor(None, self.provider.warm_up)
+        if os.path.exists(self.path):
+            if _alive(self.path):
+                raise SystemExit(f"an embedding server is already listening on {self.path}")
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, 0o600)
+        print(f"embedding server: {self.provider.model_name} on {self.path} (pid {os.getpid()})", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", default=os.getenv("EMBEDDING_SERVER") or DEFAULT_SOCKET)
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    server = EmbeddingServer(args.socket)
+    try:
+        asyncio.run(server.serve())
+    finally:
+        if os.path.exists(args.socket) and not _alive(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
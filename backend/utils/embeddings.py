@@ -1,19 +1,176 @@
-from sentence_transformers import SentenceTransformer
+"""
+Embedding model provider.
+
+The SentenceTransformer model is no longer built at import time: it is loaded
+lazily on first use, or ahead of time (optionally in a background thread)
+through ``embedding_provider.warm_up`` from the FastAPI lifespan. With
+EMBEDDING_SERVER set, "the model" is a client of the shared model process in
+utils.embedding_server instead, so worker processes do not each load a copy.
+"""
+import os
+import threading
+import time
+from typing import List, Optional
+
 import numpy as np
-from typing import List
+from dotenv import load_dotenv
+
+from utils.embedding_cache import EmbeddingCache, EMBEDDING_CACHE_PATH
+from utils.retrieval import normalize_rows, top_k_indices
+
+load_dotenv()
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# torch | quantized (int8 dynamic quantization) | onnx | openvino
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# background | eager | lazy
+EMBEDDING_PRELOAD = os.getenv("EMBEDDING_PRELOAD", "background")
+# Unix socket of a shared model process (utils.embedding_server); empty = model in this process
+EMBEDDING_SERVER = os.getenv("EMBEDDING_SERVER", "")
+# torch intra-op threads for the model (0 = torch default, one per core)
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+
+
+class EmbeddingProvider:
+    """Owns the embedding model and tracks its lifecycle state"""
+
+    NOT_LOADED = "not_loaded"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, model_name: str, backend: str = "torch", server: Optional[str] = None):
+        self.model_name = model_name
+        self.backend = backend
+        self.server = server or None
+        self.state = self.NOT_LOADED
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        if self.server:
+            from utils.embedding_server import connect
+            return connect(self.server, self.model_name)
+
+        # Imported here so that importing this module never pays for torch
+        from sentence_transformers import SentenceTransformer
+
+        if EMBEDDING_THREADS:
+            import torch
+            torch.set_num_threads(EMBEDDING_THREADS)
+
+        if self.backend in ("onnx", "openvino"):
+            # Requires sentence-transformers>=3.2 with the optimum extras
+            return SentenceTransformer(self.model_name, device="cpu", backend=self.backend)
+
+        model = SentenceTransformer(self.model_name, device="cpu")
+        if self.backend == "quantized":
+            import torch
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif self.backend != "torch":
+            raise ValueError(f"Unknown EMBEDDING_BACKEND: {self.backend}")
+        return model
+
+    def load(self):
+        """Load the model once; concurrent callers wait for the first load"""
+        if self._model is not None:
+            return self._model
+
+        with self._lock:
+            if self._model is None:
+                self.state = self.LOADING
+                start = time.perf_counter()
+                try:
+                    self._model = self._build()
+                except Exception as e:
+                    self.state = self.FAILED
+                    self.error = str(e)
+                    raise
+                self.load_seconds = time.perf_counter() - start
+                self.state = self.READY
+        return self._model
 
-# Load the embedding model (lightweight and efficient)
-model = SentenceTransformer('all-MiniLM-L6-v2')
+    def warm_up(self):
+        """Load the model and run one encode so the first request is not cold"""
+        self.load()
+        start = time.perf_counter()
+        self.encode(["warm up"])
+        self.warmup_seconds = time.perf_counter() - start
+
+    def start_background_load(self) -> threading.Thread:
+        """Warm the model up in a daemon thread without blocking startup"""
+        def run():
+            try:
+                self.warm_up()
+            except Exception:
+                pass  # state/error are recorded by load()
+
+        thread = threading.Thread(target=run, name="embedding-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def ready(self) -> bool:
+        return self.state == self.READY
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Encode a batch of texts into a float32 (n, dim) matrix"""
+        model = self.load()
+        embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def status(self) -> dict:
+        return {
+            "model": self.model_name,
+            "backend": self.backend,
+            "server": self.server,
+            "state": self.state,
+            "error": self.error,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+        }
+
+
+embedding_provider = EmbeddingProvider(EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, EMBEDDING_SERVER)
+embedding_cache = EmbeddingCache(EMBEDDING_MODEL_NAME, path=EMBEDDING_CACHE_PATH or None)
 
 
 def generate_embedding(text: str) -> List[float]:
     """Generate embedding vector for a given text"""
     if not text or not text.strip():
         return []
-    embedding = model.encode(text, convert_to_numpy=True)
+    embedding = embedding_cache.get(text)
+    if embedding is None:
+        embedding = embedding_provider.encode([text])[0]
+        embedding_cache.put(text, embedding)
     return embedding.tolist()
 
 
+def generate_embeddings(texts: List[str]) -> List[Optional[np.ndarray]]:
+    """Batch counterpart of generate_embedding for worker threads (None for blank text)"""
+    vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+    wanted = [i for i, text in enumerate(texts) if text and text.strip()]
+    missing = []
+    for i in wanted:
+        vectors[i] = embedding_cache.get_memory(texts[i])
+        if vectors[i] is None:
+            missing.append(i)
+    if missing:
+        found = embedding_cache.get_disk_many([texts[i] for i in missing])
+        for i, vector in zip(missing, found):
+            vectors[i] = vector
+        missing = [i for i in missing if vectors[i] is None]
+    if missing:
+        encoded = embedding_provider.encode([texts[i] for i in missing])
+        embedding_cache.put_many([texts[i] for i in missing], encoded)
+        for i, vector in zip(missing, encoded):
+            vectors[i] = vector
+    return vectors
+
+
 def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     """Calculate cosine similarity between two vectors"""
     if not vec1 or not vec2:
@@ -36,17 +193,15 @@ def find_similar_papers(query_embedding: List[float], papers_with_embeddings: Li
     """Find most similar papers based on embedding similarity"""
     if not query_embedding:
         return []
-    
-    similarities = []
-    for paper in papers_with_embeddings:
-        if paper.get('embedding'):
-            similarity = cosine_similarity(query_embedding, paper['embedding'])
-            similarities.append({
-                'paper': paper,
-                'similarity': similarity
-            })
-    
-    # Sort by similarity score
-    similarities.sort(key=lambda x: x['similarity'], reverse=True)
-    
-    return [item['paper'] for item in similarities[:top_k]]
+
+    candidates = [paper for paper in papers_with_embeddings if paper.get('embedding')]
+    if not candidates:
+        return []
+
+    # One normalized matrix and a single matrix-vector product instead of
+    # a cosine_similarity call per paper
+    matrix = normalize_rows(np.asarray([p['embedding'] for p in candidates], dtype=np.float32))
+    query = normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+    scores = matrix @ query
+
+    return [candidates[i] for i in top_k_indices(scores, top_k)]
@@ -0,0 +1,420 @@
+"""
+Full-text ingestion and chunk retrieval.
+
+For every imported paper with a URL, the open-access PDF is streamed to a
+temporary file (or read in place from FULLTEXT_LOCAL_DIR), its text is
+extracted one page at a time, split into overlapping word windows, embedded
+in batches on the ingest worker threads and stored as PaperChunk rows
+plus a per-workspace chunk index. Only one page of text and one embedding
+batch are held in memory at a time, and up to FULLTEXT_WORKERS papers are
+processed in parallel.
+
+Paper URLs are user input, so downloads only go to public addresses: the
+host is resolved and every address checked before connecting (and again for
+each redirect, which is followed by hand), and the connection is made to the
+checked address so a second DNS answer cannot point it elsewhere.
+
+Chat retrieval then searches the chunk index and packs the best passages
+into the prompt under a token budget.
+"""
+import asyncio
+import ipaddress
+import os
+import re
+import socket
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from importlib.util import find_spec
+from typing import Awaitable, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import unquote, urlparse
+
+import httpx
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from models.paper import Paper, PaperChunk
+from utils.ann_index import IVFIndex, get_workspace_index
+from utils.embeddings import EMBEDDING_MODEL_NAME, embedding_provider
+from utils.history import estimate_tokens
+from utils.jobs import JobContext, job_handler
+from utils.response_cache import bump_content_version
+from utils.vector_codec import decode_matrix, encode_embedding
+
+load_dotenv()
+
+FULLTEXT_INGEST = os.getenv("FULLTEXT_INGEST", "true").lower() in ("1", "true", "yes")
+FULLTEXT_WORKERS = int(os.getenv("FULLTEXT_WORKERS", "4"))
+FULLTEXT_CHUNK_WORDS = int(os.getenv("FULLTEXT_CHUNK_WORDS", "200"))
+FULLTEXT_CHUNK_OVERLAP = int(os.getenv("FULLTEXT_CHUNK_OVERLAP", "40"))
+FULLTEXT_EMBED_BATCH = int(os.getenv("FULLTEXT_EMBED_BATCH", "64"))
+FULLTEXT_MAX_BYTES = int(os.getenv("FULLTEXT_MAX_BYTES", str(50 * 1024 * 1024)))
+FULLTEXT_MAX_PAGES = int(os.getenv("FULLTEXT_MAX_PAGES", "200"))
+FULLTEXT_TIMEOUT = float(os.getenv("FULLTEXT_TIMEOUT", "30"))
+FULLTEXT_TOP_K = int(os.getenv("FULLTEXT_TOP_K", "20"))
+# Directory that file:// URLs may point into (unset = local files are refused)
+FULLTEXT_LOCAL_DIR = os.getenv("FULLTEXT_LOCAL_DIR")
+FULLTEXT_MAX_REDIRECTS = int(os.getenv("FULLTEXT_MAX_REDIRECTS", "5"))
+# Also download from loopback / private / link-local addresses (local testing only)
+FULLTEXT_ALLOW_PRIVATE_HOSTS = os.getenv("FULLTEXT_ALLOW_PRIVATE_HOSTS", "false").lower() in ("1", "true", "yes")
+
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+_REFERENCES_RE = re.compile(r"^\s*(references|bibliography)\s*$", re.IGNORECASE | re.MULTILINE)
+_HYPHEN_BREAK_RE = re.compile(r"(\w)-\n(\w)")
+
+
+class NotAPdf(Exception):
+    """The URL did not lead to a readable PDF"""
+
+
+class BlockedHost(NotAPdf):
+    """The URL's host resolves to an address that is not public"""
+
+
+def is_public_address(address: str) -> bool:
+    """Globally routable unicast address (not loopback, private, link-local, metadata, ...)"""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+# =========================
+# TEXT PIPELINE
+# =========================
+def extract_pages(path: str, max_pages: int = FULLTEXT_MAX_PAGES) -> Iterator[Tuple[int, str]]:
+    """Yield (page number, text) one page at a time, stopping at the references"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    for number, page in enumerate(reader.pages, 1):
+        if number > max_pages:
+            return
+        text = _HYPHEN_BREAK_RE.sub(r"\1\2", page.extract_text() or "")
+        references = _REFERENCES_RE.search(text) if number > 1 else None
+        if references:
+            yield number, text[:references.start()]
+            return
+        yield number, text
+
+
+def iter_chunks(
+    pages: Iterable[Tuple[int, str]],
+    size: int = FULLTEXT_CHUNK_WORDS,
+    overlap: int = FULLTEXT_CHUNK_OVERLAP
+) -> Iterator[Tuple[int, str]]:
+    """Overlapping windows of ``size`` words; yields (start page, text)"""
+    step = max(1, size - overlap)
+    words: List[str] = []
+    word_pages: List[int] = []
+    emitted = False
+    for number, text in pages:
+        for word in text.split():
+            words.append(word)
+            word_pages.append(number)
+            if len(words) == size:
+                yield word_pages[0], " ".join(words)
+                emitted = True
+                del words[:step], word_pages[:step]
+    # The tail only holds new words if it is longer than the overlap
+    if words and (not emitted or len(words) > size - step):
+        yield word_pages[0], " ".join(words)
+
+
+# =========================
+# INGESTION
+# =========================
+class FulltextIngestor:
+    """Fetches, chunks and embeds paper PDFs with a bounded number of workers"""
+
+    def __init__(self, workers: int = FULLTEXT_WORKERS):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fulltext")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self.metrics = {
+            "papers": 0, "indexed": 0, "empty": 0, "no_pdf": 0, "failed": 0, "blocked": 0, "chunks": 0, "bytes": 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return FULLTEXT_INGEST and find_spec("pypdf") is not None
+
+    def _bind(self):
+        # The semaphore and HTTP client belong to one event loop
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.workers)
+            # Redirects are followed by _pdf_file, which checks every hop
+            self._client = httpx.AsyncClient(
+                timeout=FULLTEXT_TIMEOUT,
+                follow_redirects=False,
+                headers={"User-Agent": "ResearchPilot/1.0"},
+            )
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+    async def ingest(self, paper_ids: Sequence[int], on_paper: Optional[Callable[[], Awaitable]] = None):
+        """Ingest the full text of the given papers, FULLTEXT_WORKERS at a time (awaiting ``on_paper`` after each)"""
+        self._bind()
+
+        async def one(paper_id: int):
+            await self._ingest_one(paper_id)
+            if on_paper is not None:
+                await on_paper()
+
+        await asyncio.gather(*(one(paper_id) for paper_id in paper_ids))
+
+    async def _ingest_one(self, paper_id: int):
+        async with self._slots:
+            # Database work runs on the worker threads, never on the event loop
+            paper = await self._loop.run_in_executor(self._executor, _load_paper, paper_id)
+            if paper is None:
+                return
+
+            self.metrics["papers"] += 1
+            try:
+                async with self._pdf_file(paper.url) as path:
+                    chunks = await self._loop.run_in_executor(
+                        self._executor, self._index_file, paper_id, paper.workspace_id, path
+                    )
+                status = "indexed" if chunks else "empty"
+            except BlockedHost:
+                self.metrics["blocked"] += 1
+                status = "no_pdf"
+            except NotAPdf:
+                status = "no_pdf"
+            except Exception:
+                status = "failed"
+            self.metrics[status] += 1
+
+            await self._loop.run_in_executor(self._executor, _set_status, paper_id, paper.workspace_id, status)
+
+    async def _connect_address(self, url: httpx.URL) -> str:
+        """A checked address of ``url``'s host to connect to; BlockedHost if any is not public"""
+        port = url.port or (443 if url.scheme == "https" else 80)
+        try:
+            infos = await self._loop.getaddrinfo(url.host, port, type=socket.SOCK_STREAM)
+        except socket.gaierror:
+            raise NotAPdf(f"{url}: cannot resolve host")
+        addresses = [info[4][0] for info in infos]
+        # All of them: the host may resolve to a public and a private address
+        if not addresses or not (FULLTEXT_ALLOW_PRIVATE_HOSTS or all(map(is_public_address, addresses))):
+            raise BlockedHost(f"{url}: not a public address")
+        return addresses[0]
+
+    @asynccontextmanager
+    async def _pdf_file(self, url: Optional[str]):
+        """Path of the PDF behind ``url``: a local file, or a streamed temporary download"""
+        parsed = urlparse(url or "")
+        if parsed.scheme == "file":
+            path = os.path.realpath(unquote(parsed.path))
+            root = os.path.realpath(FULLTEXT_LOCAL_DIR) if FULLTEXT_LOCAL_DIR else None
+            if root is None or os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+                raise NotAPdf(url)
+            _check_magic(path)
+            yield path
+            return
+        if parsed.scheme not in ("http", "https"):
+            raise NotAPdf(url)
+
+        fd, path = tempfile.mkstemp(suffix=".pdf", prefix="paper_")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                size = await self._download(httpx.URL(url), out)
+            self.metrics["bytes"] += size
+            _check_magic(path)
+            yield path
+        finally:
+            os.unlink(path)
+
+    async def _download(self, url: httpx.URL, out) -> int:
+        """Stream ``url`` into ``out``, following up to FULLTEXT_MAX_REDIRECTS checked redirects"""
+        for _ in range(FULLTEXT_MAX_REDIRECTS + 1):
+            if url.scheme not in ("http", "https"):
+                raise NotAPdf(f"{url}: unsupported scheme")
+            address = await self._connect_address(url)
+            # Connect to the checked address; Host and TLS SNI (and certificate check) use the name
+            async with self._client.stream(
+                "GET",
+                url.copy_with(host=address),
+                headers={"Host": url.netloc.decode("ascii")},
+                extensions={"sni_hostname": url.host} if url.scheme == "https" else None,
+            ) as response:
+                if response.is_redirect:
+                    url = url.join(response.headers["Location"])
+                    continue
+                if response.status_code != 200:
+                    raise NotAPdf(f"{url}: HTTP {response.status_code}")
+                size = 0
+                async for block in response.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+                    size += len(block)
+                    if size > FULLTEXT_MAX_BYTES:
+                        raise NotAPdf(f"{url}: larger than {FULLTEXT_MAX_BYTES} bytes")
+                    out.write(block)
+                return size
+        raise NotAPdf(f"{url}: more than {FULLTEXT_MAX_REDIRECTS} redirects")
+
+    def _index_file(self, paper_id: int, workspace_id: int, path: str) -> int:
+        """Worker thread: extract, chunk, embed and store one PDF; returns the chunk count"""
+        with SessionLocal() as db:
+            # Bootstrapped first, so the chunks added below join the workspace's existing ones
+            index = get_chunk_index(db, workspace_id)
+            old = [row[0] for row in db.query(PaperChunk.id).filter(PaperChunk.paper_id == paper_id)]
+            if old:
+                db.query(PaperChunk).filter(PaperChunk.paper_id == paper_id).delete(synchronize_session=False)
+                db.commit()
+                index.remove(old)
+
+            stored = 0
+            try:
+                batch = []
+                for ordinal, (page, text) in enumerate(iter_chunks(extract_pages(path))):
+                    batch.append((ordinal, page, text))
+                    if len(batch) >= FULLTEXT_EMBED_BATCH:
+                        stored += self._store_batch(db, index, paper_id, workspace_id, batch)
+                        batch = []
+                if batch:
+                    stored += self._store_batch(db, index, paper_id, workspace_id, batch)
+            except Exception:
+                # Do not leave half a paper behind
+                ids = [row[0] for row in db.query(PaperChunk.id).filter(PaperChunk.paper_id == paper_id)]
+                db.query(PaperChunk).filter(PaperChunk.paper_id == paper_id).delete(synchronize_session=False)
+                db.commit()
+                index.remove(ids)
+                raise
+        self.metrics["chunks"] += stored
+        return stored
+
+    def _store_batch(self, db: Session, index: IVFIndex, paper_id: int, workspace_id: int, batch: list) -> int:
+        texts = [text for _, _, text in batch]
+        # Encoded right here, so FULLTEXT_WORKERS papers embed in parallel instead of
+        # queueing on the request batcher; chunks bypass the embedding cache so they
+        # do not evict query embeddings
+        vectors = embedding_provider.encode(texts)
+
+        ids = db.scalars(
+            insert(PaperChunk).returning(PaperChunk.id, sort_by_parameter_order=True),
+            [
+                {
+                    "paper_id": paper_id,
+                    "workspace_id": workspace_id,
+                    "ordinal": ordinal,
+                    "page": page,
+                    "content": text,
+                    "token_count": estimate_tokens(text),
+                    "embedding": encode_embedding(vector),
+                }
+                for (ordinal, page, text), vector in zip(batch, vectors)
+            ]
+        ).all()
+        db.commit()
+        index.add(ids, np.vstack(vectors))
+        return len(ids)
+
+    def stats(self) -> dict:
+        return {**self.metrics, "enabled": self.enabled, "workers": self.workers}
+
+
+def _load_paper(paper_id: int):
+    with SessionLocal() as db:
+        return db.query(Paper.url, Paper.workspace_id).filter(Paper.id == paper_id).first()
+
+
+def _set_status(paper_id: int, workspace_id: int, status: str):
+    with SessionLocal() as db:
+        db.query(Paper).filter(Paper.id == paper_id).update(
+            {"fulltext_status": status}, synchronize_session=False
+        )
+        if status == "indexed":
+            # New passages change what chat answers are grounded on
+            bump_content_version(db, workspace_id)
+        db.commit()
+
+
+def _check_magic(path: str):
+    with open(path, "rb") as f:
+        if f.read(5) != b"%PDF-":
+            raise NotAPdf(path)
+
+
+fulltext_ingestor = FulltextIngestor()
+
+
+def _pending_papers(paper_ids: List[int]) -> List[int]:
+    with SessionLocal() as db:
+        return [row[0] for row in db.query(Paper.id).filter(
+            Paper.id.in_(paper_ids),
+            Paper.fulltext_status == "pending"
+        )]
+
+
+@job_handler("fulltext")
+async def run_fulltext_job(job: JobContext) -> dict:
+    """Ingest the papers of a job that are still pending (so a retried job resumes)"""
+    total = len(job.payload["paper_ids"])
+    pending = await job.run_in_thread(_pending_papers, job.payload["paper_ids"])
+    done = total - len(pending)
+    await job.run_in_thread(job.progress, done, total)
+
+    async def heartbeat():
+        # Per paper, so requeue_stale() never mistakes a long job for a dead one
+        nonlocal done
+        done += 1
+        await job.run_in_thread(job.progress, done)
+
+    await fulltext_ingestor.ingest(pending, on_paper=heartbeat)
+    return {"ingested": len(pending)}
+
+
+# =========================
+# RETRIEVAL
+# =========================
+def get_chunk_index(db: Session, workspace_id: int) -> IVFIndex:
+    """Chunk index for a workspace, bootstrapped from the database on first use"""
+    index = get_workspace_index(workspace_id, "chunks")
+
+    def load():
+        # A new transaction, started under the rebuild lock: ``db`` may hold an older snapshot
+        with Session(bind=db.get_bind()) as session:
+            rows = session.query(PaperChunk.id, PaperChunk.embedding).join(Paper, Paper.id == PaperChunk.paper_id).filter(
+                PaperChunk.workspace_id == workspace_id,
+                PaperChunk.embedding.isnot(None),
+                Paper.embedding_model == EMBEDDING_MODEL_NAME
+            ).all()
+        return [r[0] for r in rows], decode_matrix(r[1] for r in rows)
+
+    index.bootstrap(load)
+    return index
+
+
+def search_chunks(db: Session, workspace_id: int, query, top_k: int = FULLTEXT_TOP_K) -> List[dict]:
+    """Best-matching passages in a workspace, best first"""
+    index = get_chunk_index(db, workspace_id)
+    if not len(index):
+        return []
+    hits = index.search(query, top_k=top_k)
+    rows = {
+        row.id: row for row in db.query(
+            PaperChunk.id, PaperChunk.paper_id, PaperChunk.page, PaperChunk.content, PaperChunk.token_count
+        ).filter(PaperChunk.id.in_([chunk_id for chunk_id, _ in hits]))
+    }
+    return [
+        {
+            "paper_id": rows[chunk_id].paper_id,
+            "page": rows[chunk_id].page,
+            "content": rows[chunk_id].content,
+            "tokens": rows[chunk_id].token_count,
+            "score": score,
+        }
+        for chunk_id, score in hits if chunk_id in rows
+    ]
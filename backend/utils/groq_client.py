@@ -1,13 +1,47 @@
-from groq import Groq
+from groq import AsyncGroq
 import os
+from collections import deque
 from dotenv import load_dotenv
 
 load_dotenv()
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Point at a local fake server in benchmarks; None uses the real Groq API
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+
+async_client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), base_url=GROQ_BASE_URL)
 
 MODEL_CONFIG = {
     "model": "llama-3.3-70b-versatile",
     "temperature": 0.3,
     "max_tokens": 2000
-}
\ No newline at end of file
+}
+
+# Prompt + completion tokens the model accepts; not an API parameter, so it
+# lives outside MODEL_CONFIG (which is splatted into every request)
+MODEL_CONTEXT_WINDOW = int(os.getenv("MODEL_CONTEXT_WINDOW", "131072"))
+
+
+class LLMStats:
+    """Rolling window of streaming time-to-first-token measurements"""
+
+    def __init__(self, window: int = 500):
+        self.first_token_ms = deque(maxlen=window)
+        self.streams = 0
+
+    def record_first_token(self, ms: float):
+        self.streams += 1
+        self.first_token_ms.append(ms)
+
+    def summary(self) -> dict:
+        samples = sorted(self.first_token_ms)
+
+        def pick(q):
+            return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else None
+
+        return {
+            "streams": self.streams,
+            "time_to_first_token_ms": {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)},
+        }
+
+
+llm_stats = LLMStats()
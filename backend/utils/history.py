@@ -0,0 +1,198 @@
+"""
+Conversation history for chat prompts.
+
+The newest HISTORY_MAX_TURNS messages are read through the
+(conversation_id, created_at DESC) index and trimmed, newest first, to a
+token budget that also respects the model's context window and
+``MODEL_CONFIG["max_tokens"]``. With HISTORY_SUMMARY enabled, turns that fall
+out of that window are folded into a rolling summary stored on the
+conversation, which is sent in their place.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.database import run_db
+from models.conversation import Conversation, Message
+from utils.groq_client import MODEL_CONFIG, MODEL_CONTEXT_WINDOW
+from utils.llm_limiter import llm_limiter
+
+load_dotenv()
+
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "20"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+HISTORY_SUMMARY = os.getenv("HISTORY_SUMMARY", "false").lower() in ("1", "true", "yes")
+HISTORY_SUMMARY_MIN_TURNS = int(os.getenv("HISTORY_SUMMARY_MIN_TURNS", "6"))
+HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "300"))
+SUMMARY_INPUT_TURNS = 50  # dropped turns folded in per refresh
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators around every chat message
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a researcher and a "
+    "research assistant. Merge the new turns into the current summary. Keep papers, "
+    "findings, decisions and open questions; drop pleasantries. Answer with the "
+    f"updated summary only, in at most {HISTORY_SUMMARY_MAX_TOKENS * 3 // 4} words."
+)
+
+history_stats = {"loads": 0, "truncated": 0, "summaries_used": 0, "summaries_refreshed": 0, "summary_errors": 0}
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate: words plus punctuation, but at least chars / 4"""
+    if not text:
+        return 0
+    return max(len(_TOKEN_RE.findall(text)), len(text) // 4)
+
+
+def message_tokens(message: dict) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def history_budget(prompt_tokens: int = 0) -> int:
+    """Tokens available for history next to a prompt of ``prompt_tokens``"""
+    room = MODEL_CONTEXT_WINDOW - MODEL_CONFIG["max_tokens"] - prompt_tokens
+    return max(0, min(HISTORY_TOKEN_BUDGET, room))
+
+
+@dataclass
+class History:
+    messages: List[dict] = field(default_factory=list)  # oldest first, Groq format
+    tokens: int = 0
+    truncated: bool = False       # older turns exist that are not in ``messages``
+    oldest_id: Optional[int] = None
+    needs_summary: bool = False   # enough dropped turns are missing from the summary
+
+
+def load_history(
+    db: Session,
+    conversation_id: int,
+    budget: int,
+    exclude_id: Optional[int] = None
+) -> History:
+    """Latest turns of a conversation that fit in ``budget`` tokens"""
+    query = db.query(Message.id, Message.role, Message.content).filter(
+        Message.conversation_id == conversation_id
+    )
+    if exclude_id is not None:
+        query = query.filter(Message.id != exclude_id)
+    rows = query.order_by(
+        Message.created_at.desc(), Message.id.desc()
+    ).limit(HISTORY_MAX_TURNS + 1).all()
+
+    summary, summary_through_id = None, None
+    if HISTORY_SUMMARY:
+        summary, summary_through_id = db.query(
+            Conversation.summary, Conversation.summary_through_id
+        ).filter(Conversation.id == conversation_id).one()
+    summary_message = {
+        "role": "system",
+        "content": f"Summary of the earlier conversation:\n{summary}"
+    } if summary else None
+
+    history = History(truncated=len(rows) > HISTORY_MAX_TURNS)
+    used = message_tokens(summary_message) if summary_message else 0
+    kept = []
+    for row in rows[:HISTORY_MAX_TURNS]:
+        message = {"role": row.role, "content": row.content}
+        cost = message_tokens(message)
+        if used + cost > budget:
+            history.truncated = True
+            break
+        kept.append(message)
+        history.oldest_id = row.id
+        used += cost
+    kept.reverse()
+
+    history_stats["loads"] += 1
+    if history.truncated:
+        history_stats["truncated"] += 1
+        if summary_message:
+            history_stats["summaries_used"] += 1
+            kept.insert(0, summary_message)
+        if HISTORY_SUMMARY:
+            history.needs_summary = _uncovered_turns(
+                db, conversation_id, summary_through_id, history.oldest_id
+            ) >= HISTORY_SUMMARY_MIN_TURNS
+
+    history.messages = kept
+    history.tokens = sum(message_tokens(m) for m in kept)
+    return history
+
+
+def _uncovered_query(db: Session, conversation_id: int, through_id: Optional[int], before_id: Optional[int]):
+    """Messages older than the window that the summary does not cover yet"""
+    query = db.query(Message).filter(Message.conversation_id == conversation_id)
+    if through_id is not None:
+        query = query.filter(Message.id > through_id)
+    if before_id is not None:
+        query = query.filter(Message.id < before_id)
+    return query
+
+
+def _uncovered_turns(db: Session, conversation_id: int, through_id: Optional[int], before_id: Optional[int]) -> int:
+    return _uncovered_query(db, conversation_id, through_id, before_id).with_entities(func.count(Message.id)).scalar()
+
+
+def _summary_input(db: Session, conversation_id: int):
+    """(summary, summary_through_id, turns to fold in), or None when there is nothing to do"""
+    conversation = db.get(Conversation, conversation_id)
+    if conversation is None:
+        return None
+    summary, through_id = conversation.summary, conversation.summary_through_id
+    window = load_history(db, conversation_id, history_budget())
+    if not window.truncated:
+        return None
+    turns = _uncovered_query(db, conversation_id, through_id, window.oldest_id).with_entities(
+        Message.id, Message.role, Message.content
+    ).order_by(Message.id).limit(SUMMARY_INPUT_TURNS).all()
+    return (summary, through_id, [tuple(turn) for turn in turns]) if turns else None
+
+
+def _save_summary(db: Session, conversation_id: int, through_id: Optional[int], summary: str, new_through_id: int) -> int:
+    """Store a refreshed summary unless a concurrent refresh got there first; returns rows updated"""
+    updated = db.query(Conversation).filter(
+        Conversation.id == conversation_id,
+        Conversation.summary_through_id.is_(None) if through_id is None
+        else Conversation.summary_through_id == through_id
+    ).update(
+        {"summary": summary, "summary_through_id": new_through_id},
+        synchronize_session=False
+    )
+    db.commit()
+    return updated
+
+
+async def refresh_summary(conversation_id: int, user_key: str):
+    """Fold turns that left the history window into the rolling summary (best effort)"""
+    loaded = await run_db(_summary_input, conversation_id)
+    if loaded is None:
+        return
+    summary, through_id, turns = loaded
+
+    transcript = "\n\n".join(f"{role}: {content}" for _, role, content in turns)
+    try:
+        response = await llm_limiter.complete(
+            user_key,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"},
+            ],
+            model=MODEL_CONFIG["model"],
+            temperature=0.2,
+            max_tokens=HISTORY_SUMMARY_MAX_TOKENS
+        )
+        new_summary = response.choices[0].message.content.strip()
+    except Exception:
+        history_stats["summary_errors"] += 1
+        return
+
+    updated = await run_db(_save_summary, conversation_id, through_id, new_summary, turns[-1][0])
+    if updated:
+        history_stats["summaries_refreshed"] += 1
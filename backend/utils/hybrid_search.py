@@ -0,0 +1,112 @@
+"""
+Hybrid lexical + semantic search over a workspace's papers.
+
+Lexical matches come from the database's own inverted index over title,
+abstract and authors (FTS5 ranked by BM25 on SQLite, a weighted tsvector with
+a GIN index on Postgres; see migration 5). The database keeps it up to date
+on every insert, update and delete. Lexical and vector rankings are combined
+by reciprocal-rank fusion, which needs no calibration between BM25 and cosine
+scores.
+"""
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from utils.ann_index import IVFIndex
+
+load_dotenv()
+
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))  # taken from each ranker
+RRF_K = int(os.getenv("RRF_K", "60"))
+MAX_QUERY_TERMS = 32
+
+SEARCH_MODES = ("hybrid", "semantic", "lexical")
+_WORD_RE = re.compile(r"\w+")
+_fts_ready: Dict[str, bool] = {}
+
+
+@dataclass
+class SearchHit:
+    paper_id: int
+    score: float
+    semantic_rank: Optional[int] = None  # 1-based
+    lexical_rank: Optional[int] = None
+
+
+def query_terms(query: str) -> List[str]:
+    return list(dict.fromkeys(_WORD_RE.findall(query.lower())))[:MAX_QUERY_TERMS]
+
+
+def _has_fts(db: Session) -> bool:
+    url = str(db.bind.url)
+    if url not in _fts_ready:
+        _fts_ready[url] = db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'papers_fts'")
+        ).first() is not None
+    return _fts_ready[url]
+
+
+def lexical_search(db: Session, workspace_id: int, query: str, limit: int = HYBRID_CANDIDATES) -> List[Tuple[int, float]]:
+    """Papers matching any query term, best first, as (paper id, relevance)"""
+    terms = query_terms(query)
+    if not terms:
+        return []
+
+    dialect = db.bind.dialect.name
+    if dialect == "sqlite" and _has_fts(db):
+        # Quoted terms cannot be parsed as FTS5 operators; title and authors weigh more
+        rows = db.execute(text(
+            "SELECT p.id, -bm25(papers_fts, 3.0, 1.0, 2.0) FROM papers_fts "
+            "JOIN papers p ON p.id = papers_fts.rowid "
+            "WHERE papers_fts MATCH :match AND p.workspace_id = :workspace_id "
+            "ORDER BY bm25(papers_fts, 3.0, 1.0, 2.0) LIMIT :limit"
+        ), {"match": " OR ".join(f'"{t}"' for t in terms), "workspace_id": workspace_id, "limit": limit})
+    elif dialect == "postgresql":
+        rows = db.execute(text(
+            "SELECT id, ts_rank_cd(search_vector, query) AS rank "
+            "FROM papers, (SELECT to_tsquery('english', :terms) || to_tsquery('simple', :terms) AS query) q "
+            "WHERE workspace_id = :workspace_id AND search_vector @@ query "
+            "ORDER BY rank DESC LIMIT :limit"
+        ), {"terms": " | ".join(terms), "workspace_id": workspace_id, "limit": limit})
+    else:
+        return []
+    return [(paper_id, float(score)) for paper_id, score in rows]
+
+
+def rrf_fuse(rankings: Sequence[Sequence[int]], k: int = RRF_K) -> List[Tuple[int, float]]:
+    """Reciprocal-rank fusion: sum of 1 / (k + rank) over the rankings, best first"""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+
+
+def hybrid_search(
+    db: Session,
+    workspace_id: int,
+    query: str,
+    query_vector,
+    index: IVFIndex,
+    top_k: int = 10,
+    mode: str = "hybrid"
+) -> List[SearchHit]:
+    """Fused vector + BM25 ranking of a workspace's papers (``mode`` can disable either side)"""
+    semantic: List[int] = []
+    if mode != "lexical" and query_vector is not None and len(query_vector) and len(index):
+        semantic = [paper_id for paper_id, _ in index.search(query_vector, top_k=max(top_k, HYBRID_CANDIDATES))]
+    lexical: List[int] = []
+    if mode != "semantic":
+        lexical = [paper_id for paper_id, _ in lexical_search(db, workspace_id, query, max(top_k, HYBRID_CANDIDATES))]
+
+    semantic_ranks = {paper_id: rank for rank, paper_id in enumerate(semantic, 1)}
+    lexical_ranks = {paper_id: rank for rank, paper_id in enumerate(lexical, 1)}
+    return [
+        SearchHit(paper_id, score, semantic_ranks.get(paper_id), lexical_ranks.get(paper_id))
+        for paper_id, score in rrf_fuse([semantic, lexical])[:top_k]
+    ]
@@ -0,0 +1,249 @@
+"""
+Database-backed background jobs.
+
+``enqueue`` stores a job row; a ``JobWorkerPool`` running inside the API
+process (JOB_WORKERS async workers, started from the lifespan) or inside an
+admin command claims queued jobs atomically and runs the handler registered
+for their kind with ``@job_handler``. Claiming and recording outcomes run on
+the pool's threads, and so should a handler's blocking work
+(``JobContext.run_in_thread``), including model calls: with one thread per
+worker, JOB_WORKERS jobs embed in parallel. Handlers report progress and
+checkpoints through ``JobContext.progress``; a job whose worker died (no
+heartbeat for JOB_STALE_SECONDS) is queued again and can resume from its
+last checkpoint.
+
+A job may fan out into child jobs: the parent then sits in ``waiting`` and is
+finished by the last child to complete.
+"""
+import asyncio
+import functools
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from models.job import Job
+
+load_dotenv()
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+QUEUED, RUNNING, WAITING, DONE, FAILED = "queued", "running", "waiting", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+HANDLERS: Dict[str, Callable[["JobContext"], Awaitable[Optional[dict]]]] = {}
+
+
+class WaitForChildren(Exception):
+    """Raised by a handler that enqueued child jobs and should finish with them"""
+
+
+def job_handler(kind: str):
+    """Register the coroutine that runs jobs of ``kind``"""
+    def decorator(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: dict,
+    user_id: Optional[int] = None,
+    parent_id: Optional[int] = None,
+    total: Optional[int] = None,
+    commit: bool = True
+) -> Job:
+    """Add a job to the queue; running pools in this process are woken up"""
+    job = Job(kind=kind, status=QUEUED, payload=json.dumps(payload), user_id=user_id, parent_id=parent_id, total=total)
+    db.add(job)
+    if commit:
+        db.commit()
+        db.refresh(job)
+        job_pool.notify()
+    return job
+
+
+def job_state(job: Job) -> dict:
+    return json.loads(job.result) if job.result else {}
+
+
+class JobContext:
+    """What a handler sees of its job: payload, checkpoint state and progress"""
+
+    def __init__(self, job: Job, pool: "JobWorkerPool"):
+        self.id = job.id
+        self.kind = job.kind
+        self.user_id = job.user_id
+        self.payload = json.loads(job.payload)
+        self.state = job_state(job)
+        self.pool = pool
+
+    def progress(self, done: int, total: Optional[int] = None, **checkpoint):
+        """Persist progress (and resumable checkpoint values) and refresh the heartbeat"""
+        self.state.update(checkpoint)
+        values = {"progress": done, "heartbeat_at": datetime.utcnow(), "result": json.dumps(self.state)}
+        if total is not None:
+            values["total"] = total
+        with SessionLocal() as db:
+            db.query(Job).filter(Job.id == self.id).update(values, synchronize_session=False)
+            db.commit()
+
+    async def run_in_thread(self, fn, *args, **kwargs):
+        """Run blocking work (model calls, bulk SQL, progress writes) on the pool's worker threads"""
+        return await asyncio.get_running_loop().run_in_executor(self.pool.executor, functools.partial(fn, *args, **kwargs))
+
+
+class JobWorkerPool:
+    """A fixed number of async workers claiming jobs from the ``jobs`` table"""
+
+    def __init__(self, workers: int = JOB_WORKERS, poll_seconds: float = JOB_POLL_SECONDS):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="job")
+        self.kinds: Optional[List[str]] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.metrics = {"claimed": 0, "done": 0, "failed": 0, "retried": 0, "requeued_stale": 0}
+
+    async def start(self, kinds: Optional[List[str]] = None):
+        """Requeue jobs abandoned by dead workers, then start the workers"""
+        if self._tasks or self.workers <= 0:
+            return
+        self.kinds = kinds
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self.requeue_stale()
+        self._tasks = [asyncio.create_task(self._work(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers (safe to call from any thread)"""
+        if self._loop is not None and self._wakeup is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def requeue_stale(self, stale_seconds: float = JOB_STALE_SECONDS) -> int:
+        """Put running jobs without a recent heartbeat back in the queue"""
+        cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+        with SessionLocal() as db:
+            stale = db.query(Job).filter(
+                Job.status == RUNNING,
+                func.coalesce(Job.heartbeat_at, Job.started_at) < cutoff
+            ).update({"status": QUEUED}, synchronize_session=False)
+            db.commit()
+        self.metrics["requeued_stale"] += stale
+        return stale
+
+    def _claim(self) -> Optional[Job]:
+        with SessionLocal() as db:
+            while True:
+                query = db.query(Job.id).filter(Job.status == QUEUED)
+                if self.kinds is not None:
+                    query = query.filter(Job.kind.in_(self.kinds))
+                job_id = query.order_by(Job.id).limit(1).scalar()
+                if job_id is None:
+                    return None
+                now = datetime.utcnow()
+                # Only one worker (in any process) wins the queued -> running transition
+                claimed = db.query(Job).filter(Job.id == job_id, Job.status == QUEUED).update(
+                    {"status": RUNNING, "started_at": now, "heartbeat_at": now, "attempts": Job.attempts + 1},
+                    synchronize_session=False
+                )
+                db.commit()
+                if claimed:
+                    self.metrics["claimed"] += 1
+                    return db.get(Job, job_id)
+
+    async def _work(self, number: int):
+        while True:
+            job = await self._loop.run_in_executor(self.executor, self._claim)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run(job)
+
+    async def run(self, job: Job):
+        """Run one claimed job and record its outcome"""
+        handler = HANDLERS.get(job.kind)
+        context = JobContext(job, self)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler for job kind {job.kind!r}")
+            result = await handler(context)
+            values = {"status": DONE, "result": json.dumps({**context.state, **(result or {})})}
+        except WaitForChildren:
+            values = {"status": WAITING, "result": json.dumps(context.state), "heartbeat_at": datetime.utcnow()}
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back to the queue
+            self._finish(job.id, {"status": QUEUED, "attempts": Job.attempts - 1})
+            raise
+        except Exception as e:
+            retry = job.attempts < JOB_MAX_ATTEMPTS and not isinstance(e, LookupError)
+            values = {"status": QUEUED if retry else FAILED, "error": f"{type(e).__name__}: {e}"}
+            if retry:
+                self.metrics["retried"] += 1
+        if values["status"] in FINISHED:
+            values["finished_at"] = datetime.utcnow()
+        await self._loop.run_in_executor(self.executor, self._record, job, values)
+        if values["status"] == QUEUED:
+            self.notify()
+
+    def _record(self, job: Job, values: dict):
+        """Store a job's outcome and update its waiting parent"""
+        self._finish(job.id, values)
+        if values["status"] in FINISHED:
+            self.metrics[values["status"]] += 1
+            if job.parent_id is not None:
+                self._finish_parent(job.parent_id)
+        elif values["status"] == WAITING:
+            # Children may all have finished before the parent started waiting
+            self._finish_parent(job.id)
+
+    def _finish(self, job_id: int, values: dict):
+        with SessionLocal() as db:
+            db.query(Job).filter(Job.id == job_id).update(values, synchronize_session=False)
+            db.commit()
+
+    def _finish_parent(self, parent_id: int):
+        """Update a waiting parent's progress; close it when no child is left"""
+        with SessionLocal() as db:
+            counts = dict(
+                db.query(Job.status, func.count(Job.id)).filter(Job.parent_id == parent_id).group_by(Job.status).all()
+            )
+            finished = sum(counts.get(status, 0) for status in FINISHED)
+            values = {"progress": finished, "heartbeat_at": datetime.utcnow()}
+            if finished == sum(counts.values()):
+                values["finished_at"] = datetime.utcnow()
+                values["status"] = FAILED if counts.get(FAILED) else DONE
+                if counts.get(FAILED):
+                    values["error"] = f"{counts[FAILED]} of {finished} child jobs failed"
+            db.query(Job).filter(Job.id == parent_id, Job.status == WAITING).update(values, synchronize_session=False)
+            db.commit()
+
+    def stats(self) -> dict:
+        with SessionLocal() as db:
+            counts = dict(db.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+        return {**self.metrics, "workers": len(self._tasks), "jobs": counts}
+
+
+job_pool = JobWorkerPool()
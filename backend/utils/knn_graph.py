@@ -0,0 +1,266 @@
+"""
+Per-workspace k-nearest-neighbour graph between papers ("related papers").
+
+Each paper keeps its KNN_GRAPH_K most similar papers (cosine over the
+embeddings) with their scores. The graph is built with blocked matrix
+products, GRAPH_BLOCK_ROWS rows against the whole workspace at a time, and
+then kept up to date incrementally:
+
+  insert  new rows get a full neighbour list; every existing row only
+          merges the new papers into its current list
+  delete  rows are dropped; only rows that listed a deleted paper are
+          recomputed, every other list is still exact
+
+The graph mirrors the workspace's paper index (utils.ann_index): it records
+the index version and the slot of each paper, and ``sync`` applies whatever
+changed since then, including writes made by other worker processes. It
+lives in memory only; a process builds it on first use.
+"""
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from utils.ann_index import IVFIndex
+from utils.retrieval import normalize_rows, top_k_indices
+
+load_dotenv()
+
+
+KNN_GRAPH_K = int(os.getenv("KNN_GRAPH_K", "10"))
+GRAPH_BLOCK_ROWS = 1024
+
+
+def _as_matrix(vectors) -> np.ndarray:
+    vectors = np.array(vectors, dtype=np.float32)
+    return normalize_rows(vectors.reshape(1, -1) if vectors.ndim == 1 else vectors)
+
+
+class KNNGraph:
+    """Exact top-k neighbour lists over one workspace's paper embeddings"""
+
+    def __init__(self, k: int = KNN_GRAPH_K):
+        self.k = k
+        self.version = None   # paper index version the graph reflects
+        self._lock = threading.RLock()
+        self._reset(0)
+
+    def _reset(self, dim: int, capacity: int = 0):
+        self.dim = dim
+        self._size = 0
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._slots = np.empty(capacity, dtype=np.int64)
+        self._vectors = np.empty((capacity, dim), dtype=np.float32)
+        self._neighbours = np.full((capacity, self.k), -1, dtype=np.int64)
+        self._scores = np.full((capacity, self.k), -np.inf, dtype=np.float32)
+        self._positions: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    # -------------------------
+    # blocked top-k
+    # -------------------------
+    def _top(self, scores: np.ndarray, self_columns: Optional[np.ndarray], candidate_ids: np.ndarray):
+        """Best k candidates per row of ``scores``, padded with (-1, -inf)"""
+        if self_columns is not None:
+            scores[np.arange(len(scores)), self_columns] = -np.inf
+        best = top_k_indices(scores, self.k)
+        ids = np.full((len(scores), self.k), -1, dtype=np.int64)
+        top = np.full((len(scores), self.k), -np.inf, dtype=np.float32)
+        ids[:, :best.shape[1]] = candidate_ids[best]
+        top[:, :best.shape[1]] = np.take_along_axis(scores, best, axis=1)
+        ids[~np.isfinite(top)] = -1
+        return ids, top
+
+    def _recompute(self, rows: np.ndarray):
+        """Neighbour lists of ``rows`` against every paper in the graph"""
+        vectors, ids = self._vectors[:self._size], self._ids[:self._size]
+        for start in range(0, len(rows), GRAPH_BLOCK_ROWS):
+            block = rows[start:start + GRAPH_BLOCK_ROWS]
+            scores = vectors[block] @ vectors.T
+            self._neighbours[block], self._scores[block] = self._top(scores, block, ids)
+
+    def _merge(self, rows: np.ndarray, new_rows: np.ndarray):
+        """Fold the papers in ``new_rows`` into the existing lists of ``rows``"""
+        new_vectors, new_ids = self._vectors[new_rows], self._ids[new_rows]
+        for start in range(0, len(rows), GRAPH_BLOCK_ROWS):
+            block = rows[start:start + GRAPH_BLOCK_ROWS]
+            scores = np.concatenate([self._scores[block], self._vectors[block] @ new_vectors.T], axis=1)
+            candidates = np.concatenate([self._neighbours[block], np.broadcast_to(new_ids, (len(block), len(new_ids)))], axis=1)
+            best = top_k_indices(scores, self.k)
+            ids = np.take_along_axis(candidates, best, axis=1)
+            top = np.take_along_axis(scores, best, axis=1)
+            ids[~np.isfinite(top)] = -1
+            self._neighbours[block], self._scores[block] = ids, top
+
+    # -------------------------
+    # mutation
+    # -------------------------
+    def _grow(self, needed: int):
+        capacity = max(len(self._ids), 256)
+        while capacity < needed:
+            capacity *= 2
+        if capacity == len(self._ids):
+            return
+        size = self._size
+        old = (self._ids, self._slots, self._vectors, self._neighbours, self._scores)
+        self._reset(self.dim, capacity)
+        self._size = size
+        for new, current in zip((self._ids, self._slots, self._vectors, self._neighbours, self._scores), old):
+            new[:size] = current[:size]
+        self._positions = dict(zip(self._ids[:size].tolist(), range(size)))
+
+    def rebuild(self, paper_ids: Sequence[int], vectors, slots: Optional[Sequence[int]] = None) -> None:
+        """Replace the graph with a full recompute over ``vectors``"""
+        vectors = _as_matrix(vectors)
+        with self._lock:
+            self._reset(vectors.shape[1], len(paper_ids))
+            self._size = len(paper_ids)
+            self._ids[:] = paper_ids
+            self._slots[:] = slots if slots is not None else -1
+            self._vectors[:] = vectors
+            self._positions = dict(zip(self._ids.tolist(), range(self._size)))
+            self._recompute(np.arange(self._size))
+
+    def add(self, paper_ids: Sequence[int], vectors, slots: Optional[Sequence[int]] = None) -> None:
+        """Insert papers (ids already in the graph are replaced)"""
+        vectors = _as_matrix(vectors)
+        with self._lock:
+            if not len(paper_ids):
+                return
+            if not self._size:
+                self.rebuild(paper_ids, vectors, slots)
+                return
+            self.remove([i for i in paper_ids if int(i) in self._positions])
+
+            start = self._size
+            self._grow(start + len(paper_ids))
+            new_rows = np.arange(start, start + len(paper_ids))
+            self._ids[new_rows] = paper_ids
+            self._slots[new_rows] = slots if slots is not None else -1
+            self._vectors[new_rows] = vectors
+            self._size += len(paper_ids)
+            self._positions.update(zip(self._ids[new_rows].tolist(), new_rows.tolist()))
+
+            self._merge(np.arange(start), new_rows)
+            self._recompute(new_rows)
+
+    def remove(self, paper_ids: Sequence[int]) -> int:
+        """Delete papers and repair the lists that pointed at them; returns how many were present"""
+        with self._lock:
+            gone = np.array([i for i in paper_ids if int(i) in self._positions], dtype=np.int64)
+            if not len(gone):
+                return 0
+            keep = np.ones(self._size, dtype=bool)
+            keep[[self._positions[int(i)] for i in gone]] = False
+            kept = np.flatnonzero(keep)
+            size = len(kept)
+            for array in (self._ids, self._slots, self._vectors, self._neighbours, self._scores):
+                array[:size] = array[kept]
+            self._size = size
+            self._positions = dict(zip(self._ids[:size].tolist(), range(size)))
+
+            stale = np.flatnonzero(np.isin(self._neighbours[:size], gone).any(axis=1))
+            self._recompute(stale)
+            return len(gone)
+
+    def sync(self, index: IVFIndex) -> None:
+        """Apply the paper index's changes since the last sync"""
+        with self._lock:
+            for _ in range(3):
+                version, ids, slots = index.live_slots()
+                if version == self.version:
+                    return
+                if self._apply(index, version, ids, slots):
+                    self.version = version
+                    return
+            # The index kept changing under us: take whatever it holds now
+            version, ids, slots = index.live_slots()
+            vectors = index.vectors_at(slots, version)
+            if vectors is not None:
+                self.rebuild(ids, vectors, slots)
+                self.version = version
+
+    def _apply(self, index: IVFIndex, version: int, ids: np.ndarray, slots: np.ndarray) -> bool:
+        if not self._size or index.meta["dim"] != self.dim:
+            vectors = index.vectors_at(slots, version)
+            if vectors is None:
+                return False
+            self.rebuild(ids, vectors, slots)
+            return True
+
+        known = self._ids[:self._size]
+        removed = np.setdiff1d(known, ids)
+        rows = np.array([self._positions.get(i, -1) for i in ids.tolist()], dtype=np.int64)
+        fresh = rows < 0
+        # A paper moves to a new slot when it is re-embedded or the index is compacted
+        moved = ~fresh
+        moved[moved] = self._slots[rows[moved]] != slots[moved]
+
+        changed = fresh | moved
+        vectors = index.vectors_at(slots[changed], version)
+        if vectors is None:
+            return False
+        # Compaction moves vectors without changing them; only real changes are re-inserted
+        same = np.zeros(len(vectors), dtype=bool)
+        was_moved = moved[changed]
+        same[was_moved] = np.all(np.isclose(self._vectors[rows[changed][was_moved]], vectors[was_moved], atol=1e-6), axis=1)
+        self._slots[rows[changed][same]] = slots[changed][same]
+
+        self.remove(removed)
+        reinsert = ~same
+        self.add(ids[changed][reinsert], vectors[reinsert], slots[changed][reinsert])
+        return True
+
+    # -------------------------
+    # reading
+    # -------------------------
+    def neighbours(self, paper_id: int, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """[(paper_id, cosine similarity)] of the most similar papers, best first"""
+        with self._lock:
+            row = self._positions.get(int(paper_id))
+            if row is None:
+                return []
+            ids, scores = self._neighbours[row], self._scores[row]
+            valid = ids >= 0
+            return list(zip(ids[valid][:limit].tolist(), scores[valid][:limit].tolist()))
+
+    def snapshot(self) -> Dict[int, List[int]]:
+        """paper id -> neighbour ids, for comparing graphs"""
+        with self._lock:
+            return {
+                int(paper_id): [int(i) for i in row if i >= 0]
+                for paper_id, row in zip(self._ids[:self._size], self._neighbours[:self._size])
+            }
+
+
+# =========================
+# PER-WORKSPACE REGISTRY
+# =========================
+_graphs: Dict[int, KNNGraph] = {}
+_registry_lock = threading.Lock()
+
+
+def workspace_graph(workspace_id: int, index: IVFIndex) -> KNNGraph:
+    """Graph of a workspace, built on first use and synced with its paper index"""
+    with _registry_lock:
+        graph = _graphs.get(workspace_id)
+        if graph is None:
+            graph = _graphs[workspace_id] = KNNGraph()
+    graph.sync(index)
+    return graph
+
+
+def refresh_workspace_graph(workspace_id: int, index: IVFIndex) -> None:
+    """After writing to a paper index: update the graph if this process has one"""
+    graph = _graphs.get(workspace_id)
+    if graph is not None:
+        graph.sync(index)
+
+
+def drop_workspace_graph(workspace_id: int) -> None:
+    with _registry_lock:
+        _graphs.pop(workspace_id, None)
@@ -0,0 +1,147 @@
+"""
+Concurrency control for LLM calls.
+
+Every chat completion takes a per-user slot and then a global slot, so one
+worker never has more than LLM_MAX_CONCURRENCY calls in flight and a single
+user cannot occupy more than LLM_MAX_PER_USER of them. Callers that wait in
+the queue for longer than LLM_QUEUE_TIMEOUT get LLMBusyError. A call that
+runs longer than LLM_TIMEOUT is cancelled, and so is a call whose client has
+disconnected.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from starlette.requests import Request
+
+from utils.groq_client import async_client
+
+load_dotenv()
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_MAX_PER_USER = int(os.getenv("LLM_MAX_PER_USER", "2"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+DISCONNECT_POLL_SECONDS = 0.5
+
+
+class LLMBusyError(Exception):
+    """No LLM slot became free within LLM_QUEUE_TIMEOUT"""
+
+
+class LLMTimeoutError(Exception):
+    """The LLM call exceeded LLM_TIMEOUT and was cancelled"""
+
+
+class ClientDisconnected(Exception):
+    """The HTTP client went away, so the LLM call was cancelled"""
+
+
+class LLMLimiter:
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_per_user: int = LLM_MAX_PER_USER,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.queue_timeout = queue_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._global: Optional[asyncio.Semaphore] = None
+        self._users: Dict[str, list] = {}  # user -> [semaphore, holders + waiters]
+        self.waiting = 0
+        self.active = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    def _bind(self):
+        # Semaphores belong to one event loop; start fresh if the loop changed
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._global = asyncio.Semaphore(self.max_concurrency)
+            self._users = {}
+
+    async def _acquire(self, user_sem: asyncio.Semaphore):
+        await user_sem.acquire()
+        try:
+            await self._global.acquire()
+        except BaseException:
+            user_sem.release()
+            raise
+
+    @asynccontextmanager
+    async def slot(self, user_key: str):
+        """Hold a per-user and a global LLM slot for the duration of the block"""
+        self._bind()
+        entry = self._users.setdefault(user_key, [asyncio.Semaphore(self.max_per_user), 0])
+        entry[1] += 1
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            try:
+                await asyncio.wait_for(self._acquire(entry[0]), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise LLMBusyError("Too many chats in progress, please retry shortly")
+            finally:
+                self.waiting -= 1
+
+            self.active += 1
+            try:
+                yield
+            finally:
+                self.active -= 1
+                self._global.release()
+                entry[0].release()
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._users.pop(user_key, None)
+
+    async def complete(self, user_key: str, request: Optional[Request] = None,
+                       timeout: float = LLM_TIMEOUT, **kwargs):
+        """Rate-limited ``chat.completions.create`` with timeout and disconnect cancellation"""
+        async with self.slot(user_key):
+            task = asyncio.ensure_future(async_client.chat.completions.create(**kwargs))
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            try:
+                while True:
+                    remaining = deadline - loop.time()
+                    done, _ = await asyncio.wait({task}, timeout=max(0, min(DISCONNECT_POLL_SECONDS, remaining)))
+                    if done:
+                        self.completed += 1
+                        return task.result()
+                    if loop.time() >= deadline:
+                        self.timeouts += 1
+                        raise LLMTimeoutError(f"LLM call exceeded {timeout:.0f}s")
+                    if request is not None and await request.is_disconnected():
+                        self.cancelled += 1
+                        raise ClientDisconnected()
+            finally:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "active": self.active,
+            "active_users": len(self._users),
+            "max_concurrency": self.max_concurrency,
+            "max_per_user": self.max_per_user,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+        }
+
+
+llm_limiter = LLMLimiter()
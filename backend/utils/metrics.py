@@ -0,0 +1,236 @@
+"""
+Request and per-stage latency metrics.
+
+``MetricsMiddleware`` times every HTTP request and opens a trace for it;
+code inside the request marks its stages with
+
+    with stage("embed"):
+        vector = await generate_embedding_async(text)
+
+Both end up in fixed-bucket histograms labelled by route template (and
+stage), exported in Prometheus text format on ``GET /metrics`` and as
+p50/p95/p99 estimates on ``/health/stages``. Requests slower than
+SLOW_REQUEST_MS are logged with their stage breakdown and kept in a short
+ring buffer (``/health/slow-requests``).
+
+With METRICS=false the middleware is not installed and ``stage`` is a shared
+no-op context manager, so the instrumented code pays one function call.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS = os.getenv("METRICS", "true").lower() in ("1", "true", "yes")
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "2000"))  # 0 = no slow-request log
+
+# Upper bounds in seconds, Prometheus' usual latency buckets stretched for LLM calls
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = logging.getLogger("researchpilot.slow_requests")
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram for one label set"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate by linear interpolation inside the bucket holding the q-th sample"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return BUCKETS[-1]
+
+
+class MetricsRegistry:
+    """Histograms keyed by metric name and label values"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Tuple[Tuple[str, str], ...], Histogram]] = {}
+        self.slow_requests = deque(maxlen=100)
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = tuple(labels.items())  # callers pass labels in a fixed order
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(seconds)
+
+    def summary(self, name: str) -> List[dict]:
+        """Count and p50/p95/p99 in milliseconds per label set"""
+        with self._lock:
+            series = list(self._histograms.get(name, {}).items())
+        return [
+            {
+                **dict(key),
+                "count": h.count,
+                **{f"p{int(q * 100)}_ms": round(h.quantile(q) * 1000, 2) for q in (0.5, 0.95, 0.99)},
+            }
+            for key, h in sorted(series)
+        ]
+
+    def prometheus(self) -> str:
+        """All histograms in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, h in sorted(series.items()):
+                    labels = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+                    cumulative = 0
+                    for bound, n in zip((*BUCKETS, "+Inf"), h.counts):
+                        cumulative += n
+                        lines.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}')
+                    lines.append(f"{name}_sum{{{labels}}} {h.sum}")
+                    lines.append(f"{name}_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self.slow_requests.clear()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = MetricsRegistry()
+
+
+# =========================
+# PER-REQUEST TRACES
+# =========================
+class Trace:
+    """Stage timings of one request; the route is resolved once routing has happened"""
+
+    __slots__ = ("scope", "stages")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.stages: List[Tuple[str, float]] = []
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_noop = nullcontext()
+
+
+def observe_stage(name: str, seconds: float):
+    """Record a stage duration measured elsewhere (e.g. time to first token)"""
+    if not METRICS:
+        return
+    trace = _trace.get()
+    if trace is not None:
+        trace.stages.append((name, seconds))
+        route = trace.route
+    else:
+        route = "background"
+    metrics.observe("researchpilot_stage_seconds", seconds, route=route, stage=name)
+
+
+class _Timed:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        observe_stage(self.name, time.perf_counter() - self.start)
+
+
+def stage(name: str):
+    """Context manager timing one stage of the current request (sync or async code)"""
+    return _Timed(name) if METRICS else _noop
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: request histogram, trace context and slow-request log"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(scope)
+        token = _trace.set(trace)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _trace.reset(token)
+            seconds = time.perf_counter() - start
+            route = trace.route
+            if route != "/metrics":
+                metrics.observe(
+                    "researchpilot_request_seconds", seconds,
+                    route=route, method=scope["method"], status=str(status)
+                )
+            if SLOW_REQUEST_MS and seconds * 1000 >= SLOW_REQUEST_MS:
+                _log_slow(scope, route, status, seconds, trace.stages)
+
+
+def _log_slow(scope: dict, route: str, status: int, seconds: float, stages: List[Tuple[str, float]]):
+    breakdown = {}
+    for name, s in stages:  # a stage entered twice (e.g. two queries) is summed
+        breakdown[name] = round(breakdown.get(name, 0.0) + s * 1000, 1)
+    metrics.slow_requests.append({
+        "at": time.time(),
+        "method": scope["method"],
+        "route": route,
+        "path": scope["path"],
+        "status": status,
+        "total_ms": round(seconds * 1000, 1),
+        "stages_ms": breakdown,
+    })
+    logger.warning(
+        "slow request %s %s -> %s in %.0fms: %s",
+        scope["method"], scope["path"], status, seconds * 1000,
+        ", ".join(f"{name}={ms}ms" for name, ms in breakdown.items()) or "no stages recorded"
+    )
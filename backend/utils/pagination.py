@@ -0,0 +1,44 @@
+"""
+Keyset pagination for listing endpoints.
+
+A page is a plain JSON list; when more rows follow, the opaque cursor for
+the next page is returned in the ``X-Next-Cursor`` header and passed back as
+``?cursor=``. Cursors hold the sort key of the last row sent (e.g. its id,
+or created_at and id), so every page is an index range scan no matter how
+deep the client pages.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Sequence
+
+from fastapi import HTTPException, Response
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values) -> str:
+    """Opaque cursor for a sort key (ints, strings, datetimes)"""
+    key = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> List:
+    """Sort key of a cursor, converted to ``types``; 400 if it is malformed"""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(raw, list) or len(raw) != len(types):
+            raise ValueError(cursor)
+        return [datetime.fromisoformat(v) if t is datetime else t(v) for v, t in zip(raw, types)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(rows: Sequence, limit: int, response: Response, key) -> Sequence:
+    """Trim a ``limit + 1`` fetch to one page and set the next-page cursor header"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+    return rows
@@ -0,0 +1,150 @@
+"""
+Re-embedding after an embedding model change.
+
+Every paper records the model that produced its embedding. A ``reembed`` job
+walks the papers whose model differs from EMBEDDING_MODEL in id order and
+enqueues one ``reembed_chunk`` child job per REEMBED_CHUNK_SIZE papers,
+checkpointing the last planned id. The children run in parallel on the job
+workers, re-encode their papers (and the papers' full-text chunks) in a
+worker thread and update the workspace indexes. Because a chunk only touches
+papers that are still stale, an interrupted run simply resumes.
+"""
+import functools
+import os
+from collections import defaultdict
+from typing import List
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from models.paper import Paper, PaperChunk
+from utils.ann_index import get_workspace_index
+from utils.embeddings import EMBEDDING_MODEL_NAME, embedding_provider
+from utils.jobs import JobContext, WaitForChildren, enqueue, job_handler, job_pool
+from utils.vector_codec import decode_matrix, encode_embedding
+
+load_dotenv()
+
+REEMBED_CHUNK_SIZE = int(os.getenv("REEMBED_CHUNK_SIZE", "500"))
+REEMBED_TEXT_BATCH = 1024  # texts per model call inside a chunk job
+
+
+def stale_papers(db: Session):
+    """Papers not embedded with the configured model"""
+    return db.query(Paper).filter(
+        or_(Paper.embedding_model.is_(None), Paper.embedding_model != EMBEDDING_MODEL_NAME)
+    )
+
+
+def _plan_chunk(parent_id: int, last_id: int) -> List[int]:
+    """Enqueue a chunk job for the next stale papers after ``last_id``; returns their ids"""
+    with SessionLocal() as db:
+        ids = [row[0] for row in stale_papers(db).with_entities(Paper.id).filter(
+            Paper.id > last_id
+        ).order_by(Paper.id).limit(REEMBED_CHUNK_SIZE)]
+        if ids:
+            enqueue(
+                db, "reembed_chunk",
+                {"first_id": ids[0], "last_id": ids[-1], "model": EMBEDDING_MODEL_NAME},
+                parent_id=parent_id, total=len(ids), commit=False
+            )
+            db.commit()
+        return ids
+
+
+@job_handler("reembed")
+async def plan_reembed(job: JobContext):
+    """Fan the stale papers out into chunk jobs, resuming after the last planned id"""
+    last_id = job.state.get("planned_through", 0)
+    chunks = job.state.get("chunks", 0)
+    papers = job.state.get("papers", 0)
+    while True:
+        ids = await job.run_in_thread(_plan_chunk, job.id, last_id)
+        if not ids:
+            break
+        last_id, chunks, papers = ids[-1], chunks + 1, papers + len(ids)
+        await job.run_in_thread(
+            job.progress, 0, total=chunks, planned_through=last_id, chunks=chunks, papers=papers, model=EMBEDDING_MODEL_NAME
+        )
+        job_pool.notify()
+    raise WaitForChildren()
+
+
+@job_handler("reembed_chunk")
+async def reembed_chunk(job: JobContext) -> dict:
+    """Re-encode one id range of papers and their full-text chunks"""
+    if job.payload["model"] != EMBEDDING_MODEL_NAME:
+        raise RuntimeError(f"Planned for {job.payload['model']}, but this worker runs {EMBEDDING_MODEL_NAME}")
+    papers, chunks = await job.run_in_thread(_reembed_range, job.payload["first_id"], job.payload["last_id"])
+    await job.run_in_thread(job.progress, papers)
+    return {"papers": papers, "chunks": chunks}
+
+
+def _reembed_range(first_id: int, last_id: int):
+    with SessionLocal() as db:
+        rows = stale_papers(db).with_entities(
+            Paper.id, Paper.workspace_id, Paper.title, Paper.abstract
+        ).filter(Paper.id.between(first_id, last_id)).all()
+        if not rows:
+            return 0, 0
+        paper_vectors = embedding_provider.encode(
+            [f"{row.title} {row.abstract or ''}" for row in rows], batch_size=64
+        )
+
+        chunk_rows = db.query(PaperChunk.id, PaperChunk.workspace_id, PaperChunk.content).filter(
+            PaperChunk.paper_id.in_([row.id for row in rows])
+        ).order_by(PaperChunk.id).all()
+        chunk_vectors = [
+            embedding_provider.encode([c.content for c in chunk_rows[i:i + REEMBED_TEXT_BATCH]], batch_size=64)
+            for i in range(0, len(chunk_rows), REEMBED_TEXT_BATCH)
+        ]
+        chunk_vectors = np.vstack(chunk_vectors) if chunk_vectors else np.zeros((0, paper_vectors.shape[1]), np.float32)
+
+        db.execute(update(Paper), [
+            {"id": row.id, "embedding": encode_embedding(vector), "embedding_model": EMBEDDING_MODEL_NAME}
+            for row, vector in zip(rows, paper_vectors)
+        ])
+        if chunk_rows:
+            db.execute(update(PaperChunk), [
+                {"id": row.id, "embedding": encode_embedding(vector)}
+                for row, vector in zip(chunk_rows, chunk_vectors)
+            ])
+        db.commit()
+
+        _update_indexes(db, "papers", rows, paper_vectors)
+        _update_indexes(db, "chunks", chunk_rows, chunk_vectors)
+    return len(rows), len(chunk_rows)
+
+
+def _update_indexes(db: Session, kind: str, rows, vectors: np.ndarray):
+    by_workspace = defaultdict(list)
+    for i, row in enumerate(rows):
+        by_workspace[row.workspace_id].append(i)
+
+    for workspace_id, positions in by_workspace.items():
+        index = get_workspace_index(workspace_id, kind)
+        if not index.exists:
+            continue  # bootstrapped from the database on first use
+        if index.meta["dim"] in (None, vectors.shape[1]):
+            index.add([rows[i].id for i in positions], vectors[positions])
+        else:
+            # New model, new dimension: rebuild from what is already re-embedded
+            index.rebuild_from(functools.partial(_reembedded, db, kind, workspace_id))
+
+
+def _reembedded(db: Session, kind: str, workspace_id: int):
+    """(ids, vectors) of a workspace's papers or chunks embedded with the current model"""
+    db.commit()  # a new transaction, started under the rebuild lock
+    table = Paper if kind == "papers" else PaperChunk
+    query = db.query(table.id, table.embedding).filter(table.workspace_id == workspace_id)
+    if kind == "papers":
+        query = query.filter(Paper.embedding_model == EMBEDDING_MODEL_NAME)
+    else:
+        query = query.join(Paper, Paper.id == PaperChunk.paper_id).filter(
+            Paper.embedding_model == EMBEDDING_MODEL_NAME
+        )
+    current = query.all()
+    return [r[0] for r in current], decode_matrix(r[1] for r in current)
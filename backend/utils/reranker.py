@@ -0,0 +1,236 @@
+"""
+Cross-encoder reranking of chat retrieval candidates.
+
+The first stage (vector + BM25 fusion, utils.hybrid_search) is fast but
+scores the question and each paper independently. With RERANKER enabled,
+its top RERANK_CANDIDATES papers are rescored by a small local cross-encoder
+that reads the question and the paper's title and abstract together. The
+best few papers then go into the prompt.
+
+All uncached (question, paper) pairs of a request are scored by one
+``predict`` call in a dedicated thread. Scores are kept in an LRU cache
+keyed by question, paper id and text. If scoring does not finish within
+RERANK_BUDGET_MS, the request keeps the first-stage order. The scoring
+still completes in the background and fills the cache for the next asker.
+While the model is busy, a request falls back right away, without
+queueing, when the expected cost of the pairs already waiting plus its own
+uncached pairs would exceed the budget. If the model cannot be loaded, the
+failure is remembered (like EmbeddingProvider's FAILED state) and every
+request keeps the first-stage order without trying again.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from models.paper import Paper
+
+load_dotenv()
+
+RERANKER = os.getenv("RERANKER", "false").lower() in ("1", "true", "yes")
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))  # first-stage papers rescored
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "300"))  # 0 = wait for the scores
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "64"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000"))  # (question, paper) scores
+RERANK_MAX_CHARS = 2000  # of title + abstract; the model truncates to 512 tokens anyway
+
+
+class CrossEncoderReranker:
+    """Lazily loaded cross-encoder with a score cache and a per-request latency budget"""
+
+    def __init__(
+        self,
+        model_name: str = RERANKER_MODEL,
+        enabled: bool = RERANKER,
+        budget_ms: float = RERANK_BUDGET_MS,
+        batch_size: int = RERANK_BATCH_SIZE,
+        max_entries: int = RERANK_CACHE_SIZE,
+    ):
+        self.model_name = model_name
+        self.enabled = enabled
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        self.error: Optional[str] = None
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._scores: "OrderedDict[tuple, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One forward pass at a time: requests queue up (and fall back) instead of
+        # oversubscribing the CPU the embedding model and the API also need
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+        self.requests = 0
+        self.reranked = 0
+        self.fallbacks = 0
+        self.failures = 0
+        self.skipped = 0
+        self._queued_pairs = 0
+        self._ms_per_pair = 0.0  # moving average of the model's cost
+        self.pairs_cached = 0
+        self.pairs_scored = 0
+        self.batches = 0
+        self.model_seconds = 0.0
+
+    @property
+    def failed(self) -> bool:
+        return self._model is None and self.error is not None
+
+    def load(self):
+        """Load the model once; concurrent callers wait for the first load, a failure is not retried"""
+        if self._model is None:
+            with self._load_lock:
+                if self.failed:
+                    raise RuntimeError(f"reranker model failed to load: {self.error}")
+                if self._model is None:
+                    try:
+                        # Imported here so that importing this module never pays for torch
+                        from sentence_transformers import CrossEncoder
+                        self._model = CrossEncoder(self.model_name, device="cpu")
+                    except Exception as e:
+                        self.error = str(e)
+                        raise
+        return self._model
+
+    def warm_up(self):
+        self.load()
+        # Not timed: the first forward pass is slower than the steady state
+        self.score("warm up", [(0, "warm up")], cache=False, timed=False)
+
+    def start_background_load(self) -> threading.Thread:
+        def run():
+            try:
+                self.warm_up()
+            except Exception:
+                pass  # recorded in self.error; requests fall back to the first stage
+
+        thread = threading.Thread(target=run, name="reranker-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def score(self, query: str, docs: Sequence[Tuple[int, str]], cache: bool = True, timed: bool = True) -> np.ndarray:
+        """Relevance of each (id, text) to the query, uncached pairs in one batched forward pass"""
+        keys = [(query, doc_id, hash(text)) for doc_id, text in docs]
+        scores = np.empty(len(docs), dtype=np.float32)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._scores.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._scores.move_to_end(key)
+                    scores[i] = cached
+            self.pairs_cached += len(docs) - len(missing)
+
+        if missing:
+            model = self.load()
+            start = time.perf_counter()
+            predicted = model.predict(
+                [(query, docs[i][1][:RERANK_MAX_CHARS]) for i in missing],
+                batch_size=self.batch_size, show_progress_bar=False
+            )
+            elapsed = time.perf_counter() - start
+            predicted = np.asarray(predicted, dtype=np.float32).reshape(-1)
+            scores[missing] = predicted
+            with self._lock:
+                if timed:
+                    self.pairs_scored += len(missing)
+                    self.batches += 1
+                    self.model_seconds += elapsed
+                    ms_per_pair = elapsed * 1000 / len(missing)
+                    self._ms_per_pair = ms_per_pair if not self._ms_per_pair else 0.8 * self._ms_per_pair + 0.2 * ms_per_pair
+                if cache:
+                    for i, value in zip(missing, predicted.tolist()):
+                        self._scores[keys[i]] = value
+                    while len(self._scores) > self.max_entries:
+                        self._scores.popitem(last=False)
+        return scores
+
+    def rerank(self, query: str, docs: Sequence[Tuple[int, str]], budget_ms: Optional[float] = None) -> Optional[List[int]]:
+        """Doc ids best first, or None when the budget ran out or the model failed"""
+        self.requests += 1
+        if self.failed:
+            self.fallbacks += 1
+            return None
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        with self._lock:
+            # Do not queue when the pairs ahead plus this request's uncached ones would use up the
+            # budget (an idle model always runs, which keeps the cost estimate current)
+            uncached = sum((query, doc_id, hash(text)) not in self._scores for doc_id, text in docs)
+            expected_ms = (self._queued_pairs + uncached) * self._ms_per_pair
+            if budget_ms > 0 and self._queued_pairs and expected_ms >= budget_ms:
+                self.skipped += 1
+                self.fallbacks += 1
+                return None
+            self._queued_pairs += len(docs)
+        future = self._executor.submit(self.score, query, docs)
+        future.add_done_callback(lambda _: self._dequeue(len(docs)))
+        try:
+            scores = future.result(timeout=budget_ms / 1000 if budget_ms > 0 else None)
+        except FutureTimeout:
+            future.cancel()  # only succeeds while still queued behind another request
+            self.fallbacks += 1
+            return None
+        except Exception as e:
+            self.error = str(e)
+            self.failures += 1
+            self.fallbacks += 1
+            return None
+        self.reranked += 1
+        # Stable sort: ties keep the first-stage order
+        return [docs[i][0] for i in np.argsort(-scores, kind="stable")]
+
+    def _dequeue(self, pairs: int):
+        with self._lock:
+            self._queued_pairs -= pairs
+
+    def clear(self):
+        with self._lock:
+            self._scores.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            looked_up = self.pairs_cached + self.pairs_scored
+            return {
+                "enabled": self.enabled,
+                "model": self.model_name,
+                "loaded": self._model is not None,
+                "failed": self.failed,
+                "error": self.error,
+                "budget_ms": self.budget_ms,
+                "candidates": RERANK_CANDIDATES,
+                "requests": self.requests,
+                "reranked": self.reranked,
+                "fallbacks": self.fallbacks,
+                "failures": self.failures,
+                "skipped": self.skipped,
+                "queued_pairs": self._queued_pairs,
+                "cached_scores": len(self._scores),
+                "pair_hit_rate": self.pairs_cached / looked_up if looked_up else 0.0,
+                "pairs_scored": self.pairs_scored,
+                "avg_batch_ms": self.model_seconds / self.batches * 1000 if self.batches else 0.0,
+                "ms_per_pair": self._ms_per_pair,
+            }
+
+
+reranker = CrossEncoderReranker()
+
+
+def rerank_papers(db: Session, query: str, paper_ids: List[int], top_k: int) -> List[int]:
+    """First-stage paper ids reordered by the cross-encoder, cut to top_k (first-stage order on fallback)"""
+    if not reranker.enabled or len(paper_ids) <= 1:
+        return paper_ids[:top_k]
+    rows = {
+        paper_id: f"{title}. {abstract or ''}"
+        for paper_id, title, abstract in db.query(Paper.id, Paper.title, Paper.abstract).filter(Paper.id.in_(paper_ids))
+    }
+    docs = [(paper_id, rows[paper_id]) for paper_id in paper_ids if paper_id in rows]
+    order = reranker.rerank(query, docs)
+    return (order or paper_ids)[:top_k]
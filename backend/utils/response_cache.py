@@ -0,0 +1,169 @@
+"""
+Semantic cache of chat answers.
+
+Near-identical questions about the same workspace ("summarize these papers")
+are answered from memory instead of another LLM call. Entries are grouped by
+(workspace id, workspace content version, conversation history); inside a
+group the closest cached question by cosine similarity is reused when it
+scores at least RESPONSE_CACHE_THRESHOLD. Importing or deleting papers bumps
+``workspaces.content_version``, so answers about the old contents are never
+served again (and are dropped from this process right away). Entries expire
+after RESPONSE_CACHE_TTL seconds and the least recently used are evicted
+beyond RESPONSE_CACHE_SIZE. The cache lives in each worker process.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from models.workspace import Workspace
+
+load_dotenv()
+
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+
+
+class CacheKey(NamedTuple):
+    group: tuple  # (workspace id, content version, history hash)
+    vector: np.ndarray  # normalized query embedding
+
+
+@dataclass
+class CachedResponse:
+    group: tuple
+    vector: np.ndarray
+    response: str
+    expires: float
+
+
+def content_version(db: Session, workspace_id: int) -> Optional[int]:
+    """Current content version of a workspace (None if it does not exist)"""
+    return db.query(Workspace.content_version).filter(Workspace.id == workspace_id).scalar()
+
+
+def bump_content_version(db: Session, workspace_id: int):
+    """Mark a workspace's papers as changed; the caller commits"""
+    db.execute(
+        update(Workspace).where(Workspace.id == workspace_id).values(content_version=Workspace.content_version + 1)
+    )
+    response_cache.invalidate_workspace(workspace_id)
+
+
+def history_hash(messages: List[dict]) -> str:
+    """Fingerprint of the conversation history sent with a question ("" for none)"""
+    if not messages:
+        return ""
+    payload = json.dumps([(m["role"], m["content"]) for m in messages], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SemanticResponseCache:
+    """TTL + LRU cache of answers, looked up by query-embedding similarity"""
+
+    def __init__(
+        self,
+        threshold: float = RESPONSE_CACHE_THRESHOLD,
+        ttl: float = RESPONSE_CACHE_TTL,
+        max_entries: int = RESPONSE_CACHE_SIZE,
+        enabled: bool = RESPONSE_CACHE
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: "OrderedDict[int, CachedResponse]" = OrderedDict()  # LRU order
+        self._groups: Dict[tuple, Dict[int, None]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "evictions": 0, "invalidated": 0}
+
+    def key(self, workspace_id: int, version: Optional[int], query_vector, history: List[dict]) -> Optional[CacheKey]:
+        """Cache key for a question, or None when it cannot be cached"""
+        if not self.enabled or version is None or query_vector is None or not len(query_vector):
+            return None
+        vector = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return None
+        return CacheKey((workspace_id, version, history_hash(history)), vector / norm)
+
+    def get(self, key: Optional[CacheKey]) -> Optional[str]:
+        """Answer to the most similar cached question, if similar enough"""
+        if key is None:
+            return None
+        with self._lock:
+            ids = list(self._groups.get(key.group, ()))
+            now = time.monotonic()
+            for entry_id in ids:
+                if self._entries[entry_id].expires < now:
+                    self._remove(entry_id)
+                    self.metrics["expired"] += 1
+            ids = [entry_id for entry_id in ids if entry_id in self._entries]
+
+            if ids:
+                scores = np.vstack([self._entries[i].vector for i in ids]) @ key.vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._entries.move_to_end(ids[best])
+                    self.metrics["hits"] += 1
+                    return self._entries[ids[best]].response
+            self.metrics["misses"] += 1
+            return None
+
+    def put(self, key: Optional[CacheKey], response: str):
+        if key is None or not response:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = CachedResponse(key.group, key.vector, response, time.monotonic() + self.ttl)
+            self._groups.setdefault(key.group, {})[entry_id] = None
+            self.metrics["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.metrics["evictions"] += 1
+
+    def invalidate_workspace(self, workspace_id: int):
+        """Drop every answer about a workspace (its contents changed)"""
+        with self._lock:
+            for group in [g for g in self._groups if g[0] == workspace_id]:
+                for entry_id in list(self._groups[group]):
+                    self._remove(entry_id)
+                    self.metrics["invalidated"] += 1
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        group = self._groups[entry.group]
+        del group[entry_id]
+        if not group:
+            del self._groups[entry.group]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+
+    def stats(self) -> dict:
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return {
+            **self.metrics,
+            "hit_rate": self.metrics["hits"] / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+        }
+
+
+response_cache = SemanticResponseCache()
@@ -0,0 +1,231 @@
+"""
+Async Semantic Scholar client.
+
+One shared ``httpx.AsyncClient`` keeps connections alive between searches.
+Results are cached with a TTL keyed by (query, fields, limit), and concurrent
+identical searches are coalesced into a single upstream call (if the caller
+making it is cancelled, one of the waiters repeats it). Outgoing
+requests pass through a token bucket, and 429/5xx responses are retried with
+exponential backoff (honouring ``Retry-After``, up to S2_MAX_BACKOFF seconds).
+"""
+import asyncio
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SEMANTIC_SCHOLAR_API_KEY = os.getenv("SEMANTIC_SCHOLAR_API_KEY")
+SEMANTIC_SCHOLAR_BASE_URL = os.getenv("SEMANTIC_SCHOLAR_BASE_URL", "https://api.semanticscholar.org/graph/v1")
+S2_TIMEOUT = float(os.getenv("S2_TIMEOUT", "10"))
+S2_CACHE_TTL = float(os.getenv("S2_CACHE_TTL", "600"))
+S2_CACHE_SIZE = int(os.getenv("S2_CACHE_SIZE", "1000"))
+S2_RATE_PER_SEC = float(os.getenv("S2_RATE_PER_SEC", "1"))
+S2_BURST = int(os.getenv("S2_BURST", "3"))
+S2_MAX_RETRIES = int(os.getenv("S2_MAX_RETRIES", "3"))
+S2_BACKOFF = float(os.getenv("S2_BACKOFF", "0.5"))
+S2_MAX_BACKOFF = float(os.getenv("S2_MAX_BACKOFF", "10"))  # cap on any single retry delay
+
+
+class RateLimitedError(Exception):
+    """Semantic Scholar kept answering 429 after every retry"""
+
+
+class _LeaderCancelled(Exception):
+    """The caller making a coalesced request was cancelled; its waiters retry"""
+
+
+class TokenBucket:
+    """Async token bucket; callers over the rate sleep until their slot"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> float:
+        # No await between reading and updating, so this is atomic on the loop.
+        # A negative balance is a queue of reservations for future slots.
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class TTLCache:
+    """Small LRU cache whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SemanticScholarClient:
+    def __init__(
+        self,
+        base_url: str = SEMANTIC_SCHOLAR_BASE_URL,
+        api_key: Optional[str] = SEMANTIC_SCHOLAR_API_KEY,
+        rate_per_sec: float = S2_RATE_PER_SEC,
+        burst: int = S2_BURST,
+        max_retries: int = S2_MAX_RETRIES,
+        backoff: float = S2_BACKOFF,
+        max_backoff: float = S2_MAX_BACKOFF,
+        timeout: float = S2_TIMEOUT,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"User-Agent": "ResearchPilot/1.0"}
+        if api_key:
+            self.headers["x-api-key"] = api_key
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.cache = TTLCache(S2_CACHE_TTL, S2_CACHE_SIZE)
+        self.bucket = TokenBucket(rate_per_sec, burst)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self.metrics = {
+            "searches": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "upstream_requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "errors": 0,
+            "throttle_wait_seconds": 0.0,
+        }
+
+    async def _http(self) -> httpx.AsyncClient:
+        # The pooled client and in-flight futures belong to one event loop
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            old = self._client
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+            self._loop = loop
+            self._inflight = {}
+            if old is not None:
+                try:
+                    await old.aclose()
+                except RuntimeError:
+                    pass  # its connections belonged to a loop that is closed already
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def search(self, query: str, fields: str, limit: int = 10) -> dict:
+        """Paper search; served from cache or shared with identical in-flight calls"""
+        self.metrics["searches"] += 1
+        key = (" ".join(query.lower().split()), fields, limit)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.metrics["cache_hits"] += 1
+            return cached
+
+        client = await self._http()
+        while (pending := self._inflight.get(key)) is not None:
+            self.metrics["coalesced"] += 1
+            try:
+                return await asyncio.shield(pending)
+            except _LeaderCancelled:
+                pass  # look again: another waiter may already have taken over
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            data = await self._get(client, "/paper/search", {"query": query, "limit": limit, "fields": fields})
+            self.cache.set(key, data)
+            future.set_result(data)
+            return data
+        except asyncio.CancelledError:
+            # Cancelling the shared future would cancel every waiter along with us
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _get(self, client: httpx.AsyncClient, path: str, params: dict) -> dict:
+        for attempt in range(self.max_retries + 1):
+            self.metrics["throttle_wait_seconds"] += await self.bucket.acquire()
+            self.metrics["upstream_requests"] += 1
+            try:
+                response = await client.get(path, params=params)
+            except httpx.RequestError:
+                self.metrics["errors"] += 1
+                raise
+
+            retryable = response.status_code == 429 or response.status_code >= 500
+            if not retryable:
+                if response.status_code >= 400:
+                    self.metrics["errors"] += 1
+                response.raise_for_status()
+                return response.json()
+
+            if response.status_code == 429:
+                self.metrics["rate_limited"] += 1
+            if attempt == self.max_retries:
+                break
+
+            self.metrics["retries"] += 1
+            retry_after = response.headers.get("Retry-After")
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else self.backoff * 2 ** attempt
+            await asyncio.sleep(min(delay, self.max_backoff) + random.uniform(0, self.backoff))
+
+        if response.status_code == 429:
+            raise RateLimitedError("Semantic Scholar rate limit exceeded")
+        self.metrics["errors"] += 1
+        response.raise_for_status()
+
+    def stats(self) -> dict:
+        return {**self.metrics, "cache_entries": len(self.cache), "inflight": len(self._inflight)}
+
+
+semantic_scholar = SemanticScholarClient()
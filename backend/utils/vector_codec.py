@@ -0,0 +1,74 @@
+"""
+Compact binary encoding for embedding vectors.
+
+Blobs start with a 4-byte tag naming the storage type so rows written with
+different EMBEDDING_STORAGE_DTYPE settings can coexist:
+
+    F32\\0  <float32 * dim>
+    F16\\0  <float16 * dim>
+    I8\\0\\0  <float32 scale> <int8 * dim>   (symmetric per-vector quantization)
+
+Decoding goes straight from the blob to a NumPy array with ``np.frombuffer``.
+"""
+import os
+from typing import Iterable, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_STORAGE_DTYPE = os.getenv("EMBEDDING_STORAGE_DTYPE", "float32")
+
+_TAGS = {
+    "float32": b"F32\0",
+    "float16": b"F16\0",
+    "int8": b"I8\0\0",
+}
+_HEADER = 4
+
+
+def encode_embedding(vector, dtype: Optional[str] = None) -> Optional[bytes]:
+    """Pack an embedding (list or array) into a tagged binary blob"""
+    if vector is None or len(vector) == 0:
+        return None
+    dtype = dtype or EMBEDDING_STORAGE_DTYPE
+    if dtype not in _TAGS:
+        raise ValueError(f"Unsupported embedding storage dtype: {dtype}")
+
+    array = np.asarray(vector, dtype=np.float32).reshape(-1)
+    if dtype == "float32":
+        payload = array.tobytes()
+    elif dtype == "float16":
+        payload = array.astype(np.float16).tobytes()
+    else:
+        scale = float(np.abs(array).max()) / 127.0 or 1.0
+        quantized = np.clip(np.rint(array / scale), -127, 127).astype(np.int8)
+        payload = np.float32(scale).tobytes() + quantized.tobytes()
+
+    return _TAGS[dtype] + payload
+
+
+def decode_embedding(blob: Optional[bytes]) -> Optional[np.ndarray]:
+    """Unpack a blob produced by encode_embedding into a float32 array"""
+    if not blob:
+        return None
+    tag = bytes(blob[:_HEADER])
+
+    if tag == _TAGS["float32"]:
+        return np.frombuffer(blob, dtype=np.float32, offset=_HEADER)
+    if tag == _TAGS["float16"]:
+        return np.frombuffer(blob, dtype=np.float16, offset=_HEADER).astype(np.float32)
+    if tag == _TAGS["int8"]:
+        scale = np.frombuffer(blob, dtype=np.float32, count=1, offset=_HEADER)[0]
+        return np.frombuffer(blob, dtype=np.int8, offset=_HEADER + 4).astype(np.float32) * scale
+
+    raise ValueError("Unknown embedding blob format")
+
+
+def decode_matrix(blobs: Iterable[bytes]) -> np.ndarray:
+    """Decode many blobs into one (n, dim) float32 matrix"""
+    vectors = [decode_embedding(blob) for blob in blobs]
+    if not vectors:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.vstack(vectors)
@@ -18,6 +18,20 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Listing endpoints are paginated: one page of items, plus the cursor for the
+// next page from X-Next-Cursor (undefined on the last page)
+export interface Page<T = any> {
+  items: T[];
+  nextCursor?: string;
+}
+
+export const PAGE_SIZE = 50;
+
+const getPage = async (url: string, cursor?: string, limit = PAGE_SIZE): Promise<Page> => {
+  const response = await api.get(url, { params: { limit, ...(cursor ? { cursor } : {}) } });
+  return { items: response.data, nextCursor: response.headers['x-next-cursor'] };
+};
+
 // Auth API
 export const authAPI = {
   register: async (email: string, password: string) => {
@@ -57,8 +71,10 @@ export const workspaceAPI = {
 
 // Papers API
 export const papersAPI = {
-  search: async (query: string) => {
-    const response = await api.get(`/papers/search?query=${encodeURIComponent(query)}`);
+  search: async (query: string, workspaceId?: number) => {
+    const params = new URLSearchParams({ query });
+    if (workspaceId) params.append('workspace_id', workspaceId.toString());
+    const response = await api.get(`/papers/search?${params.toString()}`);
     return response.data;
   },
   
@@ -67,20 +83,23 @@ export const papersAPI = {
     return response.data;
   },
   
-  getByWorkspace: async (workspaceId: number) => {
-    const response = await api.get(`/papers/workspace/${workspaceId}`);
-    return response.data;
+  getByWorkspace: async (workspaceId: number, cursor?: string) => {
+    return getPage(`/papers/workspace/${workspaceId}`, cursor);
   },
   
-  getWorkspacePapers: async (workspaceId: number) => {
-    const response = await api.get(`/papers/workspace/${workspaceId}`);
-    return response.data;
+  getWorkspacePapers: async (workspaceId: number, cursor?: string) => {
+    return getPage(`/papers/workspace/${workspaceId}`, cursor);
   },
   
   delete: async (paperId: number) => {
     const response = await api.delete(`/papers/${paperId}`);
     return response.data;
   },
+
+  getRelated: async (paperId: number, limit = 5) => {
+    const response = await api.get(`/papers/${paperId}/related?limit=${limit}`);
+    return response.data;
+  },
 };
 
 // Chat API
@@ -95,14 +114,12 @@ export const chatAPI = {
     return response.data;
   },
   
-  getConversations: async () => {
-    const response = await api.get('/conversations');
-    return response.data;
+  getConversations: async (cursor?: string) => {
+    return getPage('/conversations', cursor);
   },
   
-  getMessages: async (conversationId: number) => {
-    const response = await api.get(`/conversation/${conversationId}/messages`);
-    return response.data;
+  getMessages: async (conversationId: number, cursor?: string) => {
+    return getPage(`/conversation/${conversationId}/messages`, cursor);
   },
   
   deleteConversation: async (conversationId: number) => {
@@ -38,7 +38,9 @@ export default function Chat() {
   
   const [workspace, setWorkspace] = useState<Workspace | null>(null);
   const [papers, setPapers] = useState<Paper[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | undefined>();
   const [loadingContext, setLoadingContext] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [messages, setMessages] = useState<Message[]>([]);
   const [input, setInput] = useState('');
   const [loading, setLoading] = useState(false);
@@ -67,17 +69,20 @@ export default function Chat() {
       const currentWorkspace = workspaces.find((w: Workspace) => w.id === Number(workspaceId));
       setWorkspace(currentWorkspace || null);
 
-      // Fetch papers in this workspace
-      const papersData = await papersAPI.getByWorkspace(Number(workspaceId));
-      setPapers(papersData || []);
+      // Fetch the first page of papers in this workspace; answers draw on all of them
+      const page = await papersAPI.getByWorkspace(Number(workspaceId));
+      const papersData: Paper[] = page.items || [];
+      setPapers(papersData);
+      setNextCursor(page.nextCursor);
 
       // Set initial message with context
-      const paperTitles = papersData.map((p: Paper) => `- ${p.title}`).join('\n');
+      const paperTitles = papersData.map((p: Paper) => `- ${p.title}`).join('\n') + (page.nextCursor ? '\n- ...' : '');
+      const paperCount = `${papersData.length}${page.nextCursor ? '+' : ''}`;
       setMessages([
         {
           id: '1',
           role: 'assistant',
-          content: `Hello! I've loaded ${papersData.length} paper${papersData.length > 1 ? 's' : ''} from the "${currentWorkspace?.name}" workspace:\n\n${paperTitles}\n\nI can help you analyze these papers, compare findings, summarize content, or answer specific questions. What would you like to know?`
+          content: `Hello! I've loaded ${paperCount} paper${papersData.length > 1 || page.nextCursor ? 's' : ''} from the "${currentWorkspace?.name}" workspace:\n\n${paperTitles}\n\nI can help you analyze these papers, compare findings, summarize content, or answer specific questions. What would you like to know?`
         }
       ]);
     } catch (err) {
@@ -94,6 +99,21 @@ export default function Chat() {
     }
   };
 
+  const loadMorePapers = async () => {
+    if (!nextCursor || loadingMore) return;
+
+    setLoadingMore(true);
+    try {
+      const page = await papersAPI.getByWorkspace(Number(workspaceId), nextCursor);
+      setPapers(prev => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   };
@@ -225,7 +245,7 @@ export default function Chat() {
               </div>
               <div className="bg-slate-800/50 rounded-xl p-3 mb-3">
                 <p className="text-white text-sm font-medium mb-1">{workspace.name}</p>
-                <p className="text-slate-400 text-xs">{papers.length} papers loaded</p>
+                <p className="text-slate-400 text-xs">{papers.length}{nextCursor ? '+' : ''} papers loaded</p>
               </div>
               <div className="space-y-2 max-h-64 overflow-y-auto">
                 {papers.map((paper) => (
@@ -236,6 +256,15 @@ export default function Chat() {
                     </div>
                   </div>
                 ))}
+                {nextCursor && (
+                  <button
+                    onClick={loadMorePapers}
+                    disabled={loadingMore}
+                    className="w-full py-2 text-xs text-cyan-400 hover:text-cyan-300 transition-colors disabled:opacity-50"
+                  >
+                    {loadingMore ? 'Loading...' : 'Load more papers'}
+                  </button>
+                )}
               </div>
             </div>
           )}
@@ -67,7 +67,8 @@ export default function Search() {
     setSearched(true);
     setImportedPapers(new Set());
     try {
-      const data = await papersAPI.search(query);
+      // Ranked by relevance to the selected workspace
+      const data = await papersAPI.search(query, selectedWorkspace ?? undefined);
       setPapers(data.papers || []);
     } catch (err) {
       console.error(err);
@@ -36,7 +36,9 @@ export default function WorkspaceDetail() {
   const { id } = useParams<{ id: string }>();
   const [workspace, setWorkspace] = useState<Workspace | null>(null);
   const [papers, setPapers] = useState<Paper[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | undefined>();
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [deleting, setDeleting] = useState<number | null>(null);
   const [selectedPapers, setSelectedPapers] = useState<Set<number>>(new Set());
   const { setToken } = useAuth();
@@ -56,9 +58,10 @@ export default function WorkspaceDetail() {
       const currentWorkspace = workspaces.find((w: Workspace) => w.id === Number(id));
       setWorkspace(currentWorkspace || null);
 
-      // Fetch papers in this workspace
-      const papersData = await papersAPI.getByWorkspace(Number(id));
-      setPapers(papersData || []);
+      // Fetch the first page of papers in this workspace
+      const page = await papersAPI.getByWorkspace(Number(id));
+      setPapers(page.items || []);
+      setNextCursor(page.nextCursor);
     } catch (err) {
       console.error(err);
     } finally {
@@ -66,6 +69,21 @@ export default function WorkspaceDetail() {
     }
   };
 
+  const loadMorePapers = async () => {
+    if (!nextCursor || loadingMore) return;
+
+    setLoadingMore(true);
+    try {
+      const page = await papersAPI.getByWorkspace(Number(id), nextCursor);
+      setPapers(prev => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDeletePaper = async (paperId: number) => {
     if (!confirm('Are you sure you want to remove this paper from the workspace?')) {
       return;
@@ -201,7 +219,7 @@ export default function WorkspaceDetail() {
             <div>
               <h1 className="text-4xl font-bold text-white mb-2">{workspace.name}</h1>
               <p className="text-slate-400 text-lg">
-                {papers.length} {papers.length === 1 ? 'paper' : 'papers'} in this workspace
+                {papers.length}{nextCursor ? '+' : ''} {papers.length === 1 && !nextCursor ? 'paper' : 'papers'} in this workspace
               </p>
             </div>
             {papers.length > 0 && (
@@ -311,6 +329,15 @@ export default function WorkspaceDetail() {
                 </div>
               </div>
             ))}
+            {nextCursor && (
+              <button
+                onClick={loadMorePapers}
+                disabled={loadingMore}
+                className="w-full py-3 text-sm text-cyan-400 hover:text-cyan-300 bg-slate-800/30 border border-slate-700/30 hover:border-slate-600/50 rounded-xl transition-colors disabled:opacity-50"
+              >
+                {loadingMore ? 'Loading...' : 'Load more papers'}
+              </button>
+            )}
           </div>
         ) : (
           <div className="text-center py-16 bg-slate-800/20 border border-slate-700/20 rounded-2xl">